@@ -0,0 +1,475 @@
+"""
+server.py の負荷試験・レイテンシ計測スクリプト
+
+合成した物件データ（1マンションあたり100件〜10万件、1〜500マンション）を
+通常の公開処理（DataManager / build_pack）で data/_bench/ 以下に作成し、
+server.py をプロセス内（ASGI）またはローカルの uvicorn で起動して、
+指定した同時接続数で各エンドポイントにリクエストを送ります。
+スループット・レイテンシ（p50 / p95 / p99）・メモリ使用量を表示し、
+保存済みのベースラインと比較して性能の劣化を検出します。
+
+使用例:
+    python benchmark.py --listings 1000 --properties 10
+    python benchmark.py --listings 100000 --mode uvicorn --workers 4 --concurrency 64
+    python benchmark.py --listings 1000 --save-baseline benchmarks/baseline.json
+    python benchmark.py --listings 1000 --baseline benchmarks/baseline.json
+
+httpx が必要です（pip install httpx）。
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import math
+import os
+import platform
+import random
+import resource
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils import setup_logger, DataManager, Listing
+from utils.snapshot_pack import build_pack
+
+try:
+    import httpx
+except ImportError:  # ベンチマーク専用の依存関係
+    httpx = None
+
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SOURCES = ['SUUMO', 'HOMES', 'at home', 'Rehouse', 'Livable']
+LAYOUTS = ['1LDK', '2LDK', '3LDK', '4LDK']
+DIRECTIONS = ['南', '南東', '南西', '東', '西', '北']
+
+DEFAULT_ENDPOINTS = ['properties', 'listings', 'stats', 'static']
+
+# 比較する指標 -> 大きいほど良いか
+METRICS = {
+    'rps': True,
+    'p50_ms': False,
+    'p95_ms': False,
+    'p99_ms': False,
+}
+
+
+def generate_fixtures(fixtures_dir: str, properties: int, listings: int, seed: int, logger) -> str:
+    """
+    合成データを作成する（同じ条件のデータが作成済みであれば再利用する）
+
+    Args:
+        fixtures_dir: 出力先（config.json と data/ を作る）
+        properties: マンション数
+        listings: 1マンションあたりの物件数
+        seed: 乱数のシード
+        logger: ロガー
+
+    Returns:
+        str: 設定ファイルのパス
+    """
+    config_path = os.path.join(fixtures_dir, 'config.json')
+    marker_path = os.path.join(fixtures_dir, 'fixture.json')
+    params = {'properties': properties, 'listings': listings, 'seed': seed}
+    if os.path.exists(marker_path):
+        with open(marker_path, 'r', encoding='utf-8') as f:
+            if json.load(f) == params:
+                logger.info(f"Reusing fixtures: {fixtures_dir}")
+                return config_path
+
+    logger.info(f"Generating fixtures: {properties} property(ies) x {listings} listings -> {fixtures_dir}")
+    data_dir = os.path.join(fixtures_dir, 'data')
+    last_updated = datetime(2026, 1, 1, tzinfo=timezone.utc).isoformat()
+    property_configs = []
+    for p in range(properties):
+        rng = random.Random(seed * 100003 + p)
+        property_config = {
+            'id': f"BenchTower{p:03d}",
+            'name': f"ベンチマークタワー{p}",
+            'area': f"東京都江東区{rng.choice(['豊洲', '有明', '東雲', '辰巳'])}",
+            'layouts': LAYOUTS,
+        }
+        property_configs.append(property_config)
+
+        items = []
+        for i in range(listings):
+            area = round(rng.uniform(35, 140), 2)
+            floor = rng.randint(1, 48)
+            items.append(Listing(
+                source=rng.choice(SOURCES),
+                title=f"{property_config['name']} {floor}階 {rng.choice(LAYOUTS)} 眺望良好",
+                url=f"https://example.com/{property_config['id']}/{i}",
+                layout=rng.choice(LAYOUTS),
+                price=int(area * rng.uniform(1.2e6, 2.0e6)) // 10000 * 10000,
+                area=area,
+                floor=floor,
+                direction=rng.choice(DIRECTIONS),
+                built_year=rng.randint(1995, 2024),
+                management_fee=rng.randint(15, 60) * 1000,
+                repair_reserve=rng.randint(8, 40) * 1000,
+                posted_date=(datetime(2025, 12, 31) - timedelta(days=rng.randint(0, 90))).strftime('%Y-%m-%d'),
+            ))
+
+        data_manager = DataManager(property_config, data_dir)
+        data_manager.save_processed_data(items, property_config['name'], last_updated=last_updated)
+        build_pack(data_manager.processed_data_dir)
+
+    with open(config_path, 'w', encoding='utf-8') as f:
+        json.dump({'properties': property_configs, 'output': {'data_base_dir': data_dir}},
+                  f, ensure_ascii=False, indent=2)
+    with open(marker_path, 'w', encoding='utf-8') as f:
+        json.dump(params, f)
+    return config_path
+
+
+def make_endpoints(property_ids: List[str], rng: random.Random) -> Dict[str, Callable[[], Tuple[str, Dict[str, str]]]]:
+    """エンドポイント名 -> リクエスト（パス, ヘッダー）を作る関数"""
+    gzip_headers = {'Accept-Encoding': 'gzip'}
+    return {
+        'properties': lambda: ('/api/properties', {}),
+        'listings': lambda: (f"/api/properties/{rng.choice(property_ids)}/listings", gzip_headers),
+        'stats': lambda: (f"/api/properties/{rng.choice(property_ids)}/stats", gzip_headers),
+        'static': lambda: (rng.choice(['/static/js/app.js', '/static/css/style.css', '/']), {}),
+        'query': lambda: (f"/api/properties/{rng.choice(property_ids)}/query"
+                          f"?layout={rng.choice(LAYOUTS)}&sort=price-asc&limit=50", {}),
+        'search': lambda: (f"/api/search?q={rng.choice(['眺望', '豊洲', '20階', 'タワー 3ldk'])}&limit=20", {}),
+    }
+
+
+def percentile(sorted_values: List[float], p: float) -> Optional[float]:
+    """昇順に並んだ値の p パーセンタイル（nearest-rank 法）"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+async def run_endpoint(client, make_request: Callable[[], Tuple[str, Dict[str, str]]],
+                       requests: int, concurrency: int, warmup: int) -> Dict[str, Any]:
+    """
+    1つのエンドポイントに指定した同時接続数でリクエストを送る
+
+    Returns:
+        Dict: requests, errors, rps, mean_ms, p50_ms, p95_ms, p99_ms, max_ms, bytes
+    """
+    for _ in range(warmup):
+        path, headers = make_request()
+        await client.get(path, headers=headers)
+
+    latencies: List[float] = []
+    errors = 0
+    received = 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors, received
+        for _ in remaining:
+            path, headers = make_request()
+            started = time.perf_counter()
+            try:
+                response = await client.get(path, headers=headers)
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+            received += response.num_bytes_downloaded
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+
+    def ms(value):
+        return round(value * 1000, 3) if value is not None else None
+
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': round(len(latencies) / elapsed, 1) if elapsed > 0 else None,
+        'mean_ms': ms(sum(latencies) / len(latencies)) if latencies else None,
+        'p50_ms': ms(percentile(latencies, 50)),
+        'p95_ms': ms(percentile(latencies, 95)),
+        'p99_ms': ms(percentile(latencies, 99)),
+        'max_ms': ms(latencies[-1]) if latencies else None,
+        'bytes': received,
+    }
+
+
+def _rss_kb(pid: int) -> Optional[int]:
+    """プロセスの RSS（KB、取得できない場合はNone）"""
+    try:
+        with open(f"/proc/{pid}/status", 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def process_tree_rss_kb(pid: int) -> Optional[int]:
+    """プロセスとその子孫（uvicorn のワーカー）の RSS の合計（KB、Linux のみ）"""
+    if not os.path.isdir('/proc'):
+        return None
+    children: Dict[int, List[int]] = {}
+    for name in os.listdir('/proc'):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat", 'r') as f:
+                # "pid (comm) state ppid ..."（comm に空白が含まれる場合がある）
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(name))
+
+    total = 0
+    stack = [pid]
+    while stack:
+        current = stack.pop()
+        total += _rss_kb(current) or 0
+        stack.extend(children.get(current, []))
+    return total
+
+
+class InProcessServer:
+    """server.py をこのプロセス内で ASGI アプリとして使う"""
+
+    def __init__(self, config_path: str, data_dir: str):
+        os.environ['CONFIG_PATH'] = config_path
+        os.environ['DATA_BASE_DIR'] = data_dir
+        os.chdir(ROOT_DIR)
+        self.app = importlib.import_module('server').app
+
+    def client(self):
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=self.app), base_url='http://bench')
+
+    def memory_kb(self) -> Dict[str, Optional[int]]:
+        return {
+            'rss': _rss_kb(os.getpid()),
+            # Linux では KB、macOS ではバイト
+            'max_rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        }
+
+    def stop(self):
+        pass
+
+
+class UvicornServer:
+    """server.py をローカルの uvicorn サブプロセスで起動する"""
+
+    def __init__(self, config_path: str, data_dir: str, workers: int, timeout: float = 60.0):
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            self.port = sock.getsockname()[1]
+        env = dict(os.environ, CONFIG_PATH=config_path, DATA_BASE_DIR=data_dir)
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'server:app', '--host', '127.0.0.1',
+             '--port', str(self.port), '--workers', str(workers), '--log-level', 'warning'],
+            cwd=ROOT_DIR, env=env,
+        )
+        self.base_url = f"http://127.0.0.1:{self.port}"
+
+        deadline = time.monotonic() + timeout
+        while True:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with code {self.process.returncode}")
+            try:
+                if httpx.get(f"{self.base_url}/api/properties", timeout=1).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > deadline:
+                self.stop()
+                raise RuntimeError("uvicorn did not become ready")
+            time.sleep(0.2)
+
+    def client(self):
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+        return httpx.AsyncClient(base_url=self.base_url, limits=limits, timeout=60)
+
+    def memory_kb(self) -> Dict[str, Optional[int]]:
+        return {'rss': process_tree_rss_kb(self.process.pid)}
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+async def run_benchmark(server, endpoints: List[str], property_ids: List[str], args) -> Dict[str, Any]:
+    """各エンドポイントを順に計測する"""
+    rng = random.Random(args.seed)
+    factories = make_endpoints(property_ids, rng)
+    results = {}
+    memory = {'start': server.memory_kb()}
+    async with server.client() as client:
+        for name in endpoints:
+            results[name] = await run_endpoint(client, factories[name], args.requests,
+                                               args.concurrency, args.warmup)
+            memory[name] = server.memory_kb()
+    return {'endpoints': results, 'memory_kb': memory}
+
+
+def peak_rss_kb(results: Dict[str, Any]) -> Optional[int]:
+    """計測中の RSS の最大値（KB）"""
+    values = [m.get('rss') for m in results.get('memory_kb', {}).values() if m and m.get('rss')]
+    return max(values) if values else None
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    ベースラインと比較する
+
+    Args:
+        results: 今回の結果
+        baseline: ベースラインの結果
+        tolerance: 許容する劣化の割合（0.2 = 20%）
+
+    Returns:
+        List[str]: 劣化した指標の説明
+    """
+    regressions = []
+    print(f"\nベースラインとの比較（許容 {tolerance:.0%}）")
+    for name, current in results['endpoints'].items():
+        base = baseline.get('endpoints', {}).get(name)
+        if not base:
+            print(f"  {name:<12} ベースラインなし")
+            continue
+        cells = []
+        for metric, higher_is_better in METRICS.items():
+            now, before = current.get(metric), base.get(metric)
+            if not now or not before:
+                continue
+            change = now / before - 1
+            worse = -change if higher_is_better else change
+            mark = ' !' if worse > tolerance else ''
+            cells.append(f"{metric} {before}->{now} ({change:+.0%}){mark}")
+            if worse > tolerance:
+                regressions.append(f"{name} {metric}: {before} -> {now} ({change:+.0%})")
+        print(f"  {name:<12} " + ', '.join(cells))
+
+    rss_now, rss_before = peak_rss_kb(results), peak_rss_kb(baseline)
+    if rss_now and rss_before:
+        change = rss_now / rss_before - 1
+        print(f"  {'memory':<12} rss {rss_before}KB->{rss_now}KB ({change:+.0%})")
+        if change > tolerance:
+            regressions.append(f"memory rss: {rss_before}KB -> {rss_now}KB ({change:+.0%})")
+    return regressions
+
+
+def print_report(results: Dict[str, Any]):
+    meta = results['meta']
+    print(f"\nベンチマーク結果: mode={meta['mode']} workers={meta['workers']} "
+          f"properties={meta['properties']} listings={meta['listings']} concurrency={meta['concurrency']}")
+    print(f"  {'endpoint':<12}{'req':>7}{'err':>5}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+          f"{'max ms':>10}{'KB/req':>9}{'RSS MB':>9}")
+    for name, r in results['endpoints'].items():
+        rss = (results['memory_kb'].get(name) or {}).get('rss')
+        per_request = r['bytes'] / r['requests'] / 1024 if r['requests'] else 0
+        print(f"  {name:<12}{r['requests']:>7}{r['errors']:>5}{r['rps'] or 0:>10.1f}"
+              f"{r['p50_ms'] or 0:>10.2f}{r['p95_ms'] or 0:>10.2f}{r['p99_ms'] or 0:>10.2f}"
+              f"{r['max_ms'] or 0:>10.2f}{per_request:>9.1f}{(rss or 0) / 1024:>9.1f}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='server.py の負荷試験・レイテンシ計測')
+    parser.add_argument('--listings', type=int, default=1000, help='1マンションあたりの物件数（100〜100000）')
+    parser.add_argument('--properties', type=int, default=1, help='マンション数（1〜500）')
+    parser.add_argument('--mode', choices=['inprocess', 'uvicorn'], default='inprocess',
+                        help='プロセス内（ASGI）で実行するか、uvicorn を起動するか')
+    parser.add_argument('--workers', type=int, default=1, help='uvicorn のワーカー数')
+    parser.add_argument('--concurrency', type=int, default=16, help='同時接続数')
+    parser.add_argument('--requests', type=int, default=500, help='エンドポイントごとのリクエスト数')
+    parser.add_argument('--warmup', type=int, default=20, help='計測前のリクエスト数')
+    parser.add_argument('--endpoint', action='append', dest='endpoints',
+                        choices=['properties', 'listings', 'stats', 'static', 'query', 'search'],
+                        help=f"計測するエンドポイント（複数指定可、省略時は {', '.join(DEFAULT_ENDPOINTS)}）")
+    parser.add_argument('--seed', type=int, default=42, help='合成データ・リクエストの乱数シード')
+    parser.add_argument('--fixtures-dir', help='合成データの出力先（省略時は data/_bench/ 以下）')
+    parser.add_argument('--output', help='結果をJSONで保存するパス')
+    parser.add_argument('--baseline', help='比較するベースライン（JSON）')
+    parser.add_argument('--save-baseline', help='結果をベースラインとして保存するパス')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='ベースラインから許容する劣化の割合')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """メイン処理"""
+    args = parse_args(argv)
+    logger = setup_logger('benchmark')
+
+    if httpx is None:
+        logger.error("httpx is required: pip install httpx")
+        sys.exit(1)
+
+    fixtures_dir = os.path.abspath(args.fixtures_dir or os.path.join(
+        ROOT_DIR, 'data', '_bench', f"p{args.properties}-l{args.listings}-s{args.seed}"))
+    config_path = generate_fixtures(fixtures_dir, args.properties, args.listings, args.seed, logger)
+    data_dir = os.path.join(fixtures_dir, 'data')
+    with open(config_path, 'r', encoding='utf-8') as f:
+        property_ids = [p['id'] for p in json.load(f)['properties']]
+
+    if args.mode == 'uvicorn':
+        server = UvicornServer(config_path, data_dir, args.workers)
+    else:
+        server = InProcessServer(config_path, data_dir)
+
+    endpoints = args.endpoints or DEFAULT_ENDPOINTS
+    logger.info(f"Running {', '.join(endpoints)}: {args.requests} requests each, concurrency {args.concurrency}")
+    try:
+        measured = asyncio.run(run_benchmark(server, endpoints, property_ids, args))
+    finally:
+        server.stop()
+
+    results = {
+        'meta': {
+            'mode': args.mode,
+            'workers': args.workers if args.mode == 'uvicorn' else None,
+            'properties': args.properties,
+            'listings': args.listings,
+            'concurrency': args.concurrency,
+            'requests': args.requests,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+        },
+        **measured,
+    }
+    print_report(results)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(results, f, ensure_ascii=False, indent=2)
+            logger.info(f"Results saved: {path}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        keys = ('mode', 'workers', 'properties', 'listings', 'concurrency')
+        mismatched = [k for k in keys if baseline.get('meta', {}).get(k) != results['meta'][k]]
+        if mismatched:
+            logger.warning(f"Baseline was measured with different settings: {', '.join(mismatched)}")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n性能の劣化を検出しました（{len(regressions)}件）:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            sys.exit(1)
+        print("\n劣化は検出されませんでした")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+"""
+静的ファイルのビルドスクリプト
+
+web/ 以下のCSS・JSをハッシュ付きのファイル名で web/dist/ に出力し、
+HTML内の参照を書き換え、gzip / Brotli の圧縮版を作ります。
+server.py は起動時に web/dist/manifest.json を読み込み、ハッシュ付きのファイルを
+Cache-Control: immutable で配信します（ビルドしていない場合は元のファイルを配信します）。
+
+使用例:
+    python build_static.py
+    python build_static.py --web-dir web --output-dir web/dist
+"""
+import argparse
+import os
+
+from utils import setup_logger
+from utils.static_assets import build_assets
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='静的ファイルをハッシュ付きのファイル名でビルドする')
+    parser.add_argument('--web-dir', default='web', help='元のファイルのディレクトリ')
+    parser.add_argument('--output-dir', help='出力先（省略時は web/dist）')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """メイン処理"""
+    args = parse_args(argv)
+    logger = setup_logger('build_static', 'logs/build_static.log')
+
+    manifest = build_assets(args.web_dir, args.output_dir)
+    for source, entry in manifest['assets'].items():
+        logger.info(f"{source} -> {entry['path']} ({', '.join(entry['encodings']) or 'uncompressed'})")
+    for name in manifest['pages']:
+        logger.info(f"{name}: references rewritten")
+    logger.info(f"Done: {args.output_dir or os.path.join(args.web_dir, 'dist')}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""
+静的サイトの生成スクリプト
+
+公開済みのデータから、マンション一覧と各マンションのページを初期データを埋め込んだ
+HTMLとしてプリレンダリングし、ハッシュ付きのCSS・JSとともに出力します。
+出力先はそのまま任意の静的ホスティングで配信できます（server.py は不要です）。
+main.py は設定の output.static_site_dir が指定されている場合、公開後に自動で生成します。
+
+使用例:
+    python generate_site.py
+    python generate_site.py --output-dir public
+"""
+import argparse
+import sys
+
+from main import load_config
+from utils import setup_logger
+from utils.static_site import generate_site
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='初期データを埋め込んだ静的サイトを生成する')
+    parser.add_argument('--config', default='config/config.json', help='設定ファイルのパス')
+    parser.add_argument('--output-dir', help='出力先（省略時は設定の output.static_site_dir、なければ site）')
+    parser.add_argument('--web-dir', default='web', help='Webフロントエンドのディレクトリ')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """メイン処理"""
+    args = parse_args(argv)
+    logger = setup_logger('generate_site', 'logs/generate_site.log')
+
+    config = load_config(args.config)
+    output_dir = args.output_dir or config['output'].get('static_site_dir') or 'site'
+    generated = generate_site(config, output_dir, args.web_dir)
+    if generated == 0:
+        logger.error("No property pages generated (no published data)")
+        sys.exit(1)
+    logger.info(f"Done: {output_dir}")
+
+
+if __name__ == '__main__':
+    main()
@@ -6,10 +6,16 @@
 import json
 import sys
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timezone
 
-from utils import setup_logger, DataManager
-from scrapers import SuumoScraper, HomesScraper, AthomeScraper, RehouseScraper, LivableScraper
+from utils import setup_logger, DataManager, snapshot_version
+from utils.alerts import AlertEngine
+from utils.data_manager import DEFAULT_CHANGES_RETENTION_DAYS, DEFAULT_HISTORY_RETENTION_DAYS
+from utils.page_archive import PageArchive
+from utils.snapshot_delta import DEFAULT_WINDOW
+from utils.snapshot_pack import build_pack
+from utils.static_site import generate_site
+from scrapers import SCRAPER_CLASSES
 
 
 def load_config(config_path: str = 'config/config.json') -> dict:
@@ -44,20 +50,43 @@ def main():
         logger.error(f"Failed to parse config file: {e}")
         sys.exit(1)
     
-    # 各マンションごとに処理
-    for property_config in config['properties']:
-        logger.info(f"\n{'=' * 60}")
-        logger.info(f"マンション: {property_config['name']}")
-        logger.info(f"Layouts: {', '.join(property_config['layouts'])}")
-        logger.info(f"{'=' * 60}")
-        
-        # データマネージャーの初期化
-        data_manager = DataManager(property_config, config['output']['data_base_dir'])
-        
-        process_property(property_config, data_manager, logger, config)
+    # アラート（設定されている場合、各マンションの変更セットをルールと照合して送る）
+    alerts_config = config.get('alerts')
+    alert_engine = AlertEngine.from_config(alerts_config) if alerts_config else None
+    
+    # 取得ページのアーカイブ（設定されている場合、実行ごとに1つ開いて全スクレイパーで共有する）
+    archive = None
+    archive_config = config['scraping'].get('archive', {})
+    if archive_config.get('enabled'):
+        archive = PageArchive.from_config(archive_config)
+        archive.apply_retention()
+    
+    try:
+        # 各マンションごとに処理
+        for property_config in config['properties']:
+            logger.info(f"\n{'=' * 60}")
+            logger.info(f"マンション: {property_config['name']}")
+            logger.info(f"Layouts: {', '.join(property_config['layouts'])}")
+            logger.info(f"{'=' * 60}")
+            
+            # データマネージャーの初期化
+            data_manager = DataManager(property_config, config['output']['data_base_dir'],
+                                       config['output'].get('delta_window', DEFAULT_WINDOW),
+                                       config['output'].get('changes_retention_days', DEFAULT_CHANGES_RETENTION_DAYS),
+                                       config['output'].get('history_retention_days', DEFAULT_HISTORY_RETENTION_DAYS))
+            
+            process_property(property_config, data_manager, logger, config, alert_engine, archive)
+    finally:
+        if archive is not None:
+            archive.close()
+
+    # 静的サイトの生成（設定されている場合、全マンションの公開後に行う）
+    static_site_dir = config['output'].get('static_site_dir')
+    if static_site_dir:
+        generate_site(config, static_site_dir)
 
 
-def process_property(property_config, data_manager, logger, config):
+def process_property(property_config, data_manager, logger, config, alert_engine=None, archive=None):
     """マンション固有の処理"""
     
     # 全LDKタイプのデータを収集
@@ -71,18 +100,13 @@ def process_property(property_config, data_manager, logger, config):
         # 現在のレイアウト用に設定を一時的に更新
         current_config = {
             'property': property_config.copy(),
-            'scraping': config['scraping']
+            'scraping': config['scraping'],
+            'archive': archive
         }
         current_config['property']['layout'] = layout
         
         # スクレイパーの初期化
-        scrapers = [
-            SuumoScraper(current_config),
-            HomesScraper(current_config),
-            AthomeScraper(current_config),
-            RehouseScraper(current_config),
-            LivableScraper(current_config),
-        ]
+        scrapers = [scraper_class(current_config) for scraper_class in SCRAPER_CLASSES]
         
         # 各サイトからデータを収集
         layout_data = []
@@ -94,8 +118,8 @@ def process_property(property_config, data_manager, logger, config):
                 if listings:
                     # 各物件にlayout情報を追加（まだ設定されていない場合のみ）
                     for listing in listings:
-                        if 'layout' not in listing:
-                            listing['layout'] = layout
+                        if listing.layout is None:
+                            listing.layout = layout
                     
                     # 生データを保存
                     raw_file = data_manager.save_raw_data(
@@ -128,11 +152,25 @@ def process_property(property_config, data_manager, logger, config):
         logger.info("=" * 60)
         merged_listings = data_manager.merge_data(all_layouts_data)
         
-        # 統合データを保存
+        # 前回データとの差分（上書き前に求める）
+        last_updated = datetime.now(timezone.utc).isoformat()
+        changes = data_manager.detect_changes(merged_listings)
+        
+        # 統合データを保存（変更セットを先に書き、latest.json の公開を最後にする）
+        data_manager.save_changes(changes, last_updated=last_updated)
         processed_file = data_manager.save_processed_data(
             merged_listings,
-            property_config['name']
+            property_config['name'],
+            last_updated=last_updated
         )
+        # サーバーがメモリマップで読む公開ファイル（latest.json から作る）
+        build_pack(data_manager.processed_data_dir)
+        
+        # 今回の変更（新着・値下げなど）だけをアラートのルールと照合する
+        alerts = []
+        if alert_engine is not None:
+            alerts = alert_engine.process(property_config, changes, data_manager.published_records,
+                                          snapshot_version(last_updated))
         
         logger.info("=" * 60)
         logger.info("データ収集が完了しました")
@@ -149,23 +187,24 @@ def process_property(property_config, data_manager, logger, config):
         print(f"収集サイト数: {len(set(d['source'] for d in all_layouts_data))}サイト")
         print(f"総物件数: {len(merged_listings)}件")
         
-        # LDK別の件数を表示
+        # 公開時に集計した統計から件数を表示
+        stats = data_manager.load_stats()
         print(f"\n間取り別の収集数:")
-        layout_counts = {}
-        for listing in merged_listings:
-            layout = listing.get('layout', 'Unknown')
-            layout_counts[layout] = layout_counts.get(layout, 0) + 1
-        for layout in sorted(layout_counts.keys()):
-            print(f"  - {layout}: {layout_counts[layout]}件")
+        for layout, group in stats.get('by_layout', {}).items():
+            print(f"  - {layout}: {group['count']}件")
         
-        print(f"\nサイト別の収集数:")
-        source_counts = {}
-        for data in all_layouts_data:
-            source = data['source']
-            source_counts[source] = source_counts.get(source, 0) + len(data['listings'])
-        for source in sorted(source_counts.keys()):
-            print(f"  - {source}: {source_counts[source]}件")
+        print(f"\nサイト別の収集数（重複排除後）:")
+        for source, group in stats.get('by_source', {}).items():
+            print(f"  - {source}: {group['count']}件")
             
+        summary = changes['summary']
+        print(f"\n前回からの変更:")
+        print(f"  - 新着: {summary['new']}件 / 掲載終了: {summary['removed']}件")
+        print(f"  - 値下げ: {summary['price_down']}件 / 値上げ: {summary['price_up']}件")
+        print(f"  - 管理費・修繕積立金の変更: {summary['fee_changed']}件")
+        if alert_engine is not None:
+            print(f"  - アラート: {len(alerts)}件")
+        
         print(f"\n保存先: {processed_file}")
         print("=" * 60)
         
@@ -0,0 +1,321 @@
+"""
+アーカイブ済みページの再パーススクリプト
+
+取得ページのアーカイブ（scraping.archive）に保存されたHTMLを現在のパーサーで
+再処理し、指定期間の生データ・処理済みデータを再生成します。
+ネットワークには一切アクセスせず、プロセスプールで並列に処理します。
+
+使用例:
+    python reparse.py --start 2025-12-01 --end 2025-12-07
+    python reparse.py --start 2025-12-26 --property BranzTowerToyosu --workers 4
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from main import load_config
+from scrapers import SCRAPER_CLASSES
+from utils import setup_logger, DataManager, Listing, PageArchive
+from utils.data_manager import record_key
+from utils.json_writer import write_json_atomic
+from utils.listing import reference_year
+
+
+# 日付の区切りは日本時間
+JST = timezone(timedelta(hours=9))
+
+# ワーカープロセスごとに1つだけ開くアーカイブ
+_worker_archive: Optional[PageArchive] = None
+
+
+def _init_worker(archive_dir: str):
+    """ワーカープロセスの初期化（アーカイブのインデックスを読み込む）"""
+    global _worker_archive
+    _worker_archive = PageArchive(archive_dir)
+
+
+def _day_window(day: date) -> Tuple[str, str]:
+    """日本時間の1日を UTC の ISO 8601 文字列の範囲に変換する"""
+    start = datetime.combine(day, time.min, tzinfo=JST)
+    end = start + timedelta(days=1) - timedelta(microseconds=1)
+    return start.astimezone(timezone.utc).isoformat(), end.astimezone(timezone.utc).isoformat()
+
+
+def _reparse_job(day: date, property_config: Dict[str, Any], layout: str,
+                 scraper_name: str, scraping_config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    1日・1間取り・1スクレイパー分の再パースを行う（ワーカープロセスで実行）
+
+    Returns:
+        Dict: 再パース結果（source, listings）
+    """
+    since, at = _day_window(day)
+
+    current_config = {
+        'property': dict(property_config, layout=layout),
+        'scraping': dict(scraping_config, archive={'enabled': False}),
+        'replay': {'archive': _worker_archive, 'at': at, 'since': since},
+    }
+    scraper_class = next(c for c in SCRAPER_CLASSES if c.__name__ == scraper_name)
+    scraper = scraper_class(current_config)
+
+    listings = scraper.scrape()
+    for listing in listings:
+        if listing.layout is None:
+            listing.layout = layout
+
+    return {
+        'source': scraper.get_source_name(),
+        'scraper': scraper_name,
+        'layout': layout,
+        'listings': [listing.to_dict() for listing in listings],
+    }
+
+
+def diff_listings(old: List[Listing], new: List[Listing]) -> Dict[str, Any]:
+    """
+    保存済みデータと再生成データのフィールド単位の差分を求める
+
+    Args:
+        old: 保存済みの物件データ
+        new: 再生成した物件データ
+
+    Returns:
+        Dict: 差分（追加・削除された物件のキー、フィールドごとの変更件数と内容）
+    """
+    # 他のモジュールと同じキー（正規化したURL、URLがない場合は主要フィールドのハッシュ）で突き合わせる
+    old_map = {record_key(record): record for record in (l.to_dict() for l in old)}
+    new_map = {record_key(record): record for record in (l.to_dict() for l in new)}
+
+    added = [key for key in new_map if key not in old_map]
+    removed = [key for key in old_map if key not in new_map]
+
+    fields: Dict[str, Dict[str, Any]] = {}
+    for listing_key, new_listing in new_map.items():
+        old_listing = old_map.get(listing_key)
+        if old_listing is None:
+            continue
+        for key in Listing.FIELDS:
+            before = old_listing[key]
+            after = new_listing[key]
+            if before == after:
+                continue
+            field = fields.setdefault(key, {'count': 0, 'examples': []})
+            field['count'] += 1
+            if len(field['examples']) < 5:
+                field['examples'].append({'key': listing_key, 'before': before, 'after': after})
+
+    return {
+        'added': added,
+        'removed': removed,
+        'fields': fields,
+    }
+
+
+def _stored_listings(stored: Dict[str, Any], day: date) -> Optional[List[Listing]]:
+    """保存済み処理データの物件（日付が一致しない場合はNone）"""
+    last_updated = stored.get('last_updated')
+    if not last_updated or datetime.fromisoformat(last_updated).astimezone(JST).date() != day:
+        return None
+    year = reference_year(last_updated)
+    return [Listing.from_dict(item, year) for item in stored.get('listings', [])]
+
+
+def _load_stored(filepath: str, day: date) -> Optional[List[Listing]]:
+    """比較対象の保存済み処理データを読み込む（日付が一致しない場合はNone）"""
+    if not os.path.exists(filepath):
+        return None
+    with open(filepath, 'r', encoding='utf-8') as f:
+        return _stored_listings(json.load(f), day)
+
+
+def _load_committed(filepath: str, day: date) -> Tuple[Optional[str], Optional[List[Listing]]]:
+    """
+    その日にコミットされた処理済みデータを読み込む（定期実行は processed/ を毎回コミットする）
+
+    Args:
+        filepath: 現行の latest.json のパス
+        day: 対象日（日本時間）
+
+    Returns:
+        Tuple: (コミット, 物件データ)。git の管理外やその日のコミットがない場合は (None, None)
+    """
+    directory, filename = os.path.split(os.path.abspath(filepath))
+    if not os.path.isdir(directory):
+        return None, None
+    _, day_end = _day_window(day)
+    try:
+        commit = subprocess.run(
+            ['git', '-C', directory, 'log', '-1', '--format=%H', f'--until={day_end}', '--', filename],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        if not commit:
+            return None, None
+        body = subprocess.run(
+            ['git', '-C', directory, 'show', f'{commit}:./{filename}'],
+            capture_output=True, check=True,
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, _stored_listings(json.loads(body), day)
+
+
+def publish_day(day: date, property_config: Dict[str, Any], results: List[Dict[str, Any]],
+                output_dir: str, live_base_dir: str, logger) -> Dict[str, Any]:
+    """
+    1日分の再パース結果を保存し、保存済みデータとの差分を返す
+
+    Args:
+        day: 対象日
+        property_config: マンション設定
+        results: 再パース結果のリスト
+        output_dir: 再生成データの出力先
+        live_base_dir: 現行データのディレクトリ（差分の比較対象）
+        logger: ロガー
+
+    Returns:
+        Dict: 差分
+    """
+    _, at = _day_window(day)
+    data_manager = DataManager(property_config, os.path.join(output_dir, day.isoformat()))
+
+    # 比較対象: 以前の再生成結果 → 同日の現行データ → その日にコミットされた処理済みデータ
+    processed_path = os.path.join(data_manager.processed_data_dir, 'latest.json')
+    live_path = os.path.join(live_base_dir, property_config['id'], 'processed', 'latest.json')
+    baseline = 'reparse'
+    stored = _load_stored(processed_path, day)
+    if stored is None:
+        baseline = 'live'
+        stored = _load_stored(live_path, day)
+    if stored is None:
+        commit, stored = _load_committed(live_path, day)
+        baseline = f"git:{commit[:12]}" if stored is not None else None
+
+    for result in results:
+        result['listings'] = [Listing.from_dict(item) for item in result['listings']]
+    
+    by_source_layout: Dict[Tuple[str, str], List[Listing]] = {}
+    for result in results:
+        for listing in result['listings']:
+            key = (result['source'], listing.layout)
+            by_source_layout.setdefault(key, []).append(listing)
+    for (source, layout), listings in sorted(by_source_layout.items(), key=lambda x: (x[0][0], str(x[0][1]))):
+        data_manager.save_raw_data(source.lower().replace(' ', '_'), listings, layout, timestamp=at)
+
+    merged = data_manager.merge_data([r for r in results if r['listings']])
+    data_manager.save_processed_data(merged, property_config['name'], last_updated=at)
+
+    diff = diff_listings(stored, merged) if stored is not None else None
+    report = {
+        'date': day.isoformat(),
+        'property_id': property_config['id'],
+        'total_listings': len(merged),
+        'compared': stored is not None,
+        'baseline': baseline,
+        'diff': diff,
+    }
+    write_json_atomic(os.path.join(data_manager.processed_data_dir, 'diff.json'), report)
+
+    if diff is None:
+        logger.warning(f"{day} {property_config['id']}: {len(merged)} listings "
+                       f"(no baseline: no reparse, live or committed data for this day)")
+    else:
+        changed = ', '.join(f"{k}={v['count']}" for k, v in sorted(diff['fields'].items())) or 'none'
+        logger.info(
+            f"{day} {property_config['id']}: {len(merged)} listings vs {baseline}, "
+            f"+{len(diff['added'])} / -{len(diff['removed'])}, changed fields: {changed}"
+        )
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='アーカイブ済みページを現在のパーサーで再処理する')
+    parser.add_argument('--start', required=True, help='開始日（YYYY-MM-DD, 日本時間）')
+    parser.add_argument('--end', help='終了日（YYYY-MM-DD, 日本時間）。省略時は開始日のみ')
+    parser.add_argument('--property', action='append', dest='properties',
+                        help='対象マンションID（複数指定可、省略時は全件）')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='ワーカープロセス数')
+    parser.add_argument('--output-dir', default=os.path.join('data', '_reparse'), help='再生成データの出力先')
+    parser.add_argument('--config', default='config/config.json', help='設定ファイルのパス')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """メイン処理"""
+    args = parse_args(argv)
+    logger = setup_logger('reparse', 'logs/reparse.log')
+
+    config = load_config(args.config)
+    archive_dir = config['scraping'].get('archive', {}).get('dir', 'data/_archive')
+    if not os.path.isdir(archive_dir):
+        logger.error(f"Archive not found: {archive_dir}")
+        sys.exit(1)
+
+    start = date.fromisoformat(args.start)
+    end = date.fromisoformat(args.end) if args.end else start
+    days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+    properties = [
+        p for p in config['properties']
+        if not args.properties or p['id'] in args.properties
+    ]
+
+    jobs = [
+        (day, prop, layout, scraper_class.__name__)
+        for day in days
+        for prop in properties
+        for layout in prop['layouts']
+        for scraper_class in SCRAPER_CLASSES
+    ]
+    logger.info(f"Reparsing {len(days)} day(s) x {len(properties)} property(ies): {len(jobs)} jobs")
+
+    results: Dict[Tuple[date, str], List[Dict[str, Any]]] = {}
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                             initargs=(archive_dir,)) as executor:
+        futures = {
+            executor.submit(_reparse_job, day, prop, layout, scraper_name, config['scraping']):
+                (day, prop['id'], layout, scraper_name)
+            for day, prop, layout, scraper_name in jobs
+        }
+        for future in as_completed(futures):
+            day, property_id, layout, scraper_name = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.error(f"Reparse failed: {day} {property_id} {layout} {scraper_name}: {e}")
+                continue
+            results.setdefault((day, property_id), []).append(result)
+
+    reports = []
+    for day in days:
+        for prop in properties:
+            day_results = results.get((day, prop['id']), [])
+            if not any(r['listings'] for r in day_results):
+                logger.warning(f"{day} {prop['id']}: no archived pages")
+                continue
+            # 間取り→スクレイパーの順を通常実行と揃える（重複排除で残る物件が変わらないように）
+            scraper_order = {c.__name__: i for i, c in enumerate(SCRAPER_CLASSES)}
+            day_results.sort(key=lambda r: (prop['layouts'].index(r['layout']), scraper_order[r['scraper']]))
+            reports.append(publish_day(day, prop, day_results, args.output_dir,
+                                       config['output']['data_base_dir'], logger))
+
+    print(f"\n再パース完了: {len(reports)}件のスナップショットを {args.output_dir} に再生成しました")
+    for report in reports:
+        diff = report['diff']
+        if diff is None:
+            print(f"  - {report['date']} {report['property_id']}: {report['total_listings']}件"
+                  f"（比較対象なし: この日の再生成結果・現行データ・コミットがありません）")
+        else:
+            print(f"  - {report['date']} {report['property_id']}: {report['total_listings']}件 "
+                  f"（比較対象 {report['baseline']}） "
+                  f"追加{len(diff['added'])} 削除{len(diff['removed'])} "
+                  f"変更フィールド{len(diff['fields'])}")
+
+
+if __name__ == '__main__':
+    main()
@@ -6,6 +6,15 @@ from .athome_scraper import AthomeScraper
 from .rehouse_scraper import RehouseScraper
 from .livable_scraper import LivableScraper
 
+# 収集に使用するスクレイパー（実行順）
+SCRAPER_CLASSES = [
+    SuumoScraper,
+    HomesScraper,
+    AthomeScraper,
+    RehouseScraper,
+    LivableScraper,
+]
+
 __all__ = [
     'BaseScraper',
     'SuumoScraper',
@@ -13,4 +22,5 @@ __all__ = [
     'AthomeScraper',
     'RehouseScraper',
     'LivableScraper',
+    'SCRAPER_CLASSES',
 ]
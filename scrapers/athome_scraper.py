@@ -3,6 +3,7 @@ import re
 from typing import List, Dict, Any, Optional
 from urllib.parse import urljoin
 from scrapers.base_scraper import BaseScraper
+from utils.listing import Listing
 
 
 class AthomeScraper(BaseScraper):
@@ -13,12 +14,12 @@ class AthomeScraper(BaseScraper):
     def get_source_name(self) -> str:
         return "at home"
     
-    def scrape(self) -> List[Dict[str, Any]]:
+    def scrape(self) -> List[Listing]:
         """
         スクレイピングを実行する
         
         Returns:
-            List[Dict]: 物件データのリスト
+            List[Listing]: 物件データのリスト
         """
         self.logger.info(f"Starting {self.get_source_name()} scraping...")
         
@@ -70,12 +71,12 @@ class AthomeScraper(BaseScraper):
             data = self._parse_listing(listing_elem)
             if data:
                 listings.append(data)
-                self.logger.info(f"Parsed: {data.get('title')} - {data.get('price')}円")
+                self.logger.info(f"Parsed: {data.title} - {data.price}円")
         
         return listings
     
 
-    def _parse_listing(self, listing_elem) -> Optional[Dict[str, Any]]:
+    def _parse_listing(self, listing_elem) -> Optional[Listing]:
         """
         物件要素から情報を抽出する
         
@@ -83,7 +84,7 @@ class AthomeScraper(BaseScraper):
             listing_elem: BeautifulSoupの要素
         
         Returns:
-            Dict: 物件データ
+            Listing: 物件データ
         """
         try:
             data = {
@@ -137,16 +138,12 @@ class AthomeScraper(BaseScraper):
                     if '専有面積' in label_text:
                         data['area'] = self._parse_area(value_text)
                     
-                    # 築年月（築年数を計算）
+                    # 築年月（竣工年）
                     elif '築年月' in label_text:
-                        # 築年月から築年数を計算
                         # 形式: "2020年3月" または "2020/3" など
-                        year_match = re.search(r'(\d{4})', value_text)
-                        if year_match:
-                            built_year = int(year_match.group(1))
-                            from datetime import datetime
-                            current_year = datetime.now().year
-                            data['age_years'] = current_year - built_year
+                        built_year = self._parse_built_year(value_text)
+                        if built_year:
+                            data['built_year'] = built_year
             
             # 必須フィールドのチェック
             if 'price' not in data or 'title' not in data:
@@ -160,7 +157,7 @@ class AthomeScraper(BaseScraper):
                 self.logger.debug(f"Skipping listing: '{data.get('title')}' does not match property name '{property_name}'")
                 return None
             
-            return data
+            return Listing(**data)
         
         except Exception as e:
             self.logger.error(f"Failed to parse listing: {e}")
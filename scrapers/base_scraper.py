@@ -2,10 +2,13 @@
 import time
 import re
 import requests
+from datetime import date, datetime
 from abc import ABC, abstractmethod
 from typing import List, Dict, Any, Optional
 from bs4 import BeautifulSoup
 from utils.logger import get_logger
+from utils.listing import Listing
+from utils.page_archive import PageArchive
 
 
 class BaseScraper(ABC):
@@ -29,6 +32,58 @@ class BaseScraper(ABC):
         self.session.headers.update({
             'User-Agent': self.scraping_config['user_agent']
         })
+        
+        # アーカイブからの再生モード（ネットワークにアクセスしない）
+        # {'archive': PageArchive, 'at': 取得時刻の上限, 'since': 取得時刻の下限}
+        self.replay = config.get('replay')
+        
+        # 取得ページのアーカイブ（オプション。実行ごとに main.py が1つ作って全スクレイパーで共有する）
+        self.archive: Optional[PageArchive] = None if self.replay else config.get('archive')
+    
+    def _page_key(self, url: str, params: Optional[Dict] = None) -> str:
+        """
+        アーカイブのキーとなるURLを組み立てる
+        
+        Args:
+            url: URL
+            params: クエリパラメータ
+        
+        Returns:
+            str: クエリパラメータを含むURL
+        """
+        return requests.Request('GET', url, params=params).prepare().url
+    
+    def _archive_response(self, url: str, params: Optional[Dict], response: requests.Response):
+        """レスポンスの生データをアーカイブに追記する"""
+        try:
+            self.archive.append(self._page_key(url, params), response.content, response.encoding)
+        except OSError as e:
+            # アーカイブの失敗でスクレイピングを止めない
+            self.logger.warning(f"Failed to archive {url}: {e}")
+    
+    def _get_archived_page(self, url: str, params: Optional[Dict] = None) -> Optional[BeautifulSoup]:
+        """
+        アーカイブからページを取得する（再生モード）
+        
+        Args:
+            url: URL
+            params: クエリパラメータ
+        
+        Returns:
+            BeautifulSoup: パースされたHTML（アーカイブにない場合はNone）
+        """
+        page = self.replay['archive'].get(
+            self._page_key(url, params),
+            at=self.replay.get('at'),
+            since=self.replay.get('since')
+        )
+        if page is None:
+            self.logger.warning(f"Not found in archive: {url}")
+            return None
+        
+        self.logger.debug(f"Replaying: {url} (fetched at {page.fetched_at})")
+        text = page.content.decode(page.encoding or 'utf-8', errors='replace')
+        return BeautifulSoup(text, 'lxml')
     
     def _get_page(self, url: str, params: Optional[Dict] = None) -> Optional[BeautifulSoup]:
         """
@@ -41,11 +96,12 @@ class BaseScraper(ABC):
         Returns:
             BeautifulSoup: パースされたHTML（失敗時はNone）
         """
+        if self.replay:
+            return self._get_archived_page(url, params)
+        
         retries = self.scraping_config['max_retries']
         timeout = self.scraping_config['timeout']
         
-
-        
         for attempt in range(retries):
             try:
                 self.logger.info(f"Fetching: {url}")
@@ -55,6 +111,9 @@ class BaseScraper(ABC):
                 # エンコーディングの自動検出
                 response.encoding = response.apparent_encoding
                 
+                if self.archive:
+                    self._archive_response(url, params, response)
+                
                 return BeautifulSoup(response.text, 'lxml')
             
             except requests.exceptions.RequestException as e:
@@ -69,17 +128,19 @@ class BaseScraper(ABC):
     
     def _wait(self):
         """リクエスト間隔を空ける"""
+        if self.replay:
+            return
         interval = self.scraping_config['request_interval']
         self.logger.debug(f"Waiting {interval} seconds...")
         time.sleep(interval)
     
     @abstractmethod
-    def scrape(self) -> List[Dict[str, Any]]:
+    def scrape(self) -> List[Listing]:
         """
         スクレイピングを実行する（サブクラスで実装）
         
         Returns:
-            List[Dict]: 物件データのリスト
+            List[Listing]: 物件データのリスト
         """
         pass
     
@@ -183,6 +244,36 @@ class BaseScraper(ABC):
             self.logger.warning(f"Failed to parse area: {area_str} - {e}")
             return None
     
+    def _parse_built_year(self, text: str) -> Optional[int]:
+        """
+        築年月・築年数の文字列から竣工年を求める
+        
+        Args:
+            text: 築年月・築年数の文字列（例: "2021年10月", "2021/10", "築10年"）
+        
+        Returns:
+            int: 竣工年、パース失敗時はNone
+        """
+        if not text:
+            return None
+        
+        # "築10年" の形式（取得した年を基準にする。再生モードではページを取得した年）
+        age_match = re.search(r'築(\d+)年', text)
+        if age_match:
+            return self._fetched_year() - int(age_match.group(1))
+        
+        year_match = re.search(r'(\d{4})', text)
+        if year_match:
+            return int(year_match.group(1))
+        
+        return None
+    
+    def _fetched_year(self) -> int:
+        """ページを取得した年（再生モードでは再生する時刻の年）"""
+        if self.replay and self.replay.get('at'):
+            return datetime.fromisoformat(self.replay['at']).year
+        return date.today().year
+    
     def _parse_floor(self, floor_str: str) -> Optional[int]:
         """
         階数文字列を数値に変換する
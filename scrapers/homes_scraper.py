@@ -3,6 +3,7 @@ import re
 from typing import List, Dict, Any, Optional
 from urllib.parse import urljoin
 from scrapers.base_scraper import BaseScraper
+from utils.listing import Listing
 
 
 class HomesScraper(BaseScraper):
@@ -13,12 +14,12 @@ class HomesScraper(BaseScraper):
     def get_source_name(self) -> str:
         return "HOMES"
     
-    def scrape(self) -> List[Dict[str, Any]]:
+    def scrape(self) -> List[Listing]:
         """
         スクレイピングを実行する
         
         Returns:
-            List[Dict]: 物件データのリスト
+            List[Listing]: 物件データのリスト
         """
         self.logger.info(f"Starting {self.get_source_name()} scraping...")
         
@@ -92,7 +93,7 @@ class HomesScraper(BaseScraper):
                 listing = self._parse_listing(container, anchor)
                 if listing:
                     # 物件名チェック（念のため）
-                    if property_name in listing.get('title', ''):
+                    if property_name in (listing.title or ''):
                         listings.append(listing)
                         count += 1
             
@@ -123,7 +124,7 @@ class HomesScraper(BaseScraper):
         
         return listings
     
-    def _parse_listing(self, container, anchor) -> Optional[Dict[str, Any]]:
+    def _parse_listing(self, container, anchor) -> Optional[Listing]:
         """
         物件コンテナから情報を抽出する
         
@@ -132,7 +133,7 @@ class HomesScraper(BaseScraper):
             anchor: タイトルリンク要素
         
         Returns:
-            Dict: 物件データ
+            Listing: 物件データ
         """
         try:
             data = {
@@ -186,12 +187,10 @@ class HomesScraper(BaseScraper):
                                 data['floor'] = self._parse_floor(value)
                                 
                         elif '築年月' in header:
-                            # "2015年2月" -> 築年数計算
-                            year_match = re.search(r'(\d{4})年', value)
-                            if year_match:
-                                year = int(year_match.group(1))
-                                current_year = 2025
-                                data['age_years'] = current_year - year
+                            # "2015年2月" -> 竣工年
+                            built_year = self._parse_built_year(value)
+                            if built_year:
+                                data['built_year'] = built_year
                         
                         elif '価格' in header and 'price' not in data:
                              # テーブル内に価格がある場合のバックアップ
@@ -207,7 +206,7 @@ class HomesScraper(BaseScraper):
             # 管理費・修繕積立金が一覧にない場合、詳細ページ取得が必要だが
             # まずは一覧から取れるだけ取る
             
-            return data
+            return Listing(**data)
         
         except Exception as e:
             self.logger.error(f"Failed to parse listing: {e}")
@@ -3,6 +3,7 @@ import re
 from typing import List, Dict, Any, Optional
 from urllib.parse import urljoin
 from scrapers.base_scraper import BaseScraper
+from utils.listing import Listing
 from bs4 import BeautifulSoup
 
 class LivableScraper(BaseScraper):
@@ -14,12 +15,12 @@ class LivableScraper(BaseScraper):
     def get_source_name(self) -> str:
         return "Livable"
     
-    def scrape(self) -> List[Dict[str, Any]]:
+    def scrape(self) -> List[Listing]:
         """
         スクレイピングを実行する
         
         Returns:
-            List[Dict]: 物件データのリスト
+            List[Listing]: 物件データのリスト
         """
         self.logger.info(f"Starting {self.get_source_name()} scraping...")
         
@@ -39,7 +40,7 @@ class LivableScraper(BaseScraper):
             listing = self._parse_listing(item)
             if listing:
                 # 間取りフィルタリング
-                layout = listing.get('layout', '')
+                layout = listing.layout or ''
                 if target_layout in layout:
                     listings.append(listing)
                     count += 1
@@ -48,9 +49,9 @@ class LivableScraper(BaseScraper):
         
         # 詳細情報の取得
         for i, listing in enumerate(listings):
-            if 'url' in listing:
-                self.logger.info(f"Fetching details for {listing['title']} ({i+1}/{len(listings)})...")
-                details = self._fetch_details(listing['url'])
+            if listing.url:
+                self.logger.info(f"Fetching details for {listing.title} ({i+1}/{len(listings)})...")
+                details = self._fetch_details(listing.url)
                 if details:
                     listing.update(details)
                 self._wait()
@@ -99,10 +100,9 @@ class LivableScraper(BaseScraper):
                     details['repair_reserve'] = self._parse_price(value)
                 elif '築年月' in header or '築年数' in header:
                     # "2021年10月"
-                    match = re.search(r'(\d{4})年', value)
-                    if match:
-                        year = int(match.group(1))
-                        details['age_years'] = 2025 - year
+                    built_year = self._parse_built_year(value)
+                    if built_year:
+                        details['built_year'] = built_year
                 elif ('向き' in header or 'バルコニー' in header) and 'direction' not in details:
                     # 「バルコニー面積」などは除外
                     if '面積' in header:
@@ -126,10 +126,9 @@ class LivableScraper(BaseScraper):
                             if '平均' in header: continue
                             details['repair_reserve'] = self._parse_price(value)
                         elif '築年月' in header:
-                            match = re.search(r'(\d{4})年', value)
-                            if match:
-                                year = int(match.group(1))
-                                details['age_years'] = 2025 - year
+                            built_year = self._parse_built_year(value)
+                            if built_year:
+                                details['built_year'] = built_year
                         elif '向き' in header:
                             if '面積' in header: continue
                             details['direction'] = value
@@ -139,7 +138,7 @@ class LivableScraper(BaseScraper):
             
         return details
     
-    def _parse_listing(self, item: BeautifulSoup) -> Optional[Dict[str, Any]]:
+    def _parse_listing(self, item: BeautifulSoup) -> Optional[Listing]:
         """
         物件要素から情報を抽出する
         
@@ -147,7 +146,7 @@ class LivableScraper(BaseScraper):
             item: BeautifulSoupの要素 (.m-room-list__item)
         
         Returns:
-            Dict: 物件データ
+            Listing: 物件データ
         """
         try:
             data = {
@@ -191,7 +190,7 @@ class LivableScraper(BaseScraper):
                 self.logger.debug(f"Skipping rental listing: {data['url']}")
                 return None
             
-            return data
+            return Listing(**data)
         
         except Exception as e:
             self.logger.error(f"Failed to parse Livable listing: {e}")
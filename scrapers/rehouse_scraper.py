@@ -3,6 +3,7 @@ import re
 from typing import List, Dict, Any, Optional
 from urllib.parse import urljoin
 from scrapers.base_scraper import BaseScraper
+from utils.listing import Listing
 from bs4 import BeautifulSoup
 
 class RehouseScraper(BaseScraper):
@@ -14,12 +15,12 @@ class RehouseScraper(BaseScraper):
     def get_source_name(self) -> str:
         return "Rehouse"
     
-    def scrape(self) -> List[Dict[str, Any]]:
+    def scrape(self) -> List[Listing]:
         """
         スクレイピングを実行する
         
         Returns:
-            List[Dict]: 物件データのリスト
+            List[Listing]: 物件データのリスト
         """
         self.logger.info(f"Starting {self.get_source_name()} scraping...")
         
@@ -49,7 +50,7 @@ class RehouseScraper(BaseScraper):
                 # 間取りフィルタリング
                 # configのlayout ("2LDK") が含まれているか
                 # 完全一致または含む場合OKとする
-                layout = listing.get('layout', '')
+                layout = listing.layout or ''
                 if target_layout in layout:
                     listings.append(listing)
                     count += 1
@@ -60,9 +61,9 @@ class RehouseScraper(BaseScraper):
         
         # 詳細情報の取得
         for i, listing in enumerate(listings):
-            if 'url' in listing:
-                self.logger.info(f"Fetching details for {listing['title']} ({i+1}/{len(listings)})...")
-                details = self._fetch_details(listing['url'])
+            if listing.url:
+                self.logger.info(f"Fetching details for {listing.title} ({i+1}/{len(listings)})...")
+                details = self._fetch_details(listing.url)
                 if details:
                     listing.update(details)
                 self._wait()
@@ -77,7 +78,7 @@ class RehouseScraper(BaseScraper):
             url: 詳細ページのURL
             
         Returns:
-            Dict: 追加情報（管理費、修繕積立金、築年数、方角など）
+            Dict: 追加情報（管理費、修繕積立金、竣工年、方角など）
         """
         details = {}
         try:
@@ -89,7 +90,7 @@ class RehouseScraper(BaseScraper):
                 '管理費': 'management_fee',
                 '積立金': 'repair_reserve',
                 '修繕積立金': 'repair_reserve',
-                '築年月': 'age_years',
+                '築年月': 'built_year',
                 '向き': 'direction',
                 'バルコニー': 'direction' # 「バルコニー向き」等の場合
             }
@@ -113,13 +114,11 @@ class RehouseScraper(BaseScraper):
                                 details['management_fee'] = self._parse_price(val_text)
                             elif field == 'repair_reserve':
                                 details['repair_reserve'] = self._parse_price(val_text)
-                            elif field == 'age_years':
-                                # "2021年10月築" -> 築年数計算
-                                match = re.search(r'(\d{4})年', val_text)
-                                if match:
-                                    year = int(match.group(1))
-                                    current_year = 2025 # 仮定
-                                    details['age_years'] = current_year - year
+                            elif field == 'built_year':
+                                # "2021年10月築" -> 竣工年
+                                built_year = self._parse_built_year(val_text)
+                                if built_year:
+                                    details['built_year'] = built_year
                             elif field == 'direction':
                                 # "北西" など
                                 details['direction'] = val_text
@@ -129,7 +128,7 @@ class RehouseScraper(BaseScraper):
             
         return details
 
-    def _parse_listing(self, item: BeautifulSoup) -> Optional[Dict[str, Any]]:
+    def _parse_listing(self, item: BeautifulSoup) -> Optional[Listing]:
         """
         物件要素から情報を抽出する
         
@@ -137,7 +136,7 @@ class RehouseScraper(BaseScraper):
             item: BeautifulSoupの要素 (.mansion-list-card)
         
         Returns:
-            Dict: 物件データ
+            Listing: 物件データ
         """
         try:
             data = {
@@ -186,7 +185,7 @@ class RehouseScraper(BaseScraper):
                     if '階' in part and 'm' not in part: # mを含まない階
                         data['floor'] = self._parse_floor(part)
             
-            return data
+            return Listing(**data)
         
         except Exception as e:
             self.logger.error(f"Failed to parse Rehouse listing: {e}")
@@ -3,6 +3,7 @@ import re
 from typing import List, Dict, Any, Optional
 from urllib.parse import urljoin
 from scrapers.base_scraper import BaseScraper
+from utils.listing import Listing
 
 
 class SuumoScraper(BaseScraper):
@@ -13,12 +14,12 @@ class SuumoScraper(BaseScraper):
     def get_source_name(self) -> str:
         return "SUUMO"
     
-    def scrape(self) -> List[Dict[str, Any]]:
+    def scrape(self) -> List[Listing]:
         """
         スクレイピングを実行する
         
         Returns:
-            List[Dict]: 物件データのリスト
+            List[Listing]: 物件データのリスト
         """
         self.logger.info(f"Starting {self.get_source_name()} scraping...")
         
@@ -30,7 +31,7 @@ class SuumoScraper(BaseScraper):
         self.logger.info(f"Found {len(listings)} listings from {self.get_source_name()}")
         return listings
     
-    def _search_listings(self, property_name: str, layout: str) -> List[Dict[str, Any]]:
+    def _search_listings(self, property_name: str, layout: str) -> List[Listing]:
         """
         物件リストを検索する
         
@@ -39,7 +40,7 @@ class SuumoScraper(BaseScraper):
             layout: 間取り
         
         Returns:
-            List[Dict]: 物件データのリスト
+            List[Listing]: 物件データのリスト
         """
         listings = []
         
@@ -106,12 +107,12 @@ class SuumoScraper(BaseScraper):
                     item_text = item.get_text(separator=' ', strip=True)
                     
                     # タイトルに物件名が含まれているか、または物件情報に物件名が含まれているかをチェック
-                    if (property_name in listing.get('title', '') or 
+                    if (property_name in (listing.title or '') or 
                         f'物件名{property_name}' in item_text.replace(' ', '') or
                         property_name in item_text):
                         listings.append(listing)
                     else:
-                        self.logger.debug(f"Skipped: {listing.get('title', 'No title')[:50]} (not {property_name})")
+                        self.logger.debug(f"Skipped: {(listing.title or 'No title')[:50]} (not {property_name})")
             
             # 次のページがあるかチェック
             next_page = soup.select_one('.pagination-parts li.pagination-parts--next a')
@@ -123,7 +124,7 @@ class SuumoScraper(BaseScraper):
         
         return listings
     
-    def _parse_listing(self, listing_elem) -> Optional[Dict[str, Any]]:
+    def _parse_listing(self, listing_elem) -> Optional[Listing]:
         """
         物件要素から情報を抽出する
         
@@ -131,7 +132,7 @@ class SuumoScraper(BaseScraper):
             listing_elem: BeautifulSoupの要素
         
         Returns:
-            Dict: 物件データ
+            Listing: 物件データ
         """
         try:
             data = {
@@ -177,9 +178,9 @@ class SuumoScraper(BaseScraper):
                 
                 # 築年数
                 elif '築年数' in label or '築年月' in label:
-                    year_match = re.search(r'(\d+)年', value)
-                    if year_match:
-                        data['age_years'] = int(year_match.group(1))
+                    built_year = self._parse_built_year(value)
+                    if built_year:
+                        data['built_year'] = built_year
                 
                 # 方角
                 elif '向き' in label or '方角' in label:
@@ -208,7 +209,7 @@ class SuumoScraper(BaseScraper):
             if date_elem:
                 data['posted_date'] = date_elem.get_text(strip=True)
             
-            return data
+            return Listing(**data)
         
         except Exception as e:
             self.logger.error(f"Failed to parse listing: {e}")
@@ -274,16 +275,9 @@ class SuumoScraper(BaseScraper):
                         # 築年数（築年月から計算）
                         elif '築年' in label or '完成時期' in label:
                             # 例: "2014年12月" or "築10年"
-                            year_match = re.search(r'(\d{4})年', value)
-                            if year_match:
-                                year = int(year_match.group(1))
-                                current_year = 2025  # 現在の年
-                                detail_data['age_years'] = current_year - year
-                            else:
-                                # "築10年" の形式
-                                age_match = re.search(r'築(\d+)年', value)
-                                if age_match:
-                                    detail_data['age_years'] = int(age_match.group(1))
+                            built_year = self._parse_built_year(value)
+                            if built_year:
+                                detail_data['built_year'] = built_year
                         
                         # 方角（重要：「向き」フィールド）
                         elif '向き' in label:
@@ -0,0 +1,99 @@
+"""
+アラートの手動実行スクリプト
+
+保存済みの最新の変更セット（processed/changes.json）をアラートのルールと照合し、
+設定したシンクに送ります（通常は main.py が実行ごとに送ります）。
+--receive で動作確認用の Webhook の受け口を起動し、受け取ったアラートを表示します。
+
+使用例:
+    python send_alerts.py --dry-run
+    python send_alerts.py --property BranzTowerToyosu --rules config/alerts.json
+    python send_alerts.py --receive --port 8900
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from main import load_config
+from utils import setup_logger
+from utils.alerts import AlertEngine, WebhookReceiver, load_rules
+from utils.data_manager import record_key
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='最新の変更セットをアラートのルールと照合して送る')
+    parser.add_argument('--property', action='append', dest='properties',
+                        help='対象マンションID（複数指定可、省略時は全件）')
+    parser.add_argument('--rules', help='ルールファイルのパス（省略時は設定の alerts.rules_path）')
+    parser.add_argument('--dry-run', action='store_true', help='送らずに一致したアラートを表示する')
+    parser.add_argument('--receive', action='store_true', help='動作確認用の Webhook の受け口を起動する')
+    parser.add_argument('--port', type=int, default=8900, help='Webhook の受け口のポート')
+    parser.add_argument('--config', default='config/config.json', help='設定ファイルのパス')
+    return parser.parse_args(argv)
+
+
+def receive(port: int):
+    """Webhook の受け口を起動し、受け取ったアラートを表示する（Ctrl+C で終了）"""
+    with WebhookReceiver(port=port) as receiver:
+        print(f"Webhook の受け口: {receiver.url}（Ctrl+C で終了）")
+        shown = 0
+        try:
+            while True:
+                time.sleep(0.5)
+                for payload in receiver.received[shown:]:
+                    print(json.dumps(payload, ensure_ascii=False, indent=2))
+                shown = len(receiver.received)
+        except KeyboardInterrupt:
+            pass
+
+
+def main(argv=None):
+    """メイン処理"""
+    args = parse_args(argv)
+    if args.receive:
+        receive(args.port)
+        return
+    logger = setup_logger('send_alerts', 'logs/send_alerts.log')
+
+    config = load_config(args.config)
+    alerts_config = dict(config.get('alerts') or {})
+    if args.rules:
+        alerts_config['rules_path'] = args.rules
+    if 'rules_path' not in alerts_config:
+        logger.error("Alert rules not configured (alerts.rules_path or --rules)")
+        sys.exit(1)
+    if args.dry_run:
+        engine = AlertEngine(load_rules(alerts_config['rules_path']), [])
+    else:
+        engine = AlertEngine.from_config(alerts_config)
+
+    total = 0
+    for prop in config['properties']:
+        if args.properties and prop['id'] not in args.properties:
+            continue
+        processed_dir = os.path.join(config['output']['data_base_dir'], prop['id'], 'processed')
+        try:
+            with open(os.path.join(processed_dir, 'changes.json'), 'r', encoding='utf-8') as f:
+                changes = json.load(f)
+            # 変更セットは物件のキーだけを持つため、物件の内容は同じ公開の latest.json から引く
+            with open(os.path.join(processed_dir, 'latest.json'), 'r', encoding='utf-8') as f:
+                listings = {record_key(record): record for record in json.load(f).get('listings', [])}
+        except FileNotFoundError as e:
+            logger.warning(f"No changes found for {prop['id']}: {e.filename}")
+            continue
+
+        if args.dry_run:
+            alerts = engine.evaluate(prop, changes, listings, changes.get('version'))
+            for alert in alerts:
+                print(json.dumps(alert, ensure_ascii=False))
+        else:
+            alerts = engine.process(prop, changes, listings, changes.get('version'))
+        total += len(alerts)
+
+    print(f"\nアラート: {total}件{'（送信なし）' if args.dry_run else ''}")
+
+
+if __name__ == '__main__':
+    main()
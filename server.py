@@ -1,9 +1,24 @@
 import os
-import json
-from fastapi import FastAPI
+import asyncio
+from fastapi import FastAPI, Query, Request
+from fastapi.responses import Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+
+from utils.comparables import ComparablesIndex, DEFAULT_K as COMPARABLES_DEFAULT_K
+from utils.encoded_body import EncodedBody
+from utils.export import FORMATS as EXPORT_FORMATS, ExportFilter, check_export, dataset_rows, encode_rows
+from utils.json_writer import dumps
+from utils.listing_query import DEFAULT_LIMIT, DEFAULT_SORT, StaleCursorError
+from utils.price_model import FairPriceModels
+from utils.search_index import (
+    DEFAULT_LIMIT as SEARCH_DEFAULT_LIMIT, generation as search_generation, search as search_listings,
+)
+from utils.snapshot_cache import JSONFileCache, SnapshotCache
+from utils.snapshot_events import SnapshotBroadcaster, format_sse, snapshot_event
+from utils.static_assets import IMMUTABLE_CACHE_CONTROL, StaticAssets
+from utils.timeseries import DEFAULT_POINTS as TIMESERIES_DEFAULT_POINTS, FILENAME as TIMESERIES_FILENAME, query_series
 
 app = FastAPI(title="Real Estate Scraper Viewer")
 
@@ -17,19 +32,66 @@ app.add_middleware(
 )
 
 # 設定ファイルの読み込み
-CONFIG_PATH = os.path.join(os.path.dirname(__file__), "config", "config.json")
-DATA_BASE_DIR = os.path.join(os.path.dirname(__file__), "data")
+# 環境変数で上書き可能（ベンチマークなどで別のデータを使う場合）
+CONFIG_PATH = os.environ.get("CONFIG_PATH", os.path.join(os.path.dirname(__file__), "config", "config.json"))
+DATA_BASE_DIR = os.environ.get("DATA_BASE_DIR", os.path.join(os.path.dirname(__file__), "data"))
+
+# 設定ファイルとスナップショットのキャッシュ（ファイル更新時に自動で読み直す）
+config_cache = JSONFileCache(CONFIG_PATH)
+# 複数ワーカーで latest.snap のメモリマップを共有する（SNAPSHOT_PACK=0 で latest.json を直接読む）
+snapshot_cache = SnapshotCache(DATA_BASE_DIR, use_pack=os.environ.get("SNAPSHOT_PACK", "1") != "0")
+
+# スナップショット更新の通知（購読者がいる間だけ1つのタスクで監視する）
+broadcaster = SnapshotBroadcaster(snapshot_cache, interval=float(os.environ.get("SNAPSHOT_POLL_INTERVAL", 5)))
+SSE_KEEPALIVE_SECONDS = 20
+
+# マンションごとの適正価格モデル（スナップショットの更新時に差分で更新する）
+fair_price_models = FairPriceModels()
+
+# 類似物件の検索インデックス（スナップショットが更新されたマンションだけ作り直す）
+comparables_index = ComparablesIndex(DATA_BASE_DIR)
+
+# マンションごとのm²単価の時系列（ファイル更新時に自動で読み直す）
+timeseries_caches: Dict[str, JSONFileCache] = {}
+
+# ビルド済みの静的ファイル（python build_static.py で web/dist/ に作成）
+WEB_DIR = os.path.join(os.path.dirname(__file__), "web")
+static_assets = StaticAssets(WEB_DIR)
 
 def load_config():
     """設定ファイルを読み込む"""
-    with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    return config_cache.get()
+
+def encoded_response(request: Request, encoded: EncodedBody, media_type: str = "application/json",
+                     extra_headers: Optional[Dict[str, str]] = None) -> Response:
+    """事前圧縮済みの本文から、ETag・Accept-Encoding に応じたレスポンスを返す
+    
+    Args:
+        request: リクエスト
+        encoded: 圧縮済みの本文
+        media_type: Content-Type
+        extra_headers: 追加のレスポンスヘッダー
+    """
+    encoding, body, etag = encoded.select(request.headers.get("accept-encoding", ""))
+    headers = {
+        "ETag": etag,
+        "Vary": "Accept-Encoding",
+        # データは1日1回程度しか変わらないため、毎回ETagで再検証させる
+        "Cache-Control": "no-cache",
+    }
+    if extra_headers:
+        headers.update(extra_headers)
+    if encoded.matches(request.headers.get("if-none-match", "")):
+        return Response(status_code=304, headers=headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=media_type, headers=headers)
 
 @app.get("/api/properties")
 async def get_properties():
     """登録されているマンション一覧を取得する"""
     try:
-        config = load_config()
+        config = await config_cache.aget()
         properties = []
         for prop in config['properties']:
             properties.append({
@@ -43,56 +105,480 @@ async def get_properties():
         return {'error': str(e), 'properties': []}
 
 @app.get("/api/properties/{property_id}/listings")
-async def get_property_listings(property_id: str):
+async def get_property_listings(request: Request, property_id: str,
+                                since: Optional[str] = Query(None),
+                                layout: Optional[List[str]] = Query(None),
+                                source: Optional[List[str]] = Query(None)):
     """特定のマンションの物件データを取得する
     
+    since を指定した場合、そのバージョンからのデルタ（added / changed / removed）を返します。
+    デルタが保持されていない古いバージョンの場合は全件を返します。
+    layout / source を指定した場合は、公開時に分割したシャードから該当する物件だけを返します
+    （デルタは全件に対してだけ提供するため、since は無視します）。
+    
     Args:
         property_id: マンションID（例: "BranzTowerToyosu"）
+        since: クライアントが持っているスナップショットのバージョン
+        layout: 間取り（複数指定可、例: ?layout=2LDK&layout=3LDK）
+        source: データソース（複数指定可）
     """
-    # データファイルのパス
-    filepath = os.path.join(DATA_BASE_DIR, property_id, "processed", "latest.json")
+    try:
+        snapshot = await snapshot_cache.aget(property_id)
+    except Exception as e:
+        return {"error": str(e), "listings": [], "total_listings": 0}
     
-    if not os.path.exists(filepath):
+    if snapshot is None:
         return {"error": f"No data found for property: {property_id}", "listings": [], "total_listings": 0}
     
+    headers = {"X-Snapshot-Version": snapshot.version}
+    if layout or source:
+        encoded = snapshot.cached_selection(layout, source)
+        if encoded is None:
+            # シャードのパース・圧縮はスレッドで行う
+            encoded = await asyncio.get_running_loop().run_in_executor(None, snapshot.select, layout, source)
+        return encoded_response(request, encoded, extra_headers=headers)
+    
+    if since:
+        delta = snapshot.delta(since)
+        if delta is not None:
+            return encoded_response(request, delta, extra_headers=headers)
+    
+    # 読み込み時の内容をそのまま返す（再エンコードしない）
+    return encoded_response(request, snapshot.encoded, extra_headers=headers)
+
+@app.get("/api/properties/{property_id}/changes")
+async def get_property_changes(request: Request, property_id: str):
+    """特定のマンションの前回からの変更セットを取得する
+    
+    Args:
+        property_id: マンションID
+    """
+    snapshot = await snapshot_cache.aget(property_id)
+    if snapshot is None:
+        return {"error": f"No data found for property: {property_id}"}
+    if snapshot.changes_encoded is None:
+        return {"error": "No changes available", "version": snapshot.version}
+    return encoded_response(request, snapshot.changes_encoded)
+
+@app.get("/api/properties/{property_id}/events")
+async def property_events(property_id: str):
+    """特定のマンションの新しいスナップショットの公開を Server-Sent Events で通知する
+    
+    接続時に現在のバージョンを送り、以降は新しいバージョンが公開されるたびに
+    バージョンと変更の概要を送ります。
+    
+    Args:
+        property_id: マンションID
+    """
+    snapshot = await snapshot_cache.aget(property_id)
+    if snapshot is None:
+        return {"error": f"No data found for property: {property_id}"}
+    
+    queue = broadcaster.subscribe(property_id, snapshot.version)
+    
+    async def stream():
+        try:
+            yield format_sse(snapshot_event(snapshot), event="snapshot", event_id=snapshot.version)
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    # 接続維持用のコメント
+                    yield b": keepalive\n\n"
+                    continue
+                yield format_sse(event, event="snapshot", event_id=event["version"])
+        finally:
+            broadcaster.unsubscribe(property_id, queue)
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/api/properties/{property_id}/stats")
+async def get_property_stats(request: Request, property_id: str):
+    """特定のマンションの集計（価格・単価・管理費など）を取得する
+    
+    Args:
+        property_id: マンションID
+    """
+    snapshot = await snapshot_cache.aget(property_id)
+    if snapshot is None:
+        return {"error": f"No data found for property: {property_id}", "stats": None}
+    return encoded_response(request, snapshot.stats_encoded)
+
+@app.get("/api/properties/{property_id}/fair-price")
+async def get_property_fair_price(request: Request, property_id: str):
+    """特定のマンションの適正価格モデルと、各物件の割高・割安のスコアを取得する
+    
+    Args:
+        property_id: マンションID
+    """
+    config = await config_cache.aget()
+    property_config = next((p for p in config['properties'] if p['id'] == property_id), None)
+    snapshot = await snapshot_cache.aget(property_id, indexed=True)
+    if property_config is None or snapshot is None:
+        return {"error": f"No data found for property: {property_id}", "listings": []}
+    
+    encoded = await asyncio.get_running_loop().run_in_executor(
+        None, fair_price_models.get, snapshot, property_config.get('layouts', []))
+    return encoded_response(request, encoded)
+
+@app.get("/api/properties/{property_id}/export")
+async def export_property_listings(
+    property_id: str,
+    format: str = "csv",
+    dataset: str = "snapshot",
+    layout: Optional[List[str]] = Query(None),
+    source: Optional[List[str]] = Query(None),
+    min_price: Optional[int] = None,
+    max_price: Optional[int] = None,
+    min_area: Optional[float] = None,
+    max_area: Optional[float] = None,
+    min_floor: Optional[int] = None,
+    max_floor: Optional[int] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+):
+    """特定のマンションの物件データを CSV / JSON Lines / Parquet でダウンロードする
+    
+    行は少しずつ作ってチャンクで送るため、結果全体をメモリに持ちません。
+    
+    Args:
+        property_id: マンションID
+        format: 形式（csv, jsonl, parquet（pyarrow が必要））
+        dataset: snapshot（現在の物件）, history（掲載終了した物件を含む掲載履歴）, changes（実行ごとの変更）
+        layout: 間取り（複数指定可）
+        source: データソース（複数指定可）
+        min_price, max_price: 価格の範囲（円）
+        min_area, max_area: 面積の範囲（m²）
+        min_floor, max_floor: 階数の範囲
+        start, end: 期間（YYYY-MM-DD。history は掲載期間、changes は実行日。snapshot では指定不可）
+    """
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        return data
-    except Exception as e:
-        return {"error": str(e), "listings": [], "total_listings": 0}
+        filters = ExportFilter(
+            layouts=layout, sources=source,
+            min_price=min_price, max_price=max_price,
+            min_area=min_area, max_area=max_area,
+            min_floor=min_floor, max_floor=max_floor,
+            start=start, end=end,
+        )
+        check_export(format, dataset, filters)
+    except ValueError as e:
+        return Response(content=dumps({"error": str(e)}), status_code=400, media_type="application/json")
+    
+    config = await config_cache.aget()
+    if not any(p['id'] == property_id for p in config['properties']):
+        return Response(content=dumps({"error": f"No data found for property: {property_id}"}),
+                        status_code=404, media_type="application/json")
+    
+    listings = None
+    suffix = dataset
+    if dataset == "snapshot":
+        snapshot = await snapshot_cache.aget(property_id)
+        if snapshot is None:
+            return Response(content=dumps({"error": f"No data found for property: {property_id}"}),
+                            status_code=404, media_type="application/json")
+        listings = snapshot.listings
+        suffix = snapshot.version or dataset
+    
+    media_type, extension = EXPORT_FORMATS[format]
+    rows = dataset_rows(dataset, property_id, os.path.join(DATA_BASE_DIR, property_id, "processed"),
+                        filters, listings)
+    # 同期のジェネレーターはスレッドプールで読まれる（ファイルの読み込みでイベントループを止めない）
+    return StreamingResponse(
+        encode_rows(rows, dataset, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{property_id}-{suffix}.{extension}"'},
+    )
+
+@app.get("/api/properties/{property_id}/query")
+async def query_property_listings(
+    property_id: str,
+    layout: Optional[List[str]] = Query(None),
+    source: Optional[List[str]] = Query(None),
+    min_price: Optional[int] = None,
+    max_price: Optional[int] = None,
+    min_area: Optional[float] = None,
+    max_area: Optional[float] = None,
+    min_floor: Optional[int] = None,
+    max_floor: Optional[int] = None,
+    q: Optional[str] = None,
+    sort: str = DEFAULT_SORT,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_LIMIT,
+):
+    """特定のマンションの物件データを絞り込み・並べ替え・ページングして取得する
+    
+    Args:
+        property_id: マンションID
+        layout: 間取り（複数指定可）
+        source: データソース（複数指定可）
+        min_price, max_price: 価格の範囲（円）
+        min_area, max_area: 面積の範囲（m²）
+        min_floor, max_floor: 階数の範囲
+        q: タイトル・ソースの検索文字列
+        sort: 並び順（price-asc, price-desc, floor-desc, floor-asc, area-desc, area-asc, posted-desc）
+        cursor: 前回のレスポンスの next_cursor（別のバージョンのスナップショットのものは 409）
+        limit: 最大件数（上限500）
+    """
+    snapshot = await snapshot_cache.aget(property_id, indexed=True)
+    if snapshot is None:
+        return {"error": f"No data found for property: {property_id}", "listings": [], "next_cursor": None}
+    
+    try:
+        result = snapshot.index.query(
+            layouts=layout, sources=source,
+            min_price=min_price, max_price=max_price,
+            min_area=min_area, max_area=max_area,
+            min_floor=min_floor, max_floor=max_floor,
+            q=q, sort=sort, cursor=cursor, limit=limit,
+        )
+    except StaleCursorError as e:
+        # ページングの途中で新しいスナップショットが公開された（最初のページから取り直す）
+        return Response(content=dumps({"error": str(e), "version": snapshot.version}),
+                        status_code=409, media_type="application/json")
+    except ValueError as e:
+        return Response(content=dumps({"error": str(e)}), status_code=400, media_type="application/json")
+    
+    result['property_id'] = property_id
+    result['version'] = snapshot.version
+    result['last_updated'] = snapshot.last_updated
+    return Response(content=dumps(result), media_type="application/json")
+
+@app.get("/api/search")
+async def search_all_listings(
+    q: str,
+    property: Optional[List[str]] = Query(None),
+    layout: Optional[List[str]] = Query(None),
+    min_price: Optional[int] = None,
+    max_price: Optional[int] = None,
+    min_area: Optional[float] = None,
+    max_area: Optional[float] = None,
+    cursor: Optional[str] = None,
+    limit: int = SEARCH_DEFAULT_LIMIT,
+):
+    """登録されている全マンションの物件を横断検索する
+    
+    物件タイトル・マンション名・所在地を文字の n-gram インデックスで検索し、
+    タイトルに一致したもの（前方で一致したもの）を上位に返します。
+    
+    Args:
+        q: 検索文字列（空白区切りの語をすべて含む物件を返す）
+        property: マンションID（複数指定可、省略時は全マンション）
+        layout: 間取り（複数指定可）
+        min_price, max_price: 価格の範囲（円）
+        min_area, max_area: 面積の範囲（m²）
+        cursor: 前回のレスポンスの next_cursor（いずれかのマンションのスナップショットが更新された後は 409）
+        limit: 最大件数（上限200）
+    """
+    config = await config_cache.aget()
+    targets = [p for p in config['properties'] if not property or p['id'] in property]
+    snapshots = await asyncio.gather(*(snapshot_cache.aget(p['id'], indexed=True) for p in targets))
+    segments = [(p, snapshot.search) for p, snapshot in zip(targets, snapshots) if snapshot is not None]
+    
+    try:
+        result = search_listings(
+            segments, q, layouts=layout,
+            min_price=min_price, max_price=max_price,
+            min_area=min_area, max_area=max_area,
+            cursor=cursor, limit=limit,
+        )
+    except StaleCursorError as e:
+        # ページングの途中で新しいスナップショットが公開された（最初のページから取り直す）
+        return Response(content=dumps({"error": str(e), "generation": search_generation(segments)}),
+                        status_code=409, media_type="application/json")
+    except ValueError as e:
+        return Response(content=dumps({"error": str(e)}), status_code=400, media_type="application/json")
+    
+    return Response(content=dumps(result), media_type="application/json")
+
+async def load_timeseries(property_id: str) -> Optional[Dict[str, Any]]:
+    """マンションのm²単価の時系列を取得する（ない場合はNone）"""
+    cache = timeseries_caches.get(property_id)
+    if cache is None:
+        cache = timeseries_caches.setdefault(property_id, JSONFileCache(
+            os.path.join(DATA_BASE_DIR, property_id, "processed", TIMESERIES_FILENAME)))
+    try:
+        return await cache.aget()
+    except FileNotFoundError:
+        return None
+
+@app.get("/api/timeseries")
+async def get_price_timeseries(
+    property: Optional[List[str]] = Query(None),
+    layout: Optional[List[str]] = Query(None),
+    resolution: str = "auto",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    points: int = TIMESERIES_DEFAULT_POINTS,
+    method: str = "lttb",
+):
+    """m²単価（中央値・最小・最大）の推移をグラフ用に取得する
+    
+    マンション・間取りごとに1系列を返し、各系列の点数は points 以下になるように
+    解像度を選び、それでも多い場合は間引きます。
+    
+    Args:
+        property: マンションID（複数指定可、省略時は全マンション）
+        layout: 間取り（複数指定可、省略時は全間取りをまとめた系列 "all"）
+        resolution: auto（期間に応じて選ぶ）, daily, weekly, monthly
+        start, end: 期間（YYYY-MM-DD）
+        points: 系列ごとの最大点数（上限2000）
+        method: 間引き方（lttb: 形を保つ, minmax: 各区間の最小・最大を残す）
+    """
+    config = await config_cache.aget()
+    targets = [p for p in config['properties'] if not property or p['id'] in property]
+    timeseries = await asyncio.gather(*(load_timeseries(p['id']) for p in targets))
+    
+    try:
+        result = query_series(
+            [({'id': p['id'], 'name': p['name']}, data) for p, data in zip(targets, timeseries) if data is not None],
+            layouts=layout, resolution=resolution, start=start, end=end, points=points, method=method,
+        )
+    except ValueError as e:
+        return Response(content=dumps({"error": str(e)}), status_code=400, media_type="application/json")
+    
+    return Response(content=dumps(result), media_type="application/json")
+
+@app.get("/api/listings/{listing_id}")
+async def get_listing(listing_id: str):
+    """物件IDから物件を1件取得する（全マンションの公開済みスナップショットのハッシュ表を引く）
+    
+    同じ住戸とみなす他のサイトの掲載（sources）と、関連するAPIへのリンク（links）も返します。
+    
+    Args:
+        listing_id: 物件ID（正規化したURLなどから求めた16桁の16進数）
+    """
+    config = await config_cache.aget()
+    snapshots = await asyncio.gather(*(snapshot_cache.aget(p['id']) for p in config['properties']))
+    for property_config, snapshot in zip(config['properties'], snapshots):
+        if snapshot is None:
+            continue
+        listing = snapshot.find_listing(listing_id)
+        if listing is None:
+            continue
+        
+        sources = []
+        for id_ in snapshot.entity_group(listing_id):
+            record = listing if id_ == listing_id else snapshot.find_listing(id_)
+            if record is not None:
+                sources.append({'listing_id': id_, 'source': record.get('source'),
+                                'url': record.get('url'), 'price': record.get('price')})
+        # 指定した物件を先頭にする
+        sources.sort(key=lambda source: source['listing_id'] != listing_id)
+        
+        property_id = property_config['id']
+        result = {
+            'listing_id': listing_id,
+            'property_id': property_id,
+            'property_name': property_config['name'],
+            'version': snapshot.version,
+            'last_updated': snapshot.last_updated,
+            'listing': listing,
+            'sources': sources,
+            'links': {
+                'property': f"/{property_id}",
+                'comparables': f"/api/listings/{listing_id}/comparables",
+                'history': f"/api/properties/{property_id}/export?dataset=history&format=jsonl",
+                'changes': f"/api/properties/{property_id}/export?dataset=changes&format=jsonl",
+                'timeseries': f"/api/timeseries?property={property_id}&layout={listing.get('layout') or 'all'}",
+            },
+        }
+        return Response(content=dumps(result), media_type="application/json")
+    
+    return Response(content=dumps({"error": f"Listing not found: {listing_id}"}),
+                    status_code=404, media_type="application/json")
+
+@app.get("/api/listings/{listing_id}/comparables")
+async def get_listing_comparables(
+    listing_id: str,
+    k: int = COMPARABLES_DEFAULT_K,
+    include_past: bool = True,
+    scope: str = "nearby",
+):
+    """物件に面積・階数・間取り・向きが近い物件（掲載中・過去）を距離の近い順に取得する
+    
+    Args:
+        listing_id: 物件のID
+        k: 件数（上限100）
+        include_past: 掲載終了した物件も含めるか
+        scope: building（同じマンションのみ）, nearby（所在地が同じマンションも含める）
+    """
+    config = await config_cache.aget()
+    snapshots = await asyncio.gather(*(snapshot_cache.aget(p['id']) for p in config['properties']))
+    properties = [
+        ({'id': p['id'], 'name': p['name'], 'area': p.get('area')}, snapshot)
+        for p, snapshot in zip(config['properties'], snapshots)
+        if snapshot is not None
+    ]
+    await asyncio.get_running_loop().run_in_executor(None, comparables_index.update, properties)
+    
+    try:
+        result = comparables_index.query(listing_id, k=k, include_past=include_past, scope=scope)
+    except ValueError as e:
+        return Response(content=dumps({"error": str(e)}), status_code=400, media_type="application/json")
+    if result is None:
+        return Response(content=dumps({"error": f"Listing not found: {listing_id}"}),
+                        status_code=404, media_type="application/json")
+    return Response(content=dumps(result), media_type="application/json")
 
 @app.get("/api/listings")
-async def get_listings():
+async def get_listings(request: Request):
     """旧エンドポイント（後方互換性のため）- デフォルトマンションのデータを返す"""
-    config = load_config()
+    config = await config_cache.aget()
     if config['properties']:
         default_property_id = config['properties'][0]['id']
-        return await get_property_listings(default_property_id)
+        return await get_property_listings(request, default_property_id, since=None, layout=None, source=None)
     return {"error": "No properties configured", "listings": [], "total_listings": 0}
 
 # FileResponseのインポート
 from starlette.responses import FileResponse
 
+def page_response(request: Request, name: str) -> Response:
+    """HTMLページを返す（ビルド済みであれば参照を書き換えた圧縮済みのHTML）
+    
+    Args:
+        request: リクエスト
+        name: web/ 以下のHTMLファイル名
+    """
+    page = static_assets.page(name)
+    if page is None:
+        return FileResponse(os.path.join(WEB_DIR, name))
+    encoded, media_type = page
+    return encoded_response(request, encoded, media_type)
+
 @app.get("/")
-async def root():
+async def root(request: Request):
     """ルートページ（マンション一覧）を返す"""
-    index_path = os.path.join(os.path.dirname(__file__), "web", "index.html")
-    return FileResponse(index_path)
+    return page_response(request, "index.html")
 
 @app.get("/{property_id}")
-async def property_page(property_id: str):
+async def property_page(request: Request, property_id: str):
     """マンション詳細ページを返す
     
     Args:
         property_id: マンションID（例: "BranzTowerToyosu"）
     """
-    property_html_path = os.path.join(os.path.dirname(__file__), "web", "property.html")
-    return FileResponse(property_html_path)
+    return page_response(request, "property.html")
 
 # 静的ファイルの配信（CSS, JS, 画像など）
-if os.path.exists("web"):
-    app.mount("/static", StaticFiles(directory="web"), name="static")
+static_files = StaticFiles(directory=WEB_DIR, check_dir=False)
+
+@app.get("/static/{asset_path:path}")
+async def static_file(request: Request, asset_path: str):
+    """静的ファイルを返す（ハッシュ付きのファイルは長期間キャッシュさせる）
+    
+    Args:
+        asset_path: /static/ 以下のパス
+    """
+    asset = static_assets.asset(asset_path)
+    if asset is None:
+        return await static_files.get_response(asset_path, request.scope)
+    encoded, media_type = asset
+    return encoded_response(request, encoded, media_type,
+                            extra_headers={"Cache-Control": IMMUTABLE_CACHE_CONTROL})
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,170 @@
+"""アラート（RuleIndex, IntervalTree, WebhookSink, AlertEngine）のテスト"""
+import random
+
+import pytest
+import requests
+
+from utils import alerts
+from utils.alerts import AlertEngine, AlertRule, RuleIndex, WebhookReceiver, WebhookSink
+from utils.data_manager import DataManager, record_key
+from utils.interval_tree import IntervalTree
+from utils.listing import Listing
+
+
+INF = float('inf')
+
+
+def random_rule(rng, i):
+    low_price = rng.choice([None, 30000000, 50000000, 70000000])
+    high_price = rng.choice([None, 60000000, 90000000])
+    if low_price is not None and high_price is not None and low_price > high_price:
+        low_price, high_price = high_price, low_price
+    low_floor = rng.choice([None, 5, 10, 20])
+    high_floor = rng.choice([None, 15, 30])
+    if low_floor is not None and high_floor is not None and low_floor > high_floor:
+        low_floor, high_floor = high_floor, low_floor
+    return AlertRule(
+        id=f'rule-{i}',
+        property_id=rng.choice([None, 'A', 'B']),
+        layouts=rng.choice([None, ['2LDK'], ['3LDK'], ['2LDK', '3LDK']]),
+        min_price=low_price, max_price=high_price,
+        min_floor=low_floor, max_floor=high_floor,
+        events=rng.choice([None, ['new'], ['price_down', 'price_up']]),
+    )
+
+
+def random_listing(rng):
+    return {
+        'layout': rng.choice([None, '1LDK', '2LDK', '3LDK']),
+        'price': rng.choice([None, 25000000, 50000000, 60000000, 75000000, 95000000]),
+        'floor': rng.choice([None, 3, 5, 12, 20, 31]),
+    }
+
+
+def test_rule_index_matches_brute_force():
+    rng = random.Random(0)
+    rules = [random_rule(rng, i) for i in range(300)]
+    index = RuleIndex(rules)
+    for _ in range(500):
+        property_id = rng.choice(['A', 'B', 'C'])
+        event = rng.choice(alerts.EVENTS)
+        listing = random_listing(rng)
+        expected = sorted(rule.id for rule in rules if rule.matches(property_id, event, listing))
+        matched = [rule.id for rule in index.match(property_id, event, listing)]
+        # 同じルールが2回返らないこと
+        assert sorted(matched) == expected
+
+
+def test_interval_tree_open_bounds():
+    tree = IntervalTree([
+        (-INF, INF, 'all'),
+        (-INF, 10, 'up-to-10'),
+        (20, INF, 'from-20'),
+        (10, 20, 'closed'),
+        (30, 25, 'empty'),
+    ])
+    assert sorted(tree.query(-1e12)) == ['all', 'up-to-10']
+    assert sorted(tree.query(10)) == ['all', 'closed', 'up-to-10']
+    assert sorted(tree.query(15)) == ['all', 'closed']
+    assert sorted(tree.query(20)) == ['all', 'closed', 'from-20']
+    assert sorted(tree.query(1e12)) == ['all', 'from-20']
+
+
+def test_interval_tree_only_open_intervals():
+    tree = IntervalTree([(-INF, INF, 'all'), (-INF, INF, 'all-2')])
+    assert sorted(tree.query(0)) == ['all', 'all-2']
+    assert sorted(tree.query(-5)) == ['all', 'all-2']
+
+
+def test_webhook_sink_batches():
+    with WebhookReceiver() as receiver:
+        WebhookSink(receiver.url, batch_size=2).send([{'n': i} for i in range(5)])
+    assert [len(body['alerts']) for body in receiver.received] == [2, 2, 1]
+
+
+def test_webhook_sink_retries_and_raises(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(alerts.time, 'sleep', sleeps.append)
+    with WebhookReceiver(status=500) as receiver:
+        with pytest.raises(requests.exceptions.HTTPError):
+            WebhookSink(receiver.url, max_retries=3).send([{'n': 1}])
+    assert len(receiver.received) == 3
+    assert sleeps == [1, 2]
+
+
+def test_dispatch_continues_after_failed_sink(monkeypatch):
+    monkeypatch.setattr(alerts.time, 'sleep', lambda seconds: None)
+    with WebhookReceiver(status=500) as failing, WebhookReceiver() as receiver:
+        engine = AlertEngine([], [WebhookSink(failing.url, max_retries=1), WebhookSink(receiver.url)])
+        assert engine.dispatch([{'n': 1}]) == 1
+    assert receiver.received == [{'alerts': [{'n': 1}]}]
+
+
+def make_listing(i, price=50000000):
+    return Listing(source='SUUMO', title=f'物件{i}', url=f'https://example.com/{i}', layout='2LDK',
+                   price=price, area=60.0, floor=i)
+
+
+def publish(data_manager, listings, last_updated):
+    changes = data_manager.detect_changes(listings)
+    data_manager.save_processed_data(listings, 'テスト', last_updated)
+    return changes
+
+
+def evaluate(changes, listings):
+    engine = AlertEngine([AlertRule(id='all', events=list(alerts.EVENTS))], [])
+    records = {record_key(listing.to_dict()): listing.to_dict() for listing in listings}
+    found = engine.evaluate({'id': 'Test'}, changes, records)
+    return sorted((alert['event'], alert['listing']['floor']) for alert in found)
+
+
+def test_no_alerts_without_previous_snapshot(tmp_path):
+    data_manager = DataManager({'id': 'Test', 'name': 'テスト'}, str(tmp_path))
+    listings = [make_listing(1), make_listing(2)]
+    changes = publish(data_manager, listings, '2026-01-01T00:00:00+00:00')
+    assert changes['summary']['new'] == 2
+    assert evaluate(changes, listings) == []
+
+
+def test_relisted_listing_is_not_new(tmp_path):
+    data_manager = DataManager({'id': 'Test', 'name': 'テスト'}, str(tmp_path))
+    publish(data_manager, [make_listing(1), make_listing(2)], '2026-01-01T00:00:00+00:00')
+    # 物件2が一度消えて（取得の失敗など）、次の実行で再び掲載される
+    publish(data_manager, [make_listing(1)], '2026-01-02T00:00:00+00:00')
+    listings = [make_listing(1, price=45000000), make_listing(2), make_listing(3)]
+    changes = publish(data_manager, listings, '2026-01-03T00:00:00+00:00')
+
+    relisted = {item['key']: item for item in changes['new']}
+    assert relisted[record_key(listings[1].to_dict())]['first_seen'] == '2026-01-01T00:00:00+00:00'
+    assert 'first_seen' not in relisted[record_key(listings[2].to_dict())]
+    assert evaluate(changes, listings) == [('new', 3), ('price_down', 1)]
+
+
+class CountingRecords(dict):
+    """引いたキーを記録する（照合が変更された物件だけを引くことの確認用）"""
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.looked_up = []
+
+    def get(self, key, default=None):
+        self.looked_up.append(key)
+        return super().get(key, default)
+
+    def __iter__(self):
+        raise AssertionError('evaluate must not scan every listing')
+
+
+def test_evaluate_looks_up_only_changed_listings(tmp_path):
+    data_manager = DataManager({'id': 'Test', 'name': 'テスト'}, str(tmp_path))
+    listings = [make_listing(i) for i in range(1, 51)]
+    publish(data_manager, listings, '2026-01-01T00:00:00+00:00')
+    listings[9] = make_listing(10, price=45000000)
+    changes = publish(data_manager, listings, '2026-01-02T00:00:00+00:00')
+
+    records = CountingRecords(data_manager.published_records)
+    assert len(records) == 50
+    engine = AlertEngine([AlertRule(id='all')], [])
+    alerts = engine.evaluate({'id': 'Test'}, changes, records)
+    assert [alert['event'] for alert in alerts] == ['price_down']
+    assert records.looked_up == [record_key(listings[9].to_dict())]
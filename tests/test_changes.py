@@ -0,0 +1,79 @@
+"""DataManager.compute_changes / save_changes のテスト"""
+import json
+
+import pytest
+
+from utils.data_manager import DataManager, listing_id, listing_key, record_key
+from utils.listing import Listing
+
+
+def make_listing(i, price=50000000, **fields):
+    return Listing(source='SUUMO', title=f'物件{i}', url=f'https://example.com/{i}', layout='2LDK',
+                   price=price, area=60.0, floor=i, **fields)
+
+
+@pytest.fixture
+def data_manager(tmp_path):
+    return DataManager({'id': 'Test', 'name': 'テスト'}, str(tmp_path))
+
+
+def test_compute_changes_classifies_listings(data_manager):
+    previous = [make_listing(1), make_listing(2), make_listing(3), make_listing(4, management_fee=20000)]
+    current = [make_listing(1), make_listing(2, price=48000000), make_listing(4, management_fee=21000),
+               make_listing(5)]
+
+    changes = data_manager.compute_changes(previous, current)
+
+    assert changes['new'] == [{'key': 'https://example.com/5', 'listing_id': listing_id('https://example.com/5')}]
+    assert changes['removed'] == [{'key': 'https://example.com/3', 'listing_id': listing_id('https://example.com/3')}]
+    assert changes['price_down'] == [{
+        'key': 'https://example.com/2', 'listing_id': listing_id('https://example.com/2'),
+        'price_before': 50000000, 'price_after': 48000000,
+    }]
+    assert changes['price_up'] == []
+    assert changes['fee_changed'][0]['fees'] == {
+        'management_fee': {'before': 20000, 'after': 21000}
+    }
+    assert changes['summary'] == {
+        'new': 1, 'removed': 1, 'price_down': 1, 'price_up': 0, 'fee_changed': 1, 'unchanged': 1,
+    }
+
+
+def test_changes_carry_no_listing_payload(data_manager):
+    changes = data_manager.compute_changes([make_listing(1)], [make_listing(1, price=60000000), make_listing(2)])
+
+    assert set(changes['new'][0]) == {'key', 'listing_id'}
+    assert set(changes['price_up'][0]) == {'key', 'listing_id', 'price_before', 'price_after'}
+
+
+def test_listing_key_matches_record_key():
+    with_url = make_listing(1)
+    without_url = Listing(source='HOMES', title='URLなし', layout='3LDK', price=70000000, area=72.5, floor=10)
+
+    assert listing_key(with_url) == record_key(with_url.to_dict())
+    assert listing_key(without_url) == record_key(without_url.to_dict())
+    assert listing_key(without_url).startswith('hash:')
+
+
+def test_change_history_is_pruned(tmp_path):
+    data_manager = DataManager({'id': 'Test', 'name': 'テスト'}, str(tmp_path), changes_retention_days=30)
+    changes = data_manager.compute_changes([], [make_listing(1)])
+    for last_updated in ('2026-01-01T00:00:00+00:00', '2026-02-15T00:00:00+00:00', '2026-03-01T00:00:00+00:00'):
+        data_manager.save_changes(changes, last_updated=last_updated)
+
+    with open(tmp_path / 'Test' / 'processed' / 'changes.jsonl', encoding='utf-8') as f:
+        runs = [json.loads(line)['last_updated'] for line in f]
+    assert runs == ['2026-02-15T00:00:00+00:00', '2026-03-01T00:00:00+00:00']
+
+
+def test_change_history_prune_skips_corrupt_lines(tmp_path):
+    data_manager = DataManager({'id': 'Test', 'name': 'テスト'}, str(tmp_path), changes_retention_days=30)
+    changes = data_manager.compute_changes([], [make_listing(1)])
+    history_path = tmp_path / 'Test' / 'processed' / 'changes.jsonl'
+    # 書きかけで途切れた行や、オブジェクトでない行があっても公開は止まらない
+    history_path.write_text('{"last_updated": "2026-01-0\n[1, 2]\n', encoding='utf-8')
+    data_manager.save_changes(changes, last_updated='2026-03-01T00:00:00+00:00')
+
+    with open(history_path, encoding='utf-8') as f:
+        runs = [json.loads(line)['last_updated'] for line in f]
+    assert runs == ['2026-03-01T00:00:00+00:00']
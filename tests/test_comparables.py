@@ -0,0 +1,116 @@
+"""類似物件の検索（KDTree, encode_features, ComparablesIndex）のテスト"""
+import numpy as np
+import pytest
+
+from utils.comparables import ComparablesIndex, encode_features
+from utils.data_manager import DataManager, listing_id, record_key
+from utils.kdtree import KDTree
+from utils.listing import Listing
+from utils.snapshot_cache import SnapshotCache
+
+
+def brute_force(points, point, k, mask=None):
+    distances = np.sqrt(((points - point) ** 2).sum(axis=1))
+    order = [i for i in np.argsort(distances, kind='stable') if mask is None or mask[i]]
+    return distances[order[:k]]
+
+
+@pytest.mark.parametrize('leaf_size', [1, 4, 32])
+def test_kdtree_matches_brute_force(leaf_size):
+    rng = np.random.default_rng(leaf_size)
+    points = rng.normal(size=(300, 5))
+    # 同じ点が多数ある（それ以上分割できない）場合も正しく求める
+    points[:40] = points[0]
+    tree = KDTree(points, leaf_size=leaf_size)
+    mask = rng.random(300) < 0.5
+    for point in rng.normal(size=(20, 5)):
+        for k in (1, 7, 300, 500):
+            distances, indices = tree.query(point, k)
+            assert np.allclose(distances, brute_force(points, point, k))
+            assert np.allclose(np.sqrt(((points[indices] - point) ** 2).sum(axis=1)), distances)
+        distances, indices = tree.query(point, 10, mask)
+        assert mask[indices].all()
+        assert np.allclose(distances, brute_force(points, point, 10, mask))
+
+
+def test_kdtree_edge_cases():
+    assert len(KDTree(np.zeros((0, 3))).query(np.zeros(3), 5)[0]) == 0
+    assert len(KDTree(np.ones((3, 2))).query(np.zeros(2), 0)[1]) == 0
+    with pytest.raises(ValueError):
+        KDTree(np.zeros(3))
+
+
+def test_encode_features():
+    listings = [
+        {'area': 60.0, 'floor': 10, 'layout': '2LDK', 'direction': '北'},
+        {'area': 66.0, 'floor': None, 'layout': '3LDK', 'direction': '南'},
+        {'area': 60.0, 'floor': 20, 'layout': 'ワンルーム', 'direction': None},
+        {'area': None, 'floor': 1, 'layout': '1K'},
+    ]
+    features, valid = encode_features(listings)
+    assert valid.tolist() == [True, True, True, False]
+    # 面積は約10%の差で距離1、正反対の向きは距離2、不明な階数・部屋数は中央値
+    assert features[1, 0] - features[0, 0] == pytest.approx(np.log(1.1) / 0.1)
+    assert np.linalg.norm(features[0, 3:] - features[1, 3:]) == pytest.approx(2.0)
+    assert features[2, 3:].tolist() == [0.0, 0.0]
+    assert features[1, 1] == pytest.approx(10 / 5.0)
+    assert features[2, 2] == 2.0
+
+
+PROPERTIES = [
+    {'id': 'A', 'name': 'A', 'area': '江東区'},
+    {'id': 'B', 'name': 'B', 'area': '江東区'},
+    {'id': 'C', 'name': 'C', 'area': '港区'},
+]
+
+
+def unit(property_id, i, area, floor, direction='南'):
+    return Listing(source='SUUMO', url=f'https://example.com/{property_id}/{i}', layout='2LDK',
+                   price=50000000, area=area, floor=floor, direction=direction)
+
+
+@pytest.fixture
+def index(tmp_path):
+    data_dir = str(tmp_path)
+    a = DataManager(PROPERTIES[0], data_dir)
+    sold = unit('A', 9, 60.5, 10)
+    a.save_processed_data([unit('A', 0, 60.0, 10), unit('A', 1, 80.0, 30), sold], 'A', '2026-01-01T00:00:00+00:00')
+    # 掲載終了した物件は掲載履歴から検索する
+    a.save_processed_data([unit('A', 0, 60.0, 10), unit('A', 1, 80.0, 30)], 'A', '2026-01-02T00:00:00+00:00')
+    DataManager(PROPERTIES[1], data_dir).save_processed_data(
+        [unit('B', 0, 61.0, 11), unit('B', 1, 30.0, 2, '北')], 'B', '2026-01-02T00:00:00+00:00')
+    DataManager(PROPERTIES[2], data_dir).save_processed_data(
+        [unit('C', 0, 60.0, 10)], 'C', '2026-01-02T00:00:00+00:00')
+
+    cache = SnapshotCache(data_dir, use_pack=False)
+    index = ComparablesIndex(data_dir)
+    properties = [(p, cache.get(p['id'])) for p in PROPERTIES]
+    assert index.update(properties) == 3
+    assert index.update(properties) == 0
+    return index
+
+
+def id_of(property_id, i):
+    return listing_id(record_key({'url': f'https://example.com/{property_id}/{i}'}))
+
+
+def test_query_nearby_and_past(index):
+    result = index.query(id_of('A', 0), k=3)
+    assert result['listing']['listing_id'] == id_of('A', 0)
+    comparables = result['comparables']
+    # 掲載終了した同じマンションの物件、近隣の同じ所在地のマンションの物件の順（別の所在地は含めない）
+    assert [(c['property_id'], c['status']) for c in comparables] == [('A', 'past'), ('B', 'current'), ('A', 'current')]
+    assert comparables[0]['listing_id'] == id_of('A', 9)
+    assert comparables[0]['last_seen'] == '2026-01-01T00:00:00+00:00'
+    assert [c['distance'] for c in comparables] == sorted(c['distance'] for c in comparables)
+    assert id_of('A', 0) not in [c['listing_id'] for c in comparables]
+
+
+def test_query_scope_and_filters(index):
+    current_only = index.query(id_of('A', 0), k=3, include_past=False)['comparables']
+    assert all(c['status'] == 'current' for c in current_only)
+    building = index.query(id_of('A', 0), k=5, scope='building')['comparables']
+    assert {c['property_id'] for c in building} == {'A'} and len(building) == 2
+    assert index.query('0' * 16) is None
+    with pytest.raises(ValueError):
+        index.query(id_of('A', 0), scope='city')
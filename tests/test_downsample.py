@@ -0,0 +1,50 @@
+"""downsample（lttb, minmax）のテスト"""
+import numpy as np
+import pytest
+
+from utils.downsample import downsample, lttb, minmax
+
+
+def random_walk(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.arange(n, dtype=np.float64), rng.normal(size=n).cumsum()
+
+
+@pytest.mark.parametrize('method', ['lttb', 'minmax'])
+def test_points_within_threshold(method):
+    for n in range(0, 60):
+        x, y = random_walk(n, seed=n)
+        for threshold in range(1, n + 3):
+            selected = downsample(x, y, threshold, method)
+            assert len(selected) <= threshold
+            assert len(selected) == min(n, threshold) or method == 'minmax'
+            # 昇順で重複がなく、範囲内のインデックス
+            assert np.all(np.diff(selected) > 0)
+            assert n == 0 or (selected.min() >= 0 and selected.max() < n)
+
+
+def test_lttb_keeps_first_and_last():
+    x, y = random_walk(1000)
+    selected = lttb(x, y, 50)
+    assert len(selected) == 50
+    assert selected[0] == 0 and selected[-1] == 999
+
+
+def test_lttb_keeps_a_spike():
+    x = np.arange(500, dtype=np.float64)
+    y = np.zeros(500)
+    y[250] = 100.0
+    assert 250 in lttb(x, y, 20)
+
+
+def test_minmax_keeps_extremes():
+    x, y = random_walk(1000, seed=1)
+    selected = minmax(x, y, 40)
+    assert len(selected) <= 40
+    assert int(np.argmin(y)) in selected
+    assert int(np.argmax(y)) in selected
+
+
+def test_invalid_method():
+    with pytest.raises(ValueError):
+        downsample(np.arange(3), np.arange(3), 2, 'mean')
@@ -0,0 +1,45 @@
+"""EncodedBody（事前圧縮とETag）のテスト"""
+import gzip
+
+from utils.encoded_body import MIN_COMPRESS_SIZE, EncodedBody, parse_accept_encoding, parse_etags
+
+
+BODY = b'{"listings": [' + b'{"price": 50000000},' * 200 + b'{}]}'
+
+
+def test_small_body_is_not_compressed():
+    encoded = EncodedBody(b'{}')
+    assert list(encoded.variants) == [None]
+    assert encoded.select('gzip, br') == (None, b'{}', encoded.etag)
+
+
+def test_select_by_accept_encoding():
+    encoded = EncodedBody(BODY)
+    assert len(BODY) >= MIN_COMPRESS_SIZE
+    encoding, body, etag = encoded.select('gzip;q=0.8, identity')
+    assert encoding == 'gzip'
+    assert gzip.decompress(body) == BODY
+    assert etag == f'"{encoded.digest}-gzip"'
+    assert encoded.select('gzip;q=0') == (None, BODY, encoded.etag)
+    assert encoded.select('')[0] is None
+
+
+def test_etag_is_stable_and_content_based():
+    assert EncodedBody(BODY).etags == EncodedBody(BODY).etags
+    assert EncodedBody(BODY).etag != EncodedBody(BODY + b' ').etag
+    # gzip は mtime=0 で圧縮するため、同じ本文なら同じバイト列になる
+    assert EncodedBody(BODY).variants['gzip'] == EncodedBody(BODY).variants['gzip']
+
+
+def test_matches_any_encoding_etag():
+    encoded = EncodedBody(BODY)
+    assert encoded.matches(encoded.etag)
+    assert encoded.matches(f'"other", W/{encoded.etags["gzip"]}')
+    assert encoded.matches('*')
+    assert not encoded.matches('')
+    assert not encoded.matches('"other"')
+
+
+def test_parse_headers():
+    assert parse_accept_encoding('GZIP;q=0.5, br , *;q=bad') == {'gzip': 0.5, 'br': 1.0, '*': 0.0}
+    assert parse_etags('W/"a", "b",') == ('"a"', '"b"')
@@ -0,0 +1,144 @@
+"""エクスポート（CSV / JSON Lines のストリーミング、期間の絞り込み）のテスト"""
+import csv
+import io
+import json
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+from utils import export
+from utils.data_manager import DataManager, listing_id, record_key
+from utils.export import COLUMNS, ExportFilter, check_export, dataset_rows, encode_rows
+from utils.listing import Listing
+from utils.snapshot_cache import JSONFileCache, SnapshotCache
+
+
+PROPERTY = {'id': 'Test', 'name': 'テスト'}
+
+# 公開時刻（日本時間では各日の9時）-> 物件番号 -> 価格
+RUNS = [
+    ('2026-01-01T00:00:00+00:00', {1: 50000000, 2: 60000000, 3: 70000000}),
+    ('2026-01-02T00:00:00+00:00', {1: 48000000, 2: 60000000, 4: 80000000}),
+    ('2026-01-03T00:00:00+00:00', {1: 48000000, 2: 60000000, 4: 80000000}),
+]
+
+
+def make_listing(i, price):
+    return Listing(source='SUUMO' if i % 2 else 'HOMES', title=f'物件{i}', url=f'https://example.com/{i}',
+                   layout='2LDK' if i <= 3 else '3LDK', price=price, area=60.0 + i, floor=i)
+
+
+def id_of(i):
+    return listing_id(record_key({'url': f'https://example.com/{i}'}))
+
+
+@pytest.fixture
+def processed(tmp_path):
+    data_manager = DataManager(PROPERTY, str(tmp_path))
+    for last_updated, prices in RUNS:
+        listings = [make_listing(i, price) for i, price in prices.items()]
+        data_manager.save_changes(data_manager.detect_changes(listings), last_updated=last_updated)
+        data_manager.save_processed_data(listings, PROPERTY['name'], last_updated)
+    return os.path.join(str(tmp_path), 'Test', 'processed')
+
+
+def rows(processed, dataset, **filters):
+    listings = None
+    if dataset == 'snapshot':
+        with open(os.path.join(processed, 'latest.json'), encoding='utf-8') as f:
+            listings = json.load(f)['listings']
+    return list(dataset_rows(dataset, 'Test', processed, ExportFilter(**filters), listings))
+
+
+def test_snapshot_rows(processed):
+    result = rows(processed, 'snapshot', layouts=['2LDK'], max_price=50000000)
+    assert [(row['listing_id'], row['price']) for row in result] == [(id_of(1), 48000000)]
+    assert result[0]['property_id'] == 'Test'
+    assert len(rows(processed, 'snapshot', sources=['HOMES'])) == 2
+
+
+def test_history_rows_and_period(processed):
+    result = {row['listing_id']: row for row in rows(processed, 'history')}
+    assert set(result) == {id_of(i) for i in (1, 2, 3, 4)}
+    assert result[id_of(3)]['status'] == 'past'
+    assert result[id_of(3)]['last_seen'] == RUNS[0][0]
+    assert result[id_of(4)]['status'] == 'current' and result[id_of(4)]['first_seen'] == RUNS[1][0]
+
+    # 掲載期間が期間と重なる物件（日本時間の日付、両端の日を含む）
+    assert {row['listing_id'] for row in rows(processed, 'history', start='2026-01-02')} == {
+        id_of(1), id_of(2), id_of(4)}
+    assert {row['listing_id'] for row in rows(processed, 'history', end='2026-01-01')} == {
+        id_of(1), id_of(2), id_of(3)}
+    assert rows(processed, 'history', end='2025-12-31') == []
+
+
+def test_change_rows_resolve_listings_from_history(processed):
+    result = rows(processed, 'changes', start='2026-01-02', end='2026-01-02')
+    events = {(row['event'], row['listing_id']) for row in result}
+    assert events == {('price_down', id_of(1)), ('removed', id_of(3)), ('new', id_of(4))}
+    assert {row['changed_at'] for row in result} == {RUNS[1][0]}
+
+    # 変更セットは物件の内容を持たないため、掲載履歴から引く
+    removed = next(row for row in result if row['event'] == 'removed')
+    assert removed['title'] == '物件3' and removed['layout'] == '2LDK'
+    price_down = next(row for row in result if row['event'] == 'price_down')
+    assert (price_down['price_before'], price_down['price_after']) == (50000000, 48000000)
+
+    assert [row['event'] for row in rows(processed, 'changes', layouts=['3LDK'])] == ['new']
+    assert rows(processed, 'changes', start='2026-01-03') == []
+
+
+def test_csv_streams_in_chunks(processed, monkeypatch):
+    monkeypatch.setattr(export, 'CHUNK_ROWS', 2)
+    chunks = list(encode_rows(iter(rows(processed, 'history')), 'history', 'csv'))
+    assert len(chunks) == 2
+    parsed = list(csv.DictReader(io.StringIO(b''.join(chunks).decode('utf-8'))))
+    assert len(parsed) == 4 and list(parsed[0]) == list(COLUMNS['history'])
+    # 行がなくてもヘッダーは出力する
+    assert b''.join(encode_rows(iter([]), 'snapshot', 'csv')).decode('utf-8') == ','.join(COLUMNS['snapshot']) + '\n'
+
+
+def test_jsonl_output(processed):
+    lines = b''.join(encode_rows(iter(rows(processed, 'snapshot')), 'snapshot', 'jsonl')).splitlines()
+    records = [json.loads(line) for line in lines]
+    assert len(records) == 3 and list(records[0]) == list(COLUMNS['snapshot'])
+    assert list(encode_rows(iter([]), 'changes', 'jsonl')) == []
+
+
+def test_check_export():
+    with pytest.raises(ValueError):
+        check_export('csv', 'snapshot', ExportFilter(start='2026-01-01'))
+    with pytest.raises(ValueError):
+        check_export('xml', 'history', ExportFilter())
+    with pytest.raises(ValueError):
+        check_export('csv', 'listings', ExportFilter())
+    with pytest.raises(ValueError):
+        ExportFilter(end='2026/01/01')
+    check_export('jsonl', 'changes', ExportFilter(start='2026-01-01'))
+    if export.pyarrow is None:
+        with pytest.raises(ValueError):
+            check_export('parquet', 'snapshot', ExportFilter())
+
+
+def test_export_endpoint(processed, tmp_path, monkeypatch):
+    config_path = tmp_path / 'config.json'
+    config_path.write_text(json.dumps({'properties': [PROPERTY]}), encoding='utf-8')
+    monkeypatch.setattr(server, 'DATA_BASE_DIR', str(tmp_path))
+    monkeypatch.setattr(server, 'config_cache', JSONFileCache(str(config_path)))
+    monkeypatch.setattr(server, 'snapshot_cache', SnapshotCache(str(tmp_path)))
+    client = TestClient(server.app)
+
+    response = client.get('/api/properties/Test/export', params={'format': 'csv', 'layout': '2LDK'})
+    assert response.status_code == 200
+    assert response.headers['Content-Type'].startswith('text/csv')
+    assert 'Test-20260103000000.csv' in response.headers['Content-Disposition']
+    assert len(list(csv.DictReader(io.StringIO(response.text)))) == 2
+
+    response = client.get('/api/properties/Test/export',
+                          params={'format': 'jsonl', 'dataset': 'changes', 'start': '2026-01-02'})
+    assert len(response.content.splitlines()) == 3
+
+    assert client.get('/api/properties/Test/export', params={'start': '2026-01-02'}).status_code == 400
+    assert client.get('/api/properties/Other/export').status_code == 404
@@ -0,0 +1,56 @@
+"""json_writer のテスト"""
+import json
+import os
+
+import pytest
+
+from utils.json_writer import AtomicWriter, encode_snapshot, write_json_atomic, write_snapshot
+
+posix_only = pytest.mark.skipif(not hasattr(os, 'fchmod'), reason='POSIX permissions only')
+
+
+@posix_only
+def test_new_file_follows_umask(tmp_path):
+    path = tmp_path / 'latest.json'
+    old_mask = os.umask(0o022)
+    os.umask(old_mask)
+
+    write_json_atomic(str(path), {'a': 1})
+
+    assert os.stat(path).st_mode & 0o777 == 0o666 & ~old_mask
+
+
+@posix_only
+def test_replacement_keeps_existing_mode(tmp_path):
+    path = tmp_path / 'latest.json'
+    write_json_atomic(str(path), {'a': 1})
+    os.chmod(path, 0o640)
+
+    write_json_atomic(str(path), {'a': 2})
+
+    assert os.stat(path).st_mode & 0o777 == 0o640
+    assert json.loads(path.read_text()) == {'a': 2}
+
+
+def test_failed_write_keeps_original(tmp_path):
+    path = tmp_path / 'latest.json'
+    write_json_atomic(str(path), {'a': 1})
+
+    with pytest.raises(RuntimeError):
+        with AtomicWriter(str(path)) as f:
+            f.write(b'{"broken"')
+            raise RuntimeError('interrupted')
+
+    assert json.loads(path.read_text()) == {'a': 1}
+    assert os.listdir(tmp_path) == ['latest.json']
+
+
+def test_write_snapshot_matches_encode_snapshot(tmp_path):
+    header = {'property_name': 'テスト', 'total_listings': 2}
+    items = [{'title': '物件1', 'price': 1}, {'title': '物件2', 'price': 2}]
+    path = tmp_path / 'latest.json'
+
+    write_snapshot(str(path), header, 'listings', items)
+
+    assert path.read_bytes() == encode_snapshot(header, 'listings', items)
+    assert json.loads(path.read_text(encoding='utf-8')) == dict(header, listings=items)
@@ -0,0 +1,67 @@
+"""Listing のテスト"""
+from datetime import date
+
+import pytest
+
+from utils.listing import Listing, reference_year
+
+
+def test_round_trip():
+    listing = Listing(source='SUUMO', title='2LDK 65m²', url='https://example.com/1', layout='2LDK',
+                      price='75,000,000', area='65.5', floor=20, direction='南', built_year=2008,
+                      management_fee=20000, repair_reserve=15000, posted_date='2026-01-01')
+
+    data = listing.to_dict()
+
+    assert data['price'] == 75000000
+    assert data['area'] == 65.5
+    assert 'age_years' not in data
+    assert list(data) == list(Listing.FIELDS)
+    assert Listing.from_dict(data) == listing
+    assert Listing.from_json(listing.to_json()) == listing
+
+
+def test_legacy_age_years_uses_snapshot_year():
+    # 2025年に公開された以前の形式（築年数のみ）
+    record = {'source': 'SUUMO', 'title': 't', 'age_years': 17}
+
+    listing = Listing.from_dict(record, reference_year('2025-12-26T22:25:04+00:00'))
+
+    assert listing.built_year == 2008
+    # 読み込むたびに変わらない
+    assert Listing.from_dict(listing.to_dict()).built_year == 2008
+
+
+def test_built_year_in_record_wins_over_age_years():
+    record = {'source': 'SUUMO', 'built_year': 2010, 'age_years': 3}
+
+    assert Listing.from_dict(record, 2025).built_year == 2010
+
+
+def test_legacy_age_years_without_reference_year_is_not_guessed():
+    assert Listing.from_dict({'source': 'SUUMO', 'age_years': 17}).built_year is None
+
+
+def test_age_years_is_derived_from_built_year():
+    listing = Listing(source='SUUMO', built_year=date.today().year - 10)
+
+    assert listing.age_years == 10
+    # 築年数から竣工年を求めるのはスクレイパー（取得時の年を基準にする）
+    with pytest.raises(TypeError):
+        Listing(source='SUUMO').update({'age_years': 10})
+
+
+def test_rejects_invalid_types():
+    with pytest.raises(TypeError):
+        Listing(source='SUUMO', price=True)
+    with pytest.raises(ValueError):
+        Listing(source='SUUMO', area='広い')
+    with pytest.raises(TypeError):
+        Listing(source='SUUMO').update({'unknown': 1})
+
+
+def test_int_fields_reject_fractional_floats():
+    assert Listing(source='SUUMO', price=75000000.0, floor=20.0).price == 75000000
+    for value in (20.5, float('nan'), float('inf')):
+        with pytest.raises(ValueError):
+            Listing(source='SUUMO', floor=value)
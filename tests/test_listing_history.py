@@ -0,0 +1,45 @@
+"""ListingHistory のテスト"""
+import json
+
+from utils.listing_history import FILENAME, ListingHistory
+
+
+def read_entries(path):
+    with open(path, encoding='utf-8') as f:
+        lines = [json.loads(line) for line in f]
+    return lines[0], {entry['key']: entry for entry in lines[1:]}
+
+
+def test_publish_tracks_first_and_last_seen(tmp_path):
+    history = ListingHistory(str(tmp_path))
+    history.publish('2026-01-01T00:00:00+00:00', [('a', {'price': 1}), ('b', {'price': 2})])
+    added = history.publish('2026-01-02T00:00:00+00:00', [('a', {'price': 3}), ('c', {'price': 4})])
+
+    assert added == 1
+    listings = history.load()['listings']
+    assert listings['a'] == {'listing': {'price': 3}, 'first_seen': '2026-01-01T00:00:00+00:00',
+                             'last_seen': '2026-01-02T00:00:00+00:00'}
+    # 掲載が終了した物件も残る
+    assert listings['b']['last_seen'] == '2026-01-01T00:00:00+00:00'
+
+
+def test_invalid_line_does_not_wipe_history(tmp_path):
+    history = ListingHistory(str(tmp_path))
+    history.publish('2026-01-01T00:00:00+00:00', [('a', {'price': 1}), ('b', {'price': 2})])
+    with open(tmp_path / FILENAME, 'a', encoding='utf-8') as f:
+        f.write('{"broken\n')
+
+    history.publish('2026-01-02T00:00:00+00:00', [('c', {'price': 3})])
+
+    _, entries = read_entries(tmp_path / FILENAME)
+    assert sorted(entries) == ['a', 'b', 'c']
+    assert entries['a']['first_seen'] == '2026-01-01T00:00:00+00:00'
+
+
+def test_ended_listings_expire_after_retention(tmp_path):
+    history = ListingHistory(str(tmp_path), retention_days=30)
+    history.publish('2026-01-01T00:00:00+00:00', [('old', {}), ('kept', {})])
+    history.publish('2026-01-20T00:00:00+00:00', [('kept', {})])
+    history.publish('2026-02-15T00:00:00+00:00', [('new', {})])
+
+    assert sorted(history.load()['listings']) == ['kept', 'new']
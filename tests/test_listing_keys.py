@@ -0,0 +1,64 @@
+"""物件のキー（canonical_url, record_key, listing_id）のテスト"""
+import json
+
+from utils.data_manager import DataManager, canonical_url, listing_id, listing_key, record_key
+from utils.listing import Listing
+from utils.snapshot_delta import DeltaStore
+
+
+URL = 'https://suumo.jp/ms/chuko/tokyo/sc_koto/nc_12345678/?b=2&a=1'
+VARIANTS = [
+    URL,
+    'HTTPS://SUUMO.JP/ms/chuko/tokyo/sc_koto/nc_12345678/?a=1&b=2',
+    'https://suumo.jp/ms/chuko/tokyo/sc_koto/nc_12345678?a=1&b=2&utm_source=mail#photos',
+    ' https://suumo.jp/ms/chuko/tokyo/sc_koto/nc_12345678/?gclid=x&b=2&a=1 ',
+]
+
+
+def test_canonical_url():
+    assert canonical_url(URL) == 'https://suumo.jp/ms/chuko/tokyo/sc_koto/nc_12345678?a=1&b=2'
+    assert {canonical_url(url) for url in VARIANTS} == {canonical_url(URL)}
+    # 正規化は冪等
+    assert canonical_url(canonical_url(URL)) == canonical_url(URL)
+    assert canonical_url('https://example.com') == 'https://example.com/'
+
+
+def test_key_and_listing_id_agree_across_url_variants():
+    keys = {record_key({'url': url}) for url in VARIANTS}
+    assert keys == {canonical_url(URL)}
+    listing = Listing(source='SUUMO', url=VARIANTS[2], layout='2LDK', price=50000000)
+    assert listing_key(listing) == canonical_url(URL)
+    assert {listing_id(record_key({'url': url})) for url in VARIANTS} == {listing_id(canonical_url(URL))}
+    assert len(listing_id(URL)) == 16
+
+
+def test_hash_key_without_url():
+    record = {'source': 'SUUMO', 'title': '物件', 'layout': '2LDK', 'price': 50000000, 'area': 60.0,
+              'floor': 10, 'direction': '南'}
+    key = record_key(record)
+    assert key.startswith('hash:')
+    assert record_key(dict(record, url=None)) == key
+    assert listing_id(key) != listing_id(record_key(dict(record, floor=11)))
+
+
+def test_merge_data_dedupes_url_variants(tmp_path):
+    data_manager = DataManager({'id': 'Test', 'name': 'テスト'}, str(tmp_path))
+    merged = data_manager.merge_data([
+        {'source': 'SUUMO', 'listings': [Listing(source='SUUMO', url=VARIANTS[0], price=1)]},
+        {'source': 'HOMES', 'listings': [Listing(source='HOMES', url=VARIANTS[2], price=2),
+                                         Listing(source='HOMES', price=3), Listing(source='HOMES', price=4)]},
+    ])
+    assert [listing.price for listing in merged] == [1, 3, 4]
+
+
+def test_delta_removes_by_original_url(tmp_path):
+    store = DeltaStore(str(tmp_path))
+    kept = {'url': 'https://example.com/1/', 'price': 1}
+    gone = {'url': 'https://example.com/2/?utm_source=x', 'price': 2}
+    store.publish('v1', '2026-01-01T00:00:00+00:00', 'テスト',
+                  [(record_key(kept), kept), (record_key(gone), gone)])
+    store.publish('v2', '2026-01-02T00:00:00+00:00', 'テスト', [(record_key(kept), kept)])
+
+    with open(tmp_path / 'deltas' / 'v1.json', encoding='utf-8') as f:
+        delta = json.load(f)
+    assert delta['removed'] == [gone['url']]
@@ -0,0 +1,55 @@
+"""物件IDからの検索（entity_groups, HashIndex）のテスト"""
+from utils.data_manager import listing_id, record_key
+from utils.json_writer import dumps
+from utils.listing_lookup import (
+    GROUPS_SECTION, INDEX_SECTION, DictLookup, PackLookup, build_lookup_sections, entity_groups,
+)
+
+
+def record(source, url, floor=10, **fields):
+    return dict({'source': source, 'url': url, 'layout': '2LDK', 'area': 60.04, 'floor': floor,
+                 'direction': '南', 'price': 50000000}, **fields)
+
+
+def ids_of(records):
+    return [listing_id(record_key(r)) for r in records]
+
+
+def test_groups_merge_across_sources():
+    records = [record('SUUMO', 'https://suumo.jp/1'), record('HOMES', 'https://homes.co.jp/1', area=60.0),
+               record('SUUMO', 'https://suumo.jp/2', floor=11)]
+    ids = ids_of(records)
+    assert entity_groups(records, ids) == [ids[:2]]
+
+
+def test_same_plan_units_on_one_floor_from_one_site_are_not_merged():
+    # 同じ階の同じプランの2住戸（同じサイト）
+    records = [record('SUUMO', 'https://suumo.jp/1'), record('SUUMO', 'https://suumo.jp/2', price=51000000)]
+    ids = ids_of(records)
+    assert entity_groups(records, ids) == []
+    assert DictLookup(records).groups == {}
+
+    # 他のサイトの物件もどちらと同じ住戸か分からないのでまとめない
+    records.append(record('HOMES', 'https://homes.co.jp/1'))
+    records.append(record('athome', 'https://athome.co.jp/1'))
+    ids = ids_of(records)
+    assert entity_groups(records, ids) == [ids[2:]]
+
+
+def test_no_group_without_area_or_floor():
+    records = [record('SUUMO', 'https://suumo.jp/1', floor=None), record('HOMES', 'https://homes.co.jp/1', floor=None)]
+    assert entity_groups(records, ids_of(records)) == []
+
+
+def test_pack_lookup_matches_dict_lookup():
+    records = [record('SUUMO', f'https://suumo.jp/{i}', floor=i) for i in range(20)]
+    records.append(record('HOMES', 'https://homes.co.jp/1', floor=3))
+    body = b'{"listings": [\n' + b',\n'.join(dumps(r) for r in records) + b'\n]}'
+    sections = build_lookup_sections(body, records)
+    pack = PackLookup(body, sections[INDEX_SECTION], sections[GROUPS_SECTION])
+    expected = DictLookup(records)
+
+    for id_ in ids_of(records):
+        assert pack.get(id_) == expected.get(id_)
+    assert pack.get('0' * 16) is None and pack.get('not-an-id') is None
+    assert pack.groups == expected.groups and len(pack.groups) == 2
@@ -0,0 +1,66 @@
+"""ListingIndex.query のテスト"""
+import pytest
+
+from utils.listing_query import ListingIndex, StaleCursorError
+
+
+def make_listings(n):
+    return [
+        {'source': 'SUUMO', 'title': f'物件{i}', 'layout': '2LDK' if i % 2 else '3LDK',
+         'price': 50000000 + i * 1000000, 'area': 60.0 + i, 'floor': i % 30, 'direction': '南'}
+        for i in range(n)
+    ]
+
+
+def page_through(index, **params):
+    pages, cursor = [], None
+    while True:
+        result = index.query(cursor=cursor, **params)
+        pages.append(result['listings'])
+        cursor = result['next_cursor']
+        if cursor is None:
+            return pages
+
+
+def test_cursor_pages_cover_every_listing_once():
+    index = ListingIndex(make_listings(95), version='20260101000000')
+
+    pages = page_through(index, sort='price-desc', limit=20)
+
+    assert [len(page) for page in pages] == [20, 20, 20, 20, 15]
+    prices = [listing['price'] for page in pages for listing in page]
+    assert prices == sorted((l['price'] for l in make_listings(95)), reverse=True)
+
+
+def test_cursor_pages_with_filters():
+    listings = make_listings(95)
+    index = ListingIndex(listings, version='v1')
+
+    pages = page_through(index, layouts=['2LDK'], min_price=60000000, sort='price-asc', limit=7)
+
+    expected = sorted((l for l in listings if l['layout'] == '2LDK' and l['price'] >= 60000000),
+                      key=lambda l: l['price'])
+    assert [l for page in pages for l in page] == expected
+
+
+def test_cursor_from_previous_snapshot_is_rejected():
+    old = ListingIndex(make_listings(30), version='20260101000000')
+    cursor = old.query(limit=10)['next_cursor']
+    new = ListingIndex(make_listings(31), version='20260102000000')
+
+    with pytest.raises(StaleCursorError):
+        new.query(cursor=cursor, limit=10)
+
+
+@pytest.mark.parametrize('cursor', ['10', 'garbage', 'v1:price-asc:x'])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        ListingIndex(make_listings(30), version='v1').query(cursor=cursor)
+
+
+def test_cursor_for_another_sort_is_rejected():
+    index = ListingIndex(make_listings(30), version='v1')
+    cursor = index.query(sort='price-asc', limit=10)['next_cursor']
+
+    with pytest.raises(ValueError):
+        index.query(sort='area-desc', cursor=cursor)
@@ -0,0 +1,61 @@
+"""HedonicModel のテスト"""
+import random
+
+import numpy as np
+
+from utils.price_model import HedonicModel
+
+LAYOUTS = ['1LDK', '2LDK', '3LDK']
+DIRECTIONS = ['南', '東', '西', '北']
+
+
+def make_listing(rng, i):
+    area = rng.uniform(40, 110)
+    floor = rng.randint(1, 40)
+    built_year = rng.randint(1995, 2024)
+    price = int(np.exp(11 + 1.0 * np.log(area) + 0.01 * floor - 0.01 * (2026 - built_year) + rng.gauss(0, 0.05)))
+    return {'source': 'SUUMO', 'url': f'https://example.com/{i}', 'title': f'物件{i}',
+            'layout': rng.choice(LAYOUTS), 'direction': rng.choice(DIRECTIONS),
+            'price': price, 'area': round(area, 2), 'floor': floor, 'built_year': built_year}
+
+
+def test_incremental_update_matches_full_refit():
+    rng = random.Random(42)
+    listings = [make_listing(rng, i) for i in range(300)]
+    model = HedonicModel(LAYOUTS, reference_year=2026)
+    assert model.update(listings)['mode'] == 'full'
+
+    # 値下げ・掲載終了・新着を反映した次のスナップショット
+    changed = [dict(l, price=int(l['price'] * 0.95)) if i % 10 == 0 else l for i, l in enumerate(listings)]
+    changed = changed[20:] + [make_listing(rng, i) for i in range(300, 330)]
+    result = model.update(changed)
+    assert result['mode'] == 'incremental'
+    assert result['removed'] == 20 + 28  # 掲載終了20件 + 値下げ（残った28件）
+    assert result['added'] == 30 + 28
+
+    full = HedonicModel(LAYOUTS, reference_year=2026)
+    full.update(changed)
+
+    assert model.n == full.n
+    np.testing.assert_allclose(model.coef, full.coef, rtol=1e-8, atol=1e-10)
+    assert abs(model.sigma - full.sigma) < 1e-9
+    assert abs(model.r2 - full.r2) < 1e-9
+
+
+def test_unchanged_snapshot_does_not_refit():
+    rng = random.Random(1)
+    listings = [make_listing(rng, i) for i in range(50)]
+    model = HedonicModel(LAYOUTS, reference_year=2026)
+    model.update(listings)
+
+    assert model.update(list(listings))['mode'] == 'unchanged'
+
+
+def test_listings_without_url_use_record_key():
+    rng = random.Random(2)
+    listings = [dict(make_listing(rng, i), url=None) for i in range(50)]
+    model = HedonicModel(LAYOUTS, reference_year=2026)
+    model.update(listings)
+
+    assert model.n == 50
+    assert all(key.startswith('hash:') for key in model.rows)
@@ -0,0 +1,90 @@
+"""reparse.py（差分と比較対象の保存済みデータ）のテスト"""
+import json
+import logging
+import os
+import subprocess
+from datetime import date
+
+import pytest
+
+from reparse import _load_committed, diff_listings, publish_day
+from utils.listing import Listing
+
+
+PROPERTY = {'id': 'Test', 'name': 'テスト', 'layouts': ['2LDK']}
+
+
+def make_listing(url, price=50000000, **fields):
+    return Listing(source='SUUMO', title='物件', url=url, layout='2LDK', price=price, area=60.0, **fields)
+
+
+def test_diff_listings_uses_record_key():
+    old = [make_listing('https://example.com/1/'), make_listing('https://example.com/2'), make_listing(None, floor=3)]
+    new = [make_listing('https://example.com/1?utm_source=mail', price=48000000), make_listing(None, floor=3),
+           make_listing('https://example.com/3')]
+    diff = diff_listings(old, new)
+    # 計測用のクエリや末尾のスラッシュの違いは同じ物件、URLのない物件も突き合わせる
+    assert diff['added'] == ['https://example.com/3']
+    assert diff['removed'] == ['https://example.com/2']
+    assert diff['fields']['price']['count'] == 1
+    assert diff['fields']['price']['examples'][0] == {
+        'key': 'https://example.com/1', 'before': 50000000, 'after': 48000000}
+    assert set(diff['fields']) == {'price', 'url'}
+
+
+def git(directory, *args, **env):
+    subprocess.run(['git', '-C', str(directory), *args], check=True, capture_output=True,
+                   env=dict(os.environ, GIT_AUTHOR_NAME='t', GIT_AUTHOR_EMAIL='t@example.com',
+                            GIT_COMMITTER_NAME='t', GIT_COMMITTER_EMAIL='t@example.com', **env))
+
+
+def commit_snapshot(repo, path, last_updated, listings):
+    path.write_text(json.dumps({'last_updated': last_updated,
+                                'listings': [l.to_dict() for l in listings]}), encoding='utf-8')
+    git(repo, 'add', '.')
+    git(repo, 'commit', '-q', '-m', last_updated, GIT_COMMITTER_DATE=last_updated, GIT_AUTHOR_DATE=last_updated)
+
+
+@pytest.fixture
+def live_repo(tmp_path):
+    repo = tmp_path / 'live'
+    processed = repo / 'data' / 'Test' / 'processed'
+    processed.mkdir(parents=True)
+    git(repo, 'init', '-q')
+    path = processed / 'latest.json'
+    commit_snapshot(repo, path, '2026-01-01T06:00:00+09:00', [make_listing('https://example.com/1')])
+    commit_snapshot(repo, path, '2026-01-02T06:00:00+09:00', [make_listing('https://example.com/1', price=1)])
+    commit_snapshot(repo, path, '2026-01-05T06:00:00+09:00', [make_listing('https://example.com/9')])
+    return repo, path
+
+
+def test_load_committed_finds_the_snapshot_of_the_day(live_repo):
+    _, path = live_repo
+    commit, listings = _load_committed(str(path), date(2026, 1, 1))
+    assert commit and [l.price for l in listings] == [50000000]
+    _, listings = _load_committed(str(path), date(2026, 1, 2))
+    assert [l.price for l in listings] == [1]
+    # その日に実行されていない（前日のコミットしかない）場合は比較しない
+    assert _load_committed(str(path), date(2026, 1, 3))[1] is None
+    assert _load_committed(str(path), date(2025, 12, 31)) == (None, None)
+
+
+def test_publish_day_reports_baseline(live_repo, tmp_path):
+    repo, _ = live_repo
+    results = [{'source': 'SUUMO', 'scraper': 'SuumoScraper', 'layout': '2LDK',
+                'listings': [make_listing('https://example.com/1', price=2).to_dict()]}]
+    logger = logging.getLogger('test_reparse')
+
+    report = publish_day(date(2026, 1, 2), PROPERTY, results, str(tmp_path / 'out'), str(repo / 'data'), logger)
+    assert report['baseline'].startswith('git:')
+    assert report['diff']['fields']['price']['count'] == 1
+    with open(tmp_path / 'out' / '2026-01-02' / 'Test' / 'processed' / 'diff.json', encoding='utf-8') as f:
+        assert json.load(f)['baseline'] == report['baseline']
+
+    results[0]['listings'] = [make_listing('https://example.com/1', price=2).to_dict()]
+    assert publish_day(date(2026, 1, 2), PROPERTY, results, str(tmp_path / 'out'), str(repo / 'data'),
+                       logger)['baseline'] == 'reparse'
+
+    results[0]['listings'] = [make_listing('https://example.com/1', price=2).to_dict()]
+    report = publish_day(date(2026, 1, 4), PROPERTY, results, str(tmp_path / 'out'), str(repo / 'data'), logger)
+    assert report['baseline'] is None and report['diff'] is None
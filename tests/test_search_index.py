@@ -0,0 +1,94 @@
+"""横断検索（SearchSegment, search）のテスト"""
+import pytest
+
+from utils.listing_query import StaleCursorError
+from utils.search_index import SearchSegment, generation, normalize, search, split_terms
+
+
+TOWER = {'id': 'Tower', 'name': '豊洲タワー', 'area': '東京都江東区'}
+PARK = {'id': 'Park', 'name': 'パークハウス', 'area': '東京都港区'}
+
+
+def segment(titles, version='v1', **fields):
+    return SearchSegment([dict({'title': title, 'layout': '2LDK', 'price': 50000000 + i, 'area': 60.0}, **fields)
+                          for i, title in enumerate(titles)], version)
+
+
+@pytest.fixture
+def properties():
+    return [
+        (TOWER, segment(['眺望良好 20階 角部屋', '２０階 南向き', 'リノベーション済み', '眺望'])),
+        (PARK, segment(['ﾘﾉﾍﾞｰｼｮﾝ 眺望', '駅近'], version='v7', layout='3LDK')),
+    ]
+
+
+def test_normalize_and_split_terms():
+    assert normalize('ＡＢＣ ﾘﾉﾍﾞ') == 'abc リノベ'
+    assert split_terms(' 眺望  ２０階 眺望 ') == ['眺望', '20階']
+    assert normalize(None) == ''
+
+
+def test_segment_match_checks_contiguous_text():
+    index = segment(['南向き 角部屋', '角の南部屋', '南'])
+    assert sorted(index.match('角部屋')) == [0]
+    # 1文字の語は全件を走査する
+    assert sorted(index.match('南')) == [0, 1, 2]
+    assert list(index.match('北向き')) == []
+
+
+def test_search_ranks_title_matches_first(properties):
+    result = search(properties, '眺望')
+    assert result['total'] == 3
+    titles = [listing['title'] for listing in result['listings']]
+    # タイトルの前方で一致したものが上位（同点は価格の安い順）
+    assert titles == ['眺望良好 20階 角部屋', '眺望', 'ﾘﾉﾍﾞｰｼｮﾝ 眺望']
+    assert result['listings'][0]['property_id'] == 'Tower'
+    assert result['listings'][2]['property_name'] == 'パークハウス'
+
+
+def test_search_matches_property_name_and_all_terms(properties):
+    # マンション名・所在地の語はそのマンションの全物件に一致する
+    assert search(properties, '港区')['total'] == 2
+    assert [l['title'] for l in search(properties, '豊洲 20階')['listings']] == ['２０階 南向き', '眺望良好 20階 角部屋']
+    assert search(properties, '眺望 駅近')['total'] == 0
+
+
+def test_search_filters(properties):
+    assert search(properties, 'リノベ', layouts=['3LDK'])['total'] == 1
+    assert search(properties, '眺望', max_price=50000000)['total'] == 2
+    assert search(properties, '眺望', min_area=70)['total'] == 0
+    with pytest.raises(ValueError):
+        search(properties, '  ')
+
+
+def test_search_pages_with_cursor(properties):
+    first = search(properties, '東京都', limit=4)
+    assert first['count'] == 4 and first['total'] == 6
+    assert first['next_cursor'].startswith(first['generation'] + ':')
+    second = search(properties, '東京都', cursor=first['next_cursor'], limit=4)
+    assert second['count'] == 2 and second['next_cursor'] is None
+    seen = [(l['property_id'], l['title']) for l in first['listings'] + second['listings']]
+    assert len(set(seen)) == 6
+
+
+def test_stale_and_invalid_cursors(properties):
+    cursor = search(properties, '東京都', limit=2)['next_cursor']
+
+    # いずれかのマンションのスナップショットが更新されると世代が変わる
+    updated = [properties[0], (PARK, segment(['駅近'], version='v8'))]
+    assert generation(updated) != generation(properties)
+    with pytest.raises(StaleCursorError):
+        search(updated, '東京都', cursor=cursor)
+    # 対象のマンションが変わっても同じカーソルは使えない
+    with pytest.raises(StaleCursorError):
+        search(properties[:1], '東京都', cursor=cursor)
+
+    current = generation(properties)
+    for invalid in ('2', f'{current}:-1', f'{current}:x', 'abc'):
+        with pytest.raises(ValueError) as excinfo:
+            search(properties, '東京都', cursor=invalid)
+        assert not isinstance(excinfo.value, StaleCursorError)
+
+
+def test_generation_ignores_property_order(properties):
+    assert generation(properties) == generation(properties[::-1])
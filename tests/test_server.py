@@ -0,0 +1,74 @@
+"""server.py の物件データのエンドポイントのテスト"""
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+from utils.data_manager import DataManager
+from utils.listing import Listing
+from utils.snapshot_cache import JSONFileCache, SnapshotCache
+
+
+PROPERTY = {'id': 'Test', 'name': 'テスト', 'area': '東京都', 'layouts': ['2LDK', '3LDK']}
+
+
+@pytest.fixture(params=[True, False], ids=['pack', 'json'])
+def client(request, tmp_path, monkeypatch):
+    config_path = tmp_path / 'config.json'
+    config_path.write_text(json.dumps({'properties': [PROPERTY]}), encoding='utf-8')
+    data_dir = tmp_path / 'data'
+    data_manager = DataManager(PROPERTY, str(data_dir))
+    listings = [
+        Listing(source='SUUMO', title=f'物件{i}', url=f'https://example.com/{i}',
+                layout='2LDK' if i % 2 else '3LDK', price=50000000 + i, floor=i)
+        for i in range(6)
+    ]
+    data_manager.save_processed_data(listings, PROPERTY['name'], '2026-01-01T00:00:00+00:00')
+
+    monkeypatch.setattr(server, 'config_cache', JSONFileCache(str(config_path)))
+    monkeypatch.setattr(server, 'snapshot_cache', SnapshotCache(str(data_dir), use_pack=request.param))
+    return TestClient(server.app)
+
+
+def test_legacy_listings_endpoint(client):
+    response = client.get('/api/listings')
+    assert response.status_code == 200
+    assert response.json()['total_listings'] == 6
+    assert response.headers['X-Snapshot-Version'] == '20260101000000'
+
+
+def test_listings_by_layout(client):
+    response = client.get('/api/properties/Test/listings', params={'layout': '2LDK'})
+    assert response.status_code == 200
+    assert {listing['layout'] for listing in response.json()['listings']} == {'2LDK'}
+    assert len(response.json()['listings']) == 3
+
+    both = client.get('/api/properties/Test/listings', params=[('layout', '2LDK'), ('layout', '3LDK')])
+    assert len(both.json()['listings']) == 6
+
+
+def test_listings_not_modified(client):
+    response = client.get('/api/properties/Test/listings')
+    etag = response.headers['ETag']
+    cached = client.get('/api/properties/Test/listings', headers={'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert cached.headers['ETag'] == etag
+
+
+def test_search_cursor_is_tied_to_snapshot(client, tmp_path):
+    first = client.get('/api/search', params={'q': '物件', 'limit': 4})
+    assert first.status_code == 200
+    cursor = first.json()['next_cursor']
+    second = client.get('/api/search', params={'q': '物件', 'cursor': cursor})
+    assert [l['title'] for l in second.json()['listings']] == ['物件4', '物件5']
+
+    assert client.get('/api/search', params={'q': '物件', 'cursor': '-1'}).status_code == 400
+
+    # 新しいスナップショットが公開されたら古いカーソルは 409
+    DataManager(PROPERTY, str(tmp_path / 'data')).save_processed_data(
+        [Listing(source='SUUMO', title='物件', url='https://example.com/new', layout='2LDK', price=1)],
+        PROPERTY['name'], '2026-01-02T00:00:00+00:00')
+    stale = client.get('/api/search', params={'q': '物件', 'cursor': cursor})
+    assert stale.status_code == 409
+    assert stale.json()['generation'] != first.json()['generation']
@@ -0,0 +1,62 @@
+"""DeltaStore / compute_delta（スナップショット間の差分）のテスト"""
+import json
+import os
+
+from utils.snapshot_delta import DeltaStore, compute_delta, fingerprint
+
+
+def records(prices):
+    return [(f'https://example.com/{i}', {'url': f'https://example.com/{i}', 'price': price})
+            for i, price in prices.items()]
+
+
+def load_delta(tmp_path, since):
+    with open(os.path.join(tmp_path, 'deltas', f'{since}.json'), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_publish_writes_delta_from_previous_versions(tmp_path):
+    store = DeltaStore(str(tmp_path))
+    base = {i: 100 for i in range(10)}
+    store.publish('v1', '2026-01-01T00:00:00+00:00', 'テスト', records(base))
+    current = dict(base)
+    current.update({1: 90, 10: 200})
+    store.publish('v2', '2026-01-02T00:00:00+00:00', 'テスト', records(current))
+    del current[2]
+    assert store.publish('v3', '2026-01-03T00:00:00+00:00', 'テスト', records(current)) == 2
+
+    delta = load_delta(tmp_path, 'v1')
+    assert delta['since'] == 'v1' and delta['version'] == 'v3' and delta['total_listings'] == 10
+    assert [r['url'] for r in delta['added']] == ['https://example.com/10']
+    assert [r['price'] for r in delta['changed']] == [90]
+    assert delta['removed'] == ['https://example.com/2']
+    assert load_delta(tmp_path, 'v2')['removed'] == ['https://example.com/2']
+    assert load_delta(tmp_path, 'v2')['added'] == []
+
+
+def test_window_prunes_old_versions(tmp_path):
+    store = DeltaStore(str(tmp_path), window=2)
+    for day in range(1, 6):
+        # 1件だけ変わる（大半が変わる場合はデルタを作らない）
+        store.publish(f'v{day}', f'2026-01-0{day}T00:00:00+00:00', 'テスト', records({1: day, 2: 0, 3: 0}))
+    assert sorted(os.listdir(tmp_path / 'versions')) == ['v3.json', 'v4.json', 'v5.json']
+    assert sorted(os.listdir(tmp_path / 'deltas')) == ['v3.json', 'v4.json']
+
+
+def test_no_delta_when_hash_listing_removed():
+    previous = {'hash:abc': 'fp', 'https://example.com/1': 'fp1'}
+    current = {'https://example.com/1': ('fp1', {'url': 'https://example.com/1'})}
+    assert compute_delta(previous, current) is None
+
+
+def test_no_delta_when_most_listings_change():
+    previous = {f'k{i}': 'old' for i in range(10)}
+    current = {f'k{i}': ('new' if i < 6 else 'old', {'i': i}) for i in range(10)}
+    assert compute_delta(previous, current) is None
+    current = {f'k{i}': ('new' if i < 5 else 'old', {'i': i}) for i in range(10)}
+    assert len(compute_delta(previous, current)['changed']) == 5
+
+
+def test_fingerprint_ignores_key_order():
+    assert fingerprint({'a': 1, 'b': 2}) == fingerprint({'b': 2, 'a': 1})
+    assert fingerprint({'a': 1}) != fingerprint({'a': 2})
@@ -0,0 +1,81 @@
+"""スナップショット更新の通知（SnapshotBroadcaster, format_sse）のテスト"""
+import asyncio
+import json
+
+from utils.data_manager import DataManager
+from utils.listing import Listing
+from utils.snapshot_cache import SnapshotCache
+from utils.snapshot_events import SnapshotBroadcaster, format_sse, snapshot_event
+
+
+PROPERTY = {'id': 'Test', 'name': 'テスト'}
+
+
+def publish(data_dir, last_updated, prices):
+    data_manager = DataManager(PROPERTY, str(data_dir))
+    listings = [Listing(source='SUUMO', title='物件', url=f'https://example.com/{i}', layout='2LDK', price=price)
+                for i, price in enumerate(prices)]
+    # main.py と同じ順（上書きする前に変更を求める）
+    data_manager.save_changes(data_manager.detect_changes(listings), last_updated=last_updated)
+    data_manager.save_processed_data(listings, PROPERTY['name'], last_updated)
+
+
+def test_format_sse():
+    message = format_sse({'version': 'v1', 'name': 'テスト'}, event='snapshot', event_id='v1')
+    lines = message.decode('utf-8').split('\n')
+    assert lines[:2] == ['event: snapshot', 'id: v1']
+    assert json.loads(lines[2][len('data: '):]) == {'version': 'v1', 'name': 'テスト'}
+    assert message.endswith(b'\n\n')
+    assert format_sse({}) == b'data: {}\n\n'
+
+
+def test_snapshot_event_includes_change_summary(tmp_path):
+    publish(tmp_path, '2026-01-01T00:00:00+00:00', [1, 2])
+    event = snapshot_event(SnapshotCache(str(tmp_path)).get('Test'))
+    assert event['property_id'] == 'Test' and event['version'] == '20260101000000'
+    assert event['total_listings'] == 2
+    assert event['summary']['new'] == 2
+
+
+def test_broadcaster_notifies_new_versions_once(tmp_path):
+    publish(tmp_path, '2026-01-01T00:00:00+00:00', [1, 2])
+    cache = SnapshotCache(str(tmp_path))
+
+    async def run():
+        broadcaster = SnapshotBroadcaster(cache, interval=3600)
+        first = broadcaster.subscribe('Test', '20260101000000')
+        second = broadcaster.subscribe('Test', '20260101000000')
+        # 購読者が何人いても監視タスクは1つ
+        task = broadcaster._task
+        assert broadcaster.subscriber_count == 2
+
+        await broadcaster.check()
+        assert first.empty()
+
+        publish(tmp_path, '2026-01-02T00:00:00+00:00', [1])
+        await broadcaster.check()
+        await broadcaster.check()
+        events = [queue.get_nowait() for queue in (first, second)]
+        assert [event['version'] for event in events] == ['20260102000000'] * 2
+        assert first.empty() and second.empty()
+
+        broadcaster.unsubscribe('Test', first)
+        broadcaster.unsubscribe('Test', second)
+        assert broadcaster.subscriber_count == 0
+        assert broadcaster._task is task
+        task.cancel()
+
+    asyncio.run(run())
+
+
+def test_slow_subscriber_drops_oldest_events(tmp_path):
+    async def run():
+        broadcaster = SnapshotBroadcaster(SnapshotCache(str(tmp_path)), interval=3600)
+        queue = broadcaster.subscribe('Test')
+        for i in range(SnapshotBroadcaster.QUEUE_SIZE + 3):
+            broadcaster.publish('Test', {'version': str(i)})
+        received = [queue.get_nowait()['version'] for _ in range(queue.qsize())]
+        assert received == [str(i) for i in range(3, SnapshotBroadcaster.QUEUE_SIZE + 3)]
+        broadcaster._task.cancel()
+
+    asyncio.run(run())
@@ -0,0 +1,119 @@
+"""latest.snap（SnapshotPack）と MappedSnapshot のテスト"""
+import gzip
+import json
+import os
+
+import pytest
+
+from utils.data_manager import DataManager, listing_id, record_key
+from utils.listing import Listing
+from utils.snapshot_cache import MappedSnapshot, SnapshotCache
+from utils.snapshot_pack import FILENAME, SnapshotPack, build_pack, write_pack
+
+
+PROPERTY = {'id': 'Test', 'name': 'テスト'}
+
+
+def publish(data_dir, last_updated, listings):
+    data_manager = DataManager(PROPERTY, str(data_dir))
+    data_manager.save_changes(data_manager.detect_changes(listings), last_updated=last_updated)
+    data_manager.save_processed_data(listings, PROPERTY['name'], last_updated)
+    return os.path.join(data_dir, 'Test', 'processed')
+
+
+def make_listings(count, discounted=0):
+    # 先頭の discounted 件だけ値下げする（大半が変わるとデルタは作られない）
+    return [Listing(source='SUUMO' if i % 2 else 'HOMES', title=f'物件{i}', url=f'https://example.com/{i}',
+                    layout='2LDK' if i % 3 else '3LDK', price=50000000 + i - (i < discounted), area=60.0,
+                    floor=i // 2, direction='南')
+            for i in range(count)]
+
+
+def body(encoded):
+    return json.loads(bytes(encoded.select('')[1]))
+
+
+def test_write_pack_sections(tmp_path):
+    path = str(tmp_path / FILENAME)
+    data = b'{"listings": []}' * 100
+    write_pack(path, {'version': 'v1'}, {'listings': data}, {'index': b'\x01\x02\x03'})
+    pack = SnapshotPack(path)
+
+    assert pack.header['version'] == 'v1'
+    assert bytes(pack.section('listings')) == data
+    assert bytes(pack.section('index')) == b'\x01\x02\x03'
+    assert pack.section('missing') is None and pack.encoded('missing') is None
+    # セクションは8バイト境界に置く
+    assert all(offset % 8 == 0 for offset, _ in pack.header['sections'].values())
+    # 索引は圧縮しない
+    assert 'index.gzip' not in pack.header['sections']
+
+    encoding, compressed, _ = pack.encoded('listings').select('gzip')
+    assert encoding == 'gzip' and gzip.decompress(bytes(compressed)) == data
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / FILENAME
+    path.write_bytes(b'NOTASNAP' + b'\0' * 16)
+    with pytest.raises(ValueError):
+        SnapshotPack(str(path))
+
+
+def test_build_pack_includes_sidecars(tmp_path):
+    publish(tmp_path, '2026-01-01T00:00:00+00:00', make_listings(4))
+    processed = publish(tmp_path, '2026-01-02T00:00:00+00:00', make_listings(4, discounted=1))
+    pack = SnapshotPack(build_pack(processed))
+
+    assert pack.header['version'] == '20260102000000' and pack.header['total_listings'] == 4
+    assert pack.load_json('stats')['last_updated'] == '2026-01-02T00:00:00+00:00'
+    assert pack.load_json('changes')['summary']['price_down'] == 1
+    assert pack.load_json('delta/20260101000000')['version'] == '20260102000000'
+    assert pack.header['shards']['layout'] == {'2LDK': 2, '3LDK': 2}
+    assert pack.is_current(os.path.join(processed, 'latest.json'))
+
+    publish(tmp_path, '2026-01-03T00:00:00+00:00', make_listings(5))
+    assert not pack.is_current(os.path.join(processed, 'latest.json'))
+
+
+def test_mapped_snapshot_matches_json_snapshot(tmp_path):
+    publish(tmp_path, '2026-01-01T00:00:00+00:00', make_listings(6))
+    publish(tmp_path, '2026-01-02T00:00:00+00:00', make_listings(6, discounted=2))
+    mapped = SnapshotCache(str(tmp_path), use_pack=True).get('Test')
+    loaded = SnapshotCache(str(tmp_path), use_pack=False).get('Test')
+    assert isinstance(mapped, MappedSnapshot) and not isinstance(loaded, MappedSnapshot)
+
+    for name in ('version', 'last_updated', 'property_name', 'total_listings', 'stats', 'changes', 'listings'):
+        assert getattr(mapped, name) == getattr(loaded, name), name
+    assert bytes(mapped.encoded.select('')[1]) == loaded.body
+    assert body(mapped.delta('20260101000000')) == body(loaded.delta('20260101000000'))
+    assert mapped.delta('unknown') is None
+
+    # 物件IDの検索と同じ住戸のグループ
+    records = loaded.listings
+    for record in records:
+        id_ = listing_id(record_key(record))
+        assert mapped.find_listing(id_) == record
+        assert mapped.entity_group(id_) == loaded.entity_group(id_)
+    assert len(mapped.entity_group(listing_id(record_key(records[4])))) == 2
+    assert mapped.find_listing('0' * 16) is None
+
+    # シャードからの間取り・ソース別のレスポンス
+    for layouts, sources in ((['2LDK'], None), (None, ['SUUMO']), (['2LDK', '3LDK'], ['HOMES'])):
+        assert body(mapped.select(layouts, sources)) == body(loaded.select(layouts, sources))
+
+
+def test_stale_or_corrupt_pack(tmp_path):
+    processed = publish(tmp_path, '2026-01-01T00:00:00+00:00', make_listings(2))
+    cache = SnapshotCache(str(tmp_path))
+    assert cache.get('Test').total_listings == 2
+
+    # latest.json が更新されたら latest.snap を作り直す
+    publish(tmp_path, '2026-01-02T00:00:00+00:00', make_listings(3))
+    snapshot = cache.get('Test')
+    assert isinstance(snapshot, MappedSnapshot) and snapshot.total_listings == 3
+
+    # 壊れた latest.snap の場合は latest.json から読み込む
+    with open(os.path.join(processed, FILENAME), 'r+b') as f:
+        f.write(b'BROKEN!!')
+    snapshot = SnapshotCache(str(tmp_path)).get('Test')
+    assert not isinstance(snapshot, MappedSnapshot) and snapshot.total_listings == 3
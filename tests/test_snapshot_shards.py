@@ -0,0 +1,60 @@
+"""snapshot_shards（間取り別・ソース別のシャード）のテスト"""
+import json
+import os
+
+from utils.snapshot_shards import (SHARD_DIR, load_manifest, read_shards, select_records, shard_section,
+                                   write_shards)
+
+
+HEADER = {'property_name': 'テスト', 'last_updated': '2026-01-01T00:00:00+00:00', 'version': 'v1'}
+RECORDS = [
+    {'url': 'https://example.com/1', 'layout': '2LDK', 'source': 'SUUMO'},
+    {'url': 'https://example.com/2', 'layout': '3LDK', 'source': 'SUUMO'},
+    {'url': 'https://example.com/3', 'layout': '2LDK', 'source': 'HOMES'},
+    {'url': 'https://example.com/4', 'layout': None, 'source': 'HOMES'},
+]
+
+
+def shard_path(tmp_path, manifest, kind, name):
+    return os.path.join(tmp_path, SHARD_DIR, manifest['shards'][kind][name]['path'])
+
+
+def test_write_and_read_shards(tmp_path):
+    manifest = write_shards(str(tmp_path), HEADER, RECORDS)
+    assert load_manifest(str(tmp_path)) == manifest
+
+    counts, bodies = read_shards(str(tmp_path), 'v1')
+    assert counts == {'layout': {'2LDK': 2, '3LDK': 1, 'unknown': 1}, 'source': {'HOMES': 2, 'SUUMO': 2}}
+    shard = json.loads(bodies[shard_section('layout', '2LDK')])
+    assert shard['total_listings'] == 2
+    assert shard['shard'] == {'kind': 'layout', 'name': '2LDK'}
+    assert [record['url'] for record in shard['listings']] == ['https://example.com/1', 'https://example.com/3']
+
+
+def test_read_shards_rejects_modified_shard(tmp_path):
+    manifest = write_shards(str(tmp_path), HEADER, RECORDS)
+    with open(shard_path(tmp_path, manifest, 'source', 'SUUMO'), 'ab') as f:
+        f.write(b' ')
+    assert read_shards(str(tmp_path), 'v1') == ({}, {})
+
+
+def test_read_shards_rejects_missing_shard_and_other_version(tmp_path):
+    manifest = write_shards(str(tmp_path), HEADER, RECORDS)
+    assert read_shards(str(tmp_path), 'v0') == ({}, {})
+    os.remove(shard_path(tmp_path, manifest, 'layout', '3LDK'))
+    assert read_shards(str(tmp_path), 'v1') == ({}, {})
+
+
+def test_write_shards_removes_stale_shards(tmp_path):
+    first = write_shards(str(tmp_path), HEADER, RECORDS)
+    stale = shard_path(tmp_path, first, 'layout', '3LDK')
+    write_shards(str(tmp_path), dict(HEADER, version='v2'), [r for r in RECORDS if r['layout'] != '3LDK'])
+    assert not os.path.exists(stale)
+    counts, _ = read_shards(str(tmp_path), 'v2')
+    assert '3LDK' not in counts['layout']
+
+
+def test_select_records_matches_shards():
+    assert select_records(RECORDS, layouts=['unknown']) == [RECORDS[3]]
+    assert select_records(RECORDS, layouts=['2LDK'], sources=['HOMES']) == [RECORDS[2]]
+    assert select_records(RECORDS) == RECORDS
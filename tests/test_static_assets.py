@@ -0,0 +1,88 @@
+"""静的ファイルのビルドと配信（build_assets, StaticAssets）のテスト"""
+import gzip
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+from utils.static_assets import IMMUTABLE_CACHE_CONTROL, MANIFEST, StaticAssets, build_assets
+
+
+CSS = b'body { color: #333; }\n' * 100
+JS = b'console.log("app");\n' * 100
+HTML = ('<link rel="stylesheet" href="/static/css/style.css?v=2">'
+        '<script src="/static/js/app.js"></script>'
+        '<img src="/static/missing.png">')
+
+
+@pytest.fixture
+def web_dir(tmp_path):
+    web = tmp_path / 'web'
+    (web / 'css').mkdir(parents=True)
+    (web / 'js').mkdir()
+    (web / 'css' / 'style.css').write_bytes(CSS)
+    (web / 'js' / 'app.js').write_bytes(JS)
+    (web / 'index.html').write_text(HTML, encoding='utf-8')
+    return web
+
+
+def test_build_hashes_assets_and_rewrites_html(web_dir):
+    manifest = build_assets(str(web_dir))
+    css = manifest['assets']['css/style.css']['path']
+    js = manifest['assets']['js/app.js']['path']
+    assert css.startswith('css/style.') and css.endswith('.css') and len(css) == len('css/style..css') + 12
+    assert 'gzip' in manifest['assets']['css/style.css']['encodings']
+
+    html = (web_dir / 'dist' / 'index.html').read_text(encoding='utf-8')
+    # クエリを外してハッシュ付きのパスに書き換える（ビルドしていないファイルはそのまま）
+    assert f'href="/static/{css}"' in html and f'src="/static/{js}"' in html
+    assert 'src="/static/missing.png"' in html
+    assert gzip.decompress((web_dir / 'dist' / (css + '.gz')).read_bytes()) == CSS
+
+
+def test_hash_changes_with_content_and_old_files_are_pruned(web_dir):
+    first = build_assets(str(web_dir))['assets']['css/style.css']['path']
+    assert build_assets(str(web_dir))['assets']['css/style.css']['path'] == first
+
+    (web_dir / 'css' / 'style.css').write_bytes(CSS + b'a { color: red; }\n')
+    second = build_assets(str(web_dir))['assets']['css/style.css']['path']
+    assert second != first
+    assert not (web_dir / 'dist' / first).exists()
+    assert (web_dir / 'dist' / second).exists()
+    # 出力先はビルド対象にしない
+    with open(web_dir / 'dist' / MANIFEST, encoding='utf-8') as f:
+        assert not any(path.startswith('dist/') for path in json.load(f)['sources'])
+
+
+def test_static_assets_ignores_stale_build(web_dir):
+    manifest = build_assets(str(web_dir))
+    assets = StaticAssets(str(web_dir))
+    encoded, media_type = assets.asset(manifest['assets']['js/app.js']['path'])
+    assert media_type.endswith('; charset=utf-8')
+    assert encoded.select('')[1] == JS
+    assert assets.page('index.html') is not None
+    assert assets.asset('js/app.js') is None
+
+    # ビルド後に元のファイルが変更されたらビルド結果を使わない
+    (web_dir / 'js' / 'app.js').write_bytes(JS + b'//\n')
+    assert StaticAssets(str(web_dir)).assets == {}
+    assert StaticAssets(str(web_dir / 'missing')).pages == {}
+
+
+def test_server_serves_hashed_assets_as_immutable(web_dir, monkeypatch):
+    manifest = build_assets(str(web_dir))
+    monkeypatch.setattr(server, 'static_assets', StaticAssets(str(web_dir)))
+    client = TestClient(server.app)
+
+    path = manifest['assets']['css/style.css']['path']
+    response = client.get(f'/static/{path}', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == IMMUTABLE_CACHE_CONTROL
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.content == CSS
+
+    page = client.get('/')
+    assert f'/static/{path}' in page.text
+    assert 'immutable' not in page.headers.get('Cache-Control', '')
+    assert client.get('/', headers={'If-None-Match': page.headers['ETag']}).status_code == 304
@@ -0,0 +1,90 @@
+"""静的サイトの生成（generate_site, プリレンダリング）のテスト"""
+import json
+import os
+import re
+import shutil
+
+import pytest
+
+from utils.data_manager import DataManager
+from utils.listing import Listing
+from utils.static_site import embed_json, format_price, format_updated, generate_site, render_property_page
+
+
+WEB_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'web')
+
+PROPERTIES = [
+    {'id': 'Tower', 'name': 'タワー<東>', 'area': '東京都', 'layouts': ['2LDK']},
+    {'id': 'Empty', 'name': '未公開', 'area': '東京都'},
+]
+
+
+def initial_data(page):
+    match = re.search(r'<script id="initial-data" type="application/json">(.*?)</script>', page, re.S)
+    return json.loads(match.group(1))
+
+
+@pytest.fixture
+def site(tmp_path):
+    web_dir = tmp_path / 'web'
+    shutil.copytree(WEB_DIR, web_dir, ignore=shutil.ignore_patterns('dist'))
+    data_dir = tmp_path / 'data'
+    listings = [
+        Listing(source='SUUMO', title='眺望</script>良好', url='https://example.com/1', layout='2LDK', price=123450000),
+        Listing(source='HOMES', title='同じ物件', url='https://example.com/2', layout='2LDK', price=123450000),
+        Listing(source='SUUMO', title='3LDK', url='https://example.com/3', layout='3LDK', price=80000000),
+    ]
+    DataManager(PROPERTIES[0], str(data_dir)).save_processed_data(listings, PROPERTIES[0]['name'],
+                                                                    '2026-01-01T00:00:00+00:00')
+    config = {'properties': PROPERTIES, 'output': {'data_base_dir': str(data_dir)}}
+    return config, str(tmp_path / 'site'), str(web_dir)
+
+
+def test_generate_site(site):
+    config, output_dir, web_dir = site
+    assert generate_site(config, output_dir, web_dir) == 1
+    assert not os.path.exists(os.path.join(output_dir, 'Empty'))
+
+    with open(os.path.join(output_dir, 'Tower', 'index.html'), encoding='utf-8') as f:
+        page = f.read()
+    # 表示する間取りの物件だけを数える（価格は app.js と同じ形式）
+    assert '<h1>タワー&lt;東&gt;</h1>' in page
+    assert 'id="total-listings">2</span>' in page
+    assert 'id="min-price"><span style="font-size:1.4em">1</span>億' in page
+    assert 'id="last-updated">2026/1/1 9:00:00</span>' in page
+    data = initial_data(page)
+    assert data['static'] is True and data['property']['id'] == 'Tower'
+    assert data['snapshot']['listings'][0]['title'] == '眺望</script>良好'
+
+    # CSS・JSはハッシュ付きのパスで参照し、出力先にコピーする
+    for path in re.findall(r'(?:href|src)="/static/([^"]+)"', page):
+        assert os.path.exists(os.path.join(output_dir, 'static', path)), path
+
+    with open(os.path.join(output_dir, 'index.html'), encoding='utf-8') as f:
+        index = f.read()
+    assert 'href="/Tower/" class="property-card"' in index and '読み込み中' not in index
+    assert [p['id'] for p in initial_data(index)['properties']] == ['Tower', 'Empty']
+
+
+def test_regenerate_replaces_output(site):
+    config, output_dir, web_dir = site
+    generate_site(config, output_dir, web_dir)
+    stale = os.path.join(output_dir, 'Removed')
+    os.makedirs(stale)
+    generate_site(config, output_dir, web_dir)
+    assert not os.path.exists(stale)
+    assert not os.path.exists(output_dir + '.tmp') and not os.path.exists(output_dir + '.old')
+
+
+def test_render_helpers():
+    assert embed_json(b'{"t": "</script>"}') == b'{"t": "<\\/script>"}'
+    assert json.loads(embed_json(b'{"t": "</script>"}')) == {'t': '</script>'}
+    assert format_price(None) == '-'
+    assert format_price(200000000) == '<span style="font-size:1.4em">2</span>億円'
+    assert format_price(75000000) == '<span style="font-size:1.4em">7500</span>万円'
+    assert format_updated('2026-06-30T15:00:00+00:00') == '2026/7/1 0:00:00'
+    assert format_updated('yesterday') == 'yesterday'
+
+    page = render_property_page('<title></title><h1></h1><body></body>', {'id': 'A', 'name': 'A'},
+                                b'{"listings": []}')
+    assert initial_data(page)['snapshot'] == {'listings': []}
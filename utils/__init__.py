@@ -1,5 +1,7 @@
 """ユーティリティパッケージ"""
 from .logger import setup_logger, get_logger
-from .data_manager import DataManager
+from .listing import Listing
+from .data_manager import DataManager, listing_key, snapshot_version
+from .page_archive import PageArchive
 
-__all__ = ['setup_logger', 'get_logger', 'DataManager']
+__all__ = ['setup_logger', 'get_logger', 'Listing', 'DataManager', 'listing_key', 'snapshot_version', 'PageArchive']
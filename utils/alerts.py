@@ -0,0 +1,503 @@
+"""物件のアラート（新着・値下げの通知）
+
+保存されたルール（マンション・間取り・価格・階数の条件）を、イベントの種類・マンション・間取りごとの
+バケツに分け、各バケツの価格と階数の範囲を区間木で索引します。
+実行ごとの変更セット（新着・値下げ）の物件だけを索引で照合するため、
+照合にかかる時間はルールの数ではなく変更の件数に比例します。
+
+一致したアラートは設定したシンク（ファイル・Webhook）に送ります。
+WebhookReceiver は動作確認用の Webhook の受け口（ローカルのHTTPサーバー）です。
+
+ルールファイルの形式（例）:
+    {"rules": [{"id": "toyosu-2ldk", "user": "alice", "property_id": "BranzTowerToyosu",
+                "layouts": ["2LDK"], "max_price": 150000000, "min_floor": 20,
+                "events": ["new", "price_down"]}]}
+"""
+import json
+import os
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+import requests
+
+from utils.data_manager import listing_id
+from utils.interval_tree import IntervalTree
+from utils.json_writer import dumps
+from utils.logger import get_logger
+
+
+logger = get_logger(__name__)
+
+
+# アラートの対象にする変更の種類（変更セットのキー）
+EVENTS = ('new', 'price_down', 'price_up')
+DEFAULT_EVENTS = ('new', 'price_down')
+
+_INF = float('inf')
+
+
+class AlertRule:
+    """アラートのルール"""
+
+    __slots__ = ('id', 'user', 'property_id', 'layouts', 'min_price', 'max_price',
+                 'min_floor', 'max_floor', 'events')
+
+    def __init__(self, id: str, user: Optional[str] = None, property_id: Optional[str] = None,
+                 layouts: Optional[List[str]] = None,
+                 min_price: Optional[int] = None, max_price: Optional[int] = None,
+                 min_floor: Optional[int] = None, max_floor: Optional[int] = None,
+                 events: Optional[List[str]] = None):
+        """
+        初期化
+
+        Args:
+            id: ルールID
+            user: 通知先のユーザー
+            property_id: マンションID（省略時はすべてのマンション）
+            layouts: 間取り（省略時はすべての間取り）
+            min_price, max_price: 価格の範囲（円、両端を含む）
+            min_floor, max_floor: 階数の範囲（両端を含む）
+            events: 通知する変更の種類（new, price_down, price_up。省略時は new, price_down）
+        """
+        if not id:
+            raise ValueError("AlertRule.id is required")
+        events = list(events or DEFAULT_EVENTS)
+        unknown = [e for e in events if e not in EVENTS]
+        if unknown:
+            raise ValueError(f"AlertRule {id}: invalid events {unknown} (expected {', '.join(EVENTS)})")
+        for low, high, name in ((min_price, max_price, 'price'), (min_floor, max_floor, 'floor')):
+            if low is not None and high is not None and low > high:
+                raise ValueError(f"AlertRule {id}: min_{name} is greater than max_{name}")
+        self.id = id
+        self.user = user
+        self.property_id = property_id
+        self.layouts = list(layouts) if layouts else None
+        self.min_price = min_price
+        self.max_price = max_price
+        self.min_floor = min_floor
+        self.max_floor = max_floor
+        self.events = events
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'AlertRule':
+        """辞書からルールを作る（未知のフィールドはエラー）"""
+        unknown = set(data) - set(cls.__slots__)
+        if unknown:
+            raise ValueError(f"AlertRule {data.get('id')}: unknown fields {sorted(unknown)}")
+        return cls(**data)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """辞書に変換する（値がないフィールドは省く）"""
+        return {name: getattr(self, name) for name in self.__slots__ if getattr(self, name) is not None}
+
+    def price_range(self) -> Tuple[float, float]:
+        return (-_INF if self.min_price is None else self.min_price,
+                _INF if self.max_price is None else self.max_price)
+
+    def floor_range(self) -> Tuple[float, float]:
+        return (-_INF if self.min_floor is None else self.min_floor,
+                _INF if self.max_floor is None else self.max_floor)
+
+    def matches(self, property_id: str, event: str, listing: Dict[str, Any]) -> bool:
+        """
+        物件がルールに一致するか（索引を使わない照合。確認用）
+
+        Args:
+            property_id: マンションID
+            event: 変更の種類
+            listing: 物件データ
+
+        Returns:
+            bool: 一致する場合はTrue
+        """
+        if event not in self.events:
+            return False
+        if self.property_id and self.property_id != property_id:
+            return False
+        if self.layouts and listing.get('layout') not in self.layouts:
+            return False
+        for value, (low, high) in ((listing.get('price'), self.price_range()),
+                                   (listing.get('floor'), self.floor_range())):
+            if value is None:
+                if low != -_INF or high != _INF:
+                    return False
+            elif not low <= value <= high:
+                return False
+        return True
+
+
+def load_rules(path: str) -> List[AlertRule]:
+    """
+    ルールファイルを読み込む
+
+    Args:
+        path: ルールファイル（JSON）のパス
+
+    Returns:
+        List[AlertRule]: ルール（ファイルがない場合は空）
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        logger.warning(f"Alert rules not found: {path}")
+        return []
+    rules = [AlertRule.from_dict(item) for item in data.get('rules', [])]
+    duplicates = sorted(rule_id for rule_id, count in Counter(rule.id for rule in rules).items() if count > 1)
+    if duplicates:
+        raise ValueError(f"Duplicate alert rule ids: {duplicates}")
+    return rules
+
+
+class _RuleBucket:
+    """1つのバケツ（イベント・マンション・間取り）のルールと、価格・階数の区間木"""
+
+    __slots__ = ('rules', 'price_tree', 'floor_tree', 'price_open', 'floor_open')
+
+    def __init__(self, rules: List[AlertRule]):
+        self.rules = rules
+        self.price_tree = IntervalTree([rule.price_range() + (i,) for i, rule in enumerate(rules)])
+        self.floor_tree = IntervalTree([rule.floor_range() + (i,) for i, rule in enumerate(rules)])
+        # 値が不明な物件にも一致する（範囲の指定がない）ルール
+        self.price_open = [i for i, rule in enumerate(rules) if rule.price_range() == (-_INF, _INF)]
+        self.floor_open = [i for i, rule in enumerate(rules) if rule.floor_range() == (-_INF, _INF)]
+
+    def match(self, price: Optional[float], floor: Optional[float]) -> List[AlertRule]:
+        by_price = self.price_open if price is None else self.price_tree.query(price)
+        if not by_price:
+            return []
+        by_floor = self.floor_open if floor is None else self.floor_tree.query(floor)
+        # 少ない方を多い方の集合で絞り込む
+        if len(by_price) > len(by_floor):
+            by_price, by_floor = by_floor, by_price
+        other = set(by_floor)
+        return [self.rules[i] for i in by_price if i in other]
+
+
+class RuleIndex:
+    """ルールの索引（イベント・マンション・間取りのバケツごとに価格・階数の区間木を持つ）"""
+
+    def __init__(self, rules: Iterable[AlertRule]):
+        """
+        初期化
+
+        Args:
+            rules: ルール
+        """
+        grouped: Dict[Tuple[str, Optional[str], Optional[str]], List[AlertRule]] = {}
+        self.size = 0
+        for rule in rules:
+            self.size += 1
+            # マンション・間取りの指定がないルールは None のバケツに入れる
+            for event in rule.events:
+                for layout in rule.layouts or [None]:
+                    grouped.setdefault((event, rule.property_id, layout), []).append(rule)
+        self._buckets = {key: _RuleBucket(bucket_rules) for key, bucket_rules in grouped.items()}
+
+    def match(self, property_id: str, event: str, listing: Dict[str, Any]) -> List[AlertRule]:
+        """
+        物件に一致するルールを求める
+
+        Args:
+            property_id: マンションID
+            event: 変更の種類
+            listing: 物件データ
+
+        Returns:
+            List[AlertRule]: 一致したルール
+        """
+        layout = listing.get('layout')
+        matched = []
+        for property_key in (property_id, None):
+            for layout_key in ((layout, None) if layout else (None,)):
+                bucket = self._buckets.get((event, property_key, layout_key))
+                if bucket is not None:
+                    matched.extend(bucket.match(listing.get('price'), listing.get('floor')))
+        return matched
+
+
+def changed_listings(changes: Dict[str, Any],
+                     listings: Mapping[str, Dict[str, Any]]) -> Iterable[Tuple[str, str, Dict[str, Any], Dict[str, Any]]]:
+    """
+    変更セットからアラートの対象になる物件を取り出す
+
+    Args:
+        changes: 変更セット（DataManager.compute_changes の結果。キーと変わったフィールドだけを持つ）
+        listings: 今回の物件データ（キー -> 物件データ）
+
+    Returns:
+        Iterable: (変更の種類, 物件のキー, 物件データ, 変更の情報) のリスト
+    """
+    for event in EVENTS:
+        for item in changes.get(event, []):
+            # 掲載履歴にある物件の再掲載は新着として通知しない
+            if event == 'new' and item.get('first_seen'):
+                continue
+            listing = listings.get(item['key'])
+            if listing is None:
+                continue
+            detail = {}
+            if 'price_before' in item:
+                detail = {'price_before': item['price_before'], 'price_after': item['price_after']}
+            yield event, item['key'], listing, detail
+
+
+class AlertSink:
+    """アラートの送り先"""
+
+    name = 'sink'
+
+    def send(self, alerts: List[Dict[str, Any]]):
+        """
+        アラートを送る
+
+        Args:
+            alerts: アラート
+        """
+        raise NotImplementedError
+
+
+class FileSink(AlertSink):
+    """ファイルに1行1アラートで追記する（JSON Lines）"""
+
+    name = 'file'
+
+    def __init__(self, path: str):
+        """
+        初期化
+
+        Args:
+            path: 出力先のファイル
+        """
+        self.path = path
+
+    def send(self, alerts: List[Dict[str, Any]]):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, 'ab') as f:
+            f.write(b''.join(dumps(alert) + b'\n' for alert in alerts))
+
+
+class WebhookSink(AlertSink):
+    """WebhookにJSONでPOSTする（{"alerts": [...]} を batch_size 件ずつ）"""
+
+    name = 'webhook'
+
+    def __init__(self, url: str, timeout: float = 10, max_retries: int = 3, batch_size: int = 100,
+                 headers: Optional[Dict[str, str]] = None):
+        """
+        初期化
+
+        Args:
+            url: WebhookのURL
+            timeout: タイムアウト（秒）
+            max_retries: 最大リトライ回数
+            batch_size: 1回のリクエストで送るアラートの数
+            headers: 追加のリクエストヘッダー
+        """
+        self.url = url
+        self.timeout = timeout
+        self.max_retries = max(1, max_retries)
+        self.batch_size = max(1, batch_size)
+        self.session = requests.Session()
+        self.session.headers.update({'Content-Type': 'application/json'})
+        if headers:
+            self.session.headers.update(headers)
+
+    def send(self, alerts: List[Dict[str, Any]]):
+        for start in range(0, len(alerts), self.batch_size):
+            body = dumps({'alerts': alerts[start:start + self.batch_size]})
+            for attempt in range(self.max_retries):
+                try:
+                    response = self.session.post(self.url, data=body, timeout=self.timeout)
+                    response.raise_for_status()
+                    break
+                except requests.exceptions.RequestException as e:
+                    logger.warning(f"Webhook failed (attempt {attempt + 1}/{self.max_retries}): {e}")
+                    if attempt + 1 == self.max_retries:
+                        raise
+                    time.sleep(2 ** attempt)  # エクスポネンシャルバックオフ
+
+
+SINK_CLASSES = {cls.name: cls for cls in (FileSink, WebhookSink)}
+
+
+def create_sink(sink_config: Dict[str, Any]) -> AlertSink:
+    """
+    設定からシンクを作る
+
+    Args:
+        sink_config: type（file, webhook）とシンクの引数
+
+    Returns:
+        AlertSink: シンク
+    """
+    options = dict(sink_config)
+    sink_type = options.pop('type', None)
+    if sink_type not in SINK_CLASSES:
+        raise ValueError(f"Invalid alert sink type: {sink_type} (expected one of {', '.join(SINK_CLASSES)})")
+    return SINK_CLASSES[sink_type](**options)
+
+
+class AlertEngine:
+    """変更セットをルールの索引で照合し、一致したアラートをシンクに送る"""
+
+    def __init__(self, rules: Iterable[AlertRule], sinks: Iterable[AlertSink]):
+        """
+        初期化
+
+        Args:
+            rules: ルール
+            sinks: 送り先
+        """
+        self.index = RuleIndex(rules)
+        self.sinks = list(sinks)
+
+    @classmethod
+    def from_config(cls, alerts_config: Dict[str, Any]) -> 'AlertEngine':
+        """
+        設定（config.json の alerts）から作る
+
+        Args:
+            alerts_config: rules_path（ルールファイル）, sinks（シンクの設定のリスト）
+        """
+        rules = load_rules(alerts_config['rules_path'])
+        sinks = [create_sink(sink_config) for sink_config in alerts_config.get('sinks', [])]
+        logger.info(f"Alert engine: {len(rules)} rules, sinks: {', '.join(s.name for s in sinks) or 'none'}")
+        return cls(rules, sinks)
+
+    def evaluate(self, property_info: Dict[str, Any], changes: Dict[str, Any],
+                 listings: Mapping[str, Dict[str, Any]], version: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        変更セットに一致するアラートを求める（変更された物件だけを引くため、変更の件数に比例する）
+
+        Args:
+            property_info: マンション情報（id, name）
+            changes: 変更セット（DataManager.detect_changes の結果）
+            listings: 今回の物件データ（キー -> 物件データ。DataManager.published_records など）
+            version: 今回のスナップショットのバージョン
+
+        Returns:
+            List[Dict]: アラート（rule_id, user, event, マンション, 物件ID, 物件, 値下げ前後の価格）。
+                前回のスナップショットがない（初回の取得）場合は、全件が新着になるため空
+        """
+        if not changes.get('previous_version'):
+            logger.info(f"No previous snapshot for {property_info['id']}, alerts skipped")
+            return []
+        alerts = []
+        for event, key, listing, detail in changed_listings(changes, listings):
+            rules = self.index.match(property_info['id'], event, listing)
+            if not rules:
+                continue
+            id_ = listing_id(key)
+            for rule in rules:
+                alerts.append(dict(
+                    detail,
+                    rule_id=rule.id,
+                    user=rule.user,
+                    event=event,
+                    property_id=property_info['id'],
+                    property_name=property_info.get('name'),
+                    version=version,
+                    listing_id=id_,
+                    listing=listing,
+                ))
+        return alerts
+
+    def dispatch(self, alerts: List[Dict[str, Any]]) -> int:
+        """
+        アラートをすべてのシンクに送る（失敗したシンクはログに残して続ける）
+
+        Args:
+            alerts: アラート
+
+        Returns:
+            int: 送信に成功したシンクの数
+        """
+        if not alerts:
+            return 0
+        delivered = 0
+        for sink in self.sinks:
+            try:
+                sink.send(alerts)
+                delivered += 1
+            except Exception as e:
+                logger.error(f"Failed to send {len(alerts)} alerts to {sink.name}: {e}")
+        return delivered
+
+    def process(self, property_info: Dict[str, Any], changes: Dict[str, Any],
+                listings: Mapping[str, Dict[str, Any]], version: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        変更セットを照合してアラートを送る
+
+        Returns:
+            List[Dict]: 送ったアラート
+        """
+        started = time.perf_counter()
+        alerts = self.evaluate(property_info, changes, listings, version)
+        elapsed = (time.perf_counter() - started) * 1000
+        self.dispatch(alerts)
+        logger.info(f"Alerts for {property_info['id']}: {len(alerts)} matched "
+                    f"({self.index.size} rules, evaluated in {elapsed:.1f}ms)")
+        return alerts
+
+
+class WebhookReceiver:
+    """動作確認用の Webhook の受け口（受け取ったJSONを received に貯める）
+
+    使用例:
+        with WebhookReceiver() as receiver:
+            WebhookSink(receiver.url).send(alerts)
+            print(receiver.received)
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, status: int = 200):
+        """
+        初期化
+
+        Args:
+            host: 待ち受けるホスト
+            port: 待ち受けるポート（0の場合は空いているポート）
+            status: 返すステータスコード（失敗時の動作の確認用）
+        """
+        self.received: List[Any] = []
+        self.status = status
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                receiver.received.append(json.loads(body or b'null'))
+                self.send_response(receiver.status)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                logger.debug(f"Webhook receiver: {format % args}")
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self) -> 'WebhookReceiver':
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> 'WebhookReceiver':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,226 @@
+"""類似物件（コンパラブル）の検索
+
+掲載中と過去（掲載履歴）の物件を、面積・階数・間取り・向きを正規化した特徴ベクトルにして
+マンションごとに KD-tree を作り、指定した物件に近い物件を k近傍で求めます。
+近隣のマンション（設定の area が同じマンション）の物件も合わせて検索します。
+KD-tree はスナップショットが更新されたマンションの分だけ作り直します。
+"""
+import math
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from utils.data_manager import listing_id, record_key
+from utils.kdtree import KDTree
+from utils.listing_history import ListingHistory
+from utils.logger import get_logger
+
+
+logger = get_logger(__name__)
+
+
+# 向きの角度（北を0度として時計回り）
+DIRECTION_ANGLES = {'北': 0, '北東': 45, '東': 90, '南東': 135, '南': 180, '南西': 225, '西': 270, '北西': 315}
+
+# 特徴量ごとに距離1とみなす差
+AREA_SCALE = 0.1     # 面積の対数（約10%）
+FLOOR_SCALE = 5.0    # 階数
+ROOMS_SCALE = 1.0    # 部屋数
+# 向きは単位円上の点（正反対の向きで距離2、不明は中心）
+DIRECTION_SCALE = 1.0
+
+DEFAULT_K = 10
+MAX_K = 100
+
+SCOPES = ('building', 'nearby')
+
+_ROOMS = re.compile(r'(\d+)')
+
+
+def _rooms(layout: Optional[str]) -> float:
+    match = _ROOMS.match(layout or '')
+    return float(match.group(1)) if match else math.nan
+
+
+def encode_features(listings: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    物件を正規化した特徴ベクトルにする
+
+    Args:
+        listings: 物件データ
+
+    Returns:
+        Tuple: (特徴ベクトル (n, 5), 面積があり検索に使える行のマスク (n,))。
+            階数・部屋数が不明な場合は同じマンションの中央値で補う
+    """
+    area = np.array([l.get('area') or 0 for l in listings], dtype=np.float64)
+    floor = np.array([l.get('floor') or np.nan for l in listings], dtype=np.float64)
+    rooms = np.array([_rooms(l.get('layout')) for l in listings], dtype=np.float64)
+    angle = np.array([DIRECTION_ANGLES.get(l.get('direction'), np.nan) for l in listings], dtype=np.float64)
+
+    valid = area > 0
+    for values in (floor, rooms):
+        known = ~np.isnan(values)
+        values[~known] = np.median(values[known]) if known.any() else 0.0
+
+    radians = np.deg2rad(np.nan_to_num(angle))
+    has_direction = ~np.isnan(angle)
+    features = np.column_stack([
+        np.log(np.where(valid, area, 1.0)) / AREA_SCALE,
+        floor / FLOOR_SCALE,
+        rooms / ROOMS_SCALE,
+        np.where(has_direction, np.cos(radians), 0.0) * DIRECTION_SCALE,
+        np.where(has_direction, np.sin(radians), 0.0) * DIRECTION_SCALE,
+    ]) if len(listings) else np.zeros((0, 5))
+    return features, valid
+
+
+class ComparableSegment:
+    """1マンション分の掲載中・過去の物件と KD-tree"""
+
+    def __init__(self, property_info: Dict[str, Any], snapshot, history: Dict[str, Any]):
+        """
+        初期化（特徴ベクトルと KD-tree を作る）
+
+        Args:
+            property_info: マンション情報（id, name, area）
+            snapshot: スナップショット
+            history: 掲載履歴（ListingHistory.load() の結果）
+        """
+        self.property_info = property_info
+        self.signature = snapshot.signature
+        seen = history.get('listings', {})
+
+        # 掲載中の物件、掲載履歴にしかない物件（掲載終了）の順
+        entries = {}
+        for listing in snapshot.listings:
+            key = record_key(listing)
+            if key not in entries:
+                past = seen.get(key) or {}
+                entries[key] = (listing, True, past.get('first_seen') or snapshot.last_updated,
+                                snapshot.last_updated)
+        for key, entry in seen.items():
+            if key not in entries:
+                entries[key] = (entry['listing'], False, entry.get('first_seen'), entry.get('last_seen'))
+
+        listings = [listing for listing, _, _, _ in entries.values()]
+        features, valid = encode_features(listings)
+        positions = np.flatnonzero(valid)
+
+        self.keys = [key for key, keep in zip(entries, valid) if keep]
+        self.entries = [entry for entry, keep in zip(entries.values(), valid) if keep]
+        self.ids = [listing_id(key) for key in self.keys]
+        self.position = {id_: i for i, id_ in enumerate(self.ids)}
+        self.current = np.array([entry[1] for entry in self.entries], dtype=bool)
+        self.features = features[positions]
+        self.tree = KDTree(self.features)
+
+    def result(self, position: int, distance: Optional[float] = None) -> Dict[str, Any]:
+        """物件の情報（listing_id, マンション, 掲載状況, 距離付き）"""
+        listing, current, first_seen, last_seen = self.entries[position]
+        result = dict(
+            listing,
+            listing_id=self.ids[position],
+            property_id=self.property_info['id'],
+            property_name=self.property_info.get('name'),
+            status='current' if current else 'past',
+            first_seen=first_seen,
+            last_seen=last_seen,
+        )
+        if distance is not None:
+            result['distance'] = round(distance, 4)
+        return result
+
+
+class ComparablesIndex:
+    """全マンションの類似物件インデックス（スナップショットが変わったマンションだけ作り直す）"""
+
+    def __init__(self, data_base_dir: str):
+        """
+        初期化
+
+        Args:
+            data_base_dir: データのベースディレクトリ
+        """
+        self.data_base_dir = data_base_dir
+        # マンションID -> ComparableSegment
+        self.segments: Dict[str, ComparableSegment] = {}
+        self._lock = threading.Lock()
+
+    def update(self, properties: List[Tuple[Dict[str, Any], Any]]) -> int:
+        """
+        スナップショットが変わったマンションのインデックスを作り直す
+
+        Args:
+            properties: (マンション情報, スナップショット) のリスト
+
+        Returns:
+            int: 作り直したマンションの数
+        """
+        rebuilt = 0
+        with self._lock:
+            for property_info, snapshot in properties:
+                segment = self.segments.get(property_info['id'])
+                if segment is not None and segment.signature == snapshot.signature \
+                        and segment.property_info == property_info:
+                    continue
+                history = ListingHistory(
+                    os.path.join(self.data_base_dir, property_info['id'], 'processed')).load()
+                segment = ComparableSegment(property_info, snapshot, history)
+                self.segments[property_info['id']] = segment
+                rebuilt += 1
+                logger.info(f"Comparables index built: {property_info['id']} "
+                            f"({int(segment.current.sum())} current, {int((~segment.current).sum())} past)")
+        return rebuilt
+
+    def query(self, target_id: str, k: int = DEFAULT_K, include_past: bool = True,
+              scope: str = 'nearby') -> Optional[Dict[str, Any]]:
+        """
+        類似物件を検索する
+
+        Args:
+            target_id: 物件のID
+            k: 件数（上限 MAX_K）
+            include_past: 掲載終了した物件も含めるか
+            scope: building（同じマンションのみ）, nearby（所在地が同じマンションも含める）
+
+        Returns:
+            Dict: listing（指定した物件）, comparables（距離の昇順）。物件が見つからない場合はNone
+        """
+        if scope not in SCOPES:
+            raise ValueError(f"Invalid scope: {scope} (expected one of {', '.join(SCOPES)})")
+        k = max(1, min(k, MAX_K))
+
+        segments = dict(self.segments)
+        target = next(((segment, segment.position[target_id]) for segment in segments.values()
+                       if target_id in segment.position), None)
+        if target is None:
+            return None
+        target_segment, target_position = target
+        point = target_segment.features[target_position]
+
+        area = target_segment.property_info.get('area')
+        candidates = [segment for segment in segments.values()
+                      if segment is target_segment
+                      or (scope == 'nearby' and area and segment.property_info.get('area') == area)]
+
+        matches = []
+        for segment in candidates:
+            mask = None if include_past else segment.current.copy()
+            if segment is target_segment:
+                mask = np.ones(len(segment.ids), dtype=bool) if mask is None else mask
+                mask[target_position] = False
+            distances, positions = segment.tree.query(point, k, mask)
+            matches.extend((distance, segment, position)
+                           for distance, position in zip(distances.tolist(), positions.tolist()))
+        matches.sort(key=lambda match: match[0])
+
+        return {
+            'listing': target_segment.result(target_position),
+            'scope': scope,
+            'include_past': include_past,
+            'comparables': [segment.result(position, distance) for distance, segment, position in matches[:k]],
+        }
@@ -1,27 +1,135 @@
 """データ管理ユーティリティ"""
+import hashlib
 import json
 import os
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Any
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from utils.json_writer import AtomicWriter, dumps, write_json_atomic, write_snapshot
+from utils.listing import Listing, reference_year
+from utils.listing_history import DEFAULT_RETENTION_DAYS as DEFAULT_HISTORY_RETENTION_DAYS, ListingHistory
 from utils.logger import get_logger
+from utils.snapshot_delta import DEFAULT_WINDOW, DeltaStore
+from utils.snapshot_shards import write_shards
+from utils.stats import compute_stats
+from utils.timeseries import PriceTimeSeries
 
 
 logger = get_logger(__name__)
 
 
+# 管理費・修繕積立金として比較するフィールド
+FEE_FIELDS = ('management_fee', 'repair_reserve')
+
+# URLがない物件のキーに使うフィールド
+KEY_FIELDS = ('source', 'title', 'layout', 'price', 'area', 'floor', 'direction')
+
+# 変更履歴（changes.jsonl）を残す日数
+DEFAULT_CHANGES_RETENTION_DAYS = 365
+
+# 物件IDを求めるときに無視するクエリ（計測用）
+TRACKING_PARAM_PREFIXES = ('utm_', 'fbclid', 'gclid', 'yclid', '_ga')
+
+
+def snapshot_version(last_updated: str) -> str:
+    """
+    スナップショットのバージョンを求める（更新時刻をUTCのコンパクトな形式にしたもの）
+    
+    Args:
+        last_updated: 更新時刻（ISO 8601）
+    
+    Returns:
+        str: バージョン（例: "20251226222504"）、更新時刻がない場合はNone
+    """
+    if not last_updated:
+        return None
+    return datetime.fromisoformat(last_updated).astimezone(timezone.utc).strftime('%Y%m%d%H%M%S')
+
+
+def listing_key(listing: Listing) -> str:
+    """
+    物件を識別するキーを求める（マージ時の重複排除と同じくURLを優先）
+    
+    Args:
+        listing: 物件データ
+    
+    Returns:
+        str: キー（正規化したURL。URLがない場合は主要フィールドのハッシュ）
+    """
+    return record_key({name: getattr(listing, name) for name in ('url',) + KEY_FIELDS})
+
+
+def record_key(record: Dict[str, Any]) -> str:
+    """
+    物件データ（辞書）のキーを求める（listing_key と同じキー）
+    
+    Args:
+        record: 物件データ（Listing.to_dict() の形式）
+    
+    Returns:
+        str: キー（正規化したURL。URLがない場合は主要フィールドのハッシュ）
+    """
+    if record.get('url'):
+        return canonical_url(record['url'])
+    fields = [record.get(name) for name in KEY_FIELDS]
+    return 'hash:' + hashlib.sha1(json.dumps(fields, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def canonical_url(url: str) -> str:
+    """
+    URLを正規化する（同じページを指すURLが同じ文字列になるように）
+    
+    スキーム・ホストを小文字にし、フラグメントと計測用のクエリ（utm_* など）を除き、
+    残りのクエリをキーの順に並べ、パス末尾のスラッシュを除きます。
+    
+    Args:
+        url: URL
+    
+    Returns:
+        str: 正規化したURL
+    """
+    parts = urlsplit(url.strip())
+    query = sorted(
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not name.lower().startswith(TRACKING_PARAM_PREFIXES)
+    )
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip('/') or '/',
+                       urlencode(query), ''))
+
+
+def listing_id(key: str) -> str:
+    """
+    APIで物件を指定する安定したID（正規化したURL、URLがない場合は主要フィールドのハッシュから求める）
+    
+    Args:
+        key: listing_key / record_key で求めたキー
+    
+    Returns:
+        str: 16桁の16進数
+    """
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+
 class DataManager:
     """データの保存と管理を行うクラス"""
     
-    def __init__(self, property_config: Dict[str, Any], base_dir: str):
+    def __init__(self, property_config: Dict[str, Any], base_dir: str,
+                 delta_window: int = DEFAULT_WINDOW,
+                 changes_retention_days: int = DEFAULT_CHANGES_RETENTION_DAYS,
+                 history_retention_days: int = DEFAULT_HISTORY_RETENTION_DAYS):
         """
         初期化
         
         Args:
             property_config: マンション固有の設定情報
             base_dir: データベースディレクトリ
+            delta_window: 差分配信用に保持する過去バージョンの世代数
+            changes_retention_days: 変更履歴（changes.jsonl）を残す日数
+            history_retention_days: 掲載履歴（history.jsonl）に掲載が終了した物件を残す日数
         """
         self.property_id = property_config['id']
         self.property_name = property_config['name']
+        self.changes_retention_days = changes_retention_days
         
         # マンション固有のディレクトリパス
         property_data_dir = os.path.join(base_dir, self.property_id)
@@ -31,8 +139,15 @@ class DataManager:
         # ディレクトリの作成
         os.makedirs(self.raw_data_dir, exist_ok=True)
         os.makedirs(self.processed_data_dir, exist_ok=True)
+        
+        self.deltas = DeltaStore(self.processed_data_dir, delta_window)
+        self.history = ListingHistory(self.processed_data_dir, history_retention_days)
+        self.timeseries = PriceTimeSeries(self.processed_data_dir)
+        # 最後に公開した物件（キー -> 物件データ。アラートの照合では変更された物件だけを引く）
+        self.published_records: Dict[str, Dict[str, Any]] = {}
     
-    def save_raw_data(self, source: str, data: List[Dict[str, Any]], layout: str = None) -> str:
+    def save_raw_data(self, source: str, data: List[Listing], layout: str = None,
+                      timestamp: str = None) -> str:
         """
         生データを保存する（固定ファイル名で上書き）
         
@@ -40,6 +155,7 @@ class DataManager:
             source: データソース名（例: "suumo"）
             data: 物件データのリスト
             layout: 間取りタイプ（例: "2LDK"）
+            timestamp: 取得時刻（ISO 8601）。Noneの場合は現在時刻
         
         Returns:
             str: 保存したファイルパス
@@ -50,16 +166,13 @@ class DataManager:
             filename = f"{source}_latest.json"
         filepath = os.path.join(self.raw_data_dir, filename)
         
-        output_data = {
+        header = {
             'source': source,
             'layout': layout,
-            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'timestamp': timestamp or datetime.now(timezone.utc).isoformat(),
             'count': len(data),
-            'listings': data
         }
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(output_data, f, ensure_ascii=False, indent=2)
+        write_snapshot(filepath, header, 'listings', (listing.to_dict() for listing in data))
         
         logger.info(f"Raw data saved: {filepath} ({len(data)} listings)")
         return filepath
@@ -77,23 +190,23 @@ class DataManager:
         with open(filepath, 'r', encoding='utf-8') as f:
             return json.load(f)
     
-    def merge_data(self, data_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def merge_data(self, data_list: List[Dict[str, Any]]) -> List[Listing]:
         """
         複数のデータソースからのデータをマージし、重複を排除する
         
         Args:
-            data_list: データのリスト
+            data_list: データのリスト（source, listings）
         
         Returns:
-            List: マージされたデータ
+            List[Listing]: マージされたデータ
         """
         all_listings = []
         seen_urls = set()
         
         for data in data_list:
             for listing in data.get('listings', []):
-                url = listing.get('url')
-                # URLで重複チェック
+                # 正規化したURLで重複チェック（listing_key と同じ）
+                url = canonical_url(listing.url) if listing.url else None
                 if url and url not in seen_urls:
                     all_listings.append(listing)
                     seen_urls.add(url)
@@ -104,33 +217,256 @@ class DataManager:
         logger.info(f"Merged data: {len(all_listings)} unique listings from {len(data_list)} sources")
         return all_listings
     
-    def save_processed_data(self, data: List[Dict[str, Any]], property_name: str) -> str:
+    def save_processed_data(self, data: List[Listing], property_name: str,
+                            last_updated: str = None) -> str:
         """
         処理済みデータを保存する（固定ファイル名で上書き）
         
         Args:
             data: 統合された物件データのリスト
             property_name: 物件名
+            last_updated: 更新時刻（ISO 8601）。Noneの場合は現在時刻
         
         Returns:
             str: 保存したファイルパス
         """
         filename = "latest.json"
         filepath = os.path.join(self.processed_data_dir, filename)
+        last_updated = last_updated or datetime.now(timezone.utc).isoformat()
+        records = [listing.to_dict() for listing in data]
         
-        output_data = {
+        # 集計は公開時に一度だけ行う（latest.json より先に書き出す）
+        stats = {
             'property_name': property_name,
-            'last_updated': datetime.now(timezone.utc).isoformat(),
+            'last_updated': last_updated,
+            'stats': compute_stats(records),
+        }
+        write_json_atomic(os.path.join(self.processed_data_dir, 'stats.json'), stats)
+        
+        # 過去のバージョンからの差分・掲載履歴・m²単価の時系列も latest.json より先に書き出す
+        version = snapshot_version(last_updated)
+        entries = [(listing_key(listing), record) for listing, record in zip(data, records)]
+        self.deltas.publish(version, last_updated, property_name, entries)
+        self.history.publish(last_updated, entries)
+        self.timeseries.publish(last_updated, entries)
+        self.published_records = dict(entries)
+        
+        header = {
+            'property_name': property_name,
+            'last_updated': last_updated,
+            'version': version,
             'total_listings': len(data),
-            'listings': data
         }
+        # 間取り別・ソース別のシャードも latest.json より先に書き出す
+        write_shards(self.processed_data_dir, header, records)
+        
+        # 一時ファイルに書き出してからリネームで公開する（読み手が書きかけのファイルを読まないように）
+        size = write_snapshot(filepath, header, 'listings', records)
+        
+        logger.info(f"Processed data saved: {filepath} ({len(data)} listings, {size} bytes)")
+        return filepath
+    
+    def load_processed_data(self) -> Dict[str, Any]:
+        """
+        保存済みの処理済みデータを読み込む
+        
+        Returns:
+            Dict: データ（存在しない場合は空のデータ）
+        """
+        filepath = self.get_latest_processed_file()
+        if not filepath:
+            return {'listings': []}
+        with open(filepath, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def load_stats(self) -> Dict[str, Any]:
+        """
+        公開時に集計した統計を読み込む
+        
+        Returns:
+            Dict: 統計（存在しない場合は空の辞書）
+        """
+        filepath = os.path.join(self.processed_data_dir, 'stats.json')
+        if not os.path.exists(filepath):
+            return {}
+        with open(filepath, 'r', encoding='utf-8') as f:
+            return json.load(f).get('stats', {})
+    
+    def load_processed_listings(self) -> List[Listing]:
+        """
+        保存済みの処理済みデータを物件データのリストとして読み込む
+        
+        Returns:
+            List[Listing]: 物件データのリスト
+        """
+        data = self.load_processed_data()
+        year = reference_year(data.get('last_updated'))
+        return [Listing.from_dict(item, year) for item in data.get('listings', [])]
+    
+    def compute_changes(self, previous: List[Listing], current: List[Listing]) -> Dict[str, Any]:
+        """
+        前回と今回のスナップショットの差分（変更セット）を求める
+        
+        両スナップショットをキー→物件のハッシュマップにして1回ずつ走査するため、
+        物件数に対して線形時間で求まります。
+        
+        Args:
+            previous: 前回の物件データのリスト
+            current: 今回の物件データのリスト
+        
+        Returns:
+            Dict: 変更セット（new, removed, price_down, price_up, fee_changed と件数サマリー）
+        """
+        previous_map = {listing_key(l): l for l in previous}
+        current_map = {listing_key(l): l for l in current}
+        
+        changes = {
+            'new': [],
+            'removed': [],
+            'price_down': [],
+            'price_up': [],
+            'fee_changed': [],
+        }
+        unchanged = 0
+        
+        # 各変更はキー・物件IDと変わったフィールドだけを持つ（物件の内容は latest.json・掲載履歴から引く）
+        for key, listing in current_map.items():
+            before = previous_map.get(key)
+            if before is None:
+                changes['new'].append({'key': key, 'listing_id': listing_id(key)})
+                continue
+            
+            changed = False
+            old_price = before.price
+            new_price = listing.price
+            if old_price and new_price and old_price != new_price:
+                kind = 'price_down' if new_price < old_price else 'price_up'
+                changes[kind].append({
+                    'key': key,
+                    'listing_id': listing_id(key),
+                    'price_before': old_price,
+                    'price_after': new_price,
+                })
+                changed = True
+            
+            fee_diff = {
+                field: {'before': getattr(before, field), 'after': getattr(listing, field)}
+                for field in FEE_FIELDS
+                if getattr(before, field) != getattr(listing, field)
+            }
+            if fee_diff:
+                changes['fee_changed'].append({
+                    'key': key,
+                    'listing_id': listing_id(key),
+                    'fees': fee_diff,
+                })
+                changed = True
+            
+            if not changed:
+                unchanged += 1
+        
+        for key in previous_map:
+            if key not in current_map:
+                changes['removed'].append({'key': key, 'listing_id': listing_id(key)})
+        
+        changes['summary'] = {kind: len(items) for kind, items in changes.items()}
+        changes['summary']['unchanged'] = unchanged
+        return changes
+    
+    def detect_changes(self, current: List[Listing]) -> Dict[str, Any]:
+        """
+        保存済みの処理済みデータと今回のマージ結果から変更セットを求める
+        （save_processed_data で上書きする前に呼び出す）
         
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(output_data, f, ensure_ascii=False, indent=2)
+        new のうち掲載履歴にある物件には first_seen（初回掲載の時刻）を付けます。
         
-        logger.info(f"Processed data saved: {filepath} ({len(data)} listings)")
+        Args:
+            current: 今回のマージ結果
+        
+        Returns:
+            Dict: 変更セット
+        """
+        previous = self.load_processed_data()
+        year = reference_year(previous.get('last_updated'))
+        previous_listings = [Listing.from_dict(item, year) for item in previous.get('listings', [])]
+        changes = self.compute_changes(previous_listings, current)
+        # 掲載履歴にある物件は再掲載（取得の失敗などで一度消えたもの）として初回掲載の時刻を付ける
+        first_seen = self.history.first_seen(item['key'] for item in changes['new'])
+        for item in changes['new']:
+            if item['key'] in first_seen:
+                item['first_seen'] = first_seen[item['key']]
+        changes['previous_updated'] = previous.get('last_updated')
+        changes['previous_version'] = previous.get('version') or snapshot_version(previous.get('last_updated'))
+        return changes
+    
+    def save_changes(self, changes: Dict[str, Any], last_updated: str = None) -> str:
+        """
+        変更セットを保存する
+        
+        最新の実行分を changes.json に上書きし、実行履歴として changes.jsonl に1行追記します。
+        
+        Args:
+            changes: 変更セット
+            last_updated: 今回の更新時刻（ISO 8601）。Noneの場合は現在時刻
+        
+        Returns:
+            str: 保存したファイルパス（changes.json）
+        """
+        last_updated = last_updated or datetime.now(timezone.utc).isoformat()
+        output_data = dict(changes, last_updated=last_updated, version=snapshot_version(last_updated))
+        
+        filepath = os.path.join(self.processed_data_dir, 'changes.json')
+        write_json_atomic(filepath, output_data)
+        
+        history_path = os.path.join(self.processed_data_dir, 'changes.jsonl')
+        with open(history_path, 'ab') as f:
+            f.write(dumps(output_data) + b'\n')
+        self._prune_change_history(history_path, last_updated)
+        
+        summary = output_data['summary']
+        logger.info(
+            f"Changes saved: {filepath} (new {summary['new']}, removed {summary['removed']}, "
+            f"price down {summary['price_down']}, price up {summary['price_up']}, "
+            f"fee changed {summary['fee_changed']})"
+        )
         return filepath
     
+    def _prune_change_history(self, history_path: str, last_updated: str):
+        """
+        保持期間（changes_retention_days）より古い実行の変更を changes.jsonl から削除する
+        
+        壊れた行（書きかけの行など）は期限切れとみなして削除します（公開は止めない）。
+        
+        Args:
+            history_path: changes.jsonl のパス
+            last_updated: 今回の更新時刻（ISO 8601）
+        """
+        cutoff = datetime.fromisoformat(last_updated) - timedelta(days=self.changes_retention_days)
+        invalid = 0
+        
+        def keep(line: bytes) -> bool:
+            nonlocal invalid
+            try:
+                run_at = json.loads(line).get('last_updated')
+                return bool(run_at) and datetime.fromisoformat(run_at) >= cutoff
+            except (ValueError, TypeError, AttributeError):
+                invalid += 1
+                return False
+        
+        with open(history_path, 'rb') as f:
+            first = f.readline()
+            # 先頭の行（最も古い実行）が保持期間内であれば何もしない
+            if not first.strip() or keep(first):
+                return
+            f.seek(0)
+            invalid = 0
+            kept = [line for line in f if line.strip() and keep(line)]
+        with AtomicWriter(history_path) as f:
+            f.writelines(kept)
+        if invalid:
+            logger.warning(f"Dropped {invalid} invalid lines from change history {history_path}")
+        logger.info(f"Change history pruned: {history_path} ({len(kept)} runs kept)")
+    
     def get_latest_processed_file(self) -> str:
         """
         最新の処理済みファイルを取得する
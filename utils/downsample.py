@@ -0,0 +1,103 @@
+"""グラフ表示用の時系列の間引き
+
+長い期間の時系列を、グラフの形を保ったまま指定した点数以下に減らします。
+どちらの方法も残す点の位置（インデックス）を返すため、元の点の付随する値もそのまま使えます。
+
+- lttb: Largest-Triangle-Three-Buckets。隣り合うバケツの点と作る三角形の面積が
+  最大になる点を各バケツから1つ選ぶ（全体の形を保つ）
+- minmax: 各バケツの最小値と最大値の点を残す（山・谷を必ず残す）
+"""
+import numpy as np
+
+
+METHODS = ('lttb', 'minmax')
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    LTTB で間引く
+
+    Args:
+        x: X座標（昇順）
+        y: Y座標
+        threshold: 残す点の最大数
+
+    Returns:
+        np.ndarray: 残す点のインデックス（昇順。最初と最後の点は必ず残す）
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if threshold >= n:
+        return np.arange(n)
+    if threshold < 3:
+        return np.array([0, n - 1])[:max(threshold, 1)]
+
+    # 最初と最後を除いた点を threshold - 2 個のバケツに分ける
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], max(edges[bucket + 1], edges[bucket] + 1)
+        # 次のバケツの平均（最後のバケツは最後の点）
+        next_start, next_end = end, (edges[bucket + 2] if bucket + 2 < len(edges) else n)
+        if next_start >= next_end:
+            next_start, next_end = n - 1, n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        # 前に選んだ点・次のバケツの平均と作る三角形の面積（の2倍）
+        area = np.abs((x[previous] - avg_x) * (y[start:end] - y[previous])
+                      - (x[previous] - x[start:end]) * (avg_y - y[previous]))
+        previous = start + int(np.argmax(area))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def minmax(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    バケツごとの最小値・最大値で間引く
+
+    Args:
+        x: X座標（昇順）
+        y: Y座標
+        threshold: 残す点の最大数
+
+    Returns:
+        np.ndarray: 残す点のインデックス（昇順）
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if threshold >= n:
+        return np.arange(n)
+    buckets = max(threshold // 2, 1)
+    edges = np.linspace(0, n, buckets + 1).astype(np.int64)
+    selected = []
+    for start, end in zip(edges[:-1], edges[1:]):
+        if start >= end:
+            continue
+        block = y[start:end]
+        selected.append(start + int(np.argmin(block)))
+        selected.append(start + int(np.argmax(block)))
+    return np.unique(np.array(selected, dtype=np.int64))[:threshold]
+
+
+def downsample(x: np.ndarray, y: np.ndarray, threshold: int, method: str = 'lttb') -> np.ndarray:
+    """
+    指定した方法で間引く
+
+    Args:
+        x: X座標（昇順）
+        y: Y座標
+        threshold: 残す点の最大数
+        method: lttb または minmax
+
+    Returns:
+        np.ndarray: 残す点のインデックス（昇順）
+    """
+    if method == 'lttb':
+        return lttb(x, y, threshold)
+    if method == 'minmax':
+        return minmax(x, y, threshold)
+    raise ValueError(f"Invalid method: {method} (expected one of {', '.join(METHODS)})")
@@ -0,0 +1,173 @@
+"""レスポンス本文の事前圧縮とETag
+
+スナップショットごとに一度だけ gzip / Brotli の圧縮版とETagを作っておき、
+リクエスト時は Accept-Encoding に応じて選ぶだけにします。
+Brotli は brotli パッケージがインストールされている場合のみ使用します。
+"""
+import gzip
+import hashlib
+from typing import Dict, Optional, Tuple, Union
+
+try:
+    import brotli
+except ImportError:  # 任意の依存関係
+    brotli = None
+
+
+# 優先順（サーバー側の好み）
+ENCODINGS = ('br', 'gzip')
+
+# 小さい本文は圧縮しても効果がないためそのまま返す
+MIN_COMPRESS_SIZE = 1024
+
+
+def compress_variants(body: bytes, gzip_level: int = 9,
+                      brotli_quality: int = 9) -> Tuple[str, Dict[Optional[str], bytes]]:
+    """
+    本文のダイジェストと各エンコーディングの圧縮版を作る
+
+    Args:
+        body: 非圧縮の本文
+        gzip_level: gzipの圧縮レベル
+        brotli_quality: Brotliの品質
+
+    Returns:
+        Tuple: (ダイジェスト, エンコーディング（非圧縮はNone） -> 本文)
+    """
+    digest = hashlib.sha256(body).hexdigest()[:32]
+    variants: Dict[Optional[str], bytes] = {None: body}
+    if len(body) >= MIN_COMPRESS_SIZE:
+        variants['gzip'] = gzip.compress(body, compresslevel=gzip_level, mtime=0)
+        if brotli is not None:
+            variants['br'] = brotli.compress(body, quality=brotli_quality)
+    return digest, variants
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """
+    Accept-Encoding ヘッダーを エンコーディング -> q値 の辞書にする
+
+    Args:
+        header: Accept-Encoding ヘッダーの値
+
+    Returns:
+        Dict[str, float]: エンコーディング -> q値
+    """
+    accepted = {}
+    for part in header.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, params = part.partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    return accepted
+
+
+def parse_etags(header: str) -> Tuple[str, ...]:
+    """
+    If-None-Match ヘッダーのETag一覧を取得する（弱いETagの W/ は外す）
+
+    Args:
+        header: If-None-Match ヘッダーの値
+
+    Returns:
+        Tuple[str, ...]: ETagのタプル
+    """
+    tags = []
+    for part in header.split(','):
+        part = part.strip()
+        if part.startswith('W/'):
+            part = part[2:]
+        if part:
+            tags.append(part)
+    return tuple(tags)
+
+
+class EncodedBody:
+    """圧縮済みの各エンコーディングとETagを持つレスポンス本文"""
+
+    def __init__(self, body: bytes, gzip_level: int = 9, brotli_quality: int = 9):
+        """
+        初期化（圧縮はここで一度だけ行う）
+
+        Args:
+            body: 非圧縮の本文
+            gzip_level: gzipの圧縮レベル
+            brotli_quality: Brotliの品質
+        """
+        self._set_variants(*compress_variants(body, gzip_level, brotli_quality))
+
+    @classmethod
+    def from_variants(cls, digest: str,
+                      variants: Dict[Optional[str], Union[bytes, memoryview]]) -> 'EncodedBody':
+        """
+        圧縮済みの本文から作る（メモリマップ上のビューをコピーせずに使う場合など）
+
+        Args:
+            digest: 非圧縮の本文のダイジェスト
+            variants: エンコーディング（非圧縮はNone） -> 本文
+
+        Returns:
+            EncodedBody: レスポンス本文
+        """
+        encoded = cls.__new__(cls)
+        encoded._set_variants(digest, variants)
+        return encoded
+
+    def _set_variants(self, digest: str, variants: Dict[Optional[str], Union[bytes, memoryview]]):
+        self.digest = digest
+        self.variants = variants
+        self.etags: Dict[Optional[str], str] = {
+            encoding: f'"{digest}"' if encoding is None else f'"{digest}-{encoding}"'
+            for encoding in variants
+        }
+
+    @property
+    def etag(self) -> str:
+        """非圧縮版のETag"""
+        return self.etags[None]
+
+    def select(self, accept_encoding: str) -> Tuple[Optional[str], bytes, str]:
+        """
+        Accept-Encoding に応じて返す本文を選ぶ
+
+        Args:
+            accept_encoding: Accept-Encoding ヘッダーの値
+
+        Returns:
+            Tuple: (Content-Encoding（非圧縮はNone）, 本文, ETag)
+        """
+        accepted = parse_accept_encoding(accept_encoding or '')
+        best = None
+        best_q = 0.0
+        for encoding in ENCODINGS:
+            if encoding not in self.variants:
+                continue
+            q = accepted.get(encoding, accepted.get('*', 0.0))
+            if q > best_q:
+                best, best_q = encoding, q
+        return best, self.variants[best], self.etags[best]
+
+    def matches(self, if_none_match: str) -> bool:
+        """
+        If-None-Match がいずれかのエンコーディングのETagと一致するか判定する
+
+        Args:
+            if_none_match: If-None-Match ヘッダーの値
+
+        Returns:
+            bool: 一致する場合True（304を返してよい）
+        """
+        if not if_none_match:
+            return False
+        tags = parse_etags(if_none_match)
+        if '*' in tags:
+            return True
+        return any(tag in tags for tag in self.etags.values())
@@ -0,0 +1,403 @@
+"""物件データのエクスポート（CSV / JSON Lines / Parquet）
+
+公開済みのスナップショット・掲載履歴（history.jsonl）・変更履歴（changes.jsonl）から、
+絞り込んだ行を1行ずつ作り、一定の行数ごとにエンコードして返します。
+掲載履歴と変更履歴はファイルを1行ずつ読むため、結果全体をメモリに持ちません
+（変更履歴は変更された物件の内容だけを掲載履歴から引いておきます）。
+
+Parquet は pyarrow がインストールされている場合のみ使用できます（行グループごとに出力します）。
+"""
+import csv
+import io
+import json
+import os
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # 任意の依存関係
+    pyarrow = None
+
+from utils.data_manager import listing_id, record_key
+from utils.json_writer import dumps
+from utils.listing_history import ListingHistory
+
+
+# 形式 -> (Content-Type, 拡張子)
+FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+# snapshot: 現在の物件, history: 掲載履歴（掲載終了した物件を含む）, changes: 実行ごとの変更
+DATASETS = ('snapshot', 'history', 'changes')
+
+LISTING_COLUMNS = ('listing_id', 'source', 'title', 'url', 'layout', 'price', 'area', 'floor', 'direction',
+                   'built_year', 'management_fee', 'repair_reserve', 'posted_date')
+
+COLUMNS = {
+    'snapshot': ('property_id',) + LISTING_COLUMNS,
+    'history': ('property_id',) + LISTING_COLUMNS + ('status', 'first_seen', 'last_seen'),
+    'changes': ('property_id', 'changed_at', 'event') + LISTING_COLUMNS + ('price_before', 'price_after'),
+}
+
+INT_COLUMNS = {'price', 'floor', 'built_year', 'management_fee', 'repair_reserve',
+               'price_before', 'price_after'}
+FLOAT_COLUMNS = {'area'}
+
+# 変更履歴のうちエクスポートする変更の種類
+CHANGE_EVENTS = ('new', 'removed', 'price_down', 'price_up', 'fee_changed')
+
+# まとめてエンコードする行数（Parquet では行グループの大きさ）
+CHUNK_ROWS = 2000
+
+# 期間は日本時間で区切る
+JST = timezone(timedelta(hours=9))
+
+
+class ExportFilter:
+    """エクスポートする行の条件"""
+
+    def __init__(self, layouts: Optional[List[str]] = None, sources: Optional[List[str]] = None,
+                 min_price: Optional[int] = None, max_price: Optional[int] = None,
+                 min_area: Optional[float] = None, max_area: Optional[float] = None,
+                 min_floor: Optional[int] = None, max_floor: Optional[int] = None,
+                 start: Optional[str] = None, end: Optional[str] = None):
+        """
+        初期化
+
+        Args:
+            layouts: 間取り（いずれかに一致）
+            sources: データソース（いずれかに一致）
+            min_price, max_price: 価格の範囲（円）
+            min_area, max_area: 面積の範囲（m²）
+            min_floor, max_floor: 階数の範囲
+            start, end: 期間（YYYY-MM-DD、日本時間、両端の日を含む）
+        """
+        self.layouts = set(layouts) if layouts else None
+        self.sources = set(sources) if sources else None
+        self.ranges = [(name, low, high) for name, low, high in (
+            ('price', min_price, max_price), ('area', min_area, max_area), ('floor', min_floor, max_floor),
+        ) if low is not None or high is not None]
+        self.start = self._day_start(start)
+        self.end = self._day_start(end) + timedelta(days=1) if end else None
+
+    @property
+    def has_period(self) -> bool:
+        return self.start is not None or self.end is not None
+
+    @staticmethod
+    def _day_start(value: Optional[str]) -> Optional[datetime]:
+        if not value:
+            return None
+        try:
+            return datetime.combine(date.fromisoformat(value), time.min, tzinfo=JST)
+        except ValueError:
+            raise ValueError(f"Invalid date: {value} (expected YYYY-MM-DD)") from None
+
+    def matches(self, listing: Dict[str, Any]) -> bool:
+        """物件が間取り・ソース・範囲の条件に一致するか"""
+        if self.layouts is not None and listing.get('layout') not in self.layouts:
+            return False
+        if self.sources is not None and listing.get('source') not in self.sources:
+            return False
+        for name, low, high in self.ranges:
+            value = listing.get(name)
+            if value is None or (low is not None and value < low) or (high is not None and value > high):
+                return False
+        return True
+
+    def overlaps(self, first: Optional[str], last: Optional[str]) -> bool:
+        """時刻の範囲 [first, last] が期間と重なるか（期間の指定がない場合は常にTrue）"""
+        if not self.has_period:
+            return True
+        if not first or not last:
+            return False
+        if self.end is not None and datetime.fromisoformat(first) >= self.end:
+            return False
+        if self.start is not None and datetime.fromisoformat(last) < self.start:
+            return False
+        return True
+
+
+def _listing_row(property_id: str, key: str, listing: Dict[str, Any]) -> Dict[str, Any]:
+    row = {name: listing.get(name) for name in LISTING_COLUMNS}
+    row['listing_id'] = listing_id(key)
+    row['property_id'] = property_id
+    return row
+
+
+def snapshot_rows(property_id: str, listings: Iterable[Dict[str, Any]],
+                  filters: ExportFilter) -> Iterator[Dict[str, Any]]:
+    """
+    スナップショットの物件を行にする
+
+    Args:
+        property_id: マンションID
+        listings: スナップショットの物件データ
+        filters: 条件（期間は使わない）
+
+    Returns:
+        Iterator[Dict]: 行（COLUMNS['snapshot']）
+    """
+    for listing in listings:
+        if filters.matches(listing):
+            yield _listing_row(property_id, record_key(listing), listing)
+
+
+def history_rows(property_id: str, entries: Iterable[Dict[str, Any]], last_updated: Optional[str],
+                 filters: ExportFilter) -> Iterator[Dict[str, Any]]:
+    """
+    掲載履歴の物件を行にする（期間は掲載期間と重なるもの）
+
+    Args:
+        property_id: マンションID
+        entries: ListingHistory.stream() の物件
+        last_updated: 掲載履歴の最後の公開時刻（最終掲載がこの時刻の物件を掲載中とする）
+        filters: 条件
+
+    Returns:
+        Iterator[Dict]: 行（COLUMNS['history']）
+    """
+    for entry in entries:
+        listing = entry['listing']
+        if not filters.matches(listing) or not filters.overlaps(entry.get('first_seen'), entry.get('last_seen')):
+            continue
+        row = _listing_row(property_id, entry['key'], listing)
+        row['status'] = 'current' if entry.get('last_seen') == last_updated else 'past'
+        row['first_seen'] = entry.get('first_seen')
+        row['last_seen'] = entry.get('last_seen')
+        yield row
+
+
+def _changes_in_range(lines: Iterable[str], filters: ExportFilter) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """変更履歴の各行のうち期間内のものを (実行時刻, 変更セット) にする"""
+    for line in lines:
+        if not line.strip():
+            continue
+        changes = json.loads(line)
+        changed_at = changes.get('last_updated')
+        if filters.overlaps(changed_at, changed_at):
+            yield changed_at, changes
+
+
+def changed_keys(lines: Iterable[str], filters: ExportFilter) -> set:
+    """
+    期間内に変更された物件のキーを集める（change_rows で物件の内容を引くため）
+
+    Args:
+        lines: changes.jsonl の行
+        filters: 条件（期間は実行時刻）
+
+    Returns:
+        set: 物件のキー
+    """
+    return {
+        item['key']
+        for _, changes in _changes_in_range(lines, filters)
+        for event in CHANGE_EVENTS
+        for item in changes.get(event, [])
+        if 'key' in item
+    }
+
+
+def change_rows(property_id: str, lines: Iterable[str], filters: ExportFilter,
+                listings: Optional[Dict[str, Dict[str, Any]]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    変更履歴（changes.jsonl の各行）を変更ごとの行にする
+
+    Args:
+        property_id: マンションID
+        lines: changes.jsonl の行
+        filters: 条件（期間は実行時刻）
+        listings: キー -> 物件データ（変更はキーと変わったフィールドだけを持つため、物件の内容はここから引く）
+
+    Returns:
+        Iterator[Dict]: 行（COLUMNS['changes']）
+    """
+    listings = listings or {}
+    for changed_at, changes in _changes_in_range(lines, filters):
+        for event in CHANGE_EVENTS:
+            for item in changes.get(event, []):
+                # 以前の形式の変更は物件データそのもの（new, removed）か listing に物件データを持つ
+                listing = listings.get(item.get('key')) or item.get('listing') or item
+                if not filters.matches(listing):
+                    continue
+                row = _listing_row(property_id, item.get('key') or record_key(listing), listing)
+                row['changed_at'] = changed_at
+                row['event'] = event
+                row['price_before'] = item.get('price_before')
+                row['price_after'] = item.get('price_after')
+                yield row
+
+
+def _read_lines(filepath: str) -> Iterator[str]:
+    """ファイルを1行ずつ読む（ない場合は何も返さない）"""
+    try:
+        f = open(filepath, 'r', encoding='utf-8')
+    except FileNotFoundError:
+        return
+    with f:
+        yield from f
+
+
+def dataset_rows(dataset: str, property_id: str, processed_data_dir: str, filters: ExportFilter,
+                 listings: Optional[Iterable[Dict[str, Any]]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    エクスポート元の行を1行ずつ作る
+
+    Args:
+        dataset: エクスポート元（snapshot, history, changes）
+        property_id: マンションID
+        processed_data_dir: 処理済みデータのディレクトリ
+        filters: 条件
+        listings: スナップショットの物件データ（dataset=snapshot の場合）
+
+    Returns:
+        Iterator[Dict]: 行
+    """
+    if dataset == 'snapshot':
+        yield from snapshot_rows(property_id, listings or [], filters)
+    elif dataset == 'history':
+        last_updated, entries = ListingHistory(processed_data_dir).stream()
+        yield from history_rows(property_id, entries, last_updated, filters)
+    elif dataset == 'changes':
+        changes_path = os.path.join(processed_data_dir, 'changes.jsonl')
+        # 変更された物件の内容だけを掲載履歴から引いてから、変更履歴をもう一度読む
+        keys = changed_keys(_read_lines(changes_path), filters)
+        _, entries = ListingHistory(processed_data_dir).stream()
+        resolved = {entry['key']: entry['listing'] for entry in entries if entry.get('key') in keys}
+        yield from change_rows(property_id, _read_lines(changes_path), filters, resolved)
+    else:
+        raise ValueError(f"Invalid dataset: {dataset} (expected one of {', '.join(DATASETS)})")
+
+
+def _chunks(rows: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def encode_csv(rows: Iterable[Dict[str, Any]], columns: Tuple[str, ...]) -> Iterator[bytes]:
+    """行を CSV（ヘッダー付き、UTF-8）にエンコードする"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(columns)
+    for chunk in _chunks(rows, CHUNK_ROWS):
+        writer.writerows([row.get(name) for name in columns] for row in chunk)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # 行がない場合のヘッダー
+        yield buffer.getvalue().encode('utf-8')
+
+
+def encode_jsonl(rows: Iterable[Dict[str, Any]], columns: Tuple[str, ...]) -> Iterator[bytes]:
+    """行を JSON Lines にエンコードする"""
+    for chunk in _chunks(rows, CHUNK_ROWS):
+        yield b''.join(dumps({name: row.get(name) for name in columns}) + b'\n' for row in chunk)
+
+
+class _StreamSink:
+    """ParquetWriter の書き込み先（書かれたバイト列を drain() で取り出す）"""
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def _parquet_schema(columns: Tuple[str, ...]):
+    def column_type(name):
+        if name in INT_COLUMNS:
+            return pyarrow.int64()
+        if name in FLOAT_COLUMNS:
+            return pyarrow.float64()
+        return pyarrow.string()
+    return pyarrow.schema([(name, column_type(name)) for name in columns])
+
+
+def encode_parquet(rows: Iterable[Dict[str, Any]], columns: Tuple[str, ...]) -> Iterator[bytes]:
+    """行を Parquet（CHUNK_ROWS 行ごとの行グループ）にエンコードする"""
+    if pyarrow is None:
+        raise ValueError("Parquet export requires pyarrow (pip install pyarrow)")
+    schema = _parquet_schema(columns)
+    sink = _StreamSink()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema, compression='zstd')
+    try:
+        for chunk in _chunks(rows, CHUNK_ROWS):
+            writer.write_table(pyarrow.Table.from_pylist(chunk, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+ENCODERS = {
+    'csv': encode_csv,
+    'jsonl': encode_jsonl,
+    'parquet': encode_parquet,
+}
+
+
+def check_export(fmt: str, dataset: str, filters: ExportFilter):
+    """
+    エクスポートの指定を確認する（ストリーミングを始める前に呼び出す）
+
+    Args:
+        fmt: 形式（csv, jsonl, parquet）
+        dataset: エクスポート元（snapshot, history, changes）
+        filters: 条件
+    """
+    if dataset not in DATASETS:
+        raise ValueError(f"Invalid dataset: {dataset} (expected one of {', '.join(DATASETS)})")
+    if dataset == 'snapshot' and filters.has_period:
+        raise ValueError("start/end are only supported for dataset=history or dataset=changes")
+    if fmt not in FORMATS:
+        raise ValueError(f"Invalid format: {fmt} (expected one of {', '.join(FORMATS)})")
+    if fmt == 'parquet' and pyarrow is None:
+        raise ValueError("Parquet export requires pyarrow (pip install pyarrow)")
+
+
+def encode_rows(rows: Iterable[Dict[str, Any]], dataset: str, fmt: str) -> Iterator[bytes]:
+    """
+    行を指定した形式にエンコードする（一定の行数ごとに返す）
+
+    Args:
+        rows: 行
+        dataset: エクスポート元（列の決定に使う）
+        fmt: 形式
+
+    Returns:
+        Iterator[bytes]: エンコードしたデータ
+    """
+    return ENCODERS[fmt](rows, COLUMNS[dataset])
@@ -0,0 +1,87 @@
+"""区間の検索用の中心区間木（centered interval tree）
+
+静的な閉区間 [low, high] の集合から、値を含む区間を O(log n + 件数) で求めます。
+各ノードは中心の値と、中心を含む区間を 下端の昇順・上端の降順 に並べたリストを持ち、
+中心より左（右）に収まる区間は左（右）の子に入れます。
+"""
+from typing import Any, List, Optional, Sequence, Tuple
+
+
+class _Node:
+    """中心区間木のノード"""
+
+    __slots__ = ('center', 'by_low', 'by_high', 'left', 'right')
+
+    def __init__(self, center: float, by_low, by_high, left, right):
+        self.center = center
+        self.by_low = by_low
+        self.by_high = by_high
+        self.left = left
+        self.right = right
+
+
+class IntervalTree:
+    """静的な区間の集合（区間が変わった場合は作り直す）"""
+
+    def __init__(self, intervals: Sequence[Tuple[float, float, Any]]):
+        """
+        初期化（木を作る）
+
+        Args:
+            intervals: (下端, 上端, 値) のリスト（両端を含む。上限・下限がない場合は ±inf）
+        """
+        self.size = len(intervals)
+        self._root = self._build([i for i in intervals if i[0] <= i[1]])
+
+    def _build(self, intervals: List[Tuple[float, float, Any]]) -> Optional[_Node]:
+        if not intervals:
+            return None
+        # 端点の中央値を中心にする（無限大の端点は除く）
+        points = sorted(p for low, high, _ in intervals for p in (low, high) if abs(p) != float('inf'))
+        center = points[len(points) // 2] if points else 0.0
+
+        left, right, middle = [], [], []
+        for interval in intervals:
+            if interval[1] < center:
+                left.append(interval)
+            elif interval[0] > center:
+                right.append(interval)
+            else:
+                middle.append(interval)
+        return _Node(
+            center,
+            sorted(middle, key=lambda i: i[0]),
+            sorted(middle, key=lambda i: i[1], reverse=True),
+            self._build(left),
+            self._build(right),
+        )
+
+    def query(self, point: float) -> List[Any]:
+        """
+        値を含む区間を求める
+
+        Args:
+            point: 値
+
+        Returns:
+            List: 値を含む区間の値
+        """
+        found = []
+        node = self._root
+        while node is not None:
+            if point < node.center:
+                for low, _, value in node.by_low:
+                    if low > point:
+                        break
+                    found.append(value)
+                node = node.left
+            elif point > node.center:
+                for _, high, value in node.by_high:
+                    if high < point:
+                        break
+                    found.append(value)
+                node = node.right
+            else:
+                found.extend(value for _, _, value in node.by_low)
+                break
+        return found
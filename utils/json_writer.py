@@ -0,0 +1,166 @@
+"""JSONファイルの書き出しユーティリティ
+
+物件データを1件ずつコンパクトな形式で書き出し、一時ファイルからのアトミックな
+リネームで公開します。読み手（server.py など）が書き込み途中のファイルを
+読むことはありません。orjson がインストールされていればエンコードに使用します。
+"""
+import json
+import os
+import tempfile
+from typing import Any, Dict, Iterable, Iterator
+
+try:
+    import orjson
+except ImportError:  # 任意の依存関係
+    orjson = None
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    オブジェクトをコンパクトなJSON（UTF-8）にエンコードする
+
+    Args:
+        obj: エンコードするオブジェクト
+
+    Returns:
+        bytes: JSONのバイト列
+    """
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _current_umask() -> int:
+    """プロセスの umask（os.umask は設定と同時にしか読めないため、読んだ値をすぐに戻す）"""
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+# 新しく作るファイルのパーミッション（通常の open() で作った場合と同じ）
+_DEFAULT_MODE = 0o666 & ~_current_umask()
+
+
+def _fsync_directory(directory: str):
+    """リネームを永続化するためにディレクトリを fsync する（対応していないOSでは何もしない）"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class AtomicWriter:
+    """
+    同じディレクトリの一時ファイルに書き込み、完了時に os.replace で置き換えるファイル
+
+    with文で使用し、例外が発生した場合は一時ファイルを削除して元のファイルを残します。
+    mkstemp の一時ファイルは 0600 で作られるため、置き換える前に既存のファイルと同じ
+    （新規の場合は umask に従った）パーミッションにし、リネーム後にディレクトリを fsync します。
+    """
+
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+        self._fp = None
+        self._tmp_path = None
+
+    def __enter__(self):
+        directory = os.path.dirname(self.filepath) or '.'
+        fd, self._tmp_path = tempfile.mkstemp(
+            dir=directory, prefix=f".{os.path.basename(self.filepath)}.", suffix='.tmp'
+        )
+        self._fp = os.fdopen(fd, 'wb')
+        return self._fp
+
+    def _target_mode(self) -> int:
+        try:
+            return os.stat(self.filepath).st_mode & 0o777
+        except FileNotFoundError:
+            return _DEFAULT_MODE
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self._fp.flush()
+                if hasattr(os, 'fchmod'):
+                    os.fchmod(self._fp.fileno(), self._target_mode())
+                os.fsync(self._fp.fileno())
+            self._fp.close()
+            if exc_type is None:
+                os.replace(self._tmp_path, self.filepath)
+                _fsync_directory(os.path.dirname(self.filepath) or '.')
+        finally:
+            if os.path.exists(self._tmp_path):
+                os.remove(self._tmp_path)
+        return False
+
+
+def write_json_atomic(filepath: str, obj: Any):
+    """
+    JSONをコンパクトな形式でアトミックに書き出す
+
+    Args:
+        filepath: 出力先のパス
+        obj: 書き出すオブジェクト
+    """
+    with AtomicWriter(filepath) as f:
+        f.write(dumps(obj))
+
+
+def _snapshot_chunks(header: Dict[str, Any], items_key: str,
+                     items: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """ヘッダーと配列からなるJSONを、1件ずつエンコードしながら返す（1物件1行）"""
+    head = dumps(header)
+    # "{...}" の閉じ括弧を外して配列を続ける
+    if head == b'{}':
+        yield b'{' + dumps(items_key) + b':['
+    else:
+        yield head[:-1] + b',' + dumps(items_key) + b':['
+
+    first = True
+    for item in items:
+        yield (b'\n' if first else b',\n') + dumps(item)
+        first = False
+    yield b'\n]}\n'
+
+
+def encode_snapshot(header: Dict[str, Any], items_key: str, items: Iterable[Dict[str, Any]]) -> bytes:
+    """
+    ヘッダーと物件データの配列からなるJSONを write_snapshot と同じ形式でエンコードする
+
+    Args:
+        header: 配列より前に出力するフィールド
+        items_key: 配列のキー（例: "listings"）
+        items: 配列の要素（イテレータ可）
+
+    Returns:
+        bytes: JSON
+    """
+    return b''.join(_snapshot_chunks(header, items_key, items))
+
+
+def write_snapshot(filepath: str, header: Dict[str, Any], items_key: str,
+                   items: Iterable[Dict[str, Any]]) -> int:
+    """
+    ヘッダーと物件データの配列からなるJSONを、1件ずつエンコードしながらアトミックに書き出す
+
+    出力は1物件1行のコンパクトな形式です（全体は通常のJSONとして読み込めます）。
+
+    Args:
+        filepath: 出力先のパス
+        header: 配列より前に出力するフィールド
+        items_key: 配列のキー（例: "listings"）
+        items: 配列の要素（イテレータ可）
+
+    Returns:
+        int: 書き出したバイト数
+    """
+    with AtomicWriter(filepath) as f:
+        for chunk in _snapshot_chunks(header, items_key, items):
+            f.write(chunk)
+        return f.tell()
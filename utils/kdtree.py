@@ -0,0 +1,127 @@
+"""k近傍探索用の KD-tree（NumPy）
+
+点を座標の範囲が最も広い次元の中央値で再帰的に分割し、各ノードの外接矩形を持ちます。
+探索は点から矩形までの距離が近いノードから順に調べ（best-first）、
+k番目に近い点より遠い矩形は調べません。葉の中の距離はまとめてベクトル演算で求めます。
+"""
+import heapq
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+DEFAULT_LEAF_SIZE = 32
+
+
+class KDTree:
+    """静的な点集合の KD-tree（点が変わった場合は作り直す）"""
+
+    def __init__(self, points: np.ndarray, leaf_size: int = DEFAULT_LEAF_SIZE):
+        """
+        初期化（木を作る）
+
+        Args:
+            points: 点の座標 (n, d)
+            leaf_size: 葉に入れる点の最大数
+        """
+        points = np.asarray(points, dtype=np.float64)
+        if points.ndim != 2:
+            raise ValueError(f"points must be 2-dimensional, got shape {points.shape}")
+        self.n, self.dims = points.shape
+        self.leaf_size = max(1, leaf_size)
+        # 葉の点が連続するように並べ替えた座標と、元の位置
+        self.order = np.arange(self.n)
+        self.points = points
+
+        # ノードごとの [start, end) と子ノード（葉は -1）、外接矩形
+        self._start: List[int] = []
+        self._end: List[int] = []
+        self._left: List[int] = []
+        self._right: List[int] = []
+        bounds = {}
+
+        if self.n:
+            stack = [(0, self.n, self._new_node())]
+            while stack:
+                start, end, node = stack.pop()
+                block = self.points[self.order[start:end]]
+                low, high = block.min(axis=0), block.max(axis=0)
+                bounds[node] = (low, high)
+                self._start[node], self._end[node] = start, end
+                if end - start <= self.leaf_size:
+                    continue
+                dim = int(np.argmax(high - low))
+                if high[dim] == low[dim]:
+                    # すべて同じ点の場合は分割しない
+                    continue
+                mid = (start + end) // 2
+                part = np.argpartition(block[:, dim], mid - start)
+                self.order[start:end] = self.order[start:end][part]
+                left, right = self._new_node(), self._new_node()
+                self._left[node], self._right[node] = left, right
+                stack.append((start, mid, left))
+                stack.append((mid, end, right))
+
+        self._low = np.zeros((len(self._start), self.dims))
+        self._high = np.zeros((len(self._start), self.dims))
+        for node, (low, high) in bounds.items():
+            self._low[node] = low
+            self._high[node] = high
+        self._sorted = self.points[self.order]
+
+    def _new_node(self) -> int:
+        self._start.append(0)
+        self._end.append(0)
+        self._left.append(-1)
+        self._right.append(-1)
+        return len(self._start) - 1
+
+    def _box_distance(self, node: int, point: np.ndarray) -> float:
+        gap = np.maximum(self._low[node] - point, 0.0) + np.maximum(point - self._high[node], 0.0)
+        return float(np.sqrt(gap @ gap))
+
+    def query(self, point: np.ndarray, k: int,
+              mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        k近傍を求める
+
+        Args:
+            point: 検索する点 (d,)
+            k: 件数
+            mask: 対象にする点（元の位置の真偽値 (n,)、省略時はすべて）
+
+        Returns:
+            Tuple: (距離の昇順の距離, 元の位置)（対象の点が k 件未満の場合はその件数）
+        """
+        point = np.asarray(point, dtype=np.float64)
+        if self.n == 0 or k <= 0:
+            return np.zeros(0), np.zeros(0, dtype=np.int64)
+
+        # 見つかった点（距離の符号を反転した最大ヒープ）
+        best: List[Tuple[float, int]] = []
+        queue = [(self._box_distance(0, point), 0)]
+        while queue:
+            box_distance, node = heapq.heappop(queue)
+            if len(best) == k and box_distance > -best[0][0]:
+                break
+            left = self._left[node]
+            if left >= 0:
+                for child in (left, self._right[node]):
+                    heapq.heappush(queue, (self._box_distance(child, point), child))
+                continue
+
+            start, end = self._start[node], self._end[node]
+            indices = self.order[start:end]
+            diff = self._sorted[start:end] - point
+            distances = np.sqrt(np.einsum('ij,ij->i', diff, diff))
+            if mask is not None:
+                keep = mask[indices]
+                indices, distances = indices[keep], distances[keep]
+            for distance, index in zip(distances.tolist(), indices.tolist()):
+                if len(best) < k:
+                    heapq.heappush(best, (-distance, index))
+                elif distance < -best[0][0]:
+                    heapq.heapreplace(best, (-distance, index))
+
+        best.sort(key=lambda item: -item[0])
+        return (np.array([-d for d, _ in best]), np.array([i for _, i in best], dtype=np.int64))
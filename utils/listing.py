@@ -0,0 +1,212 @@
+"""物件データ型"""
+import json
+from datetime import date, datetime
+from typing import Any, Dict, Optional
+
+
+def _as_str(name: str, value: Any) -> Optional[str]:
+    if value is None or isinstance(value, str):
+        return value
+    raise TypeError(f"Listing.{name} must be str, got {type(value).__name__}")
+
+
+def _as_int(name: str, value: Any) -> Optional[int]:
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        raise TypeError(f"Listing.{name} must be int, got bool")
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        # 小数部のある値は切り捨てずに不正な値として扱う
+        if not value.is_integer():
+            raise ValueError(f"Listing.{name}: invalid integer {value!r}")
+        return int(value)
+    if isinstance(value, str):
+        try:
+            return int(value.replace(',', ''))
+        except ValueError:
+            raise ValueError(f"Listing.{name}: invalid integer {value!r}") from None
+    raise TypeError(f"Listing.{name} must be int, got {type(value).__name__}")
+
+
+def _as_float(name: str, value: Any) -> Optional[float]:
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        raise TypeError(f"Listing.{name} must be float, got bool")
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            raise ValueError(f"Listing.{name}: invalid number {value!r}") from None
+    raise TypeError(f"Listing.{name} must be float, got {type(value).__name__}")
+
+
+# フィールド名 -> 変換関数（出力順もこの順）
+_CONVERTERS = {
+    'source': _as_str,
+    'title': _as_str,
+    'url': _as_str,
+    'layout': _as_str,
+    'price': _as_int,
+    'area': _as_float,
+    'floor': _as_int,
+    'direction': _as_str,
+    'built_year': _as_int,
+    'management_fee': _as_int,
+    'repair_reserve': _as_int,
+    'posted_date': _as_str,
+}
+
+
+def reference_year(last_updated: Optional[str]) -> Optional[int]:
+    """
+    保存済みデータの築年数から竣工年を求めるときの基準の年（公開時の年）
+
+    Args:
+        last_updated: データの更新時刻（ISO 8601）
+
+    Returns:
+        int: 年（更新時刻がない場合はNone）
+    """
+    if not last_updated:
+        return None
+    return datetime.fromisoformat(last_updated).year
+
+
+class Listing:
+    """
+    1件の物件データ
+
+    全スクレイパー共通のフィールドを持つ軽量なレコードです。
+    築年数は各サイトの表記に関わらず竣工年（built_year）で保持します。築年数しか分からない
+    場合はスクレイパーが取得時の年（再生モードでは再生する時刻の年）から竣工年を求めて保存し、
+    以降は変えません（年が変わっても保存済みのデータは変わりません）。age_years は表示用に
+    現在の年から算出する値で、保存しません。
+    """
+
+    __slots__ = tuple(_CONVERTERS)
+
+    # to_dict で保存するフィールド
+    FIELDS = tuple(_CONVERTERS)
+
+    def __init__(self, source: str, title: Optional[str] = None, url: Optional[str] = None,
+                 layout: Optional[str] = None, price: Optional[int] = None,
+                 area: Optional[float] = None, floor: Optional[int] = None,
+                 direction: Optional[str] = None, built_year: Optional[int] = None,
+                 management_fee: Optional[int] = None, repair_reserve: Optional[int] = None,
+                 posted_date: Optional[str] = None):
+        """
+        初期化（各フィールドの型を検証・変換する）
+
+        Args:
+            source: データソース名（例: "SUUMO"）
+            title: タイトル
+            url: 物件詳細ページのURL
+            layout: 間取り（例: "2LDK"）
+            price: 価格（円）
+            area: 専有面積（m²）
+            floor: 所在階
+            direction: 方角
+            built_year: 竣工年
+            management_fee: 管理費（円/月）
+            repair_reserve: 修繕積立金（円/月）
+            posted_date: 掲載日・情報提供日
+        """
+        if not isinstance(source, str):
+            raise TypeError(f"Listing.source must be str, got {type(source).__name__}")
+        self.source = source
+        self.title = _as_str('title', title)
+        self.url = _as_str('url', url)
+        self.layout = _as_str('layout', layout)
+        self.price = _as_int('price', price)
+        self.area = _as_float('area', area)
+        self.floor = _as_int('floor', floor)
+        self.direction = _as_str('direction', direction)
+        self.built_year = _as_int('built_year', built_year)
+        self.management_fee = _as_int('management_fee', management_fee)
+        self.repair_reserve = _as_int('repair_reserve', repair_reserve)
+        self.posted_date = _as_str('posted_date', posted_date)
+
+    @property
+    def age_years(self) -> Optional[int]:
+        """築年数（現在の年 - 竣工年。表示用で、to_dict には含めない）"""
+        if self.built_year is None:
+            return None
+        return date.today().year - self.built_year
+
+    def update(self, values: Dict[str, Any]):
+        """
+        複数のフィールドを更新する（詳細ページから取得した情報の反映など）
+
+        Args:
+            values: フィールド名 -> 値
+        """
+        for name, value in values.items():
+            if name in _CONVERTERS:
+                setattr(self, name, _CONVERTERS[name](name, value))
+            else:
+                raise TypeError(f"Listing has no field {name!r}")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        辞書に変換する（全フィールドを常に含む）
+
+        Returns:
+            Dict: 物件データ
+        """
+        return {
+            'source': self.source,
+            'title': self.title,
+            'url': self.url,
+            'layout': self.layout,
+            'price': self.price,
+            'area': self.area,
+            'floor': self.floor,
+            'direction': self.direction,
+            'built_year': self.built_year,
+            'management_fee': self.management_fee,
+            'repair_reserve': self.repair_reserve,
+            'posted_date': self.posted_date,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], reference_year: Optional[int] = None) -> 'Listing':
+        """
+        辞書から生成する（未知のキーは無視する）
+
+        竣工年はデータの built_year を使います。built_year がなく築年数（age_years）だけを持つ
+        以前の形式のデータは、reference_year（そのデータを公開した年）から竣工年を求めます。
+
+        Args:
+            data: 物件データ
+            reference_year: 公開時の年（reference_year() で求める。Noneの場合は築年数から求めない）
+
+        Returns:
+            Listing: 物件
+        """
+        listing = cls(**{k: v for k, v in data.items() if k in _CONVERTERS})
+        age_years = _as_int('age_years', data.get('age_years'))
+        if listing.built_year is None and age_years is not None and reference_year is not None:
+            listing.built_year = reference_year - age_years
+        return listing
+
+    def to_json(self) -> str:
+        """JSON文字列に変換する"""
+        return json.dumps(self.to_dict(), ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, text: str) -> 'Listing':
+        """JSON文字列から生成する"""
+        return cls.from_dict(json.loads(text))
+
+    def __eq__(self, other):
+        if not isinstance(other, Listing):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self):
+        return f"Listing(source={self.source!r}, title={self.title!r}, price={self.price!r}, layout={self.layout!r})"
@@ -0,0 +1,163 @@
+"""物件の掲載履歴
+
+公開のたびに、掲載中の物件の最新の内容と 初回掲載・最終掲載 の時刻を
+processed/history.jsonl に記録します。掲載が終了した物件も最後の内容のまま残るため、
+過去の物件との比較（類似物件の検索など）やエクスポートに使えます。
+掲載が終了してから保持期間（デフォルト2年）を過ぎた物件は削除します。
+
+ファイルは1行目がヘッダー（last_updated）、2行目以降が1物件1行の JSON Lines で、
+全体を読み込まずに1件ずつ読み出せます。
+"""
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+from utils.json_writer import AtomicWriter, dumps
+from utils.logger import get_logger
+
+
+logger = get_logger(__name__)
+
+
+FILENAME = 'history.jsonl'
+
+# 掲載が終了した物件を残す日数
+DEFAULT_RETENTION_DAYS = 730
+
+
+class ListingHistory:
+    """1マンション分の掲載履歴"""
+
+    def __init__(self, processed_data_dir: str, retention_days: int = DEFAULT_RETENTION_DAYS):
+        """
+        初期化
+
+        Args:
+            processed_data_dir: 処理済みデータのディレクトリ
+            retention_days: 掲載が終了した物件を残す日数（最終掲載からの日数）
+        """
+        self.filepath = os.path.join(processed_data_dir, FILENAME)
+        self.retention_days = retention_days
+
+    def stream(self) -> Tuple[Optional[str], Iterator[Dict[str, Any]]]:
+        """
+        掲載履歴を1件ずつ読み出す（ファイル全体は読み込まない）
+
+        Returns:
+            Tuple: (最後の公開時刻, key・listing・first_seen・last_seen のイテレータ)。
+                ない場合は (None, 空のイテレータ)
+        """
+        try:
+            f = open(self.filepath, 'r', encoding='utf-8')
+        except FileNotFoundError:
+            return None, iter(())
+        try:
+            header = json.loads(f.readline() or '{}')
+        except ValueError:
+            f.close()
+            raise
+
+        def entries():
+            with f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        # load() と同じく壊れた行は読み飛ばす
+                        logger.warning(f"Skipped an invalid line in listing history {self.filepath}")
+        return header.get('last_updated'), entries()
+
+    def load(self) -> Dict[str, Any]:
+        """
+        掲載履歴を読み込む（壊れた行は読み飛ばす。読み込み自体の失敗は例外のまま返す）
+
+        Returns:
+            Dict: last_updated（最後の公開時刻）, listings（キー -> listing, first_seen, last_seen）。
+                ない場合は空の履歴
+        """
+        try:
+            f = open(self.filepath, 'r', encoding='utf-8')
+        except FileNotFoundError:
+            return {'last_updated': None, 'listings': {}}
+        header: Dict[str, Any] = {}
+        listings = {}
+        skipped = 0
+        with f:
+            for number, line in enumerate(f):
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                    if number == 0:
+                        header = entry
+                    else:
+                        listings[entry.pop('key')] = entry
+                except (ValueError, KeyError, AttributeError):
+                    # 1行が壊れていても他の物件の初回掲載・最終掲載は残す
+                    skipped += 1
+        if skipped:
+            logger.warning(f"Skipped {skipped} invalid lines in listing history {self.filepath}")
+        return {'last_updated': header.get('last_updated'), 'listings': listings}
+
+    def first_seen(self, keys: Iterable[str]) -> Dict[str, str]:
+        """
+        物件の初回掲載の時刻を求める（掲載履歴にない物件は含めない）
+
+        Args:
+            keys: 物件のキー
+
+        Returns:
+            Dict: キー -> 初回掲載の時刻
+        """
+        wanted = set(keys)
+        if not wanted:
+            return {}
+        _, entries = self.stream()
+        return {
+            entry['key']: entry.get('first_seen')
+            for entry in entries
+            if isinstance(entry, dict) and entry.get('key') in wanted
+        }
+
+    def publish(self, last_updated: str, entries: Iterable[Tuple[str, Dict[str, Any]]]) -> int:
+        """
+        今回掲載中の物件を記録する（latest.json を置き換える前に呼び出す）
+
+        掲載が終了してから retention_days を過ぎた物件は削除します。
+
+        Args:
+            last_updated: 今回の更新時刻
+            entries: (キー, 物件データ) のリスト
+
+        Returns:
+            int: 初めて掲載された物件の数
+        """
+        history = self.load()
+        listings = history['listings']
+        added = 0
+        for key, record in entries:
+            entry = listings.get(key)
+            if entry is None:
+                listings[key] = {'listing': record, 'first_seen': last_updated, 'last_seen': last_updated}
+                added += 1
+            else:
+                entry['listing'] = record
+                entry['last_seen'] = last_updated
+
+        cutoff = datetime.fromisoformat(last_updated) - timedelta(days=self.retention_days)
+        expired = [
+            key for key, entry in listings.items()
+            if not entry.get('last_seen') or datetime.fromisoformat(entry['last_seen']) < cutoff
+        ]
+        for key in expired:
+            del listings[key]
+
+        with AtomicWriter(self.filepath) as f:
+            f.write(dumps({'last_updated': last_updated}) + b'\n')
+            for key, entry in listings.items():
+                f.write(dumps(dict(entry, key=key)) + b'\n')
+        logger.info(f"Listing history saved: {self.filepath} "
+                    f"({len(listings)} listings, {added} new, {len(expired)} expired)")
+        return added
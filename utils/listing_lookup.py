@@ -0,0 +1,223 @@
+"""物件IDからの物件の検索（ハッシュインデックス）
+
+公開時に latest.snap へ、物件ID -> latest.json 内の物件の位置（オフセット・長さ）の
+ハッシュ表（オープンアドレス法・線形探索）を入れておきます。server.py は物件データ全体を
+パースせずに、メモリマップ上の表を O(1) で引いて該当する1行だけをパースします。
+
+同じ住戸が複数のサイトに掲載されている場合に、掲載元をまとめて返せるように、
+異なるサイトの間取り・面積・階数・向きが同じ物件のグループ（エンティティ）も一緒に保存します。
+同じサイトの物件は（同じ階の同じプランの別の住戸がありうるため）まとめません。
+"""
+import json
+import struct
+from typing import Any, Dict, List, Optional, Tuple
+from utils.data_manager import listing_id, record_key
+from utils.json_writer import dumps
+
+
+INDEX_SECTION = 'listing_index'
+GROUPS_SECTION = 'listing_groups'
+
+# 1スロット: 物件ID（64bit）, latest.json 内のオフセット, 長さ（長さ0は空きスロット）
+_SLOT = struct.Struct('<QII')
+
+
+def entity_key(record: Dict[str, Any]) -> Optional[Tuple]:
+    """
+    同じ住戸とみなすキー（サイトをまたいで比較する。面積・階数がない場合はNone）
+
+    Args:
+        record: 物件データ
+
+    Returns:
+        Tuple: (間取り, 面積（小数1桁）, 階数, 向き)
+    """
+    area = record.get('area')
+    floor = record.get('floor')
+    if not area or floor is None:
+        return None
+    return (record.get('layout'), round(area, 1), floor, record.get('direction'))
+
+
+def entity_groups(records: List[Dict[str, Any]], ids: List[str]) -> List[List[str]]:
+    """
+    同じ住戸とみなす物件のグループ（2件以上のもの）を求める
+
+    グループはサイトごとに1件までです。同じサイトに同じキーの物件が複数ある場合は、
+    他のサイトの物件がどれと同じ住戸か分からないため、そのサイトの物件はまとめません。
+
+    Args:
+        records: 物件データ
+        ids: 物件ID（records と同じ順）
+
+    Returns:
+        List[List[str]]: 物件IDのグループ
+    """
+    # キー -> サイト -> 物件ID
+    groups: Dict[Tuple, Dict[Optional[str], List[str]]] = {}
+    for record, id_ in zip(records, ids):
+        key = entity_key(record)
+        if key is not None:
+            groups.setdefault(key, {}).setdefault(record.get('source'), []).append(id_)
+    result = []
+    for by_source in groups.values():
+        group = [source_ids[0] for source_ids in by_source.values() if len(source_ids) == 1]
+        if len(group) > 1:
+            result.append(group)
+    return result
+
+
+def record_offsets(body: bytes, count: int) -> Optional[List[Tuple[int, int]]]:
+    """
+    latest.json（1物件1行の形式）の各物件の位置を求める
+
+    Args:
+        body: latest.json の内容
+        count: 物件数
+
+    Returns:
+        List: (オフセット, 長さ) のリスト（1物件1行の形式でない場合はNone）
+    """
+    offsets = []
+    # 1行目はヘッダーと配列の開始
+    start = body.find(b'\n') + 1
+    while 0 < start < len(body):
+        end = body.find(b'\n', start)
+        if end < 0:
+            end = len(body)
+        line_end = end - 1 if body[end - 1:end] == b',' else end
+        if body[start:start + 1] == b'{':
+            offsets.append((start, line_end - start))
+        start = end + 1
+    return offsets if len(offsets) == count else None
+
+
+def build_lookup_sections(body: bytes, records: List[Dict[str, Any]]) -> Dict[str, bytes]:
+    """
+    latest.snap に入れる物件IDのハッシュ表とグループを作る
+
+    Args:
+        body: latest.json の内容
+        records: latest.json の物件データ
+
+    Returns:
+        Dict: セクション名 -> 内容（latest.json が1物件1行の形式でない場合は空）
+    """
+    offsets = record_offsets(body, len(records))
+    if offsets is None:
+        return {}
+    ids = [listing_id(record_key(record)) for record in records]
+
+    # 負荷率 0.5 以下の2のべき乗
+    size = 8
+    while size < len(ids) * 2:
+        size *= 2
+    mask = size - 1
+    table = bytearray(size * _SLOT.size)
+    for id_, (offset, length) in zip(ids, offsets):
+        key = int(id_, 16)
+        slot = key & mask
+        while True:
+            existing, _, existing_length = _SLOT.unpack_from(table, slot * _SLOT.size)
+            if existing_length == 0:
+                _SLOT.pack_into(table, slot * _SLOT.size, key, offset, length)
+                break
+            if existing == key:
+                # 同じIDの物件が複数ある場合は最初のもの
+                break
+            slot = (slot + 1) & mask
+
+    return {
+        INDEX_SECTION: bytes(table),
+        GROUPS_SECTION: dumps(entity_groups(records, ids)),
+    }
+
+
+class HashIndex:
+    """latest.snap の物件IDのハッシュ表（メモリマップ上のビューをそのまま引く）"""
+
+    def __init__(self, table):
+        """
+        初期化
+
+        Args:
+            table: build_lookup_sections で作った表（bytes / memoryview）
+        """
+        self.table = table
+        self.size = len(table) // _SLOT.size
+        self.mask = self.size - 1
+
+    def find(self, id_: str) -> Optional[Tuple[int, int]]:
+        """
+        物件の位置を引く
+
+        Args:
+            id_: 物件ID
+
+        Returns:
+            Tuple: latest.json 内の (オフセット, 長さ)（ない場合はNone）
+        """
+        try:
+            key = int(id_, 16)
+        except ValueError:
+            return None
+        if not self.size or len(id_) != 16:
+            return None
+        slot = key & self.mask
+        for _ in range(self.size):
+            existing, offset, length = _SLOT.unpack_from(self.table, slot * _SLOT.size)
+            if length == 0:
+                return None
+            if existing == key:
+                return offset, length
+            slot = (slot + 1) & self.mask
+        return None
+
+
+def group_map(groups: List[List[str]]) -> Dict[str, List[str]]:
+    """グループのリストから 物件ID -> 同じグループの物件ID を作る"""
+    return {id_: group for group in groups for id_ in group}
+
+
+class DictLookup:
+    """物件データから作る物件IDの辞書（latest.snap がない・古い形式の場合）"""
+
+    def __init__(self, records: List[Dict[str, Any]]):
+        """
+        初期化
+
+        Args:
+            records: 物件データ
+        """
+        ids = [listing_id(record_key(record)) for record in records]
+        self.records: Dict[str, Dict[str, Any]] = {}
+        for id_, record in zip(ids, records):
+            self.records.setdefault(id_, record)
+        self.groups = group_map(entity_groups(records, ids))
+
+    def get(self, id_: str) -> Optional[Dict[str, Any]]:
+        return self.records.get(id_)
+
+
+class PackLookup:
+    """latest.snap のハッシュ表から物件を引く（該当する1行だけをパースする）"""
+
+    def __init__(self, body, index, groups_body):
+        """
+        初期化
+
+        Args:
+            body: latest.json の内容（メモリマップ上のビュー）
+            index: ハッシュ表のセクション
+            groups_body: グループのセクション（JSON）
+        """
+        self.body = body
+        self.index = HashIndex(index)
+        self.groups = group_map(json.loads(bytes(groups_body))) if groups_body is not None else {}
+
+    def get(self, id_: str) -> Optional[Dict[str, Any]]:
+        found = self.index.find(id_)
+        if found is None:
+            return None
+        offset, length = found
+        return json.loads(bytes(self.body[offset:offset + length]))
@@ -0,0 +1,227 @@
+"""物件データの検索インデックス
+
+スナップショットごとに並び順ごとのソート済みインデックス（全体・間取り別）を
+一度だけ作っておき、絞り込み・並べ替え・カーソルページングのクエリでは
+返す範囲だけを読むようにします。並び順と重複排除は web/js/app.js と同じです。
+"""
+import bisect
+import heapq
+import math
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+# 並び順 -> (フィールド, 降順か)
+SORTS: Dict[str, Tuple[str, bool]] = {
+    'price-asc': ('price', False),
+    'price-desc': ('price', True),
+    'floor-desc': ('floor', True),
+    'floor-asc': ('floor', False),
+    'area-desc': ('area', True),
+    'area-asc': ('area', False),
+    'posted-desc': ('posted_date', True),
+}
+
+DEFAULT_SORT = 'price-asc'
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+
+class StaleCursorError(ValueError):
+    """カーソルが別のスナップショット（公開前のバージョン）のもの"""
+
+
+def dedupe_listings(listings: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    app.js と同じキー（ソース・価格・面積・階数・方角）で重複を除く
+
+    Args:
+        listings: 物件データ
+
+    Returns:
+        List[Dict]: 重複を除いた物件データ（元の順序を保持）
+    """
+    seen = set()
+    unique = []
+    for listing in listings:
+        key = (listing.get('source'), listing.get('price') or 0, listing.get('area') or 0,
+               listing.get('floor') or 0, listing.get('direction') or '')
+        if key not in seen:
+            seen.add(key)
+            unique.append(listing)
+    return unique
+
+
+def _sort_value(listing: Dict[str, Any], field: str, descending: bool):
+    """ソート用の値（欠損は常に末尾、降順は符号反転で昇順に揃える）"""
+    value = listing.get(field)
+    if field == 'posted_date':
+        return value or ''
+    if not value:
+        return math.inf
+    return -value if descending else value
+
+
+class ListingIndex:
+    """1スナップショット分の並べ替え・絞り込み用インデックス"""
+
+    def __init__(self, listings: List[Dict[str, Any]], version: Optional[str] = None):
+        """
+        初期化（全並び順のインデックスを作る）
+
+        Args:
+            listings: 物件データ
+            version: スナップショットのバージョン（カーソルに含め、別のバージョンのカーソルを拒否する）
+        """
+        self.version = version or ''
+        self.listings = dedupe_listings(listings)
+        self.search_text = [
+            f"{l.get('title') or ''}\n{l.get('source') or ''}".lower() for l in self.listings
+        ]
+
+        # 並び順 -> 順位ごとの物件の位置
+        self.orders: Dict[str, List[int]] = {}
+        # 並び順 -> 順位ごとのソート値（数値フィールドの範囲指定で二分探索に使う）
+        self.sort_values: Dict[str, Optional[List[Any]]] = {}
+        # 並び順 -> 間取り -> その間取りの物件の順位（昇順）
+        self.layout_ranks: Dict[str, Dict[str, List[int]]] = {}
+
+        for sort, (field, descending) in SORTS.items():
+            if field == 'posted_date':
+                # 文字列の降順（空は末尾）
+                order = sorted(range(len(self.listings)), reverse=True,
+                               key=lambda i: (bool(self.listings[i].get(field)), self.listings[i].get(field) or ''))
+                values = None
+            else:
+                keyed = sorted((_sort_value(self.listings[i], field, descending), i)
+                               for i in range(len(self.listings)))
+                order = [i for _, i in keyed]
+                values = [v for v, _ in keyed]
+            self.orders[sort] = order
+            self.sort_values[sort] = values
+
+            ranks: Dict[str, List[int]] = {}
+            for rank, pos in enumerate(order):
+                ranks.setdefault(self.listings[pos].get('layout') or '', []).append(rank)
+            self.layout_ranks[sort] = ranks
+
+    def _rank_bounds(self, sort: str, low: Optional[float], high: Optional[float]) -> Tuple[int, int]:
+        """並び順のフィールドに対する範囲指定を順位の範囲に変換する"""
+        values = self.sort_values[sort]
+        start, end = 0, len(self.listings)
+        if values is None:
+            return start, end
+        _, descending = SORTS[sort]
+        if descending:
+            low, high = (-high if high is not None else None), (-low if low is not None else None)
+        if low is not None:
+            start = bisect.bisect_left(values, low)
+        if high is not None:
+            end = bisect.bisect_right(values, high)
+        return start, end
+
+    def _encode_cursor(self, sort: str, rank: int) -> str:
+        return f"{self.version}:{sort}:{rank}"
+
+    def _decode_cursor(self, cursor: str, sort: str) -> int:
+        """カーソル（バージョン:並び順:順位）から順位を取り出す"""
+        try:
+            version, cursor_sort, rank = cursor.rsplit(':', 2)
+            offset = int(rank)
+        except ValueError:
+            raise ValueError(f"Invalid cursor: {cursor}") from None
+        if version != self.version:
+            raise StaleCursorError(
+                f"Stale cursor: snapshot {version} was replaced by {self.version}; restart from the first page")
+        if cursor_sort != sort or offset < 0:
+            raise ValueError(f"Invalid cursor for sort {sort}: {cursor}")
+        return offset
+
+    def _candidate_ranks(self, sort: str, layouts: Optional[List[str]], start: int, end: int) -> Iterable[int]:
+        """走査する順位を順に返す（間取り指定時は該当間取りの順位だけをマージする）"""
+        if not layouts:
+            return range(start, end)
+        lists = []
+        for layout in set(layouts):
+            ranks = self.layout_ranks[sort].get(layout)
+            if ranks:
+                lo = bisect.bisect_left(ranks, start)
+                hi = bisect.bisect_left(ranks, end)
+                lists.append(ranks[lo:hi])
+        return heapq.merge(*lists)
+
+    def query(self, layouts: Optional[List[str]] = None, sources: Optional[List[str]] = None,
+              min_price: Optional[int] = None, max_price: Optional[int] = None,
+              min_area: Optional[float] = None, max_area: Optional[float] = None,
+              min_floor: Optional[int] = None, max_floor: Optional[int] = None,
+              q: Optional[str] = None, sort: str = DEFAULT_SORT,
+              cursor: Optional[str] = None, limit: int = DEFAULT_LIMIT) -> Dict[str, Any]:
+        """
+        絞り込み・並べ替え・ページングを行う
+
+        Args:
+            layouts: 間取り（いずれかに一致）
+            sources: データソース（いずれかに一致）
+            min_price, max_price: 価格の範囲（円）
+            min_area, max_area: 面積の範囲（m²）
+            min_floor, max_floor: 階数の範囲
+            q: タイトル・ソースに含まれる文字列（大文字小文字を区別しない）
+            sort: 並び順（SORTS のキー）
+            cursor: 前回のレスポンスの next_cursor（同じスナップショット・並び順のもの）
+            limit: 最大件数
+
+        Returns:
+            Dict: listings と next_cursor（続きがない場合はNone）
+
+        Raises:
+            StaleCursorError: カーソルが別のバージョンのスナップショットのもの
+        """
+        if sort not in SORTS:
+            raise ValueError(f"Unknown sort: {sort}")
+        limit = max(1, min(limit, MAX_LIMIT))
+        offset = self._decode_cursor(cursor, sort) if cursor else 0
+
+        ranges = {
+            'price': (min_price, max_price),
+            'area': (min_area, max_area),
+            'floor': (min_floor, max_floor),
+        }
+
+        # 並び順のフィールドの範囲指定は二分探索で順位の範囲に絞る
+        field, _ = SORTS[sort]
+        start, end = 0, len(self.listings)
+        if field in ranges and ranges[field] != (None, None):
+            start, end = self._rank_bounds(sort, *ranges[field])
+        start = max(start, offset)
+
+        checks: List[Callable[[Dict[str, Any]], bool]] = []
+        for name, (low, high) in ranges.items():
+            if low is not None:
+                checks.append(lambda l, n=name, v=low: l.get(n) is not None and l.get(n) >= v)
+            if high is not None:
+                checks.append(lambda l, n=name, v=high: l.get(n) is not None and l.get(n) <= v)
+        if sources:
+            source_set = set(sources)
+            checks.append(lambda l: l.get('source') in source_set)
+        needle = q.lower() if q else None
+
+        order = self.orders[sort]
+        results = []
+        next_cursor = None
+        for rank in self._candidate_ranks(sort, layouts, start, end):
+            pos = order[rank]
+            listing = self.listings[pos]
+            if needle and needle not in self.search_text[pos]:
+                continue
+            if not all(check(listing) for check in checks):
+                continue
+            if len(results) == limit:
+                next_cursor = self._encode_cursor(sort, rank)
+                break
+            results.append(listing)
+
+        return {
+            'sort': sort,
+            'count': len(results),
+            'listings': results,
+            'next_cursor': next_cursor,
+        }
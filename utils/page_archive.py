@@ -0,0 +1,355 @@
+"""取得ページの圧縮アーカイブ
+
+スクレイパーが取得したHTMLの生バイト列を、セグメント分割されたパックファイルに
+レコード単位で圧縮して追記します。各セグメントにはサイドカーのインデックス
+（JSON Lines）が付き、URLと取得時刻からオフセット・長さを引けるようにします。
+読み出しはmmap経由で該当レコードだけを展開するため、セグメント全体の展開は不要です。
+"""
+import bisect
+import json
+import mmap
+import os
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, NamedTuple, Optional
+from utils.logger import get_logger
+
+
+logger = get_logger(__name__)
+
+
+class ArchivedPage(NamedTuple):
+    """アーカイブから読み出したページ"""
+    url: str
+    fetched_at: str
+    content: bytes
+    encoding: Optional[str]
+
+
+class _IndexEntry(NamedTuple):
+    fetched_at: str
+    segment: str
+    offset: int
+    length: int
+    encoding: Optional[str]
+
+
+class PageArchive:
+    """取得ページの生データを圧縮・保存するアーカイブ"""
+
+    SEGMENT_PREFIX = 'pages-'
+    PACK_SUFFIX = '.pack'
+    INDEX_SUFFIX = '.idx'
+
+    def __init__(self, archive_dir: str, segment_size_mb: float = 64,
+                 max_age_days: Optional[float] = None, max_size_mb: Optional[float] = None,
+                 compress_level: int = 6):
+        """
+        初期化
+
+        Args:
+            archive_dir: アーカイブの保存ディレクトリ
+            segment_size_mb: 1セグメントの最大サイズ（MB）。超えると次のセグメントに切り替える
+            max_age_days: 保持期間（日）。Noneの場合は無期限
+            max_size_mb: アーカイブ全体の最大サイズ（MB）。Noneの場合は無制限
+            compress_level: zlibの圧縮レベル
+        """
+        self.archive_dir = archive_dir
+        self.segment_size = int(segment_size_mb * 1024 * 1024)
+        self.max_age_days = max_age_days
+        self.max_size = int(max_size_mb * 1024 * 1024) if max_size_mb else None
+        self.compress_level = compress_level
+
+        os.makedirs(self.archive_dir, exist_ok=True)
+
+        # url -> 取得時刻順のエントリ一覧
+        self._index: Dict[str, List[_IndexEntry]] = {}
+        # セグメント名 -> 最終取得時刻
+        self._segment_last_fetch: Dict[str, str] = {}
+        self._mmaps: Dict[str, mmap.mmap] = {}
+
+        self._active_segment: Optional[str] = None
+        self._pack_fp = None
+        self._idx_fp = None
+
+        self._load_index()
+
+    @classmethod
+    def from_config(cls, archive_config: Dict) -> 'PageArchive':
+        """
+        設定情報からアーカイブを生成する
+
+        Args:
+            archive_config: 設定ファイルの scraping.archive セクション
+
+        Returns:
+            PageArchive: アーカイブ
+        """
+        return cls(
+            archive_config.get('dir', 'data/_archive'),
+            segment_size_mb=archive_config.get('segment_size_mb', 64),
+            max_age_days=archive_config.get('max_age_days'),
+            max_size_mb=archive_config.get('max_size_mb'),
+        )
+
+    # ------------------------------------------------------------------
+    # インデックス
+    # ------------------------------------------------------------------
+
+    def _segments(self) -> List[str]:
+        """セグメント名（拡張子なし）を古い順に返す"""
+        names = [
+            name[:-len(self.PACK_SUFFIX)]
+            for name in os.listdir(self.archive_dir)
+            if name.startswith(self.SEGMENT_PREFIX) and name.endswith(self.PACK_SUFFIX)
+        ]
+        return sorted(names)
+
+    def _pack_path(self, segment: str) -> str:
+        return os.path.join(self.archive_dir, segment + self.PACK_SUFFIX)
+
+    def _idx_path(self, segment: str) -> str:
+        return os.path.join(self.archive_dir, segment + self.INDEX_SUFFIX)
+
+    def _load_index(self):
+        """サイドカーインデックスを読み込み、メモリ上のハッシュインデックスを構築する"""
+        self._index = {}
+        self._segment_last_fetch = {}
+
+        for segment in self._segments():
+            idx_path = self._idx_path(segment)
+            if not os.path.exists(idx_path):
+                continue
+            with open(idx_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # 書き込み途中で中断された末尾行は無視する
+                        logger.warning(f"Skipping broken index line in {idx_path}")
+                        continue
+                    self._add_entry(record['url'], _IndexEntry(
+                        record['fetched_at'], segment, record['offset'],
+                        record['length'], record.get('encoding')
+                    ))
+
+    def _add_entry(self, url: str, entry: _IndexEntry):
+        entries = self._index.setdefault(url, [])
+        if entries and entries[-1].fetched_at > entry.fetched_at:
+            bisect.insort(entries, entry)
+        else:
+            entries.append(entry)
+
+        last = self._segment_last_fetch.get(entry.segment)
+        if last is None or entry.fetched_at > last:
+            self._segment_last_fetch[entry.segment] = entry.fetched_at
+
+    def urls(self) -> List[str]:
+        """
+        アーカイブ済みのURL一覧を取得する
+
+        Returns:
+            List[str]: URLのリスト
+        """
+        return list(self._index.keys())
+
+    def fetch_times(self, url: str) -> List[str]:
+        """
+        URLの取得時刻一覧を取得する
+
+        Args:
+            url: URL
+
+        Returns:
+            List[str]: 取得時刻（ISO 8601, UTC）のリスト（古い順）
+        """
+        return [entry.fetched_at for entry in self._index.get(url, [])]
+
+    # ------------------------------------------------------------------
+    # 書き込み
+    # ------------------------------------------------------------------
+
+    def _open_active_segment(self, incoming: int):
+        """書き込み先のセグメントを開く（サイズ超過時は新しいセグメントに切り替える）"""
+        if self._pack_fp is not None:
+            if self._pack_fp.seek(0, os.SEEK_END) + incoming <= self.segment_size:
+                return
+            self._close_writers()
+
+        segments = self._segments()
+        if segments:
+            latest = segments[-1]
+            if os.path.getsize(self._pack_path(latest)) + incoming <= self.segment_size:
+                self._active_segment = latest
+            else:
+                self._active_segment = None
+        if self._active_segment is None:
+            stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')
+            seq = len(segments)
+            self._active_segment = f"{self.SEGMENT_PREFIX}{stamp}-{seq:04d}"
+
+        self._pack_fp = open(self._pack_path(self._active_segment), 'ab')
+        self._idx_fp = open(self._idx_path(self._active_segment), 'a', encoding='utf-8')
+
+    def _close_writers(self):
+        for fp in (self._pack_fp, self._idx_fp):
+            if fp is not None:
+                fp.close()
+        self._pack_fp = None
+        self._idx_fp = None
+        self._active_segment = None
+
+    def append(self, url: str, content: bytes, encoding: Optional[str] = None,
+               fetched_at: Optional[str] = None) -> str:
+        """
+        ページの生データをアーカイブに追記する
+
+        Args:
+            url: URL（クエリパラメータを含む）
+            content: レスポンスの生バイト列
+            encoding: 文字エンコーディング
+            fetched_at: 取得時刻（ISO 8601, UTC）。Noneの場合は現在時刻
+
+        Returns:
+            str: 取得時刻
+        """
+        if fetched_at is None:
+            fetched_at = datetime.now(timezone.utc).isoformat()
+
+        compressed = zlib.compress(content, self.compress_level)
+        self._open_active_segment(len(compressed))
+
+        # 他のインスタンスが同じセグメントに追記している可能性があるため末尾を取り直す
+        offset = self._pack_fp.seek(0, os.SEEK_END)
+        self._pack_fp.write(compressed)
+        self._pack_fp.flush()
+
+        record = {
+            'url': url,
+            'fetched_at': fetched_at,
+            'offset': offset,
+            'length': len(compressed),
+            'encoding': encoding,
+        }
+        self._idx_fp.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._idx_fp.flush()
+
+        self._add_entry(url, _IndexEntry(fetched_at, self._active_segment, offset, len(compressed), encoding))
+        return fetched_at
+
+    # ------------------------------------------------------------------
+    # 読み出し
+    # ------------------------------------------------------------------
+
+    def _find_entry(self, url: str, at: Optional[str] = None,
+                    since: Optional[str] = None) -> Optional[_IndexEntry]:
+        entries = self._index.get(url)
+        if not entries:
+            return None
+        if at is None:
+            entry = entries[-1]
+        else:
+            pos = bisect.bisect_right(entries, at, key=lambda e: e.fetched_at)
+            if pos == 0:
+                return None
+            entry = entries[pos - 1]
+        if since is not None and entry.fetched_at < since:
+            return None
+        return entry
+
+    def _segment_view(self, segment: str, end: int) -> mmap.mmap:
+        """セグメントのmmapを取得する（追記で伸びていれば張り直す）"""
+        mm = self._mmaps.get(segment)
+        if mm is None or len(mm) < end:
+            if mm is not None:
+                mm.close()
+            with open(self._pack_path(segment), 'rb') as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._mmaps[segment] = mm
+        return mm
+
+    def get(self, url: str, at: Optional[str] = None,
+            since: Optional[str] = None) -> Optional[ArchivedPage]:
+        """
+        アーカイブからページを取得する
+
+        Args:
+            url: URL（クエリパラメータを含む）
+            at: この時刻以前で最新の取得分を返す。Noneの場合は最新
+            since: この時刻より前の取得分しかない場合はNoneを返す
+
+        Returns:
+            ArchivedPage: ページ（存在しない場合はNone）
+        """
+        entry = self._find_entry(url, at, since)
+        if entry is None:
+            return None
+
+        end = entry.offset + entry.length
+        mm = self._segment_view(entry.segment, end)
+        content = zlib.decompress(mm[entry.offset:end])
+        return ArchivedPage(url, entry.fetched_at, content, entry.encoding)
+
+    # ------------------------------------------------------------------
+    # 保持期間
+    # ------------------------------------------------------------------
+
+    def _drop_segment(self, segment: str):
+        mm = self._mmaps.pop(segment, None)
+        if mm is not None:
+            mm.close()
+        for path in (self._pack_path(segment), self._idx_path(segment)):
+            if os.path.exists(path):
+                os.remove(path)
+        logger.info(f"Archive segment removed: {segment}")
+
+    def apply_retention(self) -> int:
+        """
+        保持期間・最大サイズを超えた古いセグメントを削除する
+
+        Returns:
+            int: 削除したセグメント数
+        """
+        segments = self._segments()
+        if self._active_segment in segments:
+            segments.remove(self._active_segment)
+
+        removed = []
+
+        if self.max_age_days is not None:
+            cutoff = (datetime.now(timezone.utc) - timedelta(days=self.max_age_days)).isoformat()
+            for segment in segments:
+                last = self._segment_last_fetch.get(segment)
+                if last is None or last < cutoff:
+                    removed.append(segment)
+
+        if self.max_size is not None:
+            sizes = {
+                name: os.path.getsize(self._pack_path(name)) + (
+                    os.path.getsize(self._idx_path(name)) if os.path.exists(self._idx_path(name)) else 0
+                )
+                for name in self._segments()
+            }
+            total = sum(size for name, size in sizes.items() if name not in removed)
+            for segment in segments:
+                if total <= self.max_size:
+                    break
+                if segment not in removed:
+                    removed.append(segment)
+                    total -= sizes[segment]
+
+        for segment in removed:
+            self._drop_segment(segment)
+        if removed:
+            self._load_index()
+        return len(removed)
+
+    def close(self):
+        """ファイルハンドルとmmapを閉じる"""
+        self._close_writers()
+        for mm in self._mmaps.values():
+            mm.close()
+        self._mmaps = {}
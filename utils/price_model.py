@@ -0,0 +1,323 @@
+"""マンションごとの適正価格モデル（ヘドニック回帰）
+
+同じマンションの物件について、価格の対数を 面積の対数・階数・築年数・向き・間取り で
+最小二乗回帰し、各物件の適正価格と、実際の価格との差（割高・割安）を求めます。
+
+モデルは正規方程式の十分統計量（XᵀX, Xᵀy, yᵀy）を物件キーごとの行とともに保持し、
+新しいスナップショットでは追加・削除・変更された物件の行だけを足し引きして解き直します。
+全物件のスコアは行列演算でまとめて計算します。
+"""
+import math
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from utils.data_manager import record_key
+from utils.encoded_body import EncodedBody
+from utils.json_writer import dumps
+from utils.logger import get_logger
+
+
+logger = get_logger(__name__)
+
+
+DIRECTIONS = ('北', '北東', '東', '南東', '南', '南西', '西', '北西')
+
+# 残差の自由度がこれ未満の場合はモデルを作らない
+MIN_DEGREES_OF_FREEDOM = 3
+
+# スチューデント化残差がこれを超える物件を割高・割安とする
+ASSESSMENT_THRESHOLD = 1.0
+
+# 差分更新を続けると丸め誤差がたまるため、この回数ごとに全件から作り直す
+FULL_REFIT_INTERVAL = 50
+
+
+def _erf(x: np.ndarray) -> np.ndarray:
+    """誤差関数の近似（Abramowitz & Stegun 7.1.26、誤差 1.5e-7 以下）"""
+    sign = np.sign(x)
+    x = np.abs(x)
+    t = 1.0 / (1.0 + 0.3275911 * x)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    return sign * (1.0 - poly * np.exp(-x * x))
+
+
+class FeatureSpace:
+    """物件データを説明変数の行列に変換する"""
+
+    def __init__(self, layouts: List[str], reference_year: int):
+        """
+        初期化
+
+        Args:
+            layouts: 間取り（マンションの設定。それ以外の間取りはダミー変数なし）
+            reference_year: 竣工年から築年数を求める基準年
+        """
+        self.layouts = list(layouts)
+        self.reference_year = reference_year
+        self.names = (['intercept', 'log_area', 'floor', 'floor_missing', 'age_years', 'age_missing']
+                      + [f"direction:{d}" for d in DIRECTIONS]
+                      + [f"layout:{l}" for l in self.layouts])
+
+    def encode(self, listings: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        説明変数・目的変数を作る
+
+        Args:
+            listings: 物件データ
+
+        Returns:
+            Tuple: (説明変数 (n, p), 価格の対数 (n,), 価格と面積がありモデルに使える行のマスク (n,))
+        """
+        n = len(listings)
+        price = np.array([l.get('price') or 0 for l in listings], dtype=np.float64)
+        area = np.array([l.get('area') or 0 for l in listings], dtype=np.float64)
+        floor = np.array([l.get('floor') or np.nan for l in listings], dtype=np.float64)
+        age = np.array([self._age(l) for l in listings], dtype=np.float64)
+        direction = [l.get('direction') for l in listings]
+        layout = [l.get('layout') for l in listings]
+
+        valid = (price > 0) & (area > 0)
+        X = np.zeros((n, len(self.names)), dtype=np.float64)
+        X[:, 0] = 1.0
+        X[:, 1] = np.log(np.where(area > 0, area, 1.0))
+        floor_missing = np.isnan(floor)
+        X[:, 2] = np.where(floor_missing, 0.0, floor)
+        X[:, 3] = floor_missing
+        age_missing = np.isnan(age)
+        X[:, 4] = np.where(age_missing, 0.0, age)
+        X[:, 5] = age_missing
+
+        offset = 6
+        for j, d in enumerate(DIRECTIONS):
+            X[:, offset + j] = [value == d for value in direction]
+        offset += len(DIRECTIONS)
+        for j, name in enumerate(self.layouts):
+            X[:, offset + j] = [value == name for value in layout]
+
+        y = np.log(np.where(valid, price, 1.0))
+        return X, y, valid
+
+    def _age(self, listing: Dict[str, Any]) -> float:
+        if listing.get('built_year'):
+            return float(self.reference_year - listing['built_year'])
+        if listing.get('age_years') is not None:
+            return float(listing['age_years'])
+        return math.nan
+
+
+class HedonicModel:
+    """1マンション分の適正価格モデル（十分統計量を差分で更新する）"""
+
+    def __init__(self, layouts: List[str], reference_year: Optional[int] = None):
+        """
+        初期化
+
+        Args:
+            layouts: 間取り（マンションの設定）
+            reference_year: 築年数の基準年（省略時は今年）
+        """
+        self.features = FeatureSpace(layouts, reference_year or datetime.now().year)
+        self._reset()
+
+    def _reset(self):
+        p = len(self.features.names)
+        self.xtx = np.zeros((p, p))
+        self.xty = np.zeros(p)
+        self.yty = 0.0
+        # 物件キー（record_key。変更セット・掲載履歴と同じ）-> 説明変数の行と価格の対数（float64 のバイト列）
+        self.rows: Dict[str, bytes] = {}
+        self.updates_since_refit = 0
+        self.coef: Optional[np.ndarray] = None
+        self.xtx_pinv: Optional[np.ndarray] = None
+        self.rank = 0
+        self.sigma: Optional[float] = None
+        self.r2: Optional[float] = None
+
+    @property
+    def n(self) -> int:
+        return len(self.rows)
+
+    def update(self, listings: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        スナップショットの物件でモデルを更新する（変わった行だけを足し引きする）
+
+        Args:
+            listings: 物件データ（重複排除済み）
+
+        Returns:
+            Dict: 更新の内容（mode: full / incremental / unchanged, added, removed）
+        """
+        X, y, valid = self.features.encode(listings)
+        # 行（説明変数と価格の対数）をバイト列にして、変わった物件をまとめて比較する
+        Xy = np.column_stack([X, y])
+        current: Dict[str, bytes] = {}
+        for i in np.flatnonzero(valid):
+            current.setdefault(record_key(listings[i]), Xy[i].tobytes())
+
+        removed = [key for key, row in self.rows.items() if current.get(key) != row]
+        added = [key for key, row in current.items() if self.rows.get(key) != row]
+        if not removed and not added:
+            return {'mode': 'unchanged', 'added': 0, 'removed': 0}
+
+        self.updates_since_refit += 1
+        full = (not self.rows or self.updates_since_refit >= FULL_REFIT_INTERVAL
+                or len(added) + len(removed) > len(current))
+        if full:
+            self._reset()
+            removed, added = [], list(current)
+
+        if removed:
+            self._accumulate([self.rows.pop(key) for key in removed], -1.0)
+        if added:
+            self._accumulate([current[key] for key in added], 1.0)
+            self.rows.update((key, current[key]) for key in added)
+
+        self._solve()
+        return {'mode': 'full' if full else 'incremental', 'added': len(added), 'removed': len(removed)}
+
+    def _accumulate(self, rows: List[bytes], sign: float):
+        """行を十分統計量に足す（sign=-1 で引く）"""
+        Xy = np.frombuffer(b''.join(rows), dtype=np.float64).reshape(len(rows), -1)
+        X, y = Xy[:, :-1], Xy[:, -1]
+        self.xtx += sign * (X.T @ X)
+        self.xty += sign * (X.T @ y)
+        self.yty += sign * float(y @ y)
+
+    def _solve(self):
+        """正規方程式を最小二乗で解く（ランク落ちする場合は最小ノルム解）"""
+        n = self.n
+        coef, _, rank, _ = np.linalg.lstsq(self.xtx, self.xty, rcond=None)
+        dof = n - rank
+        if n == 0 or dof < MIN_DEGREES_OF_FREEDOM:
+            self.coef = None
+            self.xtx_pinv = None
+            self.rank = int(rank)
+            self.sigma = None
+            self.r2 = None
+            return
+
+        rss = max(self.yty - 2 * float(coef @ self.xty) + float(coef @ self.xtx @ coef), 0.0)
+        mean = float(self.xty[0]) / n
+        tss = self.yty - n * mean * mean
+        self.coef = coef
+        self.xtx_pinv = np.linalg.pinv(self.xtx)
+        self.rank = int(rank)
+        self.sigma = math.sqrt(rss / dof)
+        self.r2 = float(1 - rss / tss) if tss > 0 else None
+
+    def score(self, listings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        全物件の適正価格と割高・割安をまとめて求める
+
+        Args:
+            listings: 物件データ
+
+        Returns:
+            List[Dict]: 物件データに fair_price, residual, residual_pct, z, confidence, assessment を加えたもの
+                （モデルがない場合や価格・面積がない物件はNone）
+        """
+        if self.coef is None or not listings:
+            return [dict(listing, fair_price=None, residual=None, residual_pct=None,
+                         z=None, confidence=None, assessment=None) for listing in listings]
+
+        X, y, valid = self.features.encode(listings)
+        predicted = X @ self.coef
+        fair = np.exp(predicted)
+        residual = y - predicted
+        # レバレッジで補正したスチューデント化残差
+        leverage = np.clip(np.einsum('ij,jk,ik->i', X, self.xtx_pinv, X), 0.0, 0.999)
+        z = residual / (self.sigma * np.sqrt(1.0 - leverage)) if self.sigma > 0 else np.zeros(len(listings))
+        confidence = _erf(np.abs(z) / math.sqrt(2))
+        price = np.exp(y)
+
+        # 丸めまで行列演算で行い、物件ごとの処理は辞書を作るだけにする
+        fair_prices = np.round(fair, -4).astype(np.int64).tolist()
+        residuals = np.round(price - fair, -4).astype(np.int64).tolist()
+        residual_pcts = np.round((price / fair - 1) * 100, 2).tolist()
+        assessments = np.where(z > ASSESSMENT_THRESHOLD, 'over',
+                               np.where(z < -ASSESSMENT_THRESHOLD, 'under', 'fair')).tolist()
+        zs = np.round(z, 3).tolist()
+        confidences = np.round(confidence, 3).tolist()
+
+        results = []
+        for i, listing in enumerate(listings):
+            if not valid[i]:
+                results.append(dict(listing, fair_price=None, residual=None, residual_pct=None,
+                                    z=None, confidence=None, assessment=None))
+                continue
+            results.append(dict(
+                listing,
+                fair_price=fair_prices[i],
+                residual=residuals[i],
+                residual_pct=residual_pcts[i],
+                z=zs[i],
+                confidence=confidences[i],
+                assessment=assessments[i],
+            ))
+        return results
+
+    def summary(self) -> Dict[str, Any]:
+        """モデルの概要（サンプル数・決定係数・係数）"""
+        return {
+            'n': self.n,
+            'rank': self.rank,
+            'r2': round(self.r2, 4) if self.r2 is not None else None,
+            'sigma': round(self.sigma, 4) if self.sigma is not None else None,
+            'coefficients': (
+                {name: round(float(value), 6) for name, value in zip(self.features.names, self.coef)}
+                if self.coef is not None else None
+            ),
+        }
+
+
+class FairPriceModels:
+    """マンションごとのモデルと、スナップショットごとのスコア結果（レスポンス本文）"""
+
+    def __init__(self):
+        # マンションID -> (スナップショットのシグネチャ, モデル, レスポンス本文)
+        self._entries: Dict[str, Tuple[Any, HedonicModel, EncodedBody]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, snapshot, layouts: List[str]) -> EncodedBody:
+        """
+        スナップショットのスコア結果を取得する（新しいスナップショットの場合はモデルを差分で更新する）
+
+        Args:
+            snapshot: スナップショット（絞り込み用インデックス作成済み）
+            layouts: マンションの間取りの設定
+
+        Returns:
+            EncodedBody: スコア結果のレスポンス本文
+        """
+        with self._lock:
+            entry = self._entries.get(snapshot.property_id)
+            if entry is not None and entry[0] == snapshot.signature:
+                return entry[2]
+
+            model = entry[1] if entry is not None and entry[1].features.layouts == list(layouts) else None
+            if model is None:
+                model = HedonicModel(layouts)
+            listings = snapshot.index.listings
+            update = model.update(listings)
+            scored = model.score(listings)
+            # 割安な順（スチューデント化残差の小さい順、スコアのない物件は最後）
+            scored.sort(key=lambda l: (l['z'] is None, l['z'] or 0.0))
+
+            encoded = EncodedBody(dumps({
+                'property_id': snapshot.property_id,
+                'property_name': snapshot.property_name,
+                'last_updated': snapshot.last_updated,
+                'model': dict(model.summary(), update=update),
+                'summary': {
+                    assessment: sum(1 for l in scored if l['assessment'] == assessment)
+                    for assessment in ('under', 'fair', 'over')
+                },
+                'listings': scored,
+            }))
+            logger.info(f"Fair-price model updated: {snapshot.property_id} ({update['mode']}, "
+                        f"+{update['added']} -{update['removed']}, n={model.n})")
+            self._entries[snapshot.property_id] = (snapshot.signature, model, encoded)
+            return encoded
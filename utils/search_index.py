@@ -0,0 +1,237 @@
+"""マンション横断の全文検索
+
+日本語は単語の区切りがないため、物件タイトルを文字の2-gram・3-gram に分解した
+転置インデックスで検索します。インデックスはスナップショットごとに一度だけ作り
+（SearchSegment）、スナップショットが更新されたマンションの分だけ作り直されます。
+マンション名・所在地はマンション単位の属性として照合します。
+"""
+import hashlib
+import heapq
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from utils.listing_query import StaleCursorError
+
+
+# インデックスに登録する n-gram の長さ
+GRAM_SIZES = (2, 3)
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+# 一致した項目ごとのスコア（タイトルの一致を優先する）
+TITLE_WEIGHT = 2.0
+PROPERTY_WEIGHT = 1.0
+
+
+def normalize(text: Optional[str]) -> str:
+    """
+    検索用に文字列を正規化する（全角英数・半角カナの統一、小文字化）
+
+    Args:
+        text: 文字列
+
+    Returns:
+        str: 正規化した文字列
+    """
+    if not text:
+        return ''
+    return unicodedata.normalize('NFKC', text).lower()
+
+
+def ngrams(text: str, n: int) -> Set[str]:
+    """
+    文字列の n-gram の集合を求める
+
+    Args:
+        text: 正規化済みの文字列
+        n: n-gram の長さ
+
+    Returns:
+        Set[str]: n-gram の集合
+    """
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def split_terms(q: str) -> List[str]:
+    """
+    検索文字列を正規化して空白で区切る（すべての語を含む物件を検索する）
+
+    Args:
+        q: 検索文字列
+
+    Returns:
+        List[str]: 検索語（重複を除く）
+    """
+    return list(dict.fromkeys(normalize(q).split()))
+
+
+class SearchSegment:
+    """1スナップショット分の物件タイトルの n-gram 転置インデックス"""
+
+    def __init__(self, listings: List[Dict[str, Any]], version: Optional[str] = None):
+        """
+        初期化（インデックスを作る）
+
+        Args:
+            listings: 物件データ（重複排除済み）
+            version: スナップショットのバージョン（カーソルの世代に使う）
+        """
+        self.listings = listings
+        self.version = version
+        self.texts = [normalize(listing.get('title')) for listing in listings]
+        # n-gram -> その n-gram を含む物件の位置（昇順）
+        self.postings: Dict[str, List[int]] = {}
+        for pos, text in enumerate(self.texts):
+            for n in GRAM_SIZES:
+                for gram in ngrams(text, n):
+                    self.postings.setdefault(gram, []).append(pos)
+
+    def match(self, term: str) -> Iterable[int]:
+        """
+        タイトルに検索語を含む物件の位置を求める
+
+        Args:
+            term: 正規化済みの検索語
+
+        Returns:
+            Iterable[int]: 物件の位置
+        """
+        if len(term) < min(GRAM_SIZES):
+            # 1文字の語は n-gram で引けないため全件を走査する
+            return [pos for pos, text in enumerate(self.texts) if term in text]
+
+        n = max(size for size in GRAM_SIZES if size <= len(term))
+        lists = sorted((self.postings.get(gram, []) for gram in ngrams(term, n)), key=len)
+        if not lists or not lists[0]:
+            return []
+        candidates = set(lists[0])
+        for postings in lists[1:]:
+            candidates.intersection_update(postings)
+            if not candidates:
+                return []
+        # n-gram がすべて含まれていても連続しているとは限らないため、本文で確認する
+        return [pos for pos in candidates if term in self.texts[pos]]
+
+
+def _term_score(text: str, term: str) -> float:
+    """タイトル中の一致位置が前にあるほど高いスコア"""
+    return TITLE_WEIGHT + 1.0 / (1 + text.find(term))
+
+
+def generation(properties: List[Tuple[Dict[str, Any], SearchSegment]]) -> str:
+    """
+    検索対象のインデックスの世代（マンションIDとスナップショットのバージョンの組から求める）
+
+    いずれかのマンションのスナップショットが更新されると世代が変わり、
+    それより前に発行したカーソルは使えなくなります。
+
+    Args:
+        properties: (マンション情報, 検索インデックス) のリスト
+
+    Returns:
+        str: 世代（16進12文字）
+    """
+    segments = sorted(f"{info['id']}={segment.version}" for info, segment in properties)
+    return hashlib.sha1('\n'.join(segments).encode('utf-8')).hexdigest()[:12]
+
+
+def _decode_cursor(cursor: str, current: str) -> int:
+    """カーソル（世代:順位）から順位を取り出す"""
+    try:
+        cursor_generation, rank = cursor.rsplit(':', 1)
+        offset = int(rank)
+    except ValueError:
+        raise ValueError(f"Invalid cursor: {cursor}") from None
+    if offset < 0:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    if cursor_generation != current:
+        raise StaleCursorError(
+            f"Stale cursor: search index {cursor_generation} was replaced by {current}; restart from the first page")
+    return offset
+
+
+def search(properties: List[Tuple[Dict[str, Any], SearchSegment]], q: str,
+           layouts: Optional[List[str]] = None,
+           min_price: Optional[int] = None, max_price: Optional[int] = None,
+           min_area: Optional[float] = None, max_area: Optional[float] = None,
+           cursor: Optional[str] = None, limit: int = DEFAULT_LIMIT) -> Dict[str, Any]:
+    """
+    複数のマンションの物件を検索する
+
+    Args:
+        properties: (マンション情報（id, name, area）, 検索インデックス) のリスト
+        q: 検索文字列（空白区切りの語をすべて含む物件を返す）
+        layouts: 間取り（いずれかに一致）
+        min_price, max_price: 価格の範囲（円）
+        min_area, max_area: 面積の範囲（m²）
+        cursor: 前回のレスポンスの next_cursor
+        limit: 最大件数
+
+    Returns:
+        Dict: total（一致件数）, listings（property_id, property_name, score 付き）, next_cursor, generation
+
+    Raises:
+        ValueError: 検索文字列が空、またはカーソルが不正
+        StaleCursorError: カーソルが別の世代（更新前のスナップショット）のもの
+    """
+    terms = split_terms(q or '')
+    if not terms:
+        raise ValueError("Query is empty")
+    limit = max(1, min(limit, MAX_LIMIT))
+    current = generation(properties)
+    offset = _decode_cursor(cursor, current) if cursor else 0
+    layout_set = set(layouts) if layouts else None
+
+    hits = []
+    for info, segment in properties:
+        # マンション名・所在地に含まれる語は、そのマンションの全物件に一致する
+        property_text = normalize(f"{info.get('name') or ''} {info.get('area') or ''}")
+        property_terms = [term for term in terms if term in property_text]
+        title_terms = [term for term in terms if term not in property_terms]
+
+        if title_terms:
+            positions = None
+            for term in sorted(title_terms, key=len, reverse=True):
+                matched = set(segment.match(term))
+                positions = matched if positions is None else positions & matched
+                if not positions:
+                    break
+            positions = positions or set()
+        else:
+            positions = range(len(segment.listings))
+
+        for pos in positions:
+            listing = segment.listings[pos]
+            if layout_set is not None and listing.get('layout') not in layout_set:
+                continue
+            price = listing.get('price')
+            area = listing.get('area')
+            if min_price is not None and (price is None or price < min_price):
+                continue
+            if max_price is not None and (price is None or price > max_price):
+                continue
+            if min_area is not None and (area is None or area < min_area):
+                continue
+            if max_area is not None and (area is None or area > max_area):
+                continue
+            # マンション単位で一致した語も、タイトルに含まれていればタイトルの一致として数える
+            text = segment.texts[pos]
+            score = sum(_term_score(text, term) if term in text else PROPERTY_WEIGHT for term in terms)
+            hits.append((-score, price or float('inf'), info['id'], pos, info, listing, score))
+
+    # 返すページまでの上位だけを取り出す
+    page = heapq.nsmallest(offset + limit, hits, key=lambda hit: hit[:4])[offset:]
+    next_offset = offset + len(page)
+
+    return {
+        'query': q,
+        'total': len(hits),
+        'count': len(page),
+        'listings': [
+            dict(listing, property_id=info['id'], property_name=info.get('name'), score=round(score, 4))
+            for _, _, _, _, info, listing, score in page
+        ],
+        'next_cursor': f"{current}:{next_offset}" if next_offset < len(hits) else None,
+        'generation': current,
+    }
@@ -0,0 +1,642 @@
+"""公開済みスナップショットのキャッシュ
+
+server.py が latest.json をリクエストのたびに読み込み・再エンコードしないように、
+パース済みデータとレスポンス用のバイト列をメモリに保持します。
+ファイルの更新（mtime・サイズ・inode の変化）を検知すると次のアクセス時に読み直します。
+
+非同期ハンドラーからは aget() を使います。ファイルの読み込み・JSONのデコード・
+圧縮などは上限付きのスレッドプールで行い、同じマンションの読み込みが重なった
+場合は1回の読み込みの完了を全員で待ちます（イベントループは止めません）。
+
+latest.snap（utils/snapshot_pack.py）が使える場合はそれをメモリマップして読み込み、
+本文はマップ上のビューのまま返します。複数のワーカープロセスで同じページを共有し、
+物件データのパースは絞り込み・検索で必要になったワーカーだけが行います。
+間取り・ソースを指定したリクエストには、latest.snap のシャード（utils/snapshot_shards.py）から
+該当する分だけを返します。
+"""
+import asyncio
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from utils.data_manager import snapshot_version
+from utils.encoded_body import EncodedBody
+from utils.json_writer import dumps, encode_snapshot
+from utils.listing_lookup import GROUPS_SECTION, INDEX_SECTION, DictLookup, PackLookup
+from utils.listing_query import ListingIndex
+from utils.search_index import SearchSegment
+from utils.snapshot_delta import DeltaStore
+from utils.snapshot_pack import FILENAME as PACK_FILENAME, SnapshotPack, build_lock, build_pack
+from utils.snapshot_shards import group_records, select_records, shard_section
+from utils.stats import compute_stats
+from utils.logger import get_logger
+
+
+logger = get_logger(__name__)
+
+
+# スナップショットごとに保持する間取り・ソース別のレスポンスの数
+MAX_SELECTIONS = 32
+
+
+def _file_signature(path: str) -> Optional[Tuple[int, int, int]]:
+    """ファイルの変更検知用シグネチャ（存在しない場合はNone）"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+class JSONFileCache:
+    """変更されたときだけ読み直すJSONファイル（config.json など）"""
+
+    def __init__(self, path: str):
+        """
+        初期化
+
+        Args:
+            path: JSONファイルのパス
+        """
+        self.path = path
+        self._signature = None
+        self._data = None
+        self._lock = threading.Lock()
+
+    def get(self) -> Any:
+        """
+        ファイルの内容を取得する
+
+        Returns:
+            Any: パース済みのデータ
+        """
+        signature = _file_signature(self.path)
+        if signature is None:
+            raise FileNotFoundError(self.path)
+        if signature != self._signature:
+            with self._lock:
+                if signature != self._signature:
+                    with open(self.path, 'r', encoding='utf-8') as f:
+                        self._data = json.load(f)
+                    self._signature = signature
+        return self._data
+
+    async def aget(self) -> Any:
+        """
+        ファイルの内容を取得する（読み直しが必要な場合はスレッドで行う）
+
+        Returns:
+            Any: パース済みのデータ
+        """
+        if self._data is not None and _file_signature(self.path) == self._signature:
+            return self._data
+        return await asyncio.get_running_loop().run_in_executor(None, self.get)
+
+
+class Snapshot:
+    """1マンション分の公開済みスナップショット"""
+
+    def __init__(self, property_id: str, body: bytes, signature: Tuple,
+                 stats: Optional[Dict[str, Any]] = None, changes: Optional[Dict[str, Any]] = None,
+                 deltas: Optional[Dict[str, Dict[str, Any]]] = None):
+        """
+        初期化
+
+        Args:
+            property_id: マンションID
+            body: latest.json の内容（そのままレスポンスとして返す）
+            signature: 読み込み時のファイルシグネチャ
+            stats: 公開時に集計した統計（stats.json）。同じ更新時刻のものだけ使用する
+            changes: 前回からの変更セット（changes.json）。同じバージョンのものだけ使用する
+            deltas: 過去のバージョン -> デルタ（processed/deltas/）。このバージョンへのものだけ使用する
+        """
+        self.property_id = property_id
+        self.body = body
+        self.signature = signature
+        self.data: Dict[str, Any] = json.loads(body)
+        self._encoded: Optional[EncodedBody] = None
+        self._index: Optional[ListingIndex] = None
+        self._search: Optional[SearchSegment] = None
+        self._lookup = None
+        self._groups: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+        self._selections: Dict[Tuple, EncodedBody] = {}
+
+        if not stats or stats.get('last_updated') != self.last_updated:
+            # stats.json がない古いデータなどはここで一度だけ集計する
+            stats = {
+                'property_name': self.data.get('property_name'),
+                'last_updated': self.last_updated,
+                'stats': compute_stats(self.listings),
+            }
+        self.stats = stats
+        self.stats_encoded = EncodedBody(dumps(stats))
+
+        self.version = (
+            self.data.get('version') or snapshot_version(self.last_updated) or EncodedBody(body).digest
+        )
+        if changes is not None and changes.get('version') != self.version:
+            changes = None
+        self.changes = changes
+        self.changes_encoded = EncodedBody(dumps(changes)) if changes is not None else None
+
+        self._init_deltas(deltas)
+
+    def _init_deltas(self, deltas: Optional[Dict[str, Dict[str, Any]]]):
+        self._deltas = {
+            since: delta for since, delta in (deltas or {}).items() if delta.get('version') == self.version
+        }
+        self._deltas_encoded: Dict[str, EncodedBody] = {}
+
+    @property
+    def change_summary(self) -> Optional[Dict[str, Any]]:
+        """前回からの変更の概要（イベント通知用）"""
+        if self.changes is None:
+            return None
+        return {
+            'previous_version': self.changes.get('previous_version'),
+            'summary': self.changes.get('summary'),
+        }
+    
+    def delta(self, since: str) -> Optional[EncodedBody]:
+        """
+        指定したバージョンからこのバージョンへのデルタを取得する
+        
+        Args:
+            since: クライアントが持っているバージョン
+        
+        Returns:
+            EncodedBody: 圧縮済みのデルタ（保持期間外などでデルタがない場合はNone）
+        """
+        encoded = self._deltas_encoded.get(since)
+        if encoded is not None:
+            return encoded
+        if since == self.version:
+            delta = {
+                'property_name': self.property_name, 'since': since, 'version': self.version,
+                'last_updated': self.last_updated, 'total_listings': self.total_listings, 'delta': True,
+                'added': [], 'changed': [], 'removed': [],
+            }
+        else:
+            delta = self._deltas.get(since)
+            if delta is None:
+                return None
+        encoded = EncodedBody(dumps(delta))
+        self._deltas_encoded[since] = encoded
+        return encoded
+    
+    @property
+    def encoded(self) -> EncodedBody:
+        """圧縮済みの本文とETag（スナップショットごとに初回アクセス時に一度だけ作る）"""
+        if self._encoded is None:
+            self._encoded = EncodedBody(self.body)
+        return self._encoded
+    
+    @property
+    def index(self) -> ListingIndex:
+        """並べ替え・絞り込み用インデックス（初回アクセス時に一度だけ作る）"""
+        if self._index is None:
+            self._index = ListingIndex(self.listings, self.version)
+        return self._index
+    
+    @property
+    def search(self) -> SearchSegment:
+        """横断検索用の n-gram インデックス（初回アクセス時に一度だけ作る）"""
+        if self._search is None:
+            self._search = SearchSegment(self.index.listings, self.version)
+        return self._search
+    
+    @property
+    def lookup(self):
+        """物件IDから物件を引く辞書（初回アクセス時に一度だけ作る）"""
+        if self._lookup is None:
+            self._lookup = DictLookup(self.listings)
+        return self._lookup
+    
+    def find_listing(self, listing_id: str) -> Optional[Dict[str, Any]]:
+        """
+        物件IDから物件を取得する
+        
+        Args:
+            listing_id: 物件ID
+        
+        Returns:
+            Dict: 物件データ（ない場合はNone）
+        """
+        return self.lookup.get(listing_id)
+    
+    def entity_group(self, listing_id: str) -> List[str]:
+        """
+        同じ住戸とみなす物件（他のサイトの掲載）の物件ID
+        
+        Args:
+            listing_id: 物件ID
+        
+        Returns:
+            List[str]: 自身を含む物件ID（グループがない場合は自身のみ）
+        """
+        return self.lookup.groups.get(listing_id) or [listing_id]
+    
+    @staticmethod
+    def selection_key(layouts: Optional[List[str]], sources: Optional[List[str]]) -> Tuple:
+        """間取り・ソースの指定を正規化したキー（順序・重複を無視する）"""
+        return (tuple(sorted(set(layouts or ()))), tuple(sorted(set(sources or ()))))
+    
+    def cached_selection(self, layouts: Optional[List[str]], sources: Optional[List[str]]) -> Optional[EncodedBody]:
+        """
+        作成済みの間取り・ソース別のレスポンスを取得する（イベントループから呼び出す）
+        
+        Args:
+            layouts: 間取り
+            sources: データソース
+        
+        Returns:
+            EncodedBody: 圧縮済みの本文（まだ作っていない場合はNone）
+        """
+        return self._selections.get(self.selection_key(layouts, sources))
+    
+    def select(self, layouts: Optional[List[str]], sources: Optional[List[str]]) -> EncodedBody:
+        """
+        指定した間取り・ソースの物件だけのレスポンスを作る（スレッドで実行）
+        
+        1つの間取り（またはソース）だけの場合はシャードをそのまま返します。複数の場合は
+        指定した順（名前順）にシャードをつなぎ、両方を指定した場合はさらにもう一方で絞り込みます。
+        
+        Args:
+            layouts: 間取り（いずれかに一致）
+            sources: データソース（いずれかに一致）
+        
+        Returns:
+            EncodedBody: 圧縮済みの本文（latest.json と同じ形式）
+        """
+        key = self.selection_key(layouts, sources)
+        encoded = self._selections.get(key)
+        if encoded is not None:
+            return encoded
+        layout_names, source_names = key
+        kind, names = ('layout', layout_names) if layout_names else ('source', source_names)
+        single = len(names) == 1 and not (layout_names and source_names)
+        encoded = self._shard_encoded(kind, names[0]) if single else None
+        if encoded is None:
+            records = [record for name in names for record in self._shard_records(kind, name)]
+            if layout_names and source_names:
+                records = select_records(records, sources=source_names)
+            header = {
+                'property_name': self.property_name,
+                'last_updated': self.last_updated,
+                'version': self.version,
+                'total_listings': len(records),
+            }
+            if single:
+                # シャードのファイルと同じ内容（ETagも同じになる）
+                header['shard'] = {'kind': kind, 'name': names[0]}
+            else:
+                header['shards'] = {'layout': list(layout_names), 'source': list(source_names)}
+            encoded = EncodedBody(encode_snapshot(header, 'listings', records))
+        if len(self._selections) >= MAX_SELECTIONS:
+            self._selections.pop(next(iter(self._selections)), None)
+        self._selections[key] = encoded
+        return encoded
+    
+    def _shard_records(self, kind: str, name: str) -> List[Dict[str, Any]]:
+        """シャードの物件データ（物件データ全体から一度だけ分ける）"""
+        groups = self._groups.get(kind)
+        if groups is None:
+            groups = self._groups[kind] = group_records(self.listings, kind)
+        return groups.get(name, [])
+    
+    def _shard_encoded(self, kind: str, name: str) -> Optional[EncodedBody]:
+        """公開時に圧縮済みのシャード（latest.snap 以外ではNone）"""
+        return None
+    
+    @property
+    def indexed(self) -> bool:
+        """絞り込み・検索用インデックスが作成済みか"""
+        return self._index is not None and self._search is not None
+    
+    def build_indexes(self):
+        """絞り込み・検索用インデックスを作る"""
+        self.index
+        self.search
+    
+    def warm(self):
+        """レスポンスに必要なものを先に作っておく（読み込みスレッドで実行）"""
+        self.encoded
+        self.build_indexes()
+        self.lookup
+
+    @property
+    def listings(self):
+        return self.data.get('listings', [])
+
+    @property
+    def last_updated(self) -> Optional[str]:
+        return self.data.get('last_updated')
+
+    @property
+    def property_name(self) -> Optional[str]:
+        return self.data.get('property_name')
+
+    @property
+    def total_listings(self) -> int:
+        return len(self.listings)
+
+
+# changes を未読み込みであることを表す値（changes がない場合の None と区別する）
+_UNLOADED = object()
+
+
+class MappedSnapshot(Snapshot):
+    """メモリマップした latest.snap から読み込んだスナップショット
+
+    本文・圧縮版・統計・変更セットはマップ上のビューをそのまま返し、
+    物件データのパースは絞り込み・検索などで必要になったときに初めて行います。
+    """
+
+    def __init__(self, property_id: str, pack: SnapshotPack, signature: Tuple):
+        """
+        初期化
+
+        Args:
+            property_id: マンションID
+            pack: メモリマップした latest.snap
+            signature: 読み込み時のファイルシグネチャ
+        """
+        self.property_id = property_id
+        self.pack = pack
+        self.signature = signature
+        self.body = pack.section('listings')
+        self.version = pack.header['version']
+        self._data: Optional[Dict[str, Any]] = None
+        self._stats: Optional[Dict[str, Any]] = None
+        self._changes = _UNLOADED
+        self._encoded = pack.encoded('listings')
+        self._index = None
+        self._search = None
+        self._lookup = None
+        self._groups = {}
+        self._selections = {}
+        self._shard_data: Dict[str, Dict[str, Any]] = {}
+        self.stats_encoded = pack.encoded('stats')
+        self.changes_encoded = pack.encoded('changes')
+        self._init_deltas(None)
+
+    @property
+    def data(self) -> Dict[str, Any]:
+        if self._data is None:
+            self._data = json.loads(bytes(self.body))
+        return self._data
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        if self._stats is None:
+            self._stats = self.pack.load_json('stats')
+        return self._stats
+
+    @property
+    def changes(self) -> Optional[Dict[str, Any]]:
+        if self._changes is _UNLOADED:
+            self._changes = self.pack.load_json('changes')
+        return self._changes
+
+    @property
+    def lookup(self):
+        # ハッシュ表のない古い latest.snap では物件データから辞書を作る
+        if self._lookup is None:
+            index = self.pack.section(INDEX_SECTION)
+            if index is None:
+                self._lookup = DictLookup(self.listings)
+            else:
+                self._lookup = PackLookup(self.body, index, self.pack.section(GROUPS_SECTION))
+        return self._lookup
+
+    def _shard_records(self, kind: str, name: str) -> List[Dict[str, Any]]:
+        # シャードのない古い latest.snap では物件データ全体から分ける
+        if kind not in (self.pack.header.get('shards') or {}):
+            return super()._shard_records(kind, name)
+        section = shard_section(kind, name)
+        data = self._shard_data.get(section)
+        if data is None:
+            body = self.pack.section(section)
+            if body is None:
+                return []
+            data = self._shard_data[section] = json.loads(bytes(body))
+        return data.get('listings', [])
+
+    def _shard_encoded(self, kind: str, name: str) -> Optional[EncodedBody]:
+        return self.pack.encoded(shard_section(kind, name))
+
+    @property
+    def last_updated(self) -> Optional[str]:
+        return self.pack.header.get('last_updated')
+
+    @property
+    def property_name(self) -> Optional[str]:
+        return self.pack.header.get('property_name')
+
+    @property
+    def total_listings(self) -> int:
+        return self.pack.header.get('total_listings', 0)
+
+    def delta(self, since: str) -> Optional[EncodedBody]:
+        if since == self.version:
+            return super().delta(since)
+        encoded = self._deltas_encoded.get(since)
+        if encoded is None:
+            encoded = self.pack.encoded(f"delta/{since}")
+            if encoded is None:
+                return None
+            self._deltas_encoded[since] = encoded
+        return encoded
+
+    def warm(self):
+        # 本文・圧縮版はファイルにあるため、ここでは何もしない（インデックスは必要になったときに作る）
+        pass
+
+
+class SnapshotCache:
+    """マンションID -> 公開済みスナップショットのキャッシュ"""
+
+    FILENAME = 'latest.json'
+
+    def __init__(self, data_base_dir: str, max_workers: int = 2, use_pack: bool = True):
+        """
+        初期化
+
+        Args:
+            data_base_dir: データディレクトリ（data/）
+            max_workers: 読み込みに使うスレッド数の上限
+            use_pack: latest.snap をメモリマップして使うか（ない場合や古い場合は作成する）
+        """
+        self.data_base_dir = data_base_dir
+        self.use_pack = use_pack
+        self._snapshots: Dict[str, Snapshot] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='snapshot-loader')
+        # マンションID -> 読み込み中のFuture（同時に1回だけ読み込む）
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def path(self, property_id: str) -> Optional[str]:
+        """
+        スナップショットのファイルパスを取得する
+
+        Args:
+            property_id: マンションID
+
+        Returns:
+            str: ファイルパス（不正なIDの場合はNone）
+        """
+        if not property_id or os.path.basename(property_id) != property_id or property_id.startswith('.'):
+            return None
+        return os.path.join(self.data_base_dir, property_id, 'processed', self.FILENAME)
+
+    def _signature(self, path: str) -> Optional[Tuple]:
+        """latest.json（と latest.snap）の変更検知用シグネチャ（latest.json がない場合はNone）"""
+        signature = _file_signature(path)
+        if signature is None or not self.use_pack:
+            return signature
+        return (signature, _file_signature(os.path.join(os.path.dirname(path), PACK_FILENAME)))
+
+    def get(self, property_id: str) -> Optional[Snapshot]:
+        """
+        スナップショットを取得する（ファイルが更新されていれば読み直す）
+
+        Args:
+            property_id: マンションID
+
+        Returns:
+            Snapshot: スナップショット（データがない場合はNone）
+        """
+        path = self.path(property_id)
+        if path is None:
+            return None
+        signature = self._signature(path)
+        if signature is None:
+            self._snapshots.pop(property_id, None)
+            return None
+
+        snapshot = self._snapshots.get(property_id)
+        if snapshot is not None and snapshot.signature == signature:
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshots.get(property_id)
+            if snapshot is not None and snapshot.signature == signature:
+                return snapshot
+            snapshot = self._load(property_id, path)
+            self._snapshots[property_id] = snapshot
+            return snapshot
+
+    async def aget(self, property_id: str, indexed: bool = False) -> Optional[Snapshot]:
+        """
+        スナップショットを取得する（非同期版）
+
+        キャッシュが有効な場合はすぐに返します。読み込みが必要な場合はスレッドプールで
+        行い、同じマンションの読み込みが進行中であればその完了を待ちます。
+
+        Args:
+            property_id: マンションID
+            indexed: 絞り込み・検索用インデックスを作ってから返すか
+
+        Returns:
+            Snapshot: スナップショット（データがない場合はNone）
+        """
+        path = self.path(property_id)
+        if path is None:
+            return None
+        signature = self._signature(path)
+        if signature is None:
+            self._snapshots.pop(property_id, None)
+            return None
+
+        snapshot = self._snapshots.get(property_id)
+        if snapshot is None or snapshot.signature != signature:
+            snapshot = await self._run_once(property_id, self._load_warm, property_id)
+        if indexed and snapshot is not None and not snapshot.indexed:
+            await self._run_once(('index', snapshot), snapshot.build_indexes)
+        return snapshot
+
+    async def _run_once(self, key: Any, func, *args):
+        """同じキーの処理が進行中であればその完了を待ち、なければスレッドプールで実行する"""
+        future = self._inflight.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self._executor, func, *args)
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # 待っているリクエストがキャンセルされても処理自体は続ける
+        return await asyncio.shield(future)
+
+    def _load_warm(self, property_id: str) -> Optional[Snapshot]:
+        """スナップショットを読み込み、レスポンスに必要なものを先に作っておく（スレッドで実行）"""
+        snapshot = self.get(property_id)
+        if snapshot is not None:
+            snapshot.warm()
+        return snapshot
+
+    def _load(self, property_id: str, path: str) -> Snapshot:
+        directory = os.path.dirname(path)
+
+        if self.use_pack:
+            try:
+                pack = self._open_pack(directory, path)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Snapshot pack unavailable for {property_id}, falling back to JSON: {e}")
+            else:
+                logger.info(f"Snapshot mapped: {property_id} ({pack.signature[1]} bytes)")
+                return MappedSnapshot(property_id, pack, (_file_signature(path), pack.signature))
+
+        # 公開はアトミックなリネームで行われるため、開いたファイルの内容は一貫している
+        with open(path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            body = f.read()
+        signature = (st.st_mtime_ns, st.st_size, st.st_ino)
+        if self.use_pack:
+            signature = (signature, _file_signature(os.path.join(directory, PACK_FILENAME)))
+
+        stats = self._load_sidecar(os.path.join(directory, 'stats.json'))
+        changes = self._load_sidecar(os.path.join(directory, 'changes.json'))
+        deltas = DeltaStore(directory).load()
+
+        logger.info(f"Snapshot loaded: {property_id} ({len(body)} bytes)")
+        return Snapshot(property_id, body, signature, stats, changes, deltas)
+
+    def _open_pack(self, directory: str, json_path: str) -> SnapshotPack:
+        """latest.snap をマップする（ない場合や latest.json より古い場合は作る）"""
+        pack_path = os.path.join(directory, PACK_FILENAME)
+        if os.path.exists(pack_path):
+            pack = SnapshotPack(pack_path)
+            if pack.is_current(json_path):
+                return pack
+        with build_lock(directory):
+            # 待っている間に他のワーカーが作っていればそれを使う
+            if os.path.exists(pack_path):
+                pack = SnapshotPack(pack_path)
+                if pack.is_current(json_path):
+                    return pack
+            build_pack(directory)
+        return SnapshotPack(pack_path)
+
+    def _load_sidecar(self, path: str) -> Optional[Dict[str, Any]]:
+        """latest.json と一緒に公開される付随ファイルを読み込む（存在しない場合はNone）"""
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Failed to load {path}: {e}")
+            return None
+
+    def invalidate(self, property_id: Optional[str] = None):
+        """
+        キャッシュを破棄する
+
+        Args:
+            property_id: マンションID（Noneの場合はすべて）
+        """
+        with self._lock:
+            if property_id is None:
+                self._snapshots.clear()
+            else:
+                self._snapshots.pop(property_id, None)
@@ -0,0 +1,184 @@
+"""スナップショット間の差分（デルタ）
+
+公開時に、直近の各バージョンから今回のバージョンへの差分（追加・削除・変更された物件）を
+一度だけ計算して processed/deltas/ に書き出します。過去のバージョンは物件キーごとの
+フィンガープリントだけを processed/versions/ に保持し、保持する世代数を超えたものは削除します。
+
+server.py はクライアントが持っているバージョンからのデルタがあればそれを返し、
+なければ（古すぎる場合など）全件を返します。
+"""
+import hashlib
+import json
+import os
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from utils.json_writer import write_json_atomic
+from utils.logger import get_logger
+
+
+logger = get_logger(__name__)
+
+
+# デルタを保持する過去バージョンの世代数（デフォルト）
+DEFAULT_WINDOW = 7
+
+
+def fingerprint(record: Dict[str, Any]) -> str:
+    """
+    物件の内容のフィンガープリントを求める
+
+    Args:
+        record: 物件データ（辞書）
+
+    Returns:
+        str: フィンガープリント
+    """
+    encoded = json.dumps(record, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()[:20]
+
+
+def compute_delta(previous: Dict[str, str],
+                  current: Dict[str, Tuple[str, Dict[str, Any]]],
+                  urls: Optional[Dict[str, str]] = None) -> Optional[Dict[str, Any]]:
+    """
+    過去のバージョンのフィンガープリントと今回の物件から差分を求める
+
+    Args:
+        previous: 過去のバージョンの キー -> フィンガープリント
+        current: 今回の キー -> (フィンガープリント, 物件データ)
+        urls: 過去のバージョンの キー -> 物件のURL（キーと異なるものだけ）
+
+    Returns:
+        Dict: added（物件データ）, changed（物件データ）, removed（物件のURL。クライアントは url で特定する）。
+            URLのない物件が削除された場合（クライアントで特定できない）や、
+            半数以上の物件が追加・変更された場合はNone
+    """
+    added = []
+    changed = []
+    for key, (fp, record) in current.items():
+        before = previous.get(key)
+        if before is None:
+            added.append(record)
+        elif before != fp:
+            changed.append(record)
+
+    removed = [key for key in previous if key not in current]
+    if any(key.startswith('hash:') for key in removed):
+        return None
+    # キーは正規化したURLのため、クライアントが持っている元のURLに戻す
+    urls = urls or {}
+    removed = [urls.get(key, key) for key in removed]
+    if len(added) + len(changed) > len(current) // 2:
+        # 大半が変わっている場合は全件を返す方が小さい
+        return None
+    return {'added': added, 'changed': changed, 'removed': removed}
+
+
+class DeltaStore:
+    """1マンション分のバージョンのフィンガープリントとデルタの保存先"""
+
+    def __init__(self, processed_data_dir: str, window: int = DEFAULT_WINDOW):
+        """
+        初期化
+
+        Args:
+            processed_data_dir: 処理済みデータのディレクトリ
+            window: デルタを保持する過去バージョンの世代数
+        """
+        self.versions_dir = os.path.join(processed_data_dir, 'versions')
+        self.deltas_dir = os.path.join(processed_data_dir, 'deltas')
+        self.window = window
+
+    def _versions(self) -> List[str]:
+        """保存済みのバージョン（古い順）"""
+        if not os.path.isdir(self.versions_dir):
+            return []
+        return sorted(name[:-5] for name in os.listdir(self.versions_dir) if name.endswith('.json'))
+
+    def publish(self, version: str, last_updated: str, property_name: str,
+                entries: Iterable[Tuple[str, Dict[str, Any]]]) -> int:
+        """
+        今回のバージョンを登録し、保持中の過去バージョンからのデルタを書き出す
+        （latest.json を置き換える前に呼び出す）
+
+        Args:
+            version: 今回のバージョン
+            last_updated: 今回の更新時刻
+            property_name: 物件名
+            entries: (キー, 物件データ) のリスト
+
+        Returns:
+            int: 書き出したデルタの数
+        """
+        os.makedirs(self.versions_dir, exist_ok=True)
+        os.makedirs(self.deltas_dir, exist_ok=True)
+
+        current = {key: (fingerprint(record), record) for key, record in entries}
+        previous_versions = [v for v in self._versions() if v != version]
+        keep = previous_versions[-self.window:] if self.window > 0 else []
+
+        written = 0
+        for since in keep:
+            delta_path = os.path.join(self.deltas_dir, f"{since}.json")
+            try:
+                with open(os.path.join(self.versions_dir, f"{since}.json"), 'r', encoding='utf-8') as f:
+                    stored = json.load(f)
+                previous, urls = stored['fingerprints'], stored.get('urls')
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Failed to load version {since}: {e}")
+                previous = urls = None
+            delta = compute_delta(previous, current, urls) if previous is not None else None
+            if delta is None:
+                # デルタを作れない場合は全件を返させる
+                if os.path.exists(delta_path):
+                    os.remove(delta_path)
+                continue
+            write_json_atomic(delta_path, dict(
+                {'property_name': property_name, 'since': since, 'version': version,
+                 'last_updated': last_updated, 'total_listings': len(current), 'delta': True},
+                **delta,
+            ))
+            written += 1
+
+        write_json_atomic(os.path.join(self.versions_dir, f"{version}.json"), {
+            'version': version,
+            'last_updated': last_updated,
+            'fingerprints': {key: fp for key, (fp, _) in current.items()},
+            'urls': {key: record['url'] for key, (_, record) in current.items()
+                     if record.get('url') and record['url'] != key},
+        })
+
+        # 保持期間を過ぎたバージョンを削除する
+        for since in previous_versions[:len(previous_versions) - len(keep)]:
+            for directory in (self.versions_dir, self.deltas_dir):
+                path = os.path.join(directory, f"{since}.json")
+                if os.path.exists(path):
+                    os.remove(path)
+
+        logger.info(f"Deltas published: {written} (version {version})")
+        return written
+
+    def load(self, version: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        デルタを読み込む
+
+        Args:
+            version: 公開中のバージョン（指定した場合はこのバージョンへのデルタだけ）
+
+        Returns:
+            Dict: 過去のバージョン -> デルタ
+        """
+        deltas = {}
+        if not os.path.isdir(self.deltas_dir):
+            return deltas
+        for name in os.listdir(self.deltas_dir):
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.deltas_dir, name), 'r', encoding='utf-8') as f:
+                    delta = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Failed to load delta {name}: {e}")
+                continue
+            if version is None or delta.get('version') == version:
+                deltas[delta['since']] = delta
+        return deltas
@@ -0,0 +1,153 @@
+"""スナップショット更新の通知（Server-Sent Events）
+
+購読者がいる間だけ1つの asyncio タスクが定期的にスナップショットの更新を確認し、
+新しいバージョンが公開されたら各購読者のキューに通知を配ります。
+購読者ごとにディスクを監視するタスクは作りません。
+"""
+import asyncio
+from typing import Any, Dict, Optional, Set
+from utils.json_writer import dumps
+from utils.logger import get_logger
+from utils.snapshot_cache import Snapshot, SnapshotCache
+
+
+logger = get_logger(__name__)
+
+
+def snapshot_event(snapshot: Snapshot) -> Dict[str, Any]:
+    """
+    スナップショットの通知内容を作る
+
+    Args:
+        snapshot: スナップショット
+
+    Returns:
+        Dict: バージョンと変更の概要
+    """
+    event = {
+        'property_id': snapshot.property_id,
+        'version': snapshot.version,
+        'last_updated': snapshot.last_updated,
+        'total_listings': snapshot.total_listings,
+    }
+    summary = snapshot.change_summary
+    if summary is not None:
+        event.update(summary)
+    return event
+
+
+def format_sse(data: Dict[str, Any], event: Optional[str] = None, event_id: Optional[str] = None) -> bytes:
+    """
+    Server-Sent Events の1メッセージに整形する
+
+    Args:
+        data: 送信するデータ（JSONにエンコードする）
+        event: イベント名
+        event_id: イベントID
+
+    Returns:
+        bytes: メッセージ
+    """
+    lines = []
+    if event:
+        lines.append(f"event: {event}")
+    if event_id:
+        lines.append(f"id: {event_id}")
+    lines.append("data: " + dumps(data).decode('utf-8'))
+    return ("\n".join(lines) + "\n\n").encode('utf-8')
+
+
+class SnapshotBroadcaster:
+    """スナップショットの更新を購読者に配信する"""
+
+    # 購読者ごとに溜める通知の上限（遅いクライアントは古い通知から捨てる）
+    QUEUE_SIZE = 8
+
+    def __init__(self, cache: SnapshotCache, interval: float = 5.0):
+        """
+        初期化
+
+        Args:
+            cache: スナップショットのキャッシュ
+            interval: 更新を確認する間隔（秒）
+        """
+        self.cache = cache
+        self.interval = interval
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._versions: Dict[str, str] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    def subscribe(self, property_id: str, version: Optional[str] = None) -> asyncio.Queue:
+        """
+        マンションの更新通知を購読する
+
+        Args:
+            property_id: マンションID
+            version: 購読開始時点のバージョン
+
+        Returns:
+            asyncio.Queue: 通知が入るキュー
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.QUEUE_SIZE)
+        self._subscribers.setdefault(property_id, set()).add(queue)
+        if version is not None:
+            self._versions.setdefault(property_id, version)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._watch())
+        return queue
+
+    def unsubscribe(self, property_id: str, queue: asyncio.Queue):
+        """
+        購読を解除する
+
+        Args:
+            property_id: マンションID
+            queue: subscribe() が返したキュー
+        """
+        queues = self._subscribers.get(property_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[property_id]
+            self._versions.pop(property_id, None)
+
+    def publish(self, property_id: str, event: Dict[str, Any]):
+        """
+        購読者に通知を配る
+
+        Args:
+            property_id: マンションID
+            event: 通知内容
+        """
+        for queue in self._subscribers.get(property_id, ()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    async def check(self):
+        """購読中のマンションのスナップショットを確認し、新しいバージョンがあれば通知する"""
+        for property_id in list(self._subscribers):
+            try:
+                snapshot = await self.cache.aget(property_id)
+            except Exception as e:
+                logger.warning(f"Failed to check snapshot {property_id}: {e}")
+                continue
+            if snapshot is None:
+                continue
+            previous = self._versions.get(property_id)
+            self._versions[property_id] = snapshot.version
+            if previous is not None and previous != snapshot.version:
+                logger.info(f"Snapshot updated: {property_id} {previous} -> {snapshot.version}")
+                self.publish(property_id, snapshot_event(snapshot))
+
+    async def _watch(self):
+        """購読者がいる間だけ動く監視ループ"""
+        while self._subscribers:
+            await asyncio.sleep(self.interval)
+            await self.check()
+        self._task = None
@@ -0,0 +1,280 @@
+"""メモリマップで読むスナップショットの公開ファイル（latest.snap）
+
+latest.json の本文と、その gzip / Brotli 圧縮版、統計（stats.json）、変更セット
+（changes.json）、過去のバージョンからのデルタ（processed/deltas/）、物件IDのハッシュ表、
+間取り別・ソース別のシャード（processed/shards/）を
+1つのバイナリファイルにまとめます。server.py の各ワーカープロセスは
+このファイルを読み取り専用でメモリマップし、レスポンスはマップ上のビューをそのまま
+返します。ページはOSのページキャッシュで共有されるため、ワーカーを増やしても
+スナップショットの本文はプロセスごとに複製されません。
+
+形式:
+    MAGIC（8バイト） | ヘッダー長（uint32 LE） | ヘッダー（JSON） | セクション（8バイト境界）
+
+ヘッダーの sections はセクション名（"listings", "listings.gzip" など）からデータ部先頭からの
+(オフセット, 長さ) を引く表です。ファイルは一時ファイルからのリネームで置き換えるため、
+マップ済みの古いファイルは読み手が手放すまで有効なままです。
+"""
+import json
+import mmap
+import os
+import struct
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+from utils.data_manager import snapshot_version
+from utils.encoded_body import EncodedBody, compress_variants
+from utils.json_writer import AtomicWriter, dumps
+from utils.listing_lookup import build_lookup_sections
+from utils.logger import get_logger
+from utils.snapshot_delta import DeltaStore
+from utils.snapshot_shards import read_shards
+from utils.stats import compute_stats
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+logger = get_logger(__name__)
+
+
+MAGIC = b'RESNAP01'
+FORMAT_VERSION = 1
+FILENAME = 'latest.snap'
+
+_PREFIX = struct.Struct('<8sI')
+_ALIGN = 8
+
+
+def _align(offset: int) -> int:
+    return offset + (-offset % _ALIGN)
+
+
+def write_pack(filepath: str, header: Dict[str, Any], bodies: Dict[str, bytes],
+               raw_bodies: Optional[Dict[str, bytes]] = None) -> int:
+    """
+    本文と圧縮版をまとめたファイルをアトミックに書き出す
+
+    Args:
+        filepath: 出力先のパス
+        header: ヘッダーに含めるメタデータ
+        bodies: セクション名 -> 非圧縮の本文（圧縮版はここで作る）
+        raw_bodies: セクション名 -> レスポンスには使わないデータ（索引など。圧縮しない）
+
+    Returns:
+        int: 書き出したバイト数
+    """
+    sections = {}
+    digests = {}
+    blobs = []
+    offset = 0
+    entries = [(name, body, True) for name, body in bodies.items()]
+    entries += [(name, body, False) for name, body in (raw_bodies or {}).items()]
+    for name, body, compress in entries:
+        if compress:
+            digest, variants = compress_variants(body)
+            digests[name] = digest
+        else:
+            variants = {None: body}
+        for encoding, data in variants.items():
+            sections[name if encoding is None else f"{name}.{encoding}"] = [offset, len(data)]
+            blobs.append(data)
+            offset += len(data)
+            padding = _align(offset) - offset
+            if padding:
+                blobs.append(b'\0' * padding)
+                offset += padding
+
+    header_bytes = dumps(dict(header, format=FORMAT_VERSION, digests=digests, sections=sections))
+    prefix = _PREFIX.pack(MAGIC, len(header_bytes))
+    head_size = _PREFIX.size + len(header_bytes)
+
+    with AtomicWriter(filepath) as f:
+        f.write(prefix)
+        f.write(header_bytes)
+        f.write(b'\0' * (_align(head_size) - head_size))
+        for blob in blobs:
+            f.write(blob)
+    return _align(head_size) + offset
+
+
+def _read_sidecar(path: str) -> Optional[bytes]:
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def build_pack(processed_data_dir: str) -> str:
+    """
+    処理済みデータ（latest.json と stats.json / changes.json）から latest.snap を作る
+
+    Args:
+        processed_data_dir: 処理済みデータのディレクトリ
+
+    Returns:
+        str: 書き出したファイルパス
+    """
+    json_path = os.path.join(processed_data_dir, 'latest.json')
+    with open(json_path, 'rb') as f:
+        st = os.fstat(f.fileno())
+        body = f.read()
+    data = json.loads(body)
+    last_updated = data.get('last_updated')
+    version = data.get('version') or snapshot_version(last_updated)
+
+    bodies = {'listings': body}
+
+    # 同じ公開のものだけを含める（古い stats.json の場合は集計し直す）
+    stats_body = _read_sidecar(os.path.join(processed_data_dir, 'stats.json'))
+    if stats_body is None or json.loads(stats_body).get('last_updated') != last_updated:
+        stats_body = dumps({
+            'property_name': data.get('property_name'),
+            'last_updated': last_updated,
+            'stats': compute_stats(data.get('listings', [])),
+        })
+    bodies['stats'] = stats_body
+
+    changes_body = _read_sidecar(os.path.join(processed_data_dir, 'changes.json'))
+    if changes_body is not None and json.loads(changes_body).get('version') == version:
+        bodies['changes'] = changes_body
+
+    for since, delta in DeltaStore(processed_data_dir).load(version).items():
+        bodies[f"delta/{since}"] = dumps(delta)
+
+    # 間取り別・ソース別のシャード（同じ公開のものだけ）
+    shard_counts, shard_bodies = read_shards(processed_data_dir, version)
+    bodies.update(shard_bodies)
+
+    header = {
+        'property_name': data.get('property_name'),
+        'last_updated': last_updated,
+        'version': version,
+        'total_listings': len(data.get('listings', [])),
+        # 元にした latest.json（これと一致しない場合は作り直す）
+        'source': {'size': st.st_size, 'mtime_ns': st.st_mtime_ns},
+        # 種類 -> シャード名 -> 件数
+        'shards': shard_counts,
+    }
+    # 物件IDから物件を引くハッシュ表（/api/listings/{listing_id} 用）
+    raw_bodies = build_lookup_sections(body, data.get('listings', []))
+
+    filepath = os.path.join(processed_data_dir, FILENAME)
+    size = write_pack(filepath, header, bodies, raw_bodies)
+    logger.info(f"Snapshot pack saved: {filepath} ({size} bytes)")
+    return filepath
+
+
+@contextmanager
+def build_lock(processed_data_dir: str) -> Iterator[None]:
+    """
+    latest.snap の作成を複数のワーカープロセスで1つに限定するロック
+
+    Args:
+        processed_data_dir: 処理済みデータのディレクトリ
+    """
+    if fcntl is None:
+        yield
+        return
+    with open(os.path.join(processed_data_dir, f".{FILENAME}.lock"), 'w') as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class SnapshotPack:
+    """読み取り専用でメモリマップした latest.snap"""
+
+    def __init__(self, filepath: str):
+        """
+        初期化（ファイルをマップしてヘッダーを読む）
+
+        Args:
+            filepath: ファイルパス
+        """
+        with open(filepath, 'rb') as f:
+            st = os.fstat(f.fileno())
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.signature = (st.st_mtime_ns, st.st_size, st.st_ino)
+
+        magic, header_size = _PREFIX.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Not a snapshot pack: {filepath}")
+        self.header: Dict[str, Any] = json.loads(self._mmap[_PREFIX.size:_PREFIX.size + header_size])
+        if self.header.get('format') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot pack format: {self.header.get('format')}")
+        self._data_start = _align(_PREFIX.size + header_size)
+        self._view = memoryview(self._mmap)
+
+    def is_current(self, json_path: str) -> bool:
+        """
+        latest.json から作られたものか判定する
+
+        Args:
+            json_path: latest.json のパス
+
+        Returns:
+            bool: 元にした latest.json と一致する場合True
+        """
+        try:
+            st = os.stat(json_path)
+        except FileNotFoundError:
+            return True
+        source = self.header.get('source') or {}
+        return source.get('size') == st.st_size and source.get('mtime_ns') == st.st_mtime_ns
+
+    def section(self, name: str) -> Optional[memoryview]:
+        """
+        セクションのビューを取得する（コピーしない）
+
+        Args:
+            name: セクション名
+
+        Returns:
+            memoryview: セクションの内容（存在しない場合はNone）
+        """
+        entry = self.header['sections'].get(name)
+        if entry is None:
+            return None
+        offset, length = entry
+        start = self._data_start + offset
+        return self._view[start:start + length]
+
+    def encoded(self, name: str) -> Optional[EncodedBody]:
+        """
+        セクションと圧縮版からレスポンス本文を作る
+
+        Args:
+            name: セクション名
+
+        Returns:
+            EncodedBody: レスポンス本文（存在しない場合はNone）
+        """
+        body = self.section(name)
+        if body is None:
+            return None
+        variants = {None: body}
+        for encoding in ('gzip', 'br'):
+            compressed = self.section(f"{name}.{encoding}")
+            if compressed is not None:
+                variants[encoding] = compressed
+        return EncodedBody.from_variants(self.header['digests'][name], variants)
+
+    def load_json(self, name: str) -> Optional[Any]:
+        """
+        セクションをJSONとしてパースする
+
+        Args:
+            name: セクション名
+
+        Returns:
+            Any: パース済みのデータ（存在しない場合はNone）
+        """
+        body = self.section(name)
+        if body is None:
+            return None
+        return json.loads(bytes(body))
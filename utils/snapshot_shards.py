@@ -0,0 +1,196 @@
+"""間取り別・ソース別に分割した処理済みデータ（シャード）
+
+公開時に latest.json と同じ形式のファイルを間取りごと・データソースごとに
+processed/shards/{layout,source}/ に書き出し、件数・サイズ・チェックサムを
+processed/shards/manifest.json にまとめます。1つの間取りだけを使う分析や、
+一部の間取りだけを表示する画面は、全件の latest.json を読まずに済みます。
+
+server.py は latest.snap に入れたシャードから、リクエストされた間取り・ソースの分だけを返します
+（全件は従来どおり latest.json の内容を返します）。
+"""
+import hashlib
+import json
+import os
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from utils.json_writer import encode_snapshot, write_json_atomic, AtomicWriter
+from utils.logger import get_logger
+
+
+logger = get_logger(__name__)
+
+
+SHARD_DIR = 'shards'
+MANIFEST_FILENAME = 'manifest.json'
+
+# シャードの種類 -> 分割に使う物件のフィールド
+KINDS = {
+    'layout': 'layout',
+    'source': 'source',
+}
+
+# フィールドの値がない物件のシャード名
+UNKNOWN = 'unknown'
+
+
+def shard_name(record: Dict[str, Any], kind: str) -> str:
+    """物件が入るシャードの名前（間取り・ソース。値がない場合は unknown）"""
+    return record.get(KINDS[kind]) or UNKNOWN
+
+
+def shard_filename(name: str) -> str:
+    """
+    シャードのファイル名（英数字以外を _ にし、名前のハッシュを付けて衝突しないようにする）
+
+    Args:
+        name: シャード名（例: "2LDK", "SUUMO"）
+
+    Returns:
+        str: ファイル名（例: "2LDK-1a2b3c4d.json"）
+    """
+    slug = re.sub(r'[^0-9A-Za-z_-]+', '_', name).strip('_') or 'shard'
+    return f"{slug}-{hashlib.sha1(name.encode('utf-8')).hexdigest()[:8]}.json"
+
+
+def shard_section(kind: str, name: str) -> str:
+    """latest.snap のシャードのセクション名"""
+    return f"shard/{kind}/{name}"
+
+
+def group_records(records: Iterable[Dict[str, Any]], kind: str) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    物件をシャードごとに分ける（元の順序を保つ）
+
+    Args:
+        records: 物件データ
+        kind: シャードの種類（layout, source）
+
+    Returns:
+        Dict: シャード名 -> 物件データ
+    """
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for record in records:
+        groups.setdefault(shard_name(record, kind), []).append(record)
+    return groups
+
+
+def write_shards(processed_data_dir: str, header: Dict[str, Any], records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    間取り別・ソース別のシャードとマニフェストを書き出す（latest.json を置き換える前に呼び出す）
+
+    Args:
+        processed_data_dir: 処理済みデータのディレクトリ
+        header: latest.json のヘッダー（property_name, last_updated, version）
+        records: 物件データ
+
+    Returns:
+        Dict: マニフェスト
+    """
+    shard_root = os.path.join(processed_data_dir, SHARD_DIR)
+    manifest = {
+        'property_name': header.get('property_name'),
+        'last_updated': header.get('last_updated'),
+        'version': header.get('version'),
+        'total_listings': len(records),
+        'shards': {},
+    }
+    written = set()
+    for kind in KINDS:
+        directory = os.path.join(shard_root, kind)
+        os.makedirs(directory, exist_ok=True)
+        entries = manifest['shards'][kind] = {}
+        for name, group in sorted(group_records(records, kind).items()):
+            body = encode_snapshot(
+                dict(header, total_listings=len(group), shard={'kind': kind, 'name': name}), 'listings', group)
+            path = os.path.join(kind, shard_filename(name))
+            with AtomicWriter(os.path.join(shard_root, path)) as f:
+                f.write(body)
+            written.add(path)
+            entries[name] = {
+                'path': path,
+                'count': len(group),
+                'bytes': len(body),
+                'sha256': hashlib.sha256(body).hexdigest(),
+            }
+    write_json_atomic(os.path.join(shard_root, MANIFEST_FILENAME), manifest)
+
+    # 今回のマニフェストにないシャード（なくなった間取り・ソース）を削除する
+    for kind in KINDS:
+        for filename in os.listdir(os.path.join(shard_root, kind)):
+            if os.path.join(kind, filename) not in written and filename.endswith('.json'):
+                os.remove(os.path.join(shard_root, kind, filename))
+
+    logger.info(f"Shards saved: {shard_root} ("
+                + ', '.join(f"{len(manifest['shards'][kind])} {kind}" for kind in KINDS) + ")")
+    return manifest
+
+
+def load_manifest(processed_data_dir: str) -> Optional[Dict[str, Any]]:
+    """
+    マニフェストを読み込む
+
+    Args:
+        processed_data_dir: 処理済みデータのディレクトリ
+
+    Returns:
+        Dict: マニフェスト（ない場合はNone）
+    """
+    try:
+        with open(os.path.join(processed_data_dir, SHARD_DIR, MANIFEST_FILENAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def read_shards(processed_data_dir: str, version: str) -> Tuple[Dict[str, Dict[str, int]], Dict[str, bytes]]:
+    """
+    latest.snap に入れるシャードを読み込む（チェックサムが一致するものだけ）
+
+    Args:
+        processed_data_dir: 処理済みデータのディレクトリ
+        version: latest.json のバージョン（マニフェストが別のバージョンの場合は読み込まない）
+
+    Returns:
+        Tuple: (種類 -> シャード名 -> 件数, セクション名 -> 内容)
+    """
+    manifest = load_manifest(processed_data_dir)
+    if manifest is None or manifest.get('version') != version:
+        return {}, {}
+    counts: Dict[str, Dict[str, int]] = {}
+    bodies: Dict[str, bytes] = {}
+    for kind, entries in manifest.get('shards', {}).items():
+        counts[kind] = {}
+        for name, entry in entries.items():
+            try:
+                with open(os.path.join(processed_data_dir, SHARD_DIR, entry['path']), 'rb') as f:
+                    body = f.read()
+            except FileNotFoundError:
+                body = None
+            if body is None or hashlib.sha256(body).hexdigest() != entry['sha256']:
+                logger.warning(f"Shard missing or modified, skipped: {kind}/{name}")
+                return {}, {}
+            counts[kind][name] = entry['count']
+            bodies[shard_section(kind, name)] = body
+    return counts, bodies
+
+
+def select_records(records: Iterable[Dict[str, Any]], layouts: Optional[List[str]] = None,
+                   sources: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    間取り・ソースで物件を絞り込む（シャードと同じく、値がない物件は unknown とみなす）
+
+    Args:
+        records: 物件データ
+        layouts: 間取り（いずれかに一致）
+        sources: データソース（いずれかに一致）
+
+    Returns:
+        List[Dict]: 物件データ
+    """
+    layout_set = set(layouts) if layouts else None
+    source_set = set(sources) if sources else None
+    return [
+        record for record in records
+        if (layout_set is None or shard_name(record, 'layout') in layout_set)
+        and (source_set is None or shard_name(record, 'source') in source_set)
+    ]
@@ -0,0 +1,223 @@
+"""静的ファイル（CSS / JS / HTML）のビルドと配信
+
+ビルド時に web/ 以下のCSS・JSをハッシュ付きのファイル名（style.3f2a9c1d0b4e.css など）で
+出力し、HTML内の参照を書き換え、gzip / Brotli の圧縮版を作っておきます。
+ハッシュ付きのファイルは内容が変わるとURLも変わるため、ブラウザには
+Cache-Control: immutable で1年間キャッシュさせ、再訪時のリクエストをなくします。
+HTMLはURLを変えられないため、ETagで再検証させます。
+
+ビルド結果は manifest.json に記録し、元のファイルが変更されている場合は
+（ビルドし直すまで）ビルド結果を使わずに元のファイルをそのまま配信します。
+"""
+import hashlib
+import json
+import mimetypes
+import os
+import re
+from typing import Any, Dict, List, Optional
+from utils.encoded_body import EncodedBody, compress_variants
+from utils.json_writer import AtomicWriter, write_json_atomic
+from utils.logger import get_logger
+
+
+logger = get_logger(__name__)
+
+
+MANIFEST = 'manifest.json'
+# ビルド結果の出力先（web/ からの相対パス）
+DIST_DIR = 'dist'
+HASH_LENGTH = 12
+
+# ハッシュ付きファイルのキャッシュ（内容が変わればURLが変わる）
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# HTML内の /static/... への参照（?v=2 などのクエリは外す）
+_STATIC_REF = re.compile(r'''((?:href|src)=["'])/static/([^"'?#]+)(?:\?[^"'#]*)?(["'])''')
+
+_ENCODING_SUFFIXES = {'gzip': '.gz', 'br': '.br'}
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _hashed_name(path: str, digest: str) -> str:
+    """css/style.css -> css/style.{hash}.css"""
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.{digest[:HASH_LENGTH]}{ext}"
+
+
+def _write_variants(dist_dir: str, path: str, body: bytes) -> Dict[str, Any]:
+    """本文と圧縮版を書き出し、マニフェストのエントリを返す"""
+    digest, variants = compress_variants(body)
+    for encoding, data in variants.items():
+        filepath = os.path.join(dist_dir, path + ('' if encoding is None else _ENCODING_SUFFIXES[encoding]))
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        with AtomicWriter(filepath) as f:
+            f.write(data)
+    return {'path': path, 'digest': digest, 'encodings': [e for e in variants if e is not None]}
+
+
+def entry_files(entry: Dict[str, Any]) -> List[str]:
+    """
+    マニフェストのエントリのファイル（非圧縮と圧縮版）
+
+    Args:
+        entry: マニフェストのエントリ
+
+    Returns:
+        List[str]: 出力先からの相対パス
+    """
+    return [entry['path']] + [entry['path'] + _ENCODING_SUFFIXES[e] for e in entry['encodings']]
+
+
+def _prune(dist_dir: str, manifest: Dict[str, Any]) -> int:
+    """マニフェストに含まれないファイルを削除する"""
+    keep = {MANIFEST}
+    for entry in list(manifest['assets'].values()) + list(manifest['pages'].values()):
+        keep.update(entry_files(entry))
+    removed = 0
+    for root, _, files in os.walk(dist_dir):
+        for name in files:
+            filepath = os.path.join(root, name)
+            if os.path.relpath(filepath, dist_dir).replace(os.sep, '/') not in keep:
+                os.remove(filepath)
+                removed += 1
+    return removed
+
+
+def build_assets(web_dir: str, dist_dir: Optional[str] = None) -> Dict[str, Any]:
+    """
+    静的ファイルをビルドする
+
+    Args:
+        web_dir: 元のファイルのディレクトリ（web/）
+        dist_dir: 出力先（省略時は web/dist/）
+
+    Returns:
+        Dict: マニフェスト（assets: 元のパス -> ハッシュ付きのパス、pages: HTMLファイル名 -> エントリ）
+    """
+    dist_dir = dist_dir or os.path.join(web_dir, DIST_DIR)
+    os.makedirs(dist_dir, exist_ok=True)
+    dist_abs = os.path.abspath(dist_dir)
+
+    assets = {}
+    pages = {}
+    sources = {}
+    html_files = []
+    for root, dirs, files in os.walk(web_dir):
+        # 出力先は対象外
+        dirs[:] = sorted(d for d in dirs if os.path.abspath(os.path.join(root, d)) != dist_abs)
+        for name in sorted(files):
+            filepath = os.path.join(root, name)
+            rel = os.path.relpath(filepath, web_dir).replace(os.sep, '/')
+            with open(filepath, 'rb') as f:
+                body = f.read()
+            sources[rel] = _digest(body)
+            if name.endswith('.html'):
+                html_files.append((rel, body))
+                continue
+            entry = _write_variants(dist_dir, _hashed_name(rel, sources[rel]), body)
+            assets[rel] = entry
+
+    def rewrite(match):
+        entry = assets.get(match.group(2))
+        if entry is None:
+            return match.group(0)
+        return f"{match.group(1)}/static/{entry['path']}{match.group(3)}"
+
+    for rel, body in html_files:
+        html = _STATIC_REF.sub(rewrite, body.decode('utf-8'))
+        pages[rel] = _write_variants(dist_dir, rel, html.encode('utf-8'))
+
+    manifest = {'sources': sources, 'assets': assets, 'pages': pages}
+    write_json_atomic(os.path.join(dist_dir, MANIFEST), manifest)
+    # 以前のビルドのハッシュ付きファイルを削除する
+    _prune(dist_dir, manifest)
+    logger.info(f"Static assets built: {len(assets)} asset(s), {len(pages)} page(s) -> {dist_dir}")
+    return manifest
+
+
+class StaticAssets:
+    """ビルド済みの静的ファイル（起動時に読み込み、メモリから配信する）"""
+
+    def __init__(self, web_dir: str, dist_dir: Optional[str] = None):
+        """
+        初期化（ビルド結果を読み込む。ない・古い場合は空のまま）
+
+        Args:
+            web_dir: 元のファイルのディレクトリ（web/）
+            dist_dir: ビルド結果のディレクトリ（省略時は web/dist/）
+        """
+        self.web_dir = web_dir
+        self.dist_dir = dist_dir or os.path.join(web_dir, DIST_DIR)
+        # /static/ 以下のハッシュ付きパス -> (本文, Content-Type)
+        self.assets: Dict[str, Any] = {}
+        # HTMLファイル名 -> (本文, Content-Type)
+        self.pages: Dict[str, Any] = {}
+
+        manifest = self._load_manifest()
+        if manifest is None:
+            return
+        for entry in manifest['assets'].values():
+            self.assets[entry['path']] = self._load_entry(entry)
+        for name, entry in manifest['pages'].items():
+            self.pages[name] = self._load_entry(entry)
+        logger.info(f"Static assets loaded: {len(self.assets)} asset(s), {len(self.pages)} page(s)")
+
+    def _load_manifest(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(os.path.join(self.dist_dir, MANIFEST), 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to load static manifest: {e}")
+            return None
+
+        # 元のファイルがビルド後に変更されていれば使わない
+        for rel, digest in manifest.get('sources', {}).items():
+            try:
+                with open(os.path.join(self.web_dir, rel), 'rb') as f:
+                    current = _digest(f.read())
+            except FileNotFoundError:
+                current = None
+            if current != digest:
+                logger.warning(f"Static assets are stale ({rel} changed); serving unbuilt files")
+                return None
+        return manifest
+
+    def _load_entry(self, entry: Dict[str, Any]):
+        variants = {}
+        for encoding in [None] + entry['encodings']:
+            suffix = '' if encoding is None else _ENCODING_SUFFIXES[encoding]
+            with open(os.path.join(self.dist_dir, entry['path'] + suffix), 'rb') as f:
+                variants[encoding] = f.read()
+        media_type = mimetypes.guess_type(entry['path'])[0] or 'application/octet-stream'
+        if media_type.startswith('text/') or media_type == 'application/javascript':
+            media_type += '; charset=utf-8'
+        return EncodedBody.from_variants(entry['digest'], variants), media_type
+
+    def asset(self, path: str):
+        """
+        ハッシュ付きのファイルを取得する
+
+        Args:
+            path: /static/ 以下のパス
+
+        Returns:
+            Tuple: (本文, Content-Type)（ビルド済みのファイルでない場合はNone）
+        """
+        return self.assets.get(path)
+
+    def page(self, name: str):
+        """
+        参照を書き換えたHTMLを取得する
+
+        Args:
+            name: HTMLファイル名（index.html など）
+
+        Returns:
+            Tuple: (本文, Content-Type)（ビルドしていない場合はNone）
+        """
+        return self.pages.get(name)
@@ -0,0 +1,207 @@
+"""静的サイトの生成（プリレンダリング）
+
+公開済みのデータ（processed/latest.json）から、マンション一覧（index.html）と
+各マンションのページ（{PropertyID}/index.html）を、初期表示に必要なデータを埋め込んだ
+HTMLとして出力します。出力先はそのまま任意の静的ホスティングで配信でき、
+ページの表示に必要なリクエストはHTMLの1回だけになります（CSS・JSはハッシュ付きで長期キャッシュ）。
+
+埋め込んだデータは <script id="initial-data" type="application/json"> に入り、
+app.js は API を呼ばずにこれを表示します（静的サイトではSSEによる更新は行いません）。
+"""
+import html
+import json
+import os
+import re
+import shutil
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+from utils.json_writer import dumps
+from utils.listing_query import dedupe_listings
+from utils.logger import get_logger
+from utils.static_assets import DIST_DIR, build_assets, entry_files
+
+
+logger = get_logger(__name__)
+
+
+JST = timezone(timedelta(hours=9))
+
+
+def embed_json(body: bytes) -> bytes:
+    """
+    JSONを <script> 要素に埋め込めるようにする（</script> で終わらないようにする）
+
+    Args:
+        body: JSON
+
+    Returns:
+        bytes: 埋め込み用のJSON（</ を <\\/ にしたもの。JSONとしては同じ値）
+    """
+    return body.replace(b'</', b'<\\/')
+
+
+def _initial_data_script(body: bytes) -> str:
+    return f'<script id="initial-data" type="application/json">{embed_json(body).decode("utf-8")}</script>'
+
+
+def format_price(price: Optional[int]) -> str:
+    """価格の表示（app.js の formatPrice と同じHTML）"""
+    if not price:
+        return '-'
+    if price >= 100000000:
+        oku, man = price // 100000000, (price % 100000000) // 10000
+        man_part = f'<span style="font-size:1.1em">{man}</span>万' if man > 0 else ''
+        return f'<span style="font-size:1.4em">{oku}</span>億{man_part}円'
+    return f'<span style="font-size:1.4em">{price // 10000}</span>万円'
+
+
+def format_updated(last_updated: Optional[str]) -> str:
+    """更新日時の表示（日本時間）"""
+    if not last_updated:
+        return '-'
+    try:
+        updated = datetime.fromisoformat(last_updated).astimezone(JST)
+    except ValueError:
+        return html.escape(last_updated)
+    return f"{updated.year}/{updated.month}/{updated.day} {updated.hour}:{updated.minute:02d}:{updated.second:02d}"
+
+
+def unique_listings(listings: List[Dict[str, Any]], layouts: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    API・app.js と同じ条件（dedupe_listings）で重複を除いた物件（初期表示の件数・最低価格の計算用）
+
+    Args:
+        listings: 物件データ
+        layouts: 表示する間取り（省略時はすべて）
+
+    Returns:
+        List[Dict]: 重複を除いた物件
+    """
+    unique = dedupe_listings(listings)
+    if layouts:
+        unique = [listing for listing in unique if listing.get('layout') in layouts]
+    return unique
+
+
+def _replace(pattern: str, replacement: str, text: str) -> str:
+    """テンプレートの要素の中身を置き換える（見つからない場合はそのまま）"""
+    return re.sub(pattern, lambda m: m.group(1) + replacement + m.group(2), text, count=1, flags=re.S)
+
+
+def render_property_page(template: str, property_info: Dict[str, Any], snapshot_body: bytes) -> str:
+    """
+    マンションのページをプリレンダリングする
+
+    Args:
+        template: property.html（静的ファイルの参照を書き換えたもの）
+        property_info: マンション情報（id, name, area, layouts）
+        snapshot_body: latest.json の内容
+
+    Returns:
+        str: HTML
+    """
+    snapshot = json.loads(snapshot_body)
+    listings = unique_listings(snapshot.get('listings', []), property_info.get('layouts'))
+    prices = [l['price'] for l in listings if l.get('price')]
+    name = html.escape(property_info['name'])
+
+    page = _replace(r'(<title>).*?(</title>)', name, template)
+    page = _replace(r'(<h1>).*?(</h1>)', name, page)
+    page = _replace(r'(id="total-listings">).*?(</span>)', str(len(listings)), page)
+    page = _replace(r'(id="min-price">).*?(</span>)', format_price(min(prices) if prices else None), page)
+    page = _replace(r'(id="last-updated">).*?(</span>)', format_updated(snapshot.get('last_updated')), page)
+
+    # latest.json はパースし直さずにそのまま埋め込む
+    body = (b'{"static":true,"property":' + dumps(property_info) + b',"snapshot":' + snapshot_body + b'}')
+    return page.replace('</body>', f'    {_initial_data_script(body)}\n</body>', 1)
+
+
+def render_index_page(template: str, properties: List[Dict[str, Any]]) -> str:
+    """
+    マンション一覧をプリレンダリングする
+
+    Args:
+        template: index.html
+        properties: マンション情報のリスト
+
+    Returns:
+        str: HTML
+    """
+    cards = ''.join(
+        f'<a href="/{html.escape(p["id"])}/" class="property-card">'
+        f'<div class="property-name">{html.escape(p["name"])}</div>'
+        f'<div class="property-area">{html.escape(p.get("area") or "")}</div></a>'
+        for p in properties
+    )
+    # 読み込み中の表示をカードに置き換える
+    page = _replace(r'(id="properties-list">)\s*<div[^>]*>[^<]*</div>(\s*</div>)', cards, template)
+    # 一覧を描画するインラインスクリプトより前に置く
+    return page.replace('<script>', f'{_initial_data_script(dumps({"properties": properties}))}\n    <script>', 1)
+
+
+def _write(filepath: str, text: str):
+    # 一時ディレクトリごと入れ替えるため、個々のファイルはそのまま書き込む
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    with open(filepath, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+def generate_site(config: Dict[str, Any], output_dir: str, web_dir: str = 'web') -> int:
+    """
+    静的サイトを生成する（一時ディレクトリに作ってから出力先と入れ替える）
+
+    Args:
+        config: 設定（properties, output.data_base_dir）
+        output_dir: 出力先
+        web_dir: Webフロントエンドのディレクトリ
+
+    Returns:
+        int: 生成したマンションのページ数
+    """
+    manifest = build_assets(web_dir)
+    dist_dir = os.path.join(web_dir, DIST_DIR)
+    staging_dir = f"{output_dir.rstrip(os.sep)}.tmp"
+    shutil.rmtree(staging_dir, ignore_errors=True)
+
+    # ハッシュ付きのCSS・JSと圧縮版（静的ホスティングの事前圧縮配信用）
+    for entry in manifest['assets'].values():
+        for path in entry_files(entry):
+            target = os.path.join(staging_dir, 'static', path)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copyfile(os.path.join(dist_dir, path), target)
+
+    def template(name):
+        with open(os.path.join(dist_dir, manifest['pages'][name]['path']), 'r', encoding='utf-8') as f:
+            return f.read()
+
+    properties = [
+        {'id': p['id'], 'name': p['name'], 'area': p.get('area'), 'layouts': p.get('layouts', [])}
+        for p in config['properties']
+    ]
+    data_base_dir = config['output']['data_base_dir']
+    property_template = template('property.html')
+    generated = 0
+    for property_info in properties:
+        json_path = os.path.join(data_base_dir, property_info['id'], 'processed', 'latest.json')
+        try:
+            with open(json_path, 'rb') as f:
+                snapshot_body = f.read()
+        except FileNotFoundError:
+            logger.warning(f"No published data for {property_info['id']}: {json_path}")
+            continue
+        _write(os.path.join(staging_dir, property_info['id'], 'index.html'),
+               render_property_page(property_template, property_info, snapshot_body))
+        generated += 1
+
+    _write(os.path.join(staging_dir, 'index.html'), render_index_page(template('index.html'), properties))
+
+    # 出力先を入れ替える
+    previous_dir = f"{output_dir.rstrip(os.sep)}.old"
+    shutil.rmtree(previous_dir, ignore_errors=True)
+    if os.path.exists(output_dir):
+        os.rename(output_dir, previous_dir)
+    os.rename(staging_dir, output_dir)
+    shutil.rmtree(previous_dir, ignore_errors=True)
+
+    logger.info(f"Static site generated: {generated} property page(s) -> {output_dir}")
+    return generated
@@ -0,0 +1,124 @@
+"""物件データの集計
+
+スナップショットの公開時に一度だけ、価格・単価・管理費などの統計を
+全体・間取り別・ソース別・階数帯別に集計します。
+"""
+from statistics import median
+from typing import Any, Dict, Iterable, List, Optional
+
+
+# 1坪 = 3.3058 m²（app.js と同じ）
+TSUBO_M2 = 3.3058
+
+# 階数帯の幅
+FLOOR_BAND_SIZE = 10
+
+
+def floor_band(floor: Optional[int]) -> str:
+    """
+    階数を階数帯のラベルに変換する
+
+    Args:
+        floor: 階数
+
+    Returns:
+        str: 階数帯（例: "1-9F", "10-19F", 不明の場合は "unknown"）
+    """
+    if not floor:
+        return 'unknown'
+    if floor < 0:
+        return 'B'
+    low = (floor // FLOOR_BAND_SIZE) * FLOOR_BAND_SIZE
+    return f"{max(low, 1)}-{low + FLOOR_BAND_SIZE - 1}F"
+
+
+def _summary(values: List[float], total: bool = False) -> Optional[Dict[str, float]]:
+    if not values:
+        return None
+    summary = {
+        'min': min(values),
+        'median': median(values),
+        'max': max(values),
+    }
+    if total:
+        summary['total'] = sum(values)
+    return summary
+
+
+class _Group:
+    """集計中のグループ"""
+
+    __slots__ = ('count', 'prices', 'per_m2', 'per_tsubo', 'management_fees', 'repair_reserves', 'monthly_fees')
+
+    def __init__(self):
+        self.count = 0
+        self.prices = []
+        self.per_m2 = []
+        self.per_tsubo = []
+        self.management_fees = []
+        self.repair_reserves = []
+        self.monthly_fees = []
+
+    def add(self, listing: Dict[str, Any]):
+        self.count += 1
+        price = listing.get('price')
+        area = listing.get('area')
+        if price:
+            self.prices.append(price)
+            if area:
+                self.per_m2.append(price / area)
+                self.per_tsubo.append(price / (area / TSUBO_M2))
+        management_fee = listing.get('management_fee')
+        repair_reserve = listing.get('repair_reserve')
+        if management_fee:
+            self.management_fees.append(management_fee)
+        if repair_reserve:
+            self.repair_reserves.append(repair_reserve)
+        if management_fee or repair_reserve:
+            self.monthly_fees.append((management_fee or 0) + (repair_reserve or 0))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'price': _summary(self.prices),
+            'price_per_m2': _summary(self.per_m2),
+            'price_per_tsubo': _summary(self.per_tsubo),
+            'management_fee': _summary(self.management_fees, total=True),
+            'repair_reserve': _summary(self.repair_reserves, total=True),
+            'monthly_fees': _summary(self.monthly_fees, total=True),
+        }
+
+
+def compute_stats(listings: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    物件データを集計する
+
+    Args:
+        listings: 物件データ
+
+    Returns:
+        Dict: overall と by_layout / by_source / by_floor_band ごとの集計
+            （各集計は count と price, price_per_m2, price_per_tsubo, management_fee,
+            repair_reserve, monthly_fees の min / median / max（手数料は total も））
+    """
+    overall = _Group()
+    by_layout: Dict[str, _Group] = {}
+    by_source: Dict[str, _Group] = {}
+    by_floor_band: Dict[str, _Group] = {}
+
+    for listing in listings:
+        overall.add(listing)
+        by_layout.setdefault(listing.get('layout') or 'unknown', _Group()).add(listing)
+        by_source.setdefault(listing.get('source') or 'unknown', _Group()).add(listing)
+        by_floor_band.setdefault(floor_band(listing.get('floor')), _Group()).add(listing)
+
+    def band_order(label):
+        head = label.split('-')[0]
+        return (0, int(head)) if head.isdigit() else (1, label)
+
+    return {
+        'overall': overall.to_dict(),
+        'by_layout': {k: by_layout[k].to_dict() for k in sorted(by_layout)},
+        'by_source': {k: by_source[k].to_dict() for k in sorted(by_source)},
+        'by_floor_band': {k: by_floor_band[k].to_dict() for k in sorted(by_floor_band, key=band_order)},
+    }
@@ -0,0 +1,240 @@
+"""m²単価の時系列（日次・週次・月次）
+
+公開のたびに、マンション・間取りごとのm²単価（中央値・最小・最大）を日次・週次・月次で
+processed/timeseries.json に積み上げます。過去のスナップショットを読み直さずにグラフを描けるように、
+集計は公開時に今回の期間（日・週・月）の分だけ更新します。
+
+各期間の値は、その期間に掲載された物件ごとの最新のm²単価から求めます。
+集計中の期間の物件ごとの単価は processed/timeseries_open.json に保持し、
+期間が変わったら新しい期間の集計を始めます（終わった期間の値は変わりません）。
+
+グラフ用の取得（query_series）では、期間に応じて解像度を選び、
+それでも点数が多い場合は LTTB または最小・最大で指定した点数以下に間引きます。
+"""
+import json
+import os
+from datetime import date, datetime, timedelta, timezone
+from statistics import median
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from utils.downsample import METHODS, downsample
+from utils.json_writer import write_json_atomic
+from utils.logger import get_logger
+
+
+logger = get_logger(__name__)
+
+
+FILENAME = 'timeseries.json'
+OPEN_FILENAME = 'timeseries_open.json'
+
+# 期間は日本時間で区切る
+JST = timezone(timedelta(hours=9))
+
+RESOLUTIONS = ('daily', 'weekly', 'monthly')
+
+# 全間取りの系列
+ALL_LAYOUTS = 'all'
+
+DEFAULT_POINTS = 200
+MAX_POINTS = 2000
+
+
+def bucket_start(day: date, resolution: str) -> date:
+    """
+    日付が含まれる期間の初日を求める
+
+    Args:
+        day: 日付
+        resolution: daily, weekly（月曜始まり）, monthly
+
+    Returns:
+        date: 期間の初日
+    """
+    if resolution == 'daily':
+        return day
+    if resolution == 'weekly':
+        return day - timedelta(days=day.weekday())
+    if resolution == 'monthly':
+        return day.replace(day=1)
+    raise ValueError(f"Invalid resolution: {resolution} (expected one of {', '.join(RESOLUTIONS)})")
+
+
+def _point(bucket: str, values: List[float]) -> List[Any]:
+    """期間の集計（[期間の初日, 件数, 中央値, 最小, 最大]）"""
+    return [bucket, len(values), round(median(values)), round(min(values)), round(max(values))]
+
+
+class PriceTimeSeries:
+    """1マンション分のm²単価の時系列"""
+
+    def __init__(self, processed_data_dir: str):
+        """
+        初期化
+
+        Args:
+            processed_data_dir: 処理済みデータのディレクトリ
+        """
+        self.filepath = os.path.join(processed_data_dir, FILENAME)
+        self.open_filepath = os.path.join(processed_data_dir, OPEN_FILENAME)
+
+    @staticmethod
+    def _read(filepath: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to load time series {filepath}: {e}")
+            return None
+
+    def load(self) -> Dict[str, Any]:
+        """
+        時系列を読み込む
+
+        Returns:
+            Dict: last_updated, series（解像度 -> 間取り -> [期間の初日, 件数, 中央値, 最小, 最大] のリスト）。
+                ない場合は空の時系列
+        """
+        return self._read(self.filepath) or {
+            'last_updated': None,
+            'series': {resolution: {} for resolution in RESOLUTIONS},
+        }
+
+    def publish(self, last_updated: str, entries: Iterable[Tuple[str, Dict[str, Any]]]) -> bool:
+        """
+        今回掲載中の物件で、今回の期間の集計を更新する
+
+        Args:
+            last_updated: 今回の更新時刻（ISO 8601）
+            entries: (キー, 物件データ) のリスト
+
+        Returns:
+            bool: 更新した場合はTrue（更新時刻が集計中の期間より前の場合は更新しない）
+        """
+        day = datetime.fromisoformat(last_updated).astimezone(JST).date()
+        prices = {}
+        for key, record in entries:
+            price, area = record.get('price'), record.get('area')
+            if price and area:
+                prices[key] = [record.get('layout') or 'unknown', price / area]
+
+        timeseries = self.load()
+        opened = self._read(self.open_filepath) or {}
+        for resolution in RESOLUTIONS:
+            bucket = bucket_start(day, resolution).isoformat()
+            current = opened.get(resolution)
+            if current and bucket < current['bucket']:
+                # 再パースなどで過去の時刻で公開した場合（終わった期間は変えない）
+                logger.warning(f"Time series not updated: {last_updated} is before the open "
+                               f"{resolution} period {current['bucket']}")
+                return False
+            if not current or current['bucket'] != bucket:
+                current = opened[resolution] = {'bucket': bucket, 'prices': {}}
+            current['prices'].update(prices)
+
+            by_layout: Dict[str, List[float]] = {ALL_LAYOUTS: []}
+            for layout, per_m2 in current['prices'].values():
+                by_layout[ALL_LAYOUTS].append(per_m2)
+                by_layout.setdefault(layout, []).append(per_m2)
+
+            series = timeseries['series'].setdefault(resolution, {})
+            for layout, values in by_layout.items():
+                if not values:
+                    continue
+                points = series.setdefault(layout, [])
+                if points and points[-1][0] == bucket:
+                    points[-1] = _point(bucket, values)
+                else:
+                    points.append(_point(bucket, values))
+
+        timeseries['last_updated'] = last_updated
+        # 集計中の期間の単価を先に書き出す（時系列だけが更新された状態にならないように）
+        write_json_atomic(self.open_filepath, opened)
+        write_json_atomic(self.filepath, timeseries)
+        logger.info(f"Time series saved: {self.filepath} ({len(prices)} priced listings on {day.isoformat()})")
+        return True
+
+
+def _select_resolution(series_list: List[List[List[Any]]], points: int) -> str:
+    """期間内の点数が points 以下になる最も細かい解像度（なければ monthly）"""
+    for resolution in RESOLUTIONS:
+        if all(len(series[resolution]) <= points for series in series_list):
+            return resolution
+    return RESOLUTIONS[-1]
+
+
+def query_series(timeseries_list: List[Tuple[Dict[str, Any], Dict[str, Any]]],
+                 layouts: Optional[List[str]] = None, resolution: str = 'auto',
+                 start: Optional[str] = None, end: Optional[str] = None,
+                 points: int = DEFAULT_POINTS, method: str = 'lttb') -> Dict[str, Any]:
+    """
+    グラフ用の時系列を取得する（各系列の点数は points 以下）
+
+    Args:
+        timeseries_list: (マンション情報, PriceTimeSeries.load() の結果) のリスト
+        layouts: 間取り（省略時は全間取り）
+        resolution: auto（期間に応じて選ぶ）, daily, weekly, monthly
+        start, end: 期間（YYYY-MM-DD、両端を含む）
+        points: 系列ごとの最大点数（上限 MAX_POINTS）
+        method: 間引き方（lttb, minmax）
+
+    Returns:
+        Dict: resolution, method, series（マンション・間取りごとの点。
+            点は t（期間の初日）, count, median, min, max（円/m²））
+    """
+    if resolution != 'auto' and resolution not in RESOLUTIONS:
+        raise ValueError(f"Invalid resolution: {resolution} (expected auto or one of {', '.join(RESOLUTIONS)})")
+    if method not in METHODS:
+        raise ValueError(f"Invalid method: {method} (expected one of {', '.join(METHODS)})")
+    for value in (start, end):
+        if value:
+            try:
+                date.fromisoformat(value)
+            except ValueError:
+                raise ValueError(f"Invalid date: {value} (expected YYYY-MM-DD)")
+    points = max(2, min(points, MAX_POINTS))
+    layouts = layouts or [ALL_LAYOUTS]
+
+    def in_range(series, resolution):
+        # 期間の初日が start より前でも、start を含む期間は残す
+        first = bucket_start(date.fromisoformat(start), resolution).isoformat() if start else None
+        return [p for p in series if (not first or p[0] >= first) and (not end or p[0] <= end)]
+
+    # (マンション情報, 間取り, 解像度 -> 期間内の点)
+    selected = []
+    for property_info, timeseries in timeseries_list:
+        for layout in layouts:
+            selected.append((property_info, layout, {
+                r: in_range(timeseries['series'].get(r, {}).get(layout, []), r) for r in RESOLUTIONS
+            }))
+
+    if resolution == 'auto':
+        resolution = _select_resolution([series for _, _, series in selected], points)
+
+    result = []
+    for property_info, layout, series in selected:
+        rows = series[resolution]
+        total = len(rows)
+        if total > points:
+            x = np.array([date.fromisoformat(row[0]).toordinal() for row in rows], dtype=np.float64)
+            y = np.array([row[2] for row in rows], dtype=np.float64)
+            rows = [rows[i] for i in downsample(x, y, points, method).tolist()]
+        result.append({
+            'property_id': property_info['id'],
+            'property_name': property_info.get('name'),
+            'layout': layout,
+            'total_points': total,
+            'points': [{'t': t, 'count': count, 'median': med, 'min': low, 'max': high}
+                       for t, count, med, low, high in rows],
+        })
+
+    return {
+        'resolution': resolution,
+        'method': method,
+        'max_points': points,
+        'series': result,
+    }
@@ -13,25 +13,86 @@ document.addEventListener('DOMContentLoaded', () => {
     const searchInput = document.getElementById('search-input');
     const refreshBtn = document.getElementById('refresh-btn');
 
+    // 仮想スクロール: 表示範囲の前後に余分に描画する行数、行の高さ（gap込み）の初期値
+    const OVERSCAN_ROWS = 4;
+    const DEFAULT_ROW_STRIDE = 300;
+    const SEARCH_DEBOUNCE_MS = 150;
+
     // State
     let listings = [];
+    let searchTexts = [];        // 検索用に小文字化したタイトルとサイト名（listings と同じ並び）
+    let filtered = [];           // 絞り込み・並び替え後の物件
+    let cardPool = [];           // 再利用するカード要素（表示中の位置の順）
+    let renderedRange = null;    // 描画中の [開始, 終了) の位置
+    let rowStride = DEFAULT_ROW_STRIDE;
+    let frameRequested = false;
+    let searchTimer = null;
+    let rawListings = [];        // サーバーから受け取ったままの物件（変更セットの適用用）
+    let snapshotVersion = null;  // 表示中のスナップショットのバージョン
+    let eventSource = null;
     let currentProperty = null;
+    let loadedLayouts = null;    // 読み込み済みの間取り（null は全件。全件の場合だけ差分を適用できる）
+
+    // 静的サイト（generate_site.py）ではページに初期データが埋め込まれている
+    const initialData = readInitialData();
 
     // Initial Load
-    loadPropertyInfo();
-    fetchListings();
+    if (initialData) {
+        applyInitialData(initialData);
+    } else {
+        loadPropertyInfo();
+        fetchListings(requestedLayouts());
+    }
 
     // Event Listeners
     layoutCheckboxes.forEach(checkbox => {
-        checkbox.addEventListener('change', renderListings);
+        checkbox.addEventListener('change', onLayoutChange);
     });
     sortSelect.addEventListener('change', renderListings);
-    searchInput.addEventListener('input', renderListings);
+    searchInput.addEventListener('input', () => {
+        // 入力中は絞り込まず、入力が止まってから1回だけ描画する
+        clearTimeout(searchTimer);
+        searchTimer = setTimeout(renderListings, SEARCH_DEBOUNCE_MS);
+    });
+    window.addEventListener('scroll', scheduleWindowRender, { passive: true });
+    window.addEventListener('resize', () => {
+        renderedRange = null;
+        scheduleWindowRender();
+    });
     refreshBtn.addEventListener('click', () => {
-        listingsGrid.innerHTML = '<div class="loading-spinner"><i class="fas fa-circle-notch fa-spin"></i> Loading...</div>';
-        fetchListings();
+        if (initialData && initialData.static) {
+            // 静的サイトにはAPIがないため、生成し直されたページを読み込む
+            window.location.reload();
+            return;
+        }
+        showMessage('<div class="loading-spinner"><i class="fas fa-circle-notch fa-spin"></i> Loading...</div>');
+        fetchListings(requestedLayouts());
     });
 
+    function readInitialData() {
+        const el = document.getElementById('initial-data');
+        if (!el) return null;
+        try {
+            return JSON.parse(el.textContent);
+        } catch (error) {
+            console.error('Error parsing initial data:', error);
+            return null;
+        }
+    }
+
+    // 埋め込まれたマンション情報と物件データを、APIを呼ばずに表示する
+    function applyInitialData(data) {
+        currentProperty = data.property;
+        if (currentProperty) {
+            document.title = currentProperty.name;
+        }
+        snapshotVersion = data.snapshot.version || null;
+        setListings(data.snapshot.listings, data.snapshot);
+        if (!data.static) {
+            subscribeUpdates();
+        }
+    }
+
     async function loadPropertyInfo() {
         try {
             const response = await fetch('/api/properties');
@@ -52,42 +113,112 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
-    async function fetchListings() {
+    // サーバーに要求する間取り（一部だけチェックされている場合。すべて・なしの場合は全件なのでnull）
+    function requestedLayouts() {
+        const checked = Array.from(layoutCheckboxes)
+            .filter(checkbox => checkbox.checked)
+            .map(checkbox => checkbox.value);
+        if (checked.length === 0 || checked.length === layoutCheckboxes.length) return null;
+        return checked;
+    }
+
+    // 読み込み済みの物件にない間取りがチェックされた場合だけサーバーから取得し直す
+    function onLayoutChange() {
+        const layouts = requestedLayouts();
+        const covered = loadedLayouts === null
+            || (layouts !== null && layouts.every(layout => loadedLayouts.includes(layout)));
+        if (covered || (initialData && initialData.static)) {
+            renderListings();
+            return;
+        }
+        showMessage('<div class="loading-spinner"><i class="fas fa-circle-notch fa-spin"></i> Loading...</div>');
+        fetchListings(layouts);
+    }
+
+    async function fetchListings(layouts) {
         try {
             // マンション固有のAPIエンドポイント
-            const apiUrl = `/api/properties/${propertyId}/listings`;
+            // 一部の間取りだけの場合はその間取りのシャードを取得する（差分は全件に対してだけ提供される）
+            // 全件を表示中のバージョンがあれば、そこからの差分だけを取得する
+            const params = new URLSearchParams();
+            if (layouts) {
+                layouts.forEach(layout => params.append('layout', layout));
+            } else if (snapshotVersion && loadedLayouts === null) {
+                params.set('since', snapshotVersion);
+            }
+            const query = params.toString();
+            const apiUrl = `/api/properties/${propertyId}/listings${query ? `?${query}` : ''}`;
             const response = await fetch(apiUrl);
             const data = await response.json();
 
             if (data.error) {
                 console.error(data.error);
-                listingsGrid.innerHTML = `<div style="text-align:center; grid-column:1/-1;">Error loading data: ${data.error}</div>`;
+                showMessage(`<div style="text-align:center; grid-column:1/-1;">Error loading data: ${data.error}</div>`);
                 return;
             }
 
-            // 重複排除ロジック
-            // キー: price-area-floor-direction
-            const uniqueMap = new Map();
-            data.listings.forEach(item => {
-                // ソースごとの重複排除に変更（異なるサイトなら同じ物件でも表示）
-                const key = `${item.source}-${item.price || 0}-${item.area || 0}-${item.floor || 0}-${item.direction || ''}`;
-                if (!uniqueMap.has(key)) {
-                    uniqueMap.set(key, item);
-                }
-            });
-
-            listings = Array.from(uniqueMap.values());
-            console.log(`Loaded ${data.listings.length} listings, ${listings.length} unique.`);
-
-            updateStats(data, listings.length);
-            renderListings();
+            snapshotVersion = response.headers.get('X-Snapshot-Version') || data.version || null;
+            loadedLayouts = layouts || null;
+            if (data.delta) {
+                applyDelta(data);
+            } else {
+                setListings(data.listings, data);
+            }
+            subscribeUpdates();
 
         } catch (error) {
             console.error('Error fetching listings:', error);
-            listingsGrid.innerHTML = '<div style="text-align:center; grid-column:1/-1;">Failed to connect to server.</div>';
+            showMessage('<div style="text-align:center; grid-column:1/-1;">Failed to connect to server.</div>');
         }
     }
 
+    function setListings(items, data) {
+        rawListings = items;
+
+        // 重複排除ロジック
+        // キー: price-area-floor-direction
+        const uniqueMap = new Map();
+        items.forEach(item => {
+            // ソースごとの重複排除に変更（異なるサイトなら同じ物件でも表示）
+            const key = `${item.source}-${item.price || 0}-${item.area || 0}-${item.floor || 0}-${item.direction || ''}`;
+            if (!uniqueMap.has(key)) {
+                uniqueMap.set(key, item);
+            }
+        });
+
+        listings = Array.from(uniqueMap.values());
+        searchTexts = listings.map(l => `${l.title || ''}\n${l.source || ''}`.toLowerCase());
+        console.log(`Loaded ${items.length} listings, ${listings.length} unique.`);
+
+        updateStats(data, listings.length);
+        renderListings();
+    }
+
+    // 新しいスナップショットの公開をサーバーから受け取る（Server-Sent Events）
+    function subscribeUpdates() {
+        if (eventSource || !window.EventSource) return;
+
+        eventSource = new EventSource(`/api/properties/${propertyId}/events`);
+        eventSource.addEventListener('snapshot', async (e) => {
+            const event = JSON.parse(e.data);
+            if (!snapshotVersion || event.version === snapshotVersion) return;
+
+            console.log(`Snapshot updated: ${snapshotVersion} -> ${event.version}`);
+            // 全件を表示中の場合は差分だけを、間取りのシャードを表示中の場合は同じシャードを取得する
+            fetchListings(loadedLayouts);
+        });
+    }
+
+    // 差分（追加・変更・削除）を手元の物件データに適用する（物件はURLで識別）
+    function applyDelta(delta) {
+        const byKey = new Map(rawListings.map((l, i) => [l.url || `index:${i}`, l]));
+        delta.removed.forEach(key => byKey.delete(key));
+        [...delta.added, ...delta.changed].forEach((l, i) => byKey.set(l.url || `added:${i}`, l));
+
+        console.log(`Applied delta since ${delta.since}: +${delta.added.length} ~${delta.changed.length} -${delta.removed.length}`);
+        setListings(Array.from(byKey.values()), delta);
+    }
+
     function updateStats(data, uniqueCount) {
         // 表示名を変更
         const statLabel = document.querySelector('.stat-label');
@@ -96,9 +227,8 @@ document.addEventListener('DOMContentLoaded', () => {
         totalListingsEl.textContent = uniqueCount;
 
         // Find min price
-        const prices = listings.map(l => l.price).filter(p => p > 0);
-        if (prices.length > 0) {
-            const minPrice = Math.min(...prices);
+        const minPrice = findMinPrice(listings);
+        if (minPrice !== null) {
             minPriceEl.innerHTML = formatPrice(minPrice);
         }
 
@@ -109,30 +239,37 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
+    function findMinPrice(items) {
+        // 件数が多い場合に Math.min(...prices) は引数の上限を超えるためループで求める
+        let minPrice = null;
+        for (const l of items) {
+            if (l.price > 0 && (minPrice === null || l.price < minPrice)) minPrice = l.price;
+        }
+        return minPrice;
+    }
+
     function renderListings() {
-        // Filter by search term
+        // Filter by search term（小文字化済みのテキストで絞り込む）
         const searchTerm = searchInput.value.toLowerCase();
-        let filtered = listings.filter(l => {
-            return (l.title && l.title.toLowerCase().includes(searchTerm)) ||
-                (l.source && l.source.toLowerCase().includes(searchTerm));
-        });
 
         // Filter by LDK (checkbox-based)
-        const selectedLayouts = Array.from(layoutCheckboxes)
+        const selectedLayouts = new Set(Array.from(layoutCheckboxes)
             .filter(checkbox => checkbox.checked)
-            .map(checkbox => checkbox.value);
+            .map(checkbox => checkbox.value));
 
-        if (selectedLayouts.length > 0) {
-            filtered = filtered.filter(l => selectedLayouts.includes(l.layout));
+        filtered = [];
+        for (let i = 0; i < listings.length; i++) {
+            if (searchTerm && !searchTexts[i].includes(searchTerm)) continue;
+            if (selectedLayouts.size > 0 && !selectedLayouts.has(listings[i].layout)) continue;
+            filtered.push(listings[i]);
         }
 
         // Update stats based on filtered data
         totalListingsEl.textContent = filtered.length;
 
         // Update min price based on filtered data
-        const filteredPrices = filtered.map(l => l.price).filter(p => p > 0);
-        if (filteredPrices.length > 0) {
-            const minPrice = Math.min(...filteredPrices);
+        const minPrice = findMinPrice(filtered);
+        if (minPrice !== null) {
             minPriceEl.innerHTML = formatPrice(minPrice);
         } else {
             minPriceEl.textContent = '-';
@@ -151,78 +288,179 @@ document.addEventListener('DOMContentLoaded', () => {
         });
 
         // Render
-        listingsGrid.innerHTML = '';
-
+        renderedRange = null;
         if (filtered.length === 0) {
-            listingsGrid.innerHTML = '<div style="text-align:center; grid-column:1/-1; padding: 50px;">No listings found matching your criteria.</div>';
+            showMessage('<div style="text-align:center; grid-column:1/-1; padding: 50px;">No listings found matching your criteria.</div>');
             return;
         }
+        renderWindow();
+    }
 
-        filtered.forEach((listing, index) => {
-            const card = createListingCard(listing, index);
-            listingsGrid.appendChild(card);
+    // カードの代わりにメッセージを表示する（カード要素は次の描画で使い回す）
+    function showMessage(html) {
+        renderedRange = null;
+        listingsGrid.style.paddingTop = '';
+        listingsGrid.style.paddingBottom = '';
+        listingsGrid.innerHTML = html;
+    }
+
+    function scheduleWindowRender() {
+        if (frameRequested) return;
+        frameRequested = true;
+        requestAnimationFrame(() => {
+            frameRequested = false;
+            renderWindow();
         });
     }
 
-    function createListingCard(listing, index) {
+    function countColumns() {
+        const tracks = getComputedStyle(listingsGrid).gridTemplateColumns.split(' ').filter(t => t && t !== 'none');
+        return Math.max(1, tracks.length);
+    }
+
+    // 画面に見えている行（と前後数行）のカードだけを描画する
+    // 描画しない行の高さはグリッドの上下の余白で確保し、カード要素は位置ごとに使い回す
+    function renderWindow() {
+        if (filtered.length === 0) return;
+
+        const columns = countColumns();
+        const totalRows = Math.ceil(filtered.length / columns);
+        const gridTop = listingsGrid.getBoundingClientRect().top + window.scrollY;
+        const viewTop = window.scrollY - gridTop;
+        // 絞り込みで件数が減ってスクロール位置が末尾を越えている場合も、最後の行は描画する
+        const firstRow = Math.min(totalRows - 1, Math.max(0, Math.floor(viewTop / rowStride) - OVERSCAN_ROWS));
+        const lastRow = Math.min(totalRows, Math.max(firstRow + 1, Math.ceil((viewTop + window.innerHeight) / rowStride) + OVERSCAN_ROWS));
+        const start = firstRow * columns;
+        const end = Math.min(filtered.length, lastRow * columns);
+
+        if (renderedRange && renderedRange[0] === start && renderedRange[1] === end) return;
+        renderedRange = [start, end];
+
+        const count = end - start;
+        while (cardPool.length < count) {
+            cardPool.push(createListingCard());
+        }
+        for (let i = 0; i < count; i++) {
+            fillListingCard(cardPool[i], filtered[start + i]);
+        }
+
+        if (listingsGrid.firstElementChild !== cardPool[0]) {
+            // メッセージやローディング表示を置き換える
+            listingsGrid.replaceChildren(...cardPool.slice(0, count));
+        } else {
+            while (listingsGrid.childElementCount > count) {
+                listingsGrid.lastElementChild.remove();
+            }
+            for (let i = listingsGrid.childElementCount; i < count; i++) {
+                listingsGrid.appendChild(cardPool[i]);
+            }
+        }
+
+        listingsGrid.style.paddingTop = `${firstRow * rowStride}px`;
+        listingsGrid.style.paddingBottom = `${(totalRows - lastRow) * rowStride}px`;
+
+        // 描画したカードから実際の行の高さを測り、ずれていれば描画し直す
+        const renderedRows = Math.ceil(count / columns);
+        if (renderedRows > 1) {
+            const measured = (cardPool[(renderedRows - 1) * columns].offsetTop - cardPool[0].offsetTop) / (renderedRows - 1);
+            if (measured > 0 && Math.abs(measured - rowStride) > 1) {
+                rowStride = measured;
+                renderedRange = null;
+                scheduleWindowRender();
+            }
+        }
+    }
+
+    // カードの骨組みを作る（内容は fillListingCard で設定する）
+    function createListingCard() {
         const div = document.createElement('div');
         div.className = 'listing-card';
-        div.style.animationDelay = `${index * 0.05}s`;
-
-        const priceFormatted = formatPrice(listing.price);
-        const areaFormatted = listing.area ? `${listing.area}m²` : '-';
-        const floorFormatted = listing.floor ? `${listing.floor}F` : '-';
-        const directionFormatted = listing.direction || '-';
-        const maintenance = listing.management_fee ? `¥${listing.management_fee.toLocaleString()}` : '-';
-        const repair = listing.repair_reserve ? `¥${listing.repair_reserve.toLocaleString()}` : '-';
-        const pricePerTsubo = calculatePricePerTsubo(listing.price, listing.area);
 
         div.innerHTML = `
             <div class="card-header">
-                <div class="price-tag">${priceFormatted}</div>
-                <div class="card-title" title="${listing.title}">${listing.title}</div>
+                <div class="price-tag"></div>
+                <div class="card-title"></div>
             </div>
             <div class="card-body">
                 <div class="info-grid">
                     <div class="info-item">
                         <span class="info-label"><i class="fas fa-vector-square info-icon"></i> Area</span>
-                        <span class="info-value">${areaFormatted}</span>
+                        <span class="info-value" data-field="area"></span>
                     </div>
                     <div class="info-item">
                         <span class="info-label"><i class="fas fa-building info-icon"></i> Floor</span>
-                        <span class="info-value">${floorFormatted}</span>
+                        <span class="info-value" data-field="floor"></span>
                     </div>
                     <div class="info-item">
                         <span class="info-label"><i class="fas fa-compass info-icon"></i> Direction</span>
-                        <span class="info-value">${directionFormatted}</span>
+                        <span class="info-value" data-field="direction"></span>
                     </div>
                     <div class="info-item">
                         <span class="info-label"><i class="fas fa-yen-sign info-icon"></i> Price/坪</span>
-                        <span class="info-value">${pricePerTsubo}</span>
+                        <span class="info-value" data-field="tsubo"></span>
                     </div>
                     <div class="info-item">
                         <span class="info-label"><i class="fas fa-tools info-icon"></i> Repair Fee</span>
-                        <span class="info-value">${repair}</span>
+                        <span class="info-value" data-field="repair"></span>
                     </div>
                 </div>
                 
-                <div class="tags-section">
-                    ${listing.layout ? `<span class="tag tag-layout">${listing.layout}</span>` : ''}
-                    <span class="tag source-${listing.source.toLowerCase().replace(/\s+/g, '')}">${listing.source}</span>
-                    ${listing.age_years ? `<span class="tag">Age: ${listing.age_years}yr</span>` : ''}
-                </div>
+                <div class="tags-section"></div>
             </div>
             <div class="card-footer">
-                <span class="posted-date"><i class="far fa-clock"></i> ${listing.posted_date || 'Unknown'}</span>
-                <a href="${listing.url}" target="_blank" class="view-btn">
+                <span class="posted-date"><i class="far fa-clock"></i> <span data-field="posted"></span></span>
+                <a target="_blank" class="view-btn">
                     View <i class="fas fa-external-link-alt"></i>
                 </a>
             </div>
         `;
 
+        div.fields = {
+            price: div.querySelector('.price-tag'),
+            title: div.querySelector('.card-title'),
+            area: div.querySelector('[data-field="area"]'),
+            floor: div.querySelector('[data-field="floor"]'),
+            direction: div.querySelector('[data-field="direction"]'),
+            tsubo: div.querySelector('[data-field="tsubo"]'),
+            repair: div.querySelector('[data-field="repair"]'),
+            tags: div.querySelector('.tags-section'),
+            posted: div.querySelector('[data-field="posted"]'),
+            link: div.querySelector('.view-btn'),
+        };
         return div;
     }
 
+    function fillListingCard(card, listing) {
+        if (card.listing === listing) return;
+        card.listing = listing;
+        const f = card.fields;
+
+        f.price.innerHTML = formatPrice(listing.price);
+        f.title.textContent = listing.title || '';
+        f.title.title = listing.title || '';
+        f.area.textContent = listing.area ? `${listing.area}m²` : '-';
+        f.floor.textContent = listing.floor ? `${listing.floor}F` : '-';
+        f.direction.textContent = listing.direction || '-';
+        f.tsubo.textContent = calculatePricePerTsubo(listing.price, listing.area);
+        f.repair.textContent = listing.repair_reserve ? `¥${listing.repair_reserve.toLocaleString()}` : '-';
+        f.posted.textContent = listing.posted_date || 'Unknown';
+        f.link.href = listing.url || '#';
+
+        f.tags.replaceChildren();
+        if (listing.layout) f.tags.appendChild(createTag(listing.layout, 'tag tag-layout'));
+        f.tags.appendChild(createTag(listing.source, `tag source-${(listing.source || '').toLowerCase().replace(/\s+/g, '')}`));
+        // 築年数は竣工年から表示時に求める（以前のデータは age_years のみを持つ）
+        const age = listing.built_year ? new Date().getFullYear() - listing.built_year : listing.age_years;
+        if (age) f.tags.appendChild(createTag(`Age: ${age}yr`, 'tag'));
+    }
+
+    function createTag(text, className) {
+        const span = document.createElement('span');
+        span.className = className;
+        span.textContent = text;
+        return span;
+    }
+
     function formatPrice(price) {
         if (!price) return '-';
 